@@ -0,0 +1,468 @@
+"""Prebuilt scan artifacts.
+
+``codeguessr index`` runs the full table scan once, typically in CI next to
+a repository snapshot, and saves the results to one file: the ``FileTable``
+(paths that survived pruning and ``.gitignore``, sizes, line counts,
+classification features), every file's ``HighlightIndex`` and its MinHash
+signature.  ``codeguessr serve --index PATH`` loads that file instead of
+walking the tree, so a server starts without touching the filesystem; file
+contents are still read from the root when rounds are played.
+
+File layout (all integers little-endian, sections 8-byte aligned so the
+file can be memory-mapped and each section viewed in place)::
+
+    header    magic "CGINDEX\\0", format version (u32), section count (u32)
+    sections  one (name: 16 bytes, offset: u64, length: u64) per section
+    data      one blob per section
+
+Section ``meta`` holds JSON (root, creation time, row count, extension
+codes, …).  ``paths`` holds the NUL-separated relative paths; every other
+section is a packed array whose type code is recorded in ``meta``.
+
+Artifacts are read through ``MappedIndex``, which keeps the file mapped and
+serves the table columns and highlight indexes as views of the mapping, so
+processes serving the same artifact (``serve --workers``) share one copy of
+it in the page cache; only the paths and signatures are per process.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any
+
+from codeguessr.classify import DEFAULT_LIMITS, ClassifyLimits
+from codeguessr.content import default_store
+from codeguessr.game import HIGHLIGHT_BUCKETS, MIN_LINES, FilterPlan, HighlightIndex, ScanStats
+from codeguessr.neardup import NUM_PERM, NearDuplicateIndex
+from codeguessr.table import COLUMNS, EXTENSIONS, FileTable, iter_scan_table
+from codeguessr.treesample import iter_sample_directory
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+INDEX_MAGIC: bytes = b"CGINDEX\0"
+# Bump whenever the layout or the meaning of a section changes.
+INDEX_VERSION: int = 1
+
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<16sQQ")
+_ALIGN = 8
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+def _little_endian(values: "array[Any]") -> bytes:
+    if sys.byteorder == "little" or values.itemsize == 1:
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def write_index(
+    path: str | os.PathLike[str],
+    root: str | os.PathLike[str],
+    table: FileTable,
+    highlights: Mapping[str, HighlightIndex],
+    near_dups: NearDuplicateIndex | None = None,
+) -> int:
+    """Save a scan of *root* to the artifact file *path*.
+
+    Args:
+        path: File to write; it is replaced atomically.
+        root: Root the table was scanned from, recorded for reference.
+        table: Sorted table of the scan.
+        highlights: ``HighlightIndex`` of every row of *table*.
+        near_dups: Optional signatures of the rows; rows without one are
+            recorded as such.
+
+    Returns:
+        Size of the written file in bytes.
+
+    Raises:
+        KeyError: If a row of *table* has no highlight index.
+    """
+    rows = len(table)
+    sections: dict[str, array[Any] | bytes] = {}
+    typecodes: dict[str, str] = {}
+
+    def add(name: str, values: "array[Any]") -> None:
+        sections[name] = values
+        typecodes[name] = values.typecode
+
+    for name in COLUMNS:
+        add(name, getattr(table, name))
+
+    hl_lines = array("I")
+    hl_middle = array("I")
+    hl_lengths = array("H")
+    hl_buckets = array("I")
+    hl_outer = array("I")
+    mid_offsets = array("Q", [0])
+    out_offsets = array("Q", [0])
+    signatures = array("Q")
+    has_signature = array("B")
+    for rel in table.paths:
+        index = highlights[rel]
+        hl_lines.append(index.line_count)
+        # Line numbers may be packed as "H" or "I"; they are widened to "I".
+        hl_middle.extend(iter(index.middle))
+        hl_lengths.extend(index.lengths)
+        hl_buckets.extend(index.bucket_starts)
+        hl_outer.extend(iter(index.outer))
+        mid_offsets.append(len(hl_middle))
+        out_offsets.append(len(hl_outer))
+        signature = near_dups.signature(rel) if near_dups is not None else None
+        has_signature.append(signature is not None)
+        signatures.extend(signature if signature is not None else array("Q", bytes(NUM_PERM * 8)))
+    for name, values in (
+        ("hl_line_counts", hl_lines), ("hl_middle", hl_middle), ("hl_lengths", hl_lengths),
+        ("hl_buckets", hl_buckets), ("hl_outer", hl_outer), ("hl_mid_offsets", mid_offsets),
+        ("hl_out_offsets", out_offsets), ("minhash", signatures), ("minhash_mask", has_signature),
+    ):
+        add(name, values)
+
+    sections["paths"] = "\0".join(table.paths).encode("utf-8", errors="surrogateescape")
+    meta = {
+        "version": INDEX_VERSION,
+        "root": os.fspath(root),
+        "created": time.time(),
+        "rows": rows,
+        "extensions": list(EXTENSIONS),
+        "highlight_buckets": list(HIGHLIGHT_BUCKETS),
+        "num_perm": NUM_PERM,
+        "typecodes": typecodes,
+    }
+    sections = {"meta": json.dumps(meta).encode(), **sections}
+
+    blobs = [
+        (name, data if isinstance(data, bytes) else _little_endian(data))
+        for name, data in sections.items()
+    ]
+    offset = _HEADER.size + _SECTION.size * len(blobs)
+    table_entries = []
+    for name, blob in blobs:
+        offset += -offset % _ALIGN
+        table_entries.append(_SECTION.pack(name.encode(), offset, len(blob)))
+        offset += len(blob)
+
+    tmp = f"{os.fspath(path)}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(blobs)))
+        fh.writelines(table_entries)
+        for _, blob in blobs:
+            fh.write(bytes(-fh.tell() % _ALIGN))
+            fh.write(blob)
+        size = fh.tell()
+    os.replace(tmp, path)
+    return size
+
+
+def build_index(
+    root: str | os.PathLike[str],
+    path: str | os.PathLike[str],
+    stats: ScanStats | None = None,
+) -> tuple[FileTable, int]:
+    """Scan *root* completely and save the artifact to *path*.
+
+    Args:
+        root: Directory to scan.
+        path: Artifact file to write.
+        stats: Optional statistics that receive the scan's counters, phase
+            timings and trace spans.
+
+    Returns:
+        The scanned table and the size of the written file in bytes.
+    """
+    table = FileTable()
+    highlights: dict[str, HighlightIndex] = {}
+    near_dups = NearDuplicateIndex()
+    # Every file is read, so the artifact holds no unread rows for the
+    # processes that map it to fill in.
+    for _ in iter_scan_table(
+        root, table, highlights=highlights, limits=None, near_dups=near_dups, stats=stats
+    ):
+        pass
+    return table, write_index(path, root, table, highlights, near_dups)
+
+
+def build_sample_index(
+    root: str | os.PathLike[str],
+    path: str | os.PathLike[str],
+    sample_size: int,
+    limits: ClassifyLimits = DEFAULT_LIMITS,
+) -> tuple[FileTable, int]:
+    """Sample *root* once and save the sampled files as an artifact to *path*.
+
+    Lets several processes share one sample (``serve --workers --sample``)
+    instead of each drawing and indexing its own.  Only the sampled files
+    get rows, so every game served from the artifact plays from them.
+
+    Args:
+        root: Directory to sample.
+        path: Artifact file to write.
+        sample_size: Number of files to draw (see ``iter_sample_directory``).
+        limits: Classification thresholds the sampled files must pass.
+
+    Returns:
+        The table of sampled files and the size of the written file in bytes.
+    """
+    store = default_store()
+    table = FileTable()
+    highlights: dict[str, HighlightIndex] = {}
+    near_dups = NearDuplicateIndex()
+    for rel in iter_sample_directory(
+        root, sample_size=sample_size, highlights=highlights,
+        plan=FilterPlan(limits=limits), near_dups=near_dups,
+    ):
+        filepath = os.path.join(root, rel)
+        # Both were just cached by the sampler.
+        source = store.read(filepath)
+        table.append(rel, source.size, source.lines, source.mtime, store.sniff(filepath))
+    table.sort()
+    return table, write_index(path, root, table, highlights, near_dups)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+class _Sections:
+    """Section views of a memory-mapped artifact."""
+
+    def __init__(self, mapped: mmap.mmap, path: str) -> None:
+        magic, version, count = _HEADER.unpack_from(mapped, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a CodeGuessr index")
+        if version != INDEX_VERSION:
+            raise ValueError(
+                f"{path} has index format {version}, expected {INDEX_VERSION}; rebuild it"
+            )
+        self.mapped = mapped
+        self.spans: dict[str, tuple[int, int]] = {}
+        for idx in range(count):
+            name, offset, length = _SECTION.unpack_from(mapped, _HEADER.size + idx * _SECTION.size)
+            self.spans[name.rstrip(b"\0").decode()] = (offset, length)
+        self.meta: dict[str, Any] = json.loads(self.raw("meta"))
+
+    def raw(self, name: str) -> bytes:
+        offset, length = self.spans[name]
+        return self.mapped[offset: offset + length]
+
+    def array(self, name: str) -> "array[Any]":
+        values = array(self.meta["typecodes"][name])
+        offset, length = self.spans[name]
+        with memoryview(self.mapped) as view:
+            values.frombytes(view[offset: offset + length])
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def view(self, name: str) -> Any:
+        """Return section *name* as a read-only sequence without copying it.
+
+        On big-endian hosts the section is copied and byte-swapped instead.
+        """
+        if sys.byteorder != "little":
+            return self.array(name)
+        offset, length = self.spans[name]
+        return memoryview(self.mapped)[offset: offset + length].cast(self.meta["typecodes"][name])
+
+    def check_compatible(self, path: str | os.PathLike[str]) -> None:
+        meta = self.meta
+        if (
+            meta["extensions"] != list(EXTENSIONS)
+            or meta["highlight_buckets"] != list(HIGHLIGHT_BUCKETS)
+        ):
+            raise ValueError(f"{path} was built by an incompatible version; rebuild it")
+
+
+def read_index_meta(path: str | os.PathLike[str]) -> dict[str, Any]:
+    """Return the ``meta`` section of the artifact at *path*.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If it is not an artifact of the current format.
+    """
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return _Sections(mapped, os.fspath(path)).meta
+
+
+def _load_signatures(sections: _Sections, paths: list[str], near_dups: NearDuplicateIndex) -> None:
+    if sections.meta["num_perm"] != NUM_PERM:
+        return
+    signatures = sections.array("minhash")
+    mask = sections.array("minhash_mask")
+    for row, rel in enumerate(paths):
+        if mask[row]:
+            near_dups.add_signature(rel, signatures[row * NUM_PERM: (row + 1) * NUM_PERM])
+
+
+# ---------------------------------------------------------------------------
+# Shared mappings
+# ---------------------------------------------------------------------------
+
+
+class MappedIndex:
+    """An artifact kept memory-mapped for the life of the process.
+
+    The mapping is read-only and backed by the file, so every process that
+    maps the same artifact shares its pages.
+
+    Args:
+        path: Artifact written by ``write_index``.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If it is not an artifact of the current format or was
+            built with different extension codes or highlight buckets.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        with open(path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sections = _Sections(mapped, self.path)
+        self._sections.check_compatible(path)
+        self.meta = self._sections.meta
+        sections = self._sections
+        self.line_counts = sections.view("hl_line_counts")
+        self.middle = sections.view("hl_middle")
+        self.lengths = sections.view("hl_lengths")
+        self.buckets = sections.view("hl_buckets")
+        self.outer = sections.view("hl_outer")
+        self.mid_offsets = sections.view("hl_mid_offsets")
+        self.out_offsets = sections.view("hl_out_offsets")
+
+    def fill_table(self, table: FileTable) -> None:
+        """Point *table*'s columns at the mapping and decode its paths.
+
+        The columns become read-only views; the table must not be appended
+        to afterwards.
+        """
+        raw_paths = self._sections.raw("paths").decode("utf-8", errors="surrogateescape")
+        table.paths = raw_paths.split("\0") if self.meta["rows"] else []
+        for name in COLUMNS:
+            setattr(table, name, self._sections.view(name))
+
+    def load_signatures(self, paths: list[str], near_dups: NearDuplicateIndex) -> None:
+        """Add the recorded MinHash signatures of *paths* to *near_dups*."""
+        _load_signatures(self._sections, paths, near_dups)
+
+    def highlight(self, row: int) -> HighlightIndex:
+        """Return the highlight index of *row* as views of the mapping."""
+        width = len(HIGHLIGHT_BUCKETS)
+        mid = slice(self.mid_offsets[row], self.mid_offsets[row + 1])
+        return HighlightIndex(
+            line_count=self.line_counts[row],
+            middle=self.middle[mid],
+            lengths=self.lengths[mid],
+            bucket_starts=self.buckets[row * width: (row + 1) * width],
+            outer=self.outer[self.out_offsets[row]: self.out_offsets[row + 1]],
+        )
+
+
+class SharedHighlights(MutableMapping[str, HighlightIndex]):
+    """Highlight indexes of a ``MappedIndex``, built on access.
+
+    Looks paths up in the (sorted) *table* the mapping filled.  Until
+    ``attach`` is called it is empty; entries assigned later (files indexed
+    after the artifact was built) are kept in a private dict and take
+    precedence.
+
+    Args:
+        table: Table filled by ``MappedIndex.fill_table``.
+    """
+
+    def __init__(self, table: FileTable) -> None:
+        self._table = table
+        self._mapped: MappedIndex | None = None
+        self._extra: dict[str, HighlightIndex] = {}
+
+    def attach(self, mapped: MappedIndex) -> None:
+        """Serve the highlight indexes of *mapped*."""
+        self._mapped = mapped
+
+    def _row(self, rel: str) -> int | None:
+        if self._mapped is None:
+            return None
+        paths = self._table.paths
+        row = bisect_left(paths, rel)
+        return row if row < len(paths) and paths[row] == rel else None
+
+    def __getitem__(self, rel: str) -> HighlightIndex:
+        extra = self._extra.get(rel)
+        if extra is not None:
+            return extra
+        row = self._row(rel)
+        if row is None or self._mapped is None:
+            raise KeyError(rel)
+        return self._mapped.highlight(row)
+
+    def __contains__(self, rel: object) -> bool:
+        return rel in self._extra or (isinstance(rel, str) and self._row(rel) is not None)
+
+    def __setitem__(self, rel: str, index: HighlightIndex) -> None:
+        self._extra[rel] = index
+
+    def __delitem__(self, rel: str) -> None:
+        # Mapped entries are read-only; only assigned ones can be removed.
+        del self._extra[rel]
+
+    def __iter__(self) -> Iterator[str]:
+        if self._mapped is not None:
+            yield from self._table.paths
+        yield from (rel for rel in list(self._extra) if self._row(rel) is None)
+
+    def __len__(self) -> int:
+        mapped = len(self._table.paths) if self._mapped is not None else 0
+        return mapped + sum(1 for rel in list(self._extra) if self._row(rel) is None)
+
+    def private(self) -> dict[str, HighlightIndex]:
+        """Return the entries assigned in this process (not backed by the mapping)."""
+        return dict(self._extra)
+
+
+def iter_map_index(
+    root: str | os.PathLike[str],
+    table: FileTable,
+    index_path: str | os.PathLike[str],
+    highlights: SharedHighlights,
+    min_lines: int = MIN_LINES,
+    limits: ClassifyLimits | None = DEFAULT_LIMITS,
+    near_dups: NearDuplicateIndex | None = None,
+) -> Iterator[str]:
+    """Scanner that fills *table* from an artifact instead of walking *root*.
+
+    A drop-in replacement for ``iter_scan_table`` in ``ScanProgress.run``.
+    The artifact is mapped rather than copied (see ``MappedIndex``).
+
+    Args:
+        root: Root directory the artifact describes (not accessed).
+        table: Empty table whose columns become views of the artifact.
+        index_path: Artifact written by ``write_index``.
+        highlights: Receives the artifact's highlight indexes.
+        min_lines: Threshold for the paths that are yielded.
+        limits: Classification thresholds for the paths that are yielded.
+        near_dups: Optional index that receives the recorded signatures.
+
+    Yields:
+        Relative paths that pass *min_lines* and *limits*, in path order.
+    """
+    mapped = MappedIndex(index_path)
+    mapped.fill_table(table)
+    highlights.attach(mapped)
+    if near_dups is not None:
+        mapped.load_signatures(table.paths, near_dups)
+    yield from table.select(min_lines, limits=limits)
@@ -0,0 +1,163 @@
+"""Cheap pre-classification of source files.
+
+Before a file is fully read, its first ``SNIFF_BYTES`` are inspected to tell
+ordinary sources apart from binary blobs, generated code and minified
+bundles, which make huge, unplayable rounds.  ``Sniff`` holds the measured
+features; ``ClassifyLimits`` turns them into a verdict using per-request
+thresholds.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Self
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Bytes inspected at the start of each file.
+SNIFF_BYTES: int = 8192
+
+MAX_LINE_LENGTH: int = 1000
+MAX_AVG_LINE_LENGTH: int = 200
+MAX_FILE_BYTES: int = 1024 * 1024
+
+# Share of control bytes (other than whitespace) above which a file is binary.
+BINARY_CONTROL_RATIO: float = 0.1
+
+# Markers that tools put at the top of files they generate.  Only the
+# leading comment lines are searched (see ``_header``), so sources that
+# merely mention these phrases later on are not mistaken for generated code.
+_GENERATED_RE = re.compile(
+    rb"@generated|do not edit|code generated by|auto-?generated|"
+    rb"this file (?:is|was) (?:automatically )?generated",
+    re.IGNORECASE,
+)
+# Prefixes of line comments, and the delimiters of block comments.
+_LINE_COMMENTS = (b"#", b"//", b"--", b";", b"%")
+_BLOCK_COMMENTS = ((b"/*", b"*/"), (b"<!--", b"-->"), (b"{-", b"-}"), (b"(*", b"*)"))
+
+_TEXT_CONTROLS = frozenset(b"\t\n\r\f\b")
+
+# Verdicts returned by ``ClassifyLimits.classify``.
+SOURCE = "source"
+BINARY = "binary"
+GENERATED = "generated"
+MINIFIED = "minified"
+OVERSIZED = "oversized"
+
+
+# ---------------------------------------------------------------------------
+# Classification
+# ---------------------------------------------------------------------------
+
+
+def _header(head: bytes) -> bytes:
+    """Return the comment lines that open *head*, up to the first line of code.
+
+    Blank lines are skipped; a block comment counts as header up to its
+    closing delimiter.  Docstrings are code, not header.
+    """
+    header: list[bytes] = []
+    closing: bytes | None = None
+    for line in head.split(b"\n"):
+        stripped = line.strip()
+        if closing is not None:
+            header.append(stripped)
+            if closing in stripped:
+                closing = None
+            continue
+        if not stripped:
+            continue
+        if stripped.startswith(_LINE_COMMENTS):
+            header.append(stripped)
+            continue
+        for opening, end in _BLOCK_COMMENTS:
+            if stripped.startswith(opening):
+                header.append(stripped)
+                if end not in stripped[len(opening):]:
+                    closing = end
+                break
+        else:
+            break
+    return b"\n".join(header)
+
+
+@dataclass(frozen=True)
+class Sniff:
+    """Features measured from the head of one file.
+
+    Attributes:
+        size: Total file size in bytes.
+        binary: True if the head contains NUL bytes or too many control bytes.
+        generated: True if the comment lines that open the file carry a
+            generated-code marker.
+        max_line: Longest line length (in bytes) seen in the head.
+        avg_line: Mean line length (in bytes) over the head.
+    """
+
+    size: int
+    binary: bool
+    generated: bool
+    max_line: int
+    avg_line: int
+
+    @classmethod
+    def from_head(cls, head: bytes, size: int) -> Self:
+        """Measure *head*, the first bytes of a file of *size* bytes.
+
+        Args:
+            head: Leading bytes of the file (at most ``SNIFF_BYTES``).
+            size: Total size of the file in bytes.
+
+        Returns:
+            The measured features.
+        """
+        controls = sum(1 for byte in head if byte < 32 and byte not in _TEXT_CONTROLS)
+        lines = head.split(b"\n")
+        return cls(
+            size=size,
+            binary=b"\0" in head or controls > len(head) * BINARY_CONTROL_RATIO,
+            generated=_GENERATED_RE.search(_header(head)) is not None,
+            max_line=max(len(line) for line in lines),
+            avg_line=len(head) // len(lines),
+        )
+
+
+@dataclass(frozen=True)
+class ClassifyLimits:
+    """Thresholds that decide which sniffed files are playable.
+
+    Binary files are always rejected.
+
+    Attributes:
+        max_line_length: Files with a longer line are treated as minified.
+        max_avg_line_length: Files with a longer mean line are treated as
+            minified.
+        max_file_bytes: Larger files are rejected as oversized.
+        allow_generated: Keep files that carry a generated-code marker.
+    """
+
+    max_line_length: int = MAX_LINE_LENGTH
+    max_avg_line_length: int = MAX_AVG_LINE_LENGTH
+    max_file_bytes: int = MAX_FILE_BYTES
+    allow_generated: bool = False
+
+    def classify(self, sniff: Sniff) -> str:
+        """Return the verdict for *sniff*: ``SOURCE`` or the reason it is rejected."""
+        if sniff.binary:
+            return BINARY
+        if sniff.generated and not self.allow_generated:
+            return GENERATED
+        if sniff.max_line > self.max_line_length or sniff.avg_line > self.max_avg_line_length:
+            return MINIFIED
+        if sniff.size > self.max_file_bytes:
+            return OVERSIZED
+        return SOURCE
+
+    def accepts(self, sniff: Sniff) -> bool:
+        """Return True if *sniff* describes a playable source file."""
+        return self.classify(sniff) == SOURCE
+
+
+DEFAULT_LIMITS = ClassifyLimits()
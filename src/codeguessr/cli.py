@@ -1,48 +1,237 @@
 """Command-line interface for CodeGuessr.
 
-Provides the ``codeguessr`` entry point that scans a directory, starts a
-local uvicorn server, and opens the game in the default browser.
+Provides the ``codeguessr`` entry point.  ``codeguessr serve`` (also run
+when no subcommand is given, as in ``codeguessr DIR``) scans one or more
+directories, starts a local uvicorn server, and opens the game in the
+default browser.  ``codeguessr index`` prebuilds a directory's scan
+artifact for ``serve --index``, and ``codeguessr loadtest`` drives a server
+with simulated players.
+
+Only ``click`` and the classification defaults are imported with this
+module; the server stack (uvicorn, FastAPI, the scanner) is imported by the
+command that runs it, so ``--help`` and argument errors answer quickly.
 """
 
+import json
 import os
 import threading
 import time
-import webbrowser
 from pathlib import Path
 
 import click
-import uvicorn
+
+from codeguessr.classify import (
+    MAX_AVG_LINE_LENGTH,
+    MAX_FILE_BYTES,
+    MAX_LINE_LENGTH,
+    ClassifyLimits,
+)
+
+# Shown as the defaults of options whose values live in modules that are
+# too slow to import just to print help; tests check they stay in sync.
+ROOT_BUDGET_MB_DEFAULT: int = 512
+PROFILE_KEEP_DEFAULT: int = 50
 
 
 def _open_browser(url: str) -> None:
-    """Open *url* in the default browser after a short delay.
+    """Open *url* in the default browser without blocking the caller.
 
-    The delay allows uvicorn to finish binding before the browser loads the
-    page.
+    Called once the server is ready (see ``codeguessr.serving``), so the
+    game loads on the first try.
 
     Args:
         url: The URL to open.
     """
-    time.sleep(1.5)
-    webbrowser.open(url)
+    import webbrowser
 
+    threading.Thread(target=webbrowser.open, args=(url,), daemon=True).start()
 
-@click.command()
-@click.argument("directory", default=None, required=False)
-@click.option("--port", default=4200, show_default=True, help="Port to run the server on.")
-def main(directory: str | None, port: int) -> None:
+
+class _DefaultGroup(click.Group):
+    """Command group that runs ``serve`` when no subcommand is named.
+
+    Keeps ``codeguessr [OPTIONS] [DIRECTORIES]...`` working alongside the
+    subcommands.
+    """
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args = ["serve", *args]
+        return super().parse_args(ctx, args)
+
+
+def _check_root(root: Path) -> None:
+    """Reject *root* unless it is a directory, git revision or archive."""
+    from codeguessr.sources import is_source
+
+    if not root.is_dir() and not is_source(root):
+        raise click.BadParameter(
+            f"{root} is not a directory, git revision or archive", param_hint="DIRECTORIES"
+        )
+
+
+@click.group(cls=_DefaultGroup)
+def main() -> None:
     """CodeGuessr — a GeoGuessr-style browser game for code.
 
-    Scans DIRECTORY (default: current directory) for code files and starts
-    a local web server with the game.
+    Without a subcommand, runs 'serve'.
     """
-    root = Path(directory).resolve() if directory else Path.cwd()
 
-    if not root.is_dir():
-        raise click.BadParameter(f"{root} is not a directory", param_hint="DIRECTORY")
+
+@main.command()
+@click.argument("directories", nargs=-1)
+@click.option("--port", default=4200, show_default=True, help="Port to run the server on.")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Server processes sharing the port and a read-only index of the first directory.",
+)
+@click.option(
+    "--sample",
+    default=0,
+    show_default=True,
+    help="Sample at most this many files instead of scanning the whole tree (0 = full scan).",
+)
+@click.option(
+    "--max-line-length",
+    default=MAX_LINE_LENGTH,
+    show_default=True,
+    help="Skip files with a longer line in their first 8 KB (treated as minified).",
+)
+@click.option(
+    "--max-avg-line-length",
+    default=MAX_AVG_LINE_LENGTH,
+    show_default=True,
+    help="Skip files whose mean line length in their first 8 KB is longer (minified).",
+)
+@click.option(
+    "--max-file-kb",
+    default=MAX_FILE_BYTES // 1024,
+    show_default=True,
+    help="Skip files larger than this many KB.",
+)
+@click.option(
+    "--allow-generated",
+    is_flag=True,
+    help="Keep files marked as generated (e.g. '@generated', 'DO NOT EDIT').",
+)
+@click.option(
+    "--root-budget-mb",
+    default=ROOT_BUDGET_MB_DEFAULT,
+    show_default=True,
+    help="Unload the least recently played directories when their indexes exceed this size.",
+)
+@click.option(
+    "--index",
+    "index_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Load the first directory's scan from an artifact built by 'codeguessr index'.",
+)
+@click.option(
+    "--scan-trace",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a Chrome trace (chrome://tracing, Perfetto) of the first directory's scan.",
+)
+@click.option(
+    "--profile",
+    "profile_fraction",
+    type=click.FloatRange(0.0, 1.0),
+    default=0.0,
+    help="Profile this fraction of requests with cProfile (e.g. 0.01); off by default.",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False, writable=True),
+    default=None,
+    help="Directory for request profiles (default: a new temporary directory).",
+)
+@click.option(
+    "--profile-keep",
+    type=click.IntRange(min=1),
+    default=PROFILE_KEEP_DEFAULT,
+    show_default=True,
+    help="Most request profiles kept; the oldest are deleted first.",
+)
+@click.option(
+    "--profile-startup",
+    is_flag=True,
+    help="Measure imports, startup and the first scan, write a report and exit.",
+)
+@click.option(
+    "--startup-output",
+    default="codeguessr-startup",
+    show_default=True,
+    help="Path prefix of the --profile-startup report (.txt) and flame graph stacks (.folded).",
+)
+def serve(
+    directories: tuple[str, ...],
+    port: int,
+    workers: int,
+    sample: int,
+    max_line_length: int,
+    max_avg_line_length: int,
+    max_file_kb: int,
+    allow_generated: bool,
+    root_budget_mb: int,
+    index_path: str | None,
+    scan_trace: str | None,
+    profile_fraction: float,
+    profile_dir: str | None,
+    profile_keep: int,
+    profile_startup: bool,
+    startup_output: str,
+) -> None:
+    """Scan DIRECTORIES and start the game server.
+
+    Scans DIRECTORIES (default: current directory) for code files and starts
+    a local web server with the game.  The first directory is scanned at
+    startup; the others are scanned when a game first selects them.  A
+    directory may also be a git revision, written REPO@REF (or a bare
+    repository for its HEAD), or a .tar, .tar.gz or .zip archive; both are
+    read in place, without a checkout or extraction.
+
+    With --index, the first directory is loaded from a prebuilt artifact
+    instead of being scanned, and defaults to the directory recorded in it.
+    With --scan-trace, the spans of the first directory's full scan (one per
+    directory listed and per file read) are written when the scan completes.
+
+    With --workers N, N server processes share the port.  The first
+    directory is scanned (or, with --sample, sampled) once, into an artifact
+    the workers map read-only (unless --index gives one), and games are kept
+    in a shared directory so any worker can serve any request.  POSIX only.
+
+    With --profile, that fraction of requests runs under cProfile; the
+    latest profiles are listed at /api/admin/profiles, for local clients or
+    for clients sending the CODEGUESSR_ADMIN_TOKEN as a bearer token.
+
+    With --profile-startup, the server is started on a free local port
+    instead, timed until its first game is served and the first directory is
+    fully scanned, and stopped.  Import times (from a fresh interpreter), the
+    startup timeline and the scan phases are written to a report and to
+    folded stacks for flame graph tools.
+    """
+    if index_path is not None:
+        from codeguessr.artifact import read_index_meta
+
+        try:
+            meta = read_index_meta(index_path)
+        except (OSError, ValueError) as exc:
+            raise click.BadParameter(str(exc), param_hint="--index") from exc
+        default_root = Path(meta["root"])
+    else:
+        default_root = Path.cwd()
+    roots = [Path(directory).resolve() for directory in directories] or [default_root]
+
+    for root in roots:
+        _check_root(root)
 
     static_index = Path(__file__).parent / "static" / "browser" / "index.html"
-    if not static_index.exists():
+    # Profiling startup only talks to the API.
+    if not profile_startup and not static_index.exists():
         click.echo(
             "Error: Static files not found. Please build the client first:\n\n"
             "  make build\n\n"
@@ -53,13 +242,236 @@ def main(directory: str | None, port: int) -> None:
         )
         raise SystemExit(1)
 
-    os.environ["CODEGUESSR_DIR"] = str(root)
+    os.environ["CODEGUESSR_DIR"] = os.pathsep.join(str(root) for root in roots)
+    os.environ["CODEGUESSR_SAMPLE"] = str(sample)
+    os.environ["CODEGUESSR_MAX_LINE_LENGTH"] = str(max_line_length)
+    os.environ["CODEGUESSR_MAX_AVG_LINE_LENGTH"] = str(max_avg_line_length)
+    os.environ["CODEGUESSR_MAX_FILE_KB"] = str(max_file_kb)
+    os.environ["CODEGUESSR_ALLOW_GENERATED"] = "1" if allow_generated else ""
+    os.environ["CODEGUESSR_ROOT_BUDGET_MB"] = str(root_budget_mb)
+    os.environ["CODEGUESSR_INDEX"] = str(Path(index_path).resolve()) if index_path else ""
+    os.environ["CODEGUESSR_SCAN_TRACE"] = str(Path(scan_trace).resolve()) if scan_trace else ""
+    os.environ["CODEGUESSR_PROFILE"] = str(profile_fraction) if profile_fraction else ""
+    os.environ["CODEGUESSR_PROFILE_DIR"] = str(Path(profile_dir).resolve()) if profile_dir else ""
+    os.environ["CODEGUESSR_PROFILE_KEEP"] = str(profile_keep)
+
+    if profile_startup:
+        _profile_startup(startup_output)
+        return
 
     url = f"http://localhost:{port}"
-    click.echo(f"Starting CodeGuessr for: {root}")
-    click.echo(f"Opening {url} ...")
+    click.echo(f"Starting CodeGuessr for: {', '.join(str(root) for root in roots)}")
+    if workers > 1:
+        limits = ClassifyLimits(
+            max_line_length=max_line_length,
+            max_avg_line_length=max_avg_line_length,
+            max_file_bytes=max_file_kb * 1024,
+            allow_generated=allow_generated,
+        )
+        _serve_workers(
+            roots[0], port, workers, url, build=not index_path, sample=sample, limits=limits,
+            scan_trace=scan_trace,
+        )
+        return
+    click.echo(f"Opening {url} once the first files are scanned ...")
+
+    from codeguessr.serving import serve_app
+
+    serve_app("0.0.0.0", port, on_ready=lambda: _open_browser(url))
+
+
+def _serve_workers(
+    root: Path,
+    port: int,
+    workers: int,
+    url: str,
+    build: bool,
+    sample: int,
+    limits: ClassifyLimits,
+    scan_trace: str | None,
+) -> None:
+    """Serve from *workers* processes sharing a scan artifact and game sessions.
+
+    Args:
+        root: The first directory, whose artifact the workers share.
+        port: Port to listen on.
+        workers: Number of server processes.
+        url: Opened in the browser once a worker answers.
+        build: Scan *root* into a temporary artifact first; False when an
+            artifact was given.
+        sample: When positive, the artifact holds a sample of this many
+            files instead of a full scan.
+        limits: Classification thresholds the sampled files must pass.
+        scan_trace: Where to write the trace of a full scan, if anywhere.
+    """
+    import shutil
+    import tempfile
+
+    from codeguessr.serving import serve_workers
+    from codeguessr.sessions import HAVE_FCNTL
+
+    if not HAVE_FCNTL:
+        raise click.ClickException("--workers needs POSIX file locking")
+    scratch = tempfile.mkdtemp(prefix="codeguessr-workers-")
+    try:
+        artifact = Path(scratch) / "index.idx"
+        if build and sample > 0:
+            from codeguessr.artifact import build_sample_index
+
+            click.echo(f"Sampling {sample} files of {root} once for {workers} workers ...")
+            build_sample_index(root, artifact, sample, limits)
+            os.environ["CODEGUESSR_INDEX"] = str(artifact)
+        elif build:
+            from codeguessr.artifact import build_index
+            from codeguessr.game import ScanStats
+            from codeguessr.tracing import Tracer
+
+            click.echo(f"Scanning {root} once for {workers} workers ...")
+            stats = ScanStats(trace=Tracer() if scan_trace else None)
+            build_index(root, artifact, stats=stats)
+            if stats.trace is not None and scan_trace:
+                stats.trace.write(scan_trace)
+            os.environ["CODEGUESSR_INDEX"] = str(artifact)
+            os.environ["CODEGUESSR_SCAN_TRACE"] = ""
+        os.environ["CODEGUESSR_SESSION_DIR"] = str(Path(scratch) / "sessions")
+        click.echo(f"Opening {url} once a worker is ready ...")
+        serve_workers("0.0.0.0", port, workers, on_ready=lambda: _open_browser(url))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _profile_startup(prefix: str) -> None:
+    """Run ``profile_startup`` and write its report and folded stacks under *prefix*."""
+    from codeguessr.startup import profile_startup
+
+    click.echo("Profiling startup ...")
+    try:
+        profile = profile_startup()
+    except (RuntimeError, OSError) as exc:
+        raise click.ClickException(str(exc)) from exc
+    report, folded = profile.write(prefix)
+    click.echo(profile.format(), nl=False)
+    click.echo(f"Wrote {report} and {folded} (e.g. flamegraph.pl {folded} > startup.svg)")
+
+
+@main.command()
+@click.argument("directory", default=None, required=False)
+@click.option(
+    "--output",
+    "-o",
+    default="codeguessr.idx",
+    show_default=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Artifact file to write.",
+)
+@click.option(
+    "--scan-trace",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a Chrome trace (chrome://tracing, Perfetto) of the scan.",
+)
+@click.option("--stats", "show_stats", is_flag=True, help="Print the scan's per-phase timings.")
+def index(directory: str | None, output: str, scan_trace: str | None, show_stats: bool) -> None:
+    """Prebuild the scan artifact of DIRECTORY for 'serve --index'.
+
+    Scans DIRECTORY (default: current directory) completely and writes its
+    file table, line counts, highlight candidates and near-duplicate
+    signatures to one versioned file.  Classification thresholds are
+    applied when serving, so one artifact serves every setting.
+    """
+    root = Path(directory).resolve() if directory else Path.cwd()
+    _check_root(root)
+    from codeguessr.artifact import build_index
+    from codeguessr.game import ScanStats
+    from codeguessr.tracing import Tracer
+
+    stats = ScanStats(trace=Tracer() if scan_trace else None)
+    start = time.perf_counter()
+    table, size = build_index(root, output, stats=stats)
+    click.echo(
+        f"Indexed {len(table)} files from {root} into {output} "
+        f"({size / 1024:.0f} KiB, {time.perf_counter() - start:.1f}s)"
+    )
+    if show_stats:
+        click.echo(json.dumps(stats.as_dict(), indent=2))
+    if stats.trace is not None and scan_trace:
+        stats.trace.write(scan_trace)
+        click.echo(f"Wrote scan trace to {scan_trace}")
+
+
+@main.command()
+@click.argument("directories", nargs=-1)
+@click.option(
+    "--url",
+    default=None,
+    help="Base URL of a running server to test, instead of starting one in this process.",
+)
+@click.option(
+    "--server-pid",
+    type=int,
+    default=None,
+    help="PID of the server at --url, to report its memory growth.",
+)
+@click.option("--players", default=10, show_default=True, help="Concurrent simulated players.")
+@click.option(
+    "--games", "games_per_player", default=3, show_default=True, help="Games each player plays."
+)
+@click.option(
+    "--think-time",
+    default=1.0,
+    show_default=True,
+    help="Mean seconds a player pauses before each guess (0 = no pauses).",
+)
+@click.option("--rounds", type=int, default=None, help="Rounds per game (server default if unset).")
+@click.option("--seed", type=int, default=None, help="Seed for the players' choices.")
+@click.option(
+    "--json",
+    "json_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Also write the report to this JSON file.",
+)
+def loadtest(
+    directories: tuple[str, ...],
+    url: str | None,
+    server_pid: int | None,
+    players: int,
+    games_per_player: int,
+    think_time: float,
+    rounds: int | None,
+    seed: int | None,
+    json_path: str | None,
+) -> None:
+    """Simulate concurrent players and report latency, throughput and memory.
+
+    Each player plays full games: it creates a game, then guesses with
+    think time in between until the game is over.  Without --url, the
+    server is started in this process for DIRECTORIES (default: current
+    directory); its startup is not part of the measurements.
+    """
+    if url is None:
+        roots = [Path(directory).resolve() for directory in directories] or [Path.cwd()]
+        for root in roots:
+            _check_root(root)
+        os.environ["CODEGUESSR_DIR"] = os.pathsep.join(str(root) for root in roots)
+    elif directories:
+        raise click.BadParameter("cannot be combined with --url", param_hint="DIRECTORIES")
 
-    browser_thread = threading.Thread(target=_open_browser, args=(url,), daemon=True)
-    browser_thread.start()
+    from codeguessr.loadtest import LoadTestConfig, run_loadtest
 
-    uvicorn.run("codeguessr.server:app", host="0.0.0.0", port=port)
+    config = LoadTestConfig(
+        players=players,
+        games_per_player=games_per_player,
+        think_time=think_time,
+        settings={"num_rounds": rounds} if rounds is not None else {},
+        seed=seed,
+    )
+    target = url or "an in-process server"
+    click.echo(f"Running {players} players x {games_per_player} games against {target} ...")
+    try:
+        report = run_loadtest(config, url=url, server_pid=server_pid)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(report.format())
+    if json_path is not None:
+        Path(json_path).write_text(json.dumps(report.as_dict(), indent=2) + "\n", encoding="utf-8")
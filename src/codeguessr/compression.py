@@ -0,0 +1,421 @@
+"""Negotiated response compression.
+
+Obscured code is almost entirely runs of ``█`` (three bytes in UTF-8) and
+compresses extremely well, as do the file lists and JSON around it.
+Responses are compressed with the best coding the client accepts
+(``Accept-Encoding``): zstd and brotli when their packages are installed
+(``pip install codeguessr[compress]``), gzip always.
+
+Bodies smaller than ``MIN_COMPRESS_BYTES`` are sent as they are; bodies of
+``LARGE_BODY_BYTES`` or more are compressed at the coding's fastest level,
+where the extra ratio of the usual level costs more CPU than it saves in
+transfer.
+
+Content that many responses share — a round pool's file list, held as a
+``jsonenc.Fragment`` — is compressed once, at the coding's strongest level,
+and its compressed form spliced into each response:
+
+- gzip: the rest of the body is deflated with full flushes around the
+  fragment, which resets the compressor's window, so the fragment's own
+  raw deflate blocks can be inserted between them; only the CRC-32 of the
+  fragment is computed per response.
+- zstd: a body may consist of several frames, so the fragment is one frame
+  of its own.
+- brotli streams cannot be concatenated; bodies with fragments prefer the
+  other codings and are compressed whole if brotli is the only choice.
+
+``CompressedJSONResponse`` compresses the API's JSON this way;
+``CompressionMiddleware`` compresses every other response (the SPA's
+assets, ``/metrics``) as it is sent.
+"""
+
+import struct
+import zlib
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from codeguessr.jsonenc import Fragment, JSONBytesResponse
+
+try:
+    import brotli
+
+    HAVE_BROTLI = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAVE_BROTLI = False
+
+try:
+    import zstandard
+
+    HAVE_ZSTD = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAVE_ZSTD = False
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Bodies smaller than this are not worth the compression headers and CPU.
+MIN_COMPRESS_BYTES: int = 1024
+# Bodies at least this large are compressed at the coding's fastest level.
+LARGE_BODY_BYTES: int = 1 << 20
+# Content types that are compressed; anything else (images, profiles) is not.
+COMPRESSIBLE_TYPES: tuple[str, ...] = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+# zlib window bits of a gzip stream and of raw deflate data.
+_GZIP_WBITS = 31
+_RAW_WBITS = -zlib.MAX_WBITS
+# Gzip member header: deflate, no flags, no mtime, unknown OS.
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+# ---------------------------------------------------------------------------
+# Codings
+# ---------------------------------------------------------------------------
+
+
+class Stream(Protocol):
+    """Incremental compressor of one response body."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress *data*, returning whatever output is ready."""
+        ...
+
+    def finish(self) -> bytes:
+        """End the stream and return the remaining output."""
+        ...
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        self._deflate = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._deflate.compress(data)
+
+    def finish(self) -> bytes:
+        return self._deflate.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)  # type: ignore[no-any-return]
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()  # type: ignore[no-any-return]
+
+
+class _ZstdStream:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)  # type: ignore[no-any-return]
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()  # type: ignore[no-any-return]
+
+
+@dataclass(frozen=True)
+class Coding:
+    """A content coding and the levels it is used at.
+
+    Attributes:
+        name: ``Content-Encoding`` token.
+        level: Level for ordinary responses.
+        fast_level: Level for bodies of ``LARGE_BODY_BYTES`` or more.
+        static_level: Level for content compressed once and reused.
+        open: Returns a new ``Stream`` at the given level.
+        spliceable: Whether precompressed fragments can be spliced into a
+            body of this coding.
+    """
+
+    name: str
+    level: int
+    fast_level: int
+    static_level: int
+    open: Callable[[int], Stream]
+    spliceable: bool = False
+
+    def compress(self, data: bytes, level: int | None = None) -> bytes:
+        """Compress *data* in one go, at *level* or the level for its size."""
+        stream = self.open(level if level is not None else self.level_for(len(data)))
+        return stream.compress(data) + stream.finish()
+
+    def level_for(self, size: int) -> int:
+        """Return the level for a body of *size* bytes."""
+        return self.fast_level if size >= LARGE_BODY_BYTES else self.level
+
+
+def _available_codings() -> dict[str, Coding]:
+    codings = {}
+    if HAVE_ZSTD:
+        codings["zstd"] = Coding("zstd", 3, 1, 12, _ZstdStream, spliceable=True)
+    if HAVE_BROTLI:
+        codings["br"] = Coding("br", 4, 1, 9, _BrotliStream)
+    codings["gzip"] = Coding("gzip", 5, 1, 9, _GzipStream, spliceable=True)
+    return codings
+
+
+# Available codings, most preferred first.
+CODINGS: dict[str, Coding] = _available_codings()
+
+
+def negotiate(accept_encoding: str, prefer_spliceable: bool = False) -> Coding | None:
+    """Choose the coding for a request's ``Accept-Encoding`` header.
+
+    The coding with the highest quality value wins; ties go to the order
+    of ``CODINGS``, or to spliceable codings first with *prefer_spliceable*.
+
+    Returns:
+        The chosen coding, or ``None`` to send the body uncompressed.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[token] = weight
+    wildcard = weights.get("*", 0.0)
+    candidates = list(CODINGS.values())
+    if prefer_spliceable:
+        candidates.sort(key=lambda coding: not coding.spliceable)
+    best: Coding | None = None
+    best_weight = 0.0
+    for coding in candidates:
+        weight = weights.get(coding.name, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+# ---------------------------------------------------------------------------
+# Splicing
+# ---------------------------------------------------------------------------
+
+
+def precompressed(fragment: Fragment, coding: Coding) -> bytes:
+    """Return *fragment* compressed for splicing into a *coding* body, compressing it once.
+
+    For gzip this is raw deflate data ending in a full flush, not a gzip
+    member; for zstd it is a complete frame.
+    """
+    variant = fragment.variants.get(coding.name)
+    if variant is None:
+        if coding.name == "gzip":
+            deflate = zlib.compressobj(coding.static_level, zlib.DEFLATED, _RAW_WBITS)
+            variant = deflate.compress(fragment.data) + deflate.flush(zlib.Z_FULL_FLUSH)
+        else:
+            variant = coding.compress(fragment.data, coding.static_level)
+        fragment.variants[coding.name] = variant
+    return variant
+
+
+def _splice_gzip(parts: Sequence[bytes | Fragment], coding: Coding, level: int) -> bytes:
+    deflate = zlib.compressobj(level, zlib.DEFLATED, _RAW_WBITS)
+    out = [_GZIP_HEADER]
+    crc = size = 0
+    for part in parts:
+        if isinstance(part, Fragment):
+            # Reset the window so nothing after the fragment refers back past it.
+            out.append(deflate.flush(zlib.Z_FULL_FLUSH))
+            out.append(precompressed(part, coding))
+            data = part.data
+        else:
+            out.append(deflate.compress(part))
+            data = part
+        crc = zlib.crc32(data, crc)
+        size += len(data)
+    out.append(deflate.flush())
+    out.append(struct.pack("<II", crc, size & 0xFFFFFFFF))
+    return b"".join(out)
+
+
+def _splice_frames(parts: Sequence[bytes | Fragment], coding: Coding, level: int) -> bytes:
+    out = []
+    pending: list[bytes] = []
+    for part in parts:
+        if isinstance(part, Fragment):
+            if pending:
+                out.append(coding.compress(b"".join(pending), level))
+                pending = []
+            out.append(precompressed(part, coding))
+        else:
+            pending.append(part)
+    if pending:
+        out.append(coding.compress(b"".join(pending), level))
+    return b"".join(out)
+
+
+def compress_parts(parts: Sequence[bytes | Fragment], coding: Coding) -> bytes:
+    """Compress a body given as ``jsonenc.encode_parts`` output.
+
+    Fragments are spliced in precompressed when *coding* allows it; the
+    rest is compressed at the level for the whole body's size.
+    """
+    size = sum(len(part) for part in parts)
+    level = coding.level_for(size)
+    if not coding.spliceable or not any(isinstance(part, Fragment) for part in parts):
+        data = b"".join(part.data if isinstance(part, Fragment) else part for part in parts)
+        return coding.compress(data, level)
+    if coding.name == "gzip":
+        return _splice_gzip(parts, coding, level)
+    return _splice_frames(parts, coding, level)
+
+
+# ---------------------------------------------------------------------------
+# Responses
+# ---------------------------------------------------------------------------
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary", "")
+    if "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+
+class CompressedJSONResponse(JSONBytesResponse):
+    """``JSONBytesResponse`` compressed for the request, with precompressed fragments."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        parts = self.parts
+        coding = None
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            accept = Headers(scope=scope).get("accept-encoding", "")
+            spliced = any(isinstance(part, Fragment) for part in parts)
+            coding = negotiate(accept, prefer_spliceable=spliced)
+        if coding is not None:
+            self.body = compress_parts(parts, coding)
+            self.headers["content-encoding"] = coding.name
+            self.headers["content-length"] = str(len(self.body))
+        _add_vary(self.headers)
+        await super().__call__(scope, receive, send)
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses the client accepts compressed.
+
+    Responses that already have a ``Content-Encoding`` (such as a
+    ``CompressedJSONResponse``), partial responses, and content types
+    outside ``COMPRESSIBLE_TYPES`` pass through.  Streamed bodies are
+    compressed incrementally.
+
+    Args:
+        app: The wrapped application.
+        minimum_size: Smallest single-message body that is compressed.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_COMPRESS_BYTES) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSender(send, coding, self.minimum_size))
+
+
+class _CompressingSender:
+    """``send`` wrapper that compresses one response body."""
+
+    def __init__(self, send: Send, coding: Coding, minimum_size: int) -> None:
+        self.send = send
+        self.coding = coding
+        self.minimum_size = minimum_size
+        self.start: Message | None = None
+        self.stream: Stream | None = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        if self.stream is not None:
+            await self._send_chunk(message)
+            return
+        await self._first_body(message)
+
+    async def _first_body(self, message: Message) -> None:
+        start = self.start
+        assert start is not None
+        headers = MutableHeaders(raw=start["headers"])
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if (
+            "content-encoding" in headers
+            or "content-range" in headers
+            or start["status"] < 200
+            or start["status"] in (204, 206, 304)
+            or not _is_compressible(headers.get("content-type", ""))
+        ):
+            self.passthrough = True
+            await self.send(start)
+            await self.send(message)
+            return
+        _add_vary(headers)
+        if not more_body and len(body) < self.minimum_size:
+            self.passthrough = True
+            await self.send(start)
+            await self.send(message)
+            return
+        headers["content-encoding"] = self.coding.name
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed body differs from the one the tag was computed for.
+            headers["etag"] = f"W/{etag}"
+        if not more_body:
+            compressed = self.coding.compress(body)
+            headers["content-length"] = str(len(compressed))
+            self.passthrough = True
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+        del headers["content-length"]
+        self.stream = self.coding.open(self.coding.level)
+        await self.send(start)
+        await self._send_chunk(message)
+
+    async def _send_chunk(self, message: Message) -> None:
+        assert self.stream is not None
+        more_body = message.get("more_body", False)
+        data = self.stream.compress(message.get("body", b""))
+        if not more_body:
+            data += self.stream.finish()
+        if data or not more_body:
+            reply: dict[str, Any] = {
+                "type": "http.response.body", "body": data, "more_body": more_body,
+            }
+            await self.send(reply)
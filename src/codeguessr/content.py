@@ -0,0 +1,362 @@
+"""Shared access to source file contents.
+
+Every component that needs a file's text — the scanners, round preparation
+and the round payloads — reads it through a ``ContentStore``.  The store
+keeps decoded bodies in a byte-bounded LRU keyed by a BLAKE2b content digest
+and revalidates each path against its ``(mtime_ns, size)``, so a file is read
+from disk at most once per modification while it stays cached, and identical
+files anywhere share one decode and one set of derived indexes.
+
+Reads are counted globally in ``ContentStore.stats`` and, for any code run
+inside ``ContentStore.measure``, in a per-request ``ContentStats`` as well.
+Only the per-request stats break reads down by path, so the global counters
+stay constant-size however many files the process reads.
+"""
+
+import contextvars
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, TypeVar, cast
+
+from codeguessr import sources
+from codeguessr.classify import SNIFF_BYTES, Sniff
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Upper bound on the decoded text kept by the default store.
+CONTENT_CACHE_BYTES: int = 64 * 1024 * 1024
+# Upper bound on the paths whose stat stamp, and separately whose sniff, is
+# remembered; the least recently used are forgotten first.
+CACHE_PATHS: int = 256 * 1024
+# Bytes of the BLAKE2b digest that keys cached bodies.
+DIGEST_SIZE: int = 16
+
+T = TypeVar("T")
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class ContentStats:
+    """Counters for file content access.
+
+    Attributes:
+        reads: Number of files read from disk.
+        bytes_read: Raw bytes read from disk.
+        bytes_decoded: Bytes decoded to text; reads whose body is already
+            cached under the same digest are not decoded again.
+        hits: Number of requests served from the cache.
+        bytes_cached: Raw size of the files served from the cache.
+        bytes_sniffed: Bytes read from file heads by ``sniff``.
+        shared: Reads whose body matched an already cached digest.
+        decode_errors: Decoded bodies that were not valid UTF-8.
+        per_path: Disk reads per path, for verifying single reads; only
+            filled in by ``ContentStore.measure`` blocks.
+    """
+
+    reads: int = 0
+    bytes_read: int = 0
+    bytes_decoded: int = 0
+    hits: int = 0
+    bytes_cached: int = 0
+    bytes_sniffed: int = 0
+    shared: int = 0
+    decode_errors: int = 0
+    per_path: dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the scalar counters as a plain dict."""
+        return {
+            "reads": self.reads,
+            "bytes_read": self.bytes_read,
+            "bytes_decoded": self.bytes_decoded,
+            "hits": self.hits,
+            "bytes_cached": self.bytes_cached,
+            "bytes_sniffed": self.bytes_sniffed,
+            "shared": self.shared,
+            "decode_errors": self.decode_errors,
+        }
+
+
+# Stats objects of the ``measure`` blocks active in the current context.
+_active: contextvars.ContextVar[tuple[ContentStats, ...]] = contextvars.ContextVar(
+    "codeguessr_content_stats", default=()
+)
+
+
+# ---------------------------------------------------------------------------
+# Content store
+# ---------------------------------------------------------------------------
+
+
+def content_digest(data: bytes) -> bytes:
+    """Return the content key of a file body (128-bit BLAKE2b)."""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+@dataclass(frozen=True)
+class SourceText:
+    """Decoded contents of one file plus the stat data it was read under.
+
+    Files with identical bodies share the same *lines* list, whatever their
+    path or root.
+
+    Attributes:
+        lines: Source lines (``str.splitlines`` of the UTF-8 text).
+        size: File size in bytes.
+        mtime: Modification time (seconds since the epoch).
+        mtime_ns: Modification time in nanoseconds, used for revalidation.
+        digest: BLAKE2b digest of the raw file body.
+        lossy: The body is not valid UTF-8; invalid bytes were dropped.
+    """
+
+    lines: list[str]
+    size: int
+    mtime: float
+    mtime_ns: int
+    digest: bytes
+    lossy: bool = False
+
+
+@dataclass
+class _Body:
+    """One cached file body, shared by every path with the same digest."""
+
+    lines: list[str]
+    size: int
+    lossy: bool = False
+    derived: dict[str, Any] = field(default_factory=dict)
+
+
+class ContentStore:
+    """Byte-bounded, content-addressed cache of decoded source files.
+
+    Paths map to the ``(mtime_ns, size, digest)`` they were last read
+    under; decoded bodies, and anything derived from them with ``derive``,
+    are cached once per digest.  Identical files in different directories
+    or checkouts therefore share one decode, one line list and one set of
+    derived indexes.  A changed path is re-read and re-hashed, but only
+    decoded if its new body is not cached already.
+
+    The per-path stamps and sniffs are LRUs of at most *max_paths* entries
+    each, and ``forget`` drops those of a root that is no longer served.
+
+    Thread-safe; the lock is not held while a file is being read.
+
+    Args:
+        max_bytes: Maximum total raw size of the cached bodies.
+        max_paths: Maximum number of paths with a remembered stamp, and
+            with a remembered sniff.
+    """
+
+    def __init__(self, max_bytes: int = CONTENT_CACHE_BYTES, max_paths: int = CACHE_PATHS) -> None:
+        self.max_bytes = max_bytes
+        self.max_paths = max_paths
+        self.stats = ContentStats()
+        self._stamps: OrderedDict[str, tuple[int, int, float, bytes]] = OrderedDict()
+        self._bodies: OrderedDict[bytes, _Body] = OrderedDict()
+        self._sniffs: OrderedDict[str, tuple[int, Sniff]] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def read(self, path: str | os.PathLike[str]) -> SourceText:
+        """Return the contents of *path*, from the cache when still current.
+
+        Args:
+            path: File to read.
+
+        Returns:
+            The file's decoded lines, stat data and content digest.
+
+        Raises:
+            OSError: If the file cannot be stat'ed or read.
+        """
+        key = os.fspath(path)
+        st = sources.stat(key)
+        with self._lock:
+            stamp = self._stamps.get(key)
+            if stamp is not None and stamp[:2] == (st.st_mtime_ns, st.st_size):
+                body = self._bodies.get(stamp[3])
+                if body is not None:
+                    self._stamps.move_to_end(key)
+                    self._bodies.move_to_end(stamp[3])
+                    self._count(key, "hit", body.size)
+                    return SourceText(
+                        body.lines, body.size, stamp[2], stamp[0], stamp[3], body.lossy
+                    )
+
+        data = sources.read_bytes(key)
+        digest = content_digest(data)
+        with self._lock:
+            body = self._bodies.get(digest)
+        shared = body is not None
+        if body is None:
+            try:
+                body = _Body(data.decode("utf-8").splitlines(), len(data))
+            except UnicodeDecodeError:
+                body = _Body(
+                    data.decode("utf-8", errors="ignore").splitlines(), len(data), lossy=True
+                )
+
+        with self._lock:
+            self._count(key, "shared" if shared else "read", len(data))
+            if body.lossy and not shared:
+                for stats in (self.stats, *_active.get()):
+                    stats.decode_errors += 1
+            self._remember(self._stamps, key, (st.st_mtime_ns, st.st_size, st.st_mtime, digest))
+            body = self._store(digest, body)
+        return SourceText(
+            body.lines, body.size, st.st_mtime, st.st_mtime_ns, digest, body.lossy
+        )
+
+    def read_lines(self, path: str | os.PathLike[str]) -> list[str]:
+        """Return the source lines of *path*; see ``read``.
+
+        Raises:
+            OSError: If the file cannot be stat'ed or read.
+        """
+        return self.read(path).lines
+
+    def derive(self, source: SourceText, name: str, build: Callable[[list[str]], T]) -> T:
+        """Return ``build(source.lines)``, computed once per content digest.
+
+        Derived values (highlight indexes, signatures, …) are cached with
+        the body they were built from and evicted along with it.
+
+        Args:
+            source: Contents returned by ``read``.
+            name: Name of the derived value, unique per *build* function.
+            build: Function computing the value from the source lines.
+
+        Returns:
+            The cached or freshly built value.
+        """
+        with self._lock:
+            body = self._bodies.get(source.digest)
+            if body is not None and name in body.derived:
+                return cast(T, body.derived[name])
+        value = build(source.lines)
+        if body is not None:
+            with self._lock:
+                body.derived.setdefault(name, value)
+        return value
+
+    def sniff(self, path: str | os.PathLike[str]) -> Sniff:
+        """Return the ``Sniff`` of *path* without reading the whole file.
+
+        Results are cached per ``(mtime_ns, size)`` like file contents.
+
+        Raises:
+            OSError: If the file cannot be stat'ed or read.
+        """
+        key = os.fspath(path)
+        st = sources.stat(key)
+        with self._lock:
+            cached = self._sniffs.get(key)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1].size == st.st_size:
+                self._sniffs.move_to_end(key)
+                return cached[1]
+        head = sources.read_bytes(key, SNIFF_BYTES)
+        sniff = Sniff.from_head(head, st.st_size)
+        with self._lock:
+            for stats in (self.stats, *_active.get()):
+                stats.bytes_sniffed += len(head)
+            self._remember(self._sniffs, key, (st.st_mtime_ns, sniff))
+        return sniff
+
+    def forget(self, root: str | os.PathLike[str]) -> None:
+        """Drop the stamps and sniffs of every path under *root*.
+
+        Cached bodies stay, since other roots may share them; they age out
+        of the LRU like any other.
+        """
+        prefix = os.fspath(root).rstrip("/" + os.sep)
+        prefixes = (prefix + "/", prefix + os.sep)
+        with self._lock:
+            for paths in (self._stamps, self._sniffs):
+                for key in [key for key in paths if key.startswith(prefixes)]:
+                    del paths[key]
+
+    def clear(self) -> None:
+        """Drop every cached file and reset the global counters."""
+        with self._lock:
+            self._stamps.clear()
+            self._bodies.clear()
+            self._sniffs.clear()
+            self._cached_bytes = 0
+            self.stats = ContentStats()
+
+    @property
+    def cached_bytes(self) -> int:
+        """Total raw size of the bodies currently cached."""
+        return self._cached_bytes
+
+    @staticmethod
+    @contextmanager
+    def measure() -> Iterator[ContentStats]:
+        """Collect the content accesses made in this context into a fresh ``ContentStats``.
+
+        Blocks nest; threads started with a copied context (such as
+        ``asyncio.to_thread``) are included.
+        """
+        stats = ContentStats()
+        token = _active.set((*_active.get(), stats))
+        try:
+            yield stats
+        finally:
+            _active.reset(token)
+
+    def _count(self, key: str, kind: str, size: int) -> None:
+        for stats in (self.stats, *_active.get()):
+            if kind == "hit":
+                stats.hits += 1
+                stats.bytes_cached += size
+                continue
+            stats.reads += 1
+            stats.bytes_read += size
+            if stats is not self.stats:
+                stats.per_path[key] = stats.per_path.get(key, 0) + 1
+            if kind == "shared":
+                stats.shared += 1
+            else:
+                stats.bytes_decoded += size
+
+    def _remember(self, paths: OrderedDict[str, Any], key: str, value: Any) -> None:
+        """Set *key* in the per-path LRU *paths*, evicting beyond ``max_paths``."""
+        paths[key] = value
+        paths.move_to_end(key)
+        while len(paths) > self.max_paths:
+            paths.popitem(last=False)
+
+    def _store(self, digest: bytes, body: _Body) -> _Body:
+        """Cache *body* under *digest* and return the cached instance."""
+        cached = self._bodies.get(digest)
+        if cached is not None:
+            self._bodies.move_to_end(digest)
+            return cached
+        if body.size > self.max_bytes:
+            return body
+        self._bodies[digest] = body
+        self._cached_bytes += body.size
+        while self._cached_bytes > self.max_bytes:
+            _, evicted = self._bodies.popitem(last=False)
+            self._cached_bytes -= evicted.size
+        return body
+
+
+_default_store = ContentStore()
+
+
+def default_store() -> ContentStore:
+    """Return the process-wide ``ContentStore`` used by the game modules."""
+    return _default_store
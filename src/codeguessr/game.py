@@ -7,13 +7,27 @@ state tracking including code reveal and scoring.
 import os
 import random
 import re
+import threading
+import time
 import uuid
-from dataclasses import dataclass, field
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable, Collection, Iterator, Mapping, MutableMapping
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any, Self
+from typing import TYPE_CHECKING, Any, Self
 
 import pathspec
 
+from codeguessr import sources
+from codeguessr.classify import DEFAULT_LIMITS, ClassifyLimits
+from codeguessr.content import SourceText, default_store
+from codeguessr.neardup import NearDuplicateIndex, minhash
+from codeguessr.tracing import Tracer
+
+if TYPE_CHECKING:
+    from codeguessr.sampling import TargetSampler
+
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
@@ -28,6 +42,8 @@ PRUNE_DIRS: frozenset[str] = frozenset({
 })
 
 MIN_LINES: int = 10
+# Number of paths a background scan keeps in its random reservoir.
+RESERVOIR_SIZE: int = 1024
 NUM_ROUNDS: int = 5
 MAX_GUESSES_PER_ROUND: int = 6
 
@@ -49,6 +65,13 @@ ATTEMPT_POINTS: list[int] = [1000, 800, 600, 400, 200, 100]
 # int  → reveal ±N lines around the highlighted line.
 REVEAL_STAGES: list[int | None] = [-1, 0, 3, 8, 15, None]
 
+# Lower bounds of the non-whitespace-length buckets used by ``HighlightIndex``.
+# Bucket *k* holds lengths in ``[HIGHLIGHT_BUCKETS[k], HIGHLIGHT_BUCKETS[k + 1])``.
+HIGHLIGHT_BUCKETS: tuple[int, ...] = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Phases timed by ``ScanStats``, in the order a file passes through them.
+SCAN_PHASES: tuple[str, ...] = ("walk", "gitignore", "filter", "classify", "read", "index")
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -65,14 +88,12 @@ def _load_gitignore_spec(dirpath: Path) -> pathspec.PathSpec | None:
         A ``PathSpec`` matching the .gitignore patterns, or ``None`` if no
         .gitignore exists or the file cannot be read.
     """
-    gitignore = dirpath / ".gitignore"
-    if not gitignore.is_file():
-        return None
     try:
-        lines = gitignore.read_text(encoding="utf-8", errors="ignore").splitlines()
-        return pathspec.PathSpec.from_lines("gitwildmatch", lines)
+        data = sources.read_bytes(dirpath / ".gitignore")
     except OSError:
         return None
+    lines = data.decode("utf-8", errors="ignore").splitlines()
+    return pathspec.PathSpec.from_lines("gitwildmatch", lines)
 
 
 def _obscure(line: str) -> str:
@@ -80,6 +101,15 @@ def _obscure(line: str) -> str:
     return re.sub(r"\S", "\u2588", line)
 
 
+def _middle_bounds(count: int) -> tuple[int, int]:
+    """Return the inclusive line range covering the middle 80 % of *count* lines."""
+    low = int(count * 0.1)
+    high = int(count * 0.9)
+    if low >= high:
+        low, high = 0, count - 1
+    return low, high
+
+
 def _pick_highlight(lines: list[str], min_chars: int = 1) -> int:
     """Return a 0-based line index suitable for use as the highlighted hint.
 
@@ -95,10 +125,7 @@ def _pick_highlight(lines: list[str], min_chars: int = 1) -> int:
         A randomly chosen 0-based line index.
     """
     count = len(lines)
-    low = int(count * 0.1)
-    high = int(count * 0.9)
-    if low >= high:
-        low, high = 0, count - 1
+    low, high = _middle_bounds(count)
 
     candidates = [
         idx for idx in range(low, high + 1)
@@ -112,54 +139,351 @@ def _pick_highlight(lines: list[str], min_chars: int = 1) -> int:
 
 
 # ---------------------------------------------------------------------------
-# Directory scanner
+# Highlight index
 # ---------------------------------------------------------------------------
 
 
-def scan_directory(
-    root: str | os.PathLike[str],
-    min_lines: int = MIN_LINES,
-    include_pattern: str | None = None,
-    ignore_pattern: str | None = None,
-) -> list[str]:
-    """Return a sorted list of relative paths to qualifying code files under *root*.
+def _bucket_of(length: int) -> int:
+    """Return the ``HIGHLIGHT_BUCKETS`` slot for a non-whitespace *length*."""
+    return min(length.bit_length(), len(HIGHLIGHT_BUCKETS) - 1)
 
-    Eligible files must:
-    - Have a supported extension (see ``INCLUDE_EXTENSIONS``).
-    - Not be a minified JS bundle (``*.min.js``).
-    - Match *include_pattern* if one is given.
-    - Not match *ignore_pattern* if one is given.
-    - Have at least *min_lines* non-empty lines.
-    - Not be located inside a pruned or gitignored directory.
+
+def _line_array(values: list[int], line_count: int) -> "array[int]":
+    """Pack 0-based line numbers into the narrowest suitable ``array``."""
+    return array("H" if line_count <= 0xFFFF else "I", values)
+
+
+@dataclass(frozen=True)
+class HighlightIndex:
+    """Precomputed highlight candidates for one source file.
+
+    Built once at scan time so that ``pick`` can choose a highlight line for
+    any ``min_chars`` without re-reading the file.  It reproduces the
+    selection rules of ``_pick_highlight`` exactly.
+
+    Attributes:
+        line_count: Total number of lines in the file.
+        middle: Non-empty line numbers in the middle 80 % of the file, sorted
+            by descending stripped length.
+        lengths: Stripped lengths parallel to *middle* (capped at 65535).
+        bucket_starts: ``bucket_starts[k]`` is the number of *middle* entries
+            whose length falls in a bucket above *k*; entries of bucket *k*
+            occupy ``middle[bucket_starts[k]:bucket_starts[k - 1]]``.
+        outer: Non-empty line numbers outside the middle 80 %.
+    """
+
+    line_count: int
+    middle: "array[int]"
+    lengths: "array[int]"
+    bucket_starts: "array[int]"
+    outer: "array[int]"
+
+    @classmethod
+    def build(cls, lines: list[str]) -> Self:
+        """Index the highlight candidates of *lines*.
+
+        Args:
+            lines: All lines of the source file.
+
+        Returns:
+            A ``HighlightIndex`` for the file.
+        """
+        count = len(lines)
+        low, high = _middle_bounds(count)
+
+        middle: list[tuple[int, int]] = []
+        outer: list[int] = []
+        for idx, line in enumerate(lines):
+            length = len(line.strip())
+            if not length:
+                continue
+            if low <= idx <= high:
+                middle.append((length, idx))
+            else:
+                outer.append(idx)
+        middle.sort(key=lambda item: -item[0])
+
+        starts = [0] * len(HIGHLIGHT_BUCKETS)
+        for length, _ in middle:
+            for slot in range(_bucket_of(length)):
+                starts[slot] += 1
+        return cls(
+            line_count=count,
+            middle=_line_array([idx for _, idx in middle], count),
+            lengths=array("H", [min(length, 0xFFFF) for length, _ in middle]),
+            bucket_starts=array("I", starts),
+            outer=_line_array(outer, count),
+        )
+
+    def _eligible(self, min_chars: int) -> int:
+        """Return how many leading *middle* entries have at least *min_chars*."""
+        if min_chars <= 1:
+            return len(self.middle)
+        slot = _bucket_of(min_chars)
+        start = self.bucket_starts[slot]
+        end = self.bucket_starts[slot - 1]
+        # Only the entries of a single bucket need to be searched.
+        return bisect_right(
+            self.lengths, -min_chars, lo=start, hi=end, key=lambda n: -n
+        )
+
+    def pick(self, min_chars: int = 1) -> int:
+        """Return a random highlight line, following ``_pick_highlight`` rules.
+
+        Args:
+            min_chars: Minimum number of non-whitespace characters required.
+
+        Returns:
+            A randomly chosen 0-based line index.
+        """
+        if min_chars <= 0 and self.line_count:
+            # Every line in the middle range qualifies, blank ones included.
+            return random.randint(*_middle_bounds(self.line_count))
+        eligible = self._eligible(min_chars)
+        if eligible:
+            return self.middle[random.randrange(eligible)]
+        total = len(self.middle) + len(self.outer)
+        if total:
+            pos = random.randrange(total)
+            if pos < len(self.middle):
+                return self.middle[pos]
+            return self.outer[pos - len(self.middle)]
+        return random.randrange(self.line_count) if self.line_count else 0
+
+
+# ---------------------------------------------------------------------------
+# Filter plans
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FilterStage:
+    """Cost counters for one stage of a ``FilterPlan``.
+
+    Attributes:
+        name: Stage name (``extension``, ``include``, ``gitignore``, …).
+        checked: Number of candidates the stage evaluated.
+        rejected: Number of candidates the stage rejected.
+        seconds: Time spent in the stage (only measured for timed plans).
+    """
+
+    name: str
+    checked: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+
+class FilterPlan:
+    """Compiled file filters for one request, cheapest checks first.
+
+    The plan is built once and reused for every file: patterns are compiled
+    up front and the path-only stages run in cost order — extension set
+    lookup, ``*.min.js`` suffix test, include regex, ignore regex.  Stages
+    that need more context (gitignore matching, classification of the file
+    head, reading, ``min_lines``) are run by the scanner through
+    ``run``/``record`` so that every stage's cost is reported by ``report``.
+    The same plan can filter a walk or a cached ``FileTable``.
 
     Args:
-        root: Root directory to scan recursively.
         min_lines: Minimum number of lines required in each file.
-        include_pattern: Optional compiled-safe regex; only matching paths
-            are included.  The pattern is matched against the forward-slash
-            relative path.
-        ignore_pattern: Optional compiled-safe regex; matching paths are
-            excluded.
+        include_pattern: Optional regex (source or compiled); only matching
+            paths pass.
+        ignore_pattern: Optional regex (source or compiled); matching paths
+            are rejected.
+        extensions: File extensions (with dot) that are eligible.
+        limits: Thresholds for rejecting binary, generated, minified and
+            oversized files before they are read; ``None`` disables the check.
+        timed: Measure the time spent in each stage.
+
+    Raises:
+        re.error: If a pattern given as a string is not a valid regex.
+    """
 
-    Returns:
-        Sorted list of forward-slash relative file paths.
+    def __init__(
+        self,
+        min_lines: int = MIN_LINES,
+        include_pattern: str | re.Pattern[str] | None = None,
+        ignore_pattern: str | re.Pattern[str] | None = None,
+        extensions: Collection[str] = INCLUDE_EXTENSIONS,
+        limits: ClassifyLimits | None = DEFAULT_LIMITS,
+        timed: bool = False,
+    ) -> None:
+        self.min_lines = min_lines
+        self.limits = limits
+        self.include = re.compile(include_pattern) if include_pattern else None
+        self.ignore = re.compile(ignore_pattern) if ignore_pattern else None
+        self.extensions = frozenset(ext.lower() for ext in extensions)
+        self.timed = timed
+        self.stages: dict[str, FilterStage] = {}
+
+        exts = self.extensions
+        checks: list[tuple[str, Callable[[str], bool]]] = [
+            ("extension", lambda rel: os.path.splitext(rel)[1].lower() in exts),
+            ("minified", lambda rel: not rel.lower().endswith(".min.js")),
+        ]
+        if self.include is not None:
+            include = self.include.search
+            checks.append(("include", lambda rel: include(rel) is not None))
+        if self.ignore is not None:
+            ignore = self.ignore.search
+            checks.append(("ignore", lambda rel: ignore(rel) is None))
+        self._path_checks = checks
+
+    def record(self, name: str, passed: bool, seconds: float = 0.0) -> bool:
+        """Count one evaluation of stage *name* and return *passed*."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = FilterStage(name)
+        stage.checked += 1
+        stage.seconds += seconds
+        if not passed:
+            stage.rejected += 1
+        return passed
+
+    def run(self, name: str, predicate: Callable[[Any], bool], value: Any) -> bool:
+        """Evaluate *predicate* on *value* as stage *name*, timing it if enabled."""
+        if not self.timed:
+            return self.record(name, predicate(value))
+        start = time.perf_counter()
+        passed = predicate(value)
+        return self.record(name, passed, time.perf_counter() - start)
+
+    def matches_path(self, rel: str) -> bool:
+        """Return True if *rel* passes every path-only stage."""
+        for name, predicate in self._path_checks:
+            if not self.run(name, predicate, rel):
+                return False
+        return True
+
+    def accepts_content(self, path: str | os.PathLike[str]) -> bool:
+        """Return True if the head of *path* passes the classification limits."""
+        limits = self.limits
+        if limits is None:
+            return True
+
+        def _playable(target: str | os.PathLike[str]) -> bool:
+            try:
+                return limits.accepts(default_store().sniff(target))
+            except OSError:
+                return False
+
+        return self.run("classify", _playable, path)
+
+    def accepts_lines(self, count: int) -> bool:
+        """Return True if a file with *count* lines passes ``min_lines``."""
+        return self.record("min_lines", count >= self.min_lines)
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """Return per-stage counters and timings, in evaluation order."""
+        return {
+            name: {"checked": st.checked, "rejected": st.rejected, "seconds": st.seconds}
+            for name, st in self.stages.items()
+        }
+
+
+# ---------------------------------------------------------------------------
+# Directory scanner
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class ScanStats:
+    """Counters and per-phase timings of one scan.
+
+    Pass an instance to a scanner to find out where a slow scan spends its
+    time.  Phases (``SCAN_PHASES``) are: listing directories (``walk``),
+    ``.gitignore`` matching, path filters (``filter``), sniffing file heads
+    (``classify``), reading whole files (``read``) and building highlight
+    and near-duplicate indexes (``index``).
+
+    Attributes:
+        dirs_visited: Directories listed.
+        dirs_pruned: Subdirectories skipped because they are in
+            ``PRUNE_DIRS`` or hidden.
+        dirs_gitignored: Subdirectories skipped because a ``.gitignore``
+            matches them.
+        files_walked: Files seen in the visited directories.
+        files_gitignored: Files rejected by a ``.gitignore``.
+        files_read: Files read completely.
+        bytes_read: Total size of the files read completely.
+        decode_errors: Files read that are not valid UTF-8.
+        min_lines_rejects: Files read and rejected for having too few lines.
+        accepted: Files the scan produced.
+        phases: Seconds spent in each phase.
+        trace: Optional tracer that receives a span per listed directory and
+            per file read and indexed.
     """
-    root_path = Path(root)
 
-    # gitignore spec cache: absolute directory path → PathSpec | None.
-    _gi_cache: dict[Path, pathspec.PathSpec | None] = {}
+    dirs_visited: int = 0
+    dirs_pruned: int = 0
+    dirs_gitignored: int = 0
+    files_walked: int = 0
+    files_gitignored: int = 0
+    files_read: int = 0
+    bytes_read: int = 0
+    decode_errors: int = 0
+    min_lines_rejects: int = 0
+    accepted: int = 0
+    phases: dict[str, float] = field(default_factory=lambda: dict.fromkeys(SCAN_PHASES, 0.0))
+    trace: Tracer | None = field(default=None, repr=False)
+
+    def record_read(self, rel: str, source: SourceText, start: float, end: float) -> None:
+        """Count a file read completely between *start* and *end*."""
+        self.phases["read"] += end - start
+        self.files_read += 1
+        self.bytes_read += source.size
+        self.decode_errors += source.lossy
+        if self.trace is not None:
+            self.trace.complete("read", start, end, path=rel, bytes=source.size)
+
+    def record_index(self, rel: str, start: float, end: float) -> None:
+        """Count a file indexed between *start* and *end*."""
+        self.phases["index"] += end - start
+        if self.trace is not None:
+            self.trace.complete("index", start, end, path=rel)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters and phase timings as a plain dict."""
+        return {
+            "dirs_visited": self.dirs_visited,
+            "dirs_pruned": self.dirs_pruned,
+            "dirs_gitignored": self.dirs_gitignored,
+            "files_walked": self.files_walked,
+            "files_gitignored": self.files_gitignored,
+            "files_read": self.files_read,
+            "bytes_read": self.bytes_read,
+            "decode_errors": self.decode_errors,
+            "min_lines_rejects": self.min_lines_rejects,
+            "accepted": self.accepted,
+            "phases": dict(self.phases),
+        }
+
 
-    def _get_spec(dirpath: Path) -> pathspec.PathSpec | None:
-        if dirpath not in _gi_cache:
-            _gi_cache[dirpath] = _load_gitignore_spec(dirpath)
-        return _gi_cache[dirpath]
+class GitignoreMatcher:
+    """Answers whether a path under *root* is matched by any ancestor .gitignore.
+
+    Each directory's .gitignore is parsed at most once.
+
+    Args:
+        root: Root directory the relative paths are resolved against.
+    """
 
-    def _is_gitignored(rel: str, is_dir: bool = False) -> bool:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        # gitignore spec cache: absolute directory path → PathSpec | None.
+        self._cache: dict[Path, pathspec.PathSpec | None] = {}
+
+    def _get_spec(self, dirpath: Path) -> pathspec.PathSpec | None:
+        if dirpath not in self._cache:
+            self._cache[dirpath] = _load_gitignore_spec(dirpath)
+        return self._cache[dirpath]
+
+    def is_ignored(self, rel: str, is_dir: bool = False) -> bool:
         """Return True if *rel* is matched by any ancestor .gitignore."""
         parts = rel.split("/")
-        cur = root_path
+        cur = self.root
         for idx, part in enumerate(parts):
-            spec = _get_spec(cur)
+            spec = self._get_spec(cur)
             if spec is not None:
                 sub = "/".join(parts[idx:])
                 if spec.match_file(sub + "/" if is_dir else sub):
@@ -168,53 +492,352 @@ def scan_directory(
                 cur = cur / part
         return False
 
-    result: list[str] = []
 
-    for dirpath, dirnames, filenames in os.walk(root_path):
+def iter_candidate_files(
+    root: str | os.PathLike[str],
+    plan: FilterPlan | None = None,
+    stats: ScanStats | None = None,
+) -> Iterator[tuple[Path, str]]:
+    """Walk *root* and yield files that pass the path-only eligibility rules.
+
+    Pruned, hidden and gitignored directories are never entered.  Files must
+    pass the path stages of *plan* (extension, ``*.min.js``, include and
+    ignore patterns) and are then checked against .gitignore, the most
+    expensive path rule.  Nothing is read, so content rules (``min_lines``)
+    are left to callers.
+
+    Args:
+        root: Root directory to scan recursively.
+        plan: Filters to apply; defaults to a plan with no patterns.
+        stats: Optional statistics that receive the walk's counters and the
+            ``walk``, ``gitignore`` and ``filter`` phase timings.
+
+    Yields:
+        ``(absolute_path, forward_slash_relative_path)`` pairs, in walk order.
+    """
+    root_path = Path(root)
+    gitignore = GitignoreMatcher(root_path)
+    plan = plan or FilterPlan(min_lines=0, limits=None)
+    stats = stats if stats is not None else ScanStats()
+    phases = stats.phases
+    clock = time.perf_counter
+
+    def _not_ignored(rel: str) -> bool:
+        return not gitignore.is_ignored(rel)
+
+    walk = sources.walk(root_path)
+    while True:
+        start = clock()
+        entry = next(walk, None)
+        listed = clock()
+        phases["walk"] += listed - start
+        if entry is None:
+            break
+        dirpath, dirnames, filenames = entry
         cur = Path(dirpath)
+        stats.dirs_visited += 1
 
         # Prune hard-coded directories and hidden directories.
-        dirnames[:] = [
+        kept = [
             name for name in dirnames
             if name not in PRUNE_DIRS and not name.startswith(".")
         ]
+        stats.dirs_pruned += len(dirnames) - len(kept)
         # Prune gitignored directories so we never descend into them.
         dirnames[:] = [
-            name for name in dirnames
-            if not _is_gitignored(
+            name for name in kept
+            if not gitignore.is_ignored(
                 str((cur / name).relative_to(root_path)).replace("\\", "/"),
                 is_dir=True,
             )
         ]
+        stats.dirs_gitignored += len(kept) - len(dirnames)
+        pruned = clock()
+        phases["gitignore"] += pruned - listed
+        if stats.trace is not None:
+            stats.trace.complete(
+                "list", start, pruned, path=os.path.relpath(dirpath, root_path),
+                files=len(filenames),
+            )
 
         for filename in filenames:
+            stats.files_walked += 1
             filepath = cur / filename
             rel = str(filepath.relative_to(root_path)).replace("\\", "/")
 
-            if _is_gitignored(rel):
-                continue
-            if filepath.suffix.lower() not in INCLUDE_EXTENSIONS:
-                continue
-            if re.search(r"\.min\.js$", filename, re.IGNORECASE):
-                continue
-            if include_pattern and not re.search(include_pattern, rel):
+            checked = clock()
+            matched = plan.matches_path(rel)
+            matched_at = clock()
+            phases["filter"] += matched_at - checked
+            if not matched:
                 continue
-            if ignore_pattern and re.search(ignore_pattern, rel):
+            ignored = not plan.run("gitignore", _not_ignored, rel)
+            phases["gitignore"] += clock() - matched_at
+            if ignored:
+                stats.files_gitignored += 1
                 continue
+            yield filepath, rel
 
-            try:
-                lines = filepath.read_text(
-                    encoding="utf-8", errors="ignore"
-                ).splitlines()
-            except OSError:
-                continue
 
-            if len(lines) < min_lines:
-                continue
+def index_source(
+    rel: str,
+    source: SourceText,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    near_dups: NearDuplicateIndex | None = None,
+) -> None:
+    """Record the highlight index and MinHash signature of *source* under *rel*.
+
+    Both are derived once per content digest, so identical files (in this
+    tree or any other) share them.
+
+    Args:
+        rel: Relative path the file was found under.
+        source: The file's contents from the content store.
+        highlights: Optional mapping that receives the ``HighlightIndex``.
+        near_dups: Optional index that receives the MinHash signature.
+    """
+    store = default_store()
+    if highlights is not None:
+        highlights[rel] = store.derive(source, "highlight", HighlightIndex.build)
+    if near_dups is not None:
+        signature = store.derive(source, "minhash", minhash)
+        if signature is None:
+            near_dups.remove(rel)
+        else:
+            near_dups.add_signature(rel, signature)
+
+
+def iter_scan_directory(
+    root: str | os.PathLike[str],
+    min_lines: int = MIN_LINES,
+    include_pattern: str | None = None,
+    ignore_pattern: str | None = None,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    plan: FilterPlan | None = None,
+    near_dups: NearDuplicateIndex | None = None,
+    stats: ScanStats | None = None,
+) -> Iterator[str]:
+    """Yield relative paths to qualifying code files under *root* as they are found.
+
+    Paths are produced in walk order, so callers can start using results
+    before the whole tree has been visited.  See ``scan_directory`` for the
+    eligibility rules.
+
+    Args:
+        root: Root directory to scan recursively.
+        min_lines: Minimum number of lines required in each file.
+        include_pattern: Optional compiled-safe regex; only matching paths
+            are included.  The pattern is matched against the forward-slash
+            relative path.
+        ignore_pattern: Optional compiled-safe regex; matching paths are
+            excluded.
+        highlights: Optional mapping that is populated with a
+            ``HighlightIndex`` for every returned path.
+        plan: Prebuilt filters; when given, it replaces *min_lines*,
+            *include_pattern* and *ignore_pattern* and collects stage costs.
+        near_dups: Optional index that every returned path is added to.
+        stats: Optional statistics that receive the scan's counters, phase
+            timings and trace spans; complete once the generator is
+            exhausted.
+
+    Yields:
+        Forward-slash relative file paths, in walk order.
+    """
+    if plan is None:
+        plan = FilterPlan(min_lines, include_pattern, ignore_pattern)
+    stats = stats if stats is not None else ScanStats()
+    store = default_store()
+    clock = time.perf_counter
+    scan_start = clock()
+    for filepath, rel in iter_candidate_files(root, plan, stats):
+        start = clock()
+        playable = plan.accepts_content(filepath)
+        read_start = clock()
+        stats.phases["classify"] += read_start - start
+        if not playable:
+            continue
+        try:
+            source = store.read(filepath)
+        except OSError:
+            source = None
+        read_end = clock()
+        elapsed = read_end - read_start if plan.timed else 0.0
+        if not plan.record("read", source is not None, elapsed) or source is None:
+            continue
+        stats.record_read(rel, source, read_start, read_end)
+
+        if not plan.accepts_lines(len(source.lines)):
+            stats.min_lines_rejects += 1
+            continue
+
+        index_source(rel, source, highlights, near_dups)
+        stats.record_index(rel, read_end, clock())
+        stats.accepted += 1
+        yield rel
+    if stats.trace is not None:
+        stats.trace.complete("scan", scan_start, clock(), root=os.fspath(root))
 
-            result.append(rel)
 
-    return sorted(result)
+def scan_directory(
+    root: str | os.PathLike[str],
+    min_lines: int = MIN_LINES,
+    include_pattern: str | None = None,
+    ignore_pattern: str | None = None,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    plan: FilterPlan | None = None,
+    near_dups: NearDuplicateIndex | None = None,
+    stats: ScanStats | None = None,
+) -> list[str]:
+    """Return a sorted list of relative paths to qualifying code files under *root*.
+
+    Eligible files must:
+    - Have a supported extension (see ``INCLUDE_EXTENSIONS``).
+    - Not be a minified JS bundle (``*.min.js``).
+    - Not look binary, generated, minified or oversized from its first few
+      KB (see ``codeguessr.classify``).
+    - Match *include_pattern* if one is given.
+    - Not match *ignore_pattern* if one is given.
+    - Have at least *min_lines* non-empty lines.
+    - Not be located inside a pruned or gitignored directory.
+
+    Args:
+        root: Root directory to scan recursively.
+        min_lines: Minimum number of lines required in each file.
+        include_pattern: Optional compiled-safe regex; only matching paths
+            are included.  The pattern is matched against the forward-slash
+            relative path.
+        ignore_pattern: Optional compiled-safe regex; matching paths are
+            excluded.
+        highlights: Optional mapping that is populated with a
+            ``HighlightIndex`` for every returned path.
+        plan: Prebuilt filters; when given, it replaces *min_lines*,
+            *include_pattern* and *ignore_pattern* and collects stage costs.
+        near_dups: Optional index that every returned path is added to.
+        stats: Optional ``ScanStats`` that receives per-phase timings and
+            counters (and trace spans, if it has a tracer).
+
+    Returns:
+        Sorted list of forward-slash relative file paths.
+    """
+    return sorted(iter_scan_directory(
+        root,
+        min_lines=min_lines,
+        include_pattern=include_pattern,
+        ignore_pattern=ignore_pattern,
+        highlights=highlights,
+        plan=plan,
+        near_dups=near_dups,
+        stats=stats,
+    ))
+
+
+class ScanProgress:
+    """Results of a directory scan that is still running in the background.
+
+    Every path found so far is kept for the file explorer, and a fixed-size
+    reservoir holds a uniform random sample of them (Algorithm R), so early
+    games can pick targets before the scan completes.
+
+    Args:
+        reservoir_size: Maximum number of paths held in the reservoir.
+    """
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE) -> None:
+        self.reservoir_size = reservoir_size
+        self.found: list[str] = []
+        self.reservoir: list[str] = []
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self.error: BaseException | None = None
+        # ``time.monotonic`` when ``run`` started and ended.
+        self.started: float | None = None
+        self.finished: float | None = None
+        self._cond = threading.Condition()
+
+    @property
+    def duration(self) -> float:
+        """Seconds the scan has run so far, or took in total once done."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self) -> None:
+        """Ask a running ``run`` to stop after the current file."""
+        self.cancelled.set()
+
+    def add(self, path: str) -> None:
+        """Record a newly found *path* and update the reservoir."""
+        with self._cond:
+            self.found.append(path)
+            if len(self.reservoir) < self.reservoir_size:
+                self.reservoir.append(path)
+            else:
+                slot = random.randrange(len(self.found))
+                if slot < self.reservoir_size:
+                    self.reservoir[slot] = path
+            self._cond.notify_all()
+
+    def run(
+        self,
+        root: str | os.PathLike[str],
+        on_complete: Callable[[list[str]], None] | None = None,
+        scanner: Callable[..., Iterator[str]] | None = None,
+        **scan_kwargs: Any,
+    ) -> None:
+        """Scan *root*, recording results as they arrive.
+
+        A cancelled scan stops early and does not call *on_complete*.
+
+        Args:
+            root: Root directory to scan recursively.
+            on_complete: Called with the sorted full file list once the scan
+                finishes successfully.
+            scanner: Generator producing the paths; defaults to
+                ``iter_scan_directory``.
+            **scan_kwargs: Extra arguments for *scanner*.
+        """
+        scanner = scanner or iter_scan_directory
+        self.started = time.monotonic()
+        try:
+            for path in scanner(root, **scan_kwargs):
+                if self.cancelled.is_set():
+                    return
+                self.add(path)
+            if on_complete is not None:
+                on_complete(self.snapshot())
+        except BaseException as exc:
+            self.error = exc
+            raise
+        finally:
+            self.finished = time.monotonic()
+            with self._cond:
+                self.done.set()
+                self._cond.notify_all()
+
+    def wait_for(self, count: int, timeout: float | None = None) -> bool:
+        """Block until *count* paths are found or the scan ends.
+
+        Returns:
+            ``True`` if at least *count* paths have been found.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: len(self.found) >= count or self.done.is_set(), timeout
+            )
+            return len(self.found) >= count
+
+    def snapshot(self) -> list[str]:
+        """Return a sorted copy of every path found so far."""
+        with self._cond:
+            return sorted(self.found)
+
+    def sample(self, count: int) -> list[str]:
+        """Draw *count* targets from the reservoir, distinct when possible."""
+        with self._cond:
+            pool = list(self.reservoir)
+        if len(pool) >= count:
+            return random.sample(pool, count)
+        return random.choices(pool, k=count)
 
 
 # ---------------------------------------------------------------------------
@@ -222,6 +845,83 @@ def scan_directory(
 # ---------------------------------------------------------------------------
 
 
+# Extra candidates drawn per round when replacing near-duplicate targets.
+_SPREAD_OVERSAMPLE: int = 4
+
+
+def _spread_targets(
+    targets: list[str],
+    files: list[str],
+    count: int,
+    near_dups: NearDuplicateIndex,
+    sampler: "TargetSampler | None",
+) -> list[str]:
+    """Replace targets that are near-duplicates of earlier ones, where possible.
+
+    Replacements come from an oversampled draw (from *sampler* when given);
+    if that still leaves near-duplicates, the remaining slots keep the
+    original draw so a game always has *count* distinct targets.
+    """
+    picked = near_dups.distinct(targets, count)
+    if len(picked) == count:
+        return picked
+    extra = min(len(files), count * _SPREAD_OVERSAMPLE)
+    pool = sampler.sample(extra) if sampler is not None else random.sample(files, extra)
+    picked = near_dups.distinct([*picked, *(f for f in pool if f not in picked)], count)
+    for target in targets:
+        if len(picked) == count:
+            break
+        if target not in picked:
+            picked.append(target)
+    return picked
+
+
+@dataclass(frozen=True)
+class PreparedRound:
+    """A round whose target file and highlight line have already been chosen.
+
+    Attributes:
+        target_file: Relative path of the file the player must identify.
+        highlight_line: 0-based index of the line used for the reveal hint.
+        lines: Source lines of *target_file*, cached at preparation time.
+    """
+
+    target_file: str
+    highlight_line: int
+    lines: list[str]
+
+    @classmethod
+    def load(
+        cls,
+        root_dir: str,
+        target_file: str,
+        min_line_chars: int = 1,
+        highlight: HighlightIndex | None = None,
+    ) -> Self:
+        """Load *target_file* through the content store and pick its highlight line.
+
+        Args:
+            root_dir: Absolute path to the directory that was scanned.
+            target_file: Relative path of the chosen target.
+            min_line_chars: Minimum non-whitespace characters required in the
+                highlighted line.
+            highlight: Precomputed index for *target_file*; when omitted,
+                the index cached for the file's content is used or built.
+
+        Returns:
+            A ``PreparedRound`` carrying the file's lines.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        store = default_store()
+        source = store.read(Path(root_dir) / target_file)
+        if highlight is None:
+            highlight = store.derive(source, "highlight", HighlightIndex.build)
+        line = highlight.pick(min_line_chars)
+        return cls(target_file=target_file, highlight_line=line, lines=source.lines)
+
+
 @dataclass
 class RoundState:
     """Mutable state for a single guess-the-file round.
@@ -320,6 +1020,9 @@ class GameSession:
         files: Sorted list of all eligible relative file paths in the session.
         rounds: Ordered list of round states for this game.
         current_round_idx: Index into *rounds* for the round currently in play.
+        line_cache: Source lines of the target files, keyed by relative path.
+            Targets missing from the cache are loaded through the content
+            store on first use and kept for the rest of the session.
     """
 
     game_id: str
@@ -327,6 +1030,7 @@ class GameSession:
     files: list[str]
     rounds: list[RoundState]
     current_round_idx: int = 0
+    line_cache: dict[str, list[str]] = field(default_factory=dict, repr=False)
 
     @classmethod
     def create(
@@ -336,9 +1040,15 @@ class GameSession:
         num_rounds: int = NUM_ROUNDS,
         max_guesses: int = MAX_GUESSES_PER_ROUND,
         min_line_chars: int = 1,
+        highlights: Mapping[str, HighlightIndex] | None = None,
+        sampler: "TargetSampler | None" = None,
+        near_dups: NearDuplicateIndex | None = None,
     ) -> Self:
         """Create a new session by sampling target files and selecting highlight lines.
 
+        Targets covered by *highlights* get their highlight line from the
+        index and are not read until a payload needs them.
+
         Args:
             root_dir: Absolute path to the directory that was scanned.
             files: All eligible relative file paths (from ``scan_directory``).
@@ -346,33 +1056,120 @@ class GameSession:
             max_guesses: Maximum wrong guesses allowed per round.
             min_line_chars: Minimum non-whitespace characters required in the
                 highlighted line.
+            highlights: Optional per-file highlight indexes from the scan.
+            sampler: Optional weighted sampler over *files*; targets are
+                drawn uniformly when omitted.
+            near_dups: Optional near-duplicate index; targets that are
+                near-duplicates of an earlier target are avoided when the
+                file list allows it.
 
         Returns:
             A freshly initialised ``GameSession``.
         """
-        if len(files) >= num_rounds:
+        if sampler is not None:
+            targets = sampler.sample(num_rounds)
+        elif len(files) >= num_rounds:
             targets = random.sample(files, num_rounds)
         else:
             targets = random.choices(files, k=num_rounds)
 
-        rounds: list[RoundState] = []
-        for target in targets:
-            lines = (
-                (Path(root_dir) / target)
-                .read_text(encoding="utf-8", errors="ignore")
-                .splitlines()
+        if near_dups is not None and len(files) >= num_rounds:
+            targets = _spread_targets(targets, files, num_rounds, near_dups, sampler)
+
+        highlights = highlights or {}
+        if all(target in highlights for target in targets):
+            return cls(
+                game_id=str(uuid.uuid4()),
+                root_dir=root_dir,
+                files=files,
+                rounds=[
+                    RoundState(
+                        target_file=target,
+                        highlight_line=highlights[target].pick(min_line_chars),
+                        max_guesses=max_guesses,
+                    )
+                    for target in targets
+                ],
             )
-            rounds.append(RoundState(
-                target_file=target,
-                highlight_line=_pick_highlight(lines, min_chars=min_line_chars),
-                max_guesses=max_guesses,
-            ))
 
+        prepared = [
+            PreparedRound.load(
+                root_dir, target,
+                min_line_chars=min_line_chars, highlight=highlights.get(target),
+            )
+            for target in targets
+        ]
+        return cls.from_prepared(root_dir, files, prepared, max_guesses=max_guesses)
+
+    @classmethod
+    def from_prepared(
+        cls,
+        root_dir: str,
+        files: list[str],
+        prepared: list[PreparedRound],
+        max_guesses: int = MAX_GUESSES_PER_ROUND,
+    ) -> Self:
+        """Assemble a session from rounds whose targets and highlights are already chosen.
+
+        The cached source lines of each prepared round are kept on the
+        session, so building payloads never needs to re-read those files.
+
+        Args:
+            root_dir: Absolute path to the directory that was scanned.
+            files: All eligible relative file paths (from ``scan_directory``).
+            prepared: One prepared round per game round, in play order.
+            max_guesses: Maximum wrong guesses allowed per round.
+
+        Returns:
+            A freshly initialised ``GameSession``.
+        """
+        rounds = [
+            RoundState(
+                target_file=prep.target_file,
+                highlight_line=prep.highlight_line,
+                max_guesses=max_guesses,
+            )
+            for prep in prepared
+        ]
         return cls(
             game_id=str(uuid.uuid4()),
             root_dir=root_dir,
             files=files,
             rounds=rounds,
+            line_cache={prep.target_file: prep.lines for prep in prepared},
+        )
+
+    def to_state(self) -> dict[str, Any]:
+        """Return the session's progress as a JSON-serialisable dict.
+
+        The file list and line cache are left out; ``from_state`` restores
+        a session that can be played on from any process serving the root.
+        """
+        return {
+            "game_id": self.game_id,
+            "root_dir": self.root_dir,
+            "rounds": [asdict(round_state) for round_state in self.rounds],
+            "current_round_idx": self.current_round_idx,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any], files: list[str] | None = None) -> Self:
+        """Restore a session saved with ``to_state``.
+
+        Args:
+            state: Output of ``to_state``.
+            files: Eligible file list to attach; it is only reported to
+                clients when a game is created, so it may be omitted.
+
+        Returns:
+            The restored session, with an empty line cache.
+        """
+        return cls(
+            game_id=state["game_id"],
+            root_dir=state["root_dir"],
+            files=files if files is not None else [],
+            rounds=[RoundState(**round_state) for round_state in state["rounds"]],
+            current_round_idx=state["current_round_idx"],
         )
 
     @property
@@ -391,11 +1188,11 @@ class GameSession:
         return sum(rnd.points_earned for rnd in self.rounds)
 
     def _read_lines(self, target: str) -> list[str]:
-        return (
-            (Path(self.root_dir) / target)
-            .read_text(encoding="utf-8", errors="ignore")
-            .splitlines()
-        )
+        cached = self.line_cache.get(target)
+        if cached is None:
+            cached = default_store().read_lines(Path(self.root_dir) / target)
+            self.line_cache[target] = cached
+        return cached
 
     def current_round_payload(self) -> dict[str, Any]:
         """Build the API payload describing the current round's display state.
@@ -0,0 +1,128 @@
+"""Fast JSON encoding of API responses.
+
+The game endpoints return large payloads — a ``files`` list with every
+eligible path of a root, and ``code_display`` strings of hundreds of KB —
+that FastAPI would first walk with ``jsonable_encoder`` and then encode
+with the standard library.  Endpoints instead return a
+``JSONBytesResponse``, encoded in one pass by ``orjson`` when it is
+installed (``pip install codeguessr[fast]``) and by ``json`` otherwise;
+the choice is made once, at import.
+
+Parts of a payload that are the same for many responses, such as a round
+pool's file list, can be encoded once as a ``Fragment`` and are then
+spliced into each response as bytes.  A response keeps its body as a list
+of such parts, so ``codeguessr.compression`` can splice in the fragments'
+compressed forms as well.
+"""
+
+import json
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+
+    HAVE_ORJSON = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAVE_ORJSON = False
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Encode *obj* with the standard library, as compactly as ``orjson`` does."""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+if HAVE_ORJSON:
+    dumps: Callable[[Any], bytes] = orjson.dumps
+else:  # pragma: no cover - depends on the environment
+    dumps = _json_dumps
+
+
+class Fragment:
+    """Already-encoded JSON value, spliced into payloads by ``encode``.
+
+    Args:
+        data: The encoded JSON value.
+
+    Attributes:
+        data: The encoded JSON value.
+        variants: Compressed forms of *data*, keyed by content coding;
+            filled on demand by ``codeguessr.compression``.
+    """
+
+    __slots__ = ("data", "variants")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.variants: dict[str, bytes] = {}
+
+    @classmethod
+    def of(cls, value: Any) -> "Fragment":
+        """Encode *value* once for use in many payloads."""
+        return cls(dumps(value))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+def encode_parts(payload: dict[str, Any]) -> list[bytes | Fragment]:
+    """Encode *payload* into byte strings and its top-level ``Fragment`` values.
+
+    The parts concatenate to the encoded payload; fragments are written
+    after the other keys.
+    """
+    fragments = [(key, value) for key, value in payload.items() if isinstance(value, Fragment)]
+    if not fragments:
+        return [dumps(payload)]
+    rest = {key: value for key, value in payload.items() if not isinstance(value, Fragment)}
+    parts: list[bytes | Fragment] = []
+    head = dumps(rest)[:-1]  # without the closing brace
+    separator = b"," if rest else b""
+    for key, fragment in fragments:
+        parts += [head + separator + dumps(key) + b":", fragment]
+        head, separator = b"", b","
+    parts.append(b"}")
+    return parts
+
+
+def join_parts(parts: Sequence[bytes | Fragment]) -> bytes:
+    """Concatenate the output of ``encode_parts``."""
+    return b"".join(part.data if isinstance(part, Fragment) else part for part in parts)
+
+
+def encode(payload: dict[str, Any]) -> bytes:
+    """Encode *payload*, splicing in its top-level ``Fragment`` values as they are."""
+    return join_parts(encode_parts(payload))
+
+
+# ---------------------------------------------------------------------------
+# Response
+# ---------------------------------------------------------------------------
+
+
+class JSONBytesResponse(Response):
+    """JSON response encoded with ``encode``; ``bytes`` content is sent as is.
+
+    Attributes:
+        parts: The body as returned by ``encode_parts``.
+    """
+
+    media_type = "application/json"
+
+    parts: list[bytes | Fragment]
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            self.parts = [content]
+        elif isinstance(content, dict):
+            self.parts = encode_parts(content)
+        else:
+            self.parts = [dumps(content)]
+        return join_parts(self.parts)
@@ -0,0 +1,388 @@
+"""HTTP load driver for sizing CodeGuessr deployments.
+
+``codeguessr loadtest`` simulates concurrent players against a running
+server (``--url``) or against the app started in this process on a free
+local port.  Each player plays whole games the way the browser client does:
+``POST /api/game/new``, then guesses with think time in between until the
+game is over.  Guesses are drawn from the game's file list without
+repeating a wrong guess within a round, so most rounds use every guess —
+the heaviest realistic load per game.
+
+The report gives p50/p95/p99 latency per endpoint, throughput, the error
+rate and the server's resident set size before and after the run.  RSS is
+read from ``/proc`` and is only available on Linux, for the in-process
+server or a local server whose PID is given.
+
+The driver uses ``httpx``, an optional dependency (``codeguessr[loadtest]``).
+"""
+
+import asyncio
+import os
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+try:
+    import httpx
+
+    HAVE_HTTPX = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAVE_HTTPX = False
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Reported latency percentiles.
+PERCENTILES: tuple[int, ...] = (50, 95, 99)
+# Endpoint names used in the report, keyed by the request they time.
+NEW_GAME: str = "new_game"
+SUBMIT_GUESS: str = "submit_guess"
+# Seconds to wait for an in-process server to finish starting up.
+STARTUP_TIMEOUT: float = 120.0
+
+
+# ---------------------------------------------------------------------------
+# Configuration and results
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class LoadTestConfig:
+    """What the simulated players do.
+
+    Attributes:
+        players: Number of concurrent players.
+        games_per_player: Full games each player plays, one after another.
+        think_time: Mean pause in seconds before each guess and between
+            games; pauses are exponentially distributed.  0 disables them.
+        settings: JSON body sent with every ``POST /api/game/new``.
+        timeout: Per-request timeout in seconds.
+        seed: Seed for the players' choices; random when ``None``.
+    """
+
+    players: int = 10
+    games_per_player: int = 3
+    think_time: float = 1.0
+    settings: dict[str, Any] = field(default_factory=dict)
+    timeout: float = 30.0
+    seed: int | None = None
+
+
+@dataclass
+class EndpointStats:
+    """Latencies and failures of one endpoint.
+
+    Attributes:
+        latencies: Seconds taken by each successful request.
+        errors: Requests that failed or returned a non-2xx status.
+    """
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def count(self) -> int:
+        """Number of requests sent."""
+        return len(self.latencies) + self.errors
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the *pct*-th percentile latency in seconds (nearest rank)."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(1, -(-len(ordered) * pct // 100))
+        return ordered[int(rank) - 1]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counts and latency percentiles (in milliseconds)."""
+        summary: dict[str, Any] = {"count": self.count, "errors": self.errors}
+        for pct in PERCENTILES:
+            value = self.percentile(pct)
+            summary[f"p{pct}_ms"] = None if value is None else round(value * 1000, 3)
+        return summary
+
+
+@dataclass
+class LoadTestReport:
+    """Outcome of a load test.
+
+    Attributes:
+        config: The simulated workload.
+        endpoints: Per-endpoint statistics, keyed by ``NEW_GAME`` and
+            ``SUBMIT_GUESS``.
+        games: Games played to the end.
+        elapsed: Wall-clock duration of the run in seconds.
+        rss_before: Server RSS in bytes before the run, if known.
+        rss_after: Server RSS in bytes after the run, if known.
+    """
+
+    config: LoadTestConfig
+    endpoints: dict[str, EndpointStats] = field(
+        default_factory=lambda: {NEW_GAME: EndpointStats(), SUBMIT_GUESS: EndpointStats()}
+    )
+    games: int = 0
+    elapsed: float = 0.0
+    rss_before: int | None = None
+    rss_after: int | None = None
+
+    @property
+    def requests(self) -> int:
+        """Total requests sent."""
+        return sum(stats.count for stats in self.endpoints.values())
+
+    @property
+    def errors(self) -> int:
+        """Total failed requests."""
+        return sum(stats.errors for stats in self.endpoints.values())
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second over the whole run."""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of requests that failed."""
+        return self.errors / self.requests if self.requests else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the report as a JSON-ready dict."""
+        growth = None
+        if self.rss_before is not None and self.rss_after is not None:
+            growth = self.rss_after - self.rss_before
+        return {
+            "players": self.config.players,
+            "games": self.games,
+            "requests": self.requests,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_rps": round(self.throughput, 2),
+            "error_rate": round(self.error_rate, 5),
+            "endpoints": {name: stats.as_dict() for name, stats in self.endpoints.items()},
+            "rss_before": self.rss_before,
+            "rss_after": self.rss_after,
+            "rss_growth": growth,
+        }
+
+    def format(self) -> str:
+        """Render the report as text."""
+        lines = [
+            f"{self.config.players} players, {self.games} games, {self.requests} requests "
+            f"in {self.elapsed:.1f}s ({self.throughput:.1f} req/s)",
+            "",
+            f"{'endpoint':<14}{'count':>8}{'errors':>8}"
+            + "".join(f"{f'p{pct} ms':>10}" for pct in PERCENTILES),
+        ]
+        for name, stats in self.endpoints.items():
+            cells = []
+            for pct in PERCENTILES:
+                value = stats.percentile(pct)
+                cells.append(f"{'-' if value is None else f'{value * 1000:.1f}':>10}")
+            lines.append(f"{name:<14}{stats.count:>8}{stats.errors:>8}" + "".join(cells))
+        lines += ["", f"error rate: {self.error_rate:.2%}"]
+        if self.rss_before is not None and self.rss_after is not None:
+            mib = 1024 * 1024
+            lines.append(
+                f"server RSS: {self.rss_before / mib:.1f} MiB -> {self.rss_after / mib:.1f} MiB "
+                f"({(self.rss_after - self.rss_before) / mib:+.1f} MiB)"
+            )
+        else:
+            lines.append("server RSS: unavailable")
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Server memory
+# ---------------------------------------------------------------------------
+
+
+def read_rss(pid: int | None = None) -> int | None:
+    """Return the resident set size of process *pid* in bytes.
+
+    Args:
+        pid: Process to inspect; this process when ``None``.
+
+    Returns:
+        The current RSS from ``/proc`` on Linux.  Elsewhere, the peak RSS of
+        this process, or ``None`` for another process.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid is not None and pid != os.getpid():
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ``ru_maxrss`` is in bytes on macOS and in KiB elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---------------------------------------------------------------------------
+# Players
+# ---------------------------------------------------------------------------
+
+
+async def _timed_post(
+    client: "httpx.AsyncClient", url: str, body: dict[str, Any], stats: EndpointStats
+) -> dict[str, Any] | None:
+    """POST *body* and record the latency; return the JSON reply, or ``None`` on failure."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json=body)
+        response.raise_for_status()
+        payload: dict[str, Any] = response.json()
+    except (httpx.HTTPError, ValueError):
+        stats.errors += 1
+        return None
+    stats.latencies.append(time.perf_counter() - start)
+    return payload
+
+
+async def _think(config: LoadTestConfig, rng: random.Random) -> None:
+    if config.think_time > 0:
+        await asyncio.sleep(rng.expovariate(1 / config.think_time))
+
+
+async def _play(
+    client: "httpx.AsyncClient", config: LoadTestConfig, rng: random.Random,
+    report: LoadTestReport,
+) -> None:
+    """Play ``config.games_per_player`` games, one after another."""
+    new_game = report.endpoints[NEW_GAME]
+    guess = report.endpoints[SUBMIT_GUESS]
+    for _ in range(config.games_per_player):
+        state = await _timed_post(client, "/api/game/new", config.settings, new_game)
+        if state is None:
+            await _think(config, rng)
+            continue
+        game_id, files = state["game_id"], state["files"]
+        while state is not None and not state.get("game_over"):
+            await _think(config, rng)
+            tried = set(state.get("wrong_guesses", ()))
+            choice = rng.choice(files)
+            if choice in tried and len(tried) < len(files):
+                choice = rng.choice([path for path in files if path not in tried])
+            state = await _timed_post(
+                client, f"/api/game/{game_id}/guess", {"file_path": choice}, guess
+            )
+        if state is not None:
+            report.games += 1
+        await _think(config, rng)
+
+
+async def run_players(
+    base_url: str, config: LoadTestConfig, server_pid: int | None = None
+) -> LoadTestReport:
+    """Run ``config.players`` concurrent players against *base_url*.
+
+    Args:
+        base_url: Server root, e.g. ``http://127.0.0.1:4200``.
+        config: The workload.
+        server_pid: Local server process whose RSS is reported; ``None``
+            when the server runs in this process.
+
+    Returns:
+        The collected report.
+    """
+    report = LoadTestReport(config)
+    seeder = random.Random(config.seed)
+    limits = httpx.Limits(max_connections=max(1, config.players))
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=config.timeout, limits=limits
+    ) as client:
+        report.rss_before = read_rss(server_pid)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _play(client, config, random.Random(seeder.getrandbits(64)), report)
+            for _ in range(config.players)
+        ))
+        report.elapsed = time.perf_counter() - start
+        report.rss_after = read_rss(server_pid)
+    return report
+
+
+# ---------------------------------------------------------------------------
+# In-process server
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def serve_in_process(host: str = "127.0.0.1") -> Iterator[str]:
+    """Run the CodeGuessr app on a free port of *host* in a background thread.
+
+    The app is configured from the ``CODEGUESSR_*`` environment, as with
+    ``codeguessr serve``.
+
+    Yields:
+        The server's base URL, once startup (including the initial scan
+        wait) has completed.
+
+    Raises:
+        RuntimeError: If the server fails to start.
+    """
+    import uvicorn
+
+    from codeguessr.server import app
+    from codeguessr.serving import ReadyServer
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    ready = threading.Event()
+    server = ReadyServer(
+        uvicorn.Config(app, log_level="warning", access_log=False), on_ready=ready.set
+    )
+    thread = threading.Thread(
+        target=lambda: asyncio.run(server.serve(sockets=[sock])),
+        name="codeguessr-loadtest-server",
+        daemon=True,
+    )
+    thread.start()
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    # A failed startup ends the thread without signalling readiness.
+    while not ready.wait(0.05):
+        if not thread.is_alive() or time.monotonic() > deadline:
+            server.should_exit = True
+            sock.close()
+            raise RuntimeError("The in-process server failed to start")
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        sock.close()
+
+
+def run_loadtest(
+    config: LoadTestConfig, url: str | None = None, server_pid: int | None = None
+) -> LoadTestReport:
+    """Run a load test against *url*, or against an in-process server.
+
+    Args:
+        config: The workload.
+        url: Base URL of a running server; when ``None``, the app is started
+            in this process (configured from the environment).
+        server_pid: PID of the server at *url*, for RSS reporting.
+
+    Returns:
+        The collected report.
+
+    Raises:
+        RuntimeError: If ``httpx`` is not installed or the in-process server
+            fails to start.
+    """
+    if not HAVE_HTTPX:
+        raise RuntimeError("The load test needs httpx: pip install 'codeguessr[loadtest]'")
+    if url is not None:
+        return asyncio.run(run_players(url, config, server_pid))
+    with serve_in_process() as local_url:
+        return asyncio.run(run_players(local_url, config))
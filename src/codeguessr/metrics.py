@@ -0,0 +1,269 @@
+"""In-process metrics in the Prometheus text format.
+
+A ``MetricsRegistry`` holds counters and histograms that the server updates
+as it runs, plus callbacks that read gauges (scan progress, cache sizes, …)
+from live objects when the registry is rendered.  ``GET /metrics`` renders
+``REGISTRY`` in the Prometheus text exposition format (version 0.0.4), so
+any Prometheus-compatible scraper can collect it; nothing is sent anywhere.
+
+Updating a metric is a dict lookup, a ``bisect`` for histograms and a few
+additions under a per-metric lock.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Default histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Label values of one sample, in the order of the metric's label names.
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 2**53:
+        return str(int(value))
+    return repr(value)
+
+
+# ---------------------------------------------------------------------------
+# Metric families
+# ---------------------------------------------------------------------------
+
+
+class _Family:
+    """A named metric with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Family):
+    """Monotonically increasing value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        # An unlabelled counter is exported as 0 before its first increment.
+        self._values: dict[LabelValues, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        """Add *amount* to the sample with *labelvalues*."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        """Return the current value of the sample with *labelvalues*."""
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(_Family):
+    """Distribution of observed values per label combination.
+
+    Args:
+        name: Metric name.
+        help_text: One-line description.
+        labelnames: Names of the labels every observation carries.
+        buckets: Increasing bucket upper bounds; ``+Inf`` is implied.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label combination: [per-bucket counts (+Inf last)], sum.
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Record *value* for the sample with *labelvalues*."""
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][slot] += 1
+            entry[1][0] += value
+
+    def count(self, *labelvalues: str) -> int:
+        """Return the number of observations with *labelvalues*."""
+        entry = self._values.get(labelvalues)
+        return sum(entry[0]) if entry is not None else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(
+                (labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()
+            )
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Callback(_Family):
+    """Gauge or counter whose samples are read from live objects when rendered.
+
+    Args:
+        name: Metric name.
+        help_text: One-line description.
+        collect: Returns ``(label values, value)`` pairs for every sample.
+        labelnames: Names of the labels of each sample.
+        kind: ``"gauge"`` or ``"counter"``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Iterable[tuple[LabelValues, float]]],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in self._collect()
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+class MetricsRegistry:
+    """Named metric families, rendered together."""
+
+    def __init__(self) -> None:
+        self._families: dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: _Family) -> _Family:
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(f"Metric {family.name!r} is already registered")
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register and return a ``Counter``.
+
+        Raises:
+            ValueError: If *name* is already registered.
+        """
+        counter = Counter(name, help_text, labelnames)
+        self._register(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Register and return a ``Histogram``.
+
+        Raises:
+            ValueError: If *name* is already registered.
+        """
+        histogram = Histogram(name, help_text, labelnames, buckets)
+        self._register(histogram)
+        return histogram
+
+    def callback(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Iterable[tuple[LabelValues, float]]],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ) -> None:
+        """Register a ``Callback`` metric.
+
+        Raises:
+            ValueError: If *name* is already registered.
+        """
+        self._register(Callback(name, help_text, collect, labelnames, kind))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            families = list(self._families.values())
+        lines: list[str] = []
+        for family in families:
+            lines += family.header()
+            lines += family.render()
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served by ``GET /metrics``.
+REGISTRY = MetricsRegistry()
+
+# Rounds handed out by round pools, by whether they were already prepared
+# (``ready``) or had to be prepared while the game was created (``inline``).
+POOL_ROUNDS = REGISTRY.counter(
+    "codeguessr_round_pool_rounds_total",
+    "Rounds handed out by round pools, by source (ready = pre-generated).",
+    ("source",),
+)
@@ -0,0 +1,261 @@
+"""Near-duplicate file detection for CodeGuessr.
+
+Copy-pasted and templated files make rounds in which several files are
+equally "correct" answers.  At scan time every file gets a MinHash signature
+over shingles of consecutive non-blank lines, and the signatures are banded
+into a locality-sensitive hash (LSH) index that is updated one file at a
+time.  Round selection uses the signatures to avoid near-duplicate targets,
+and ``NearDuplicateIndex.clusters`` lists groups of near-duplicate files.
+
+Line hashing uses CRC-32; shingle combination and the MinHash permutations
+are vectorised with NumPy when it is installed, with a pure-Python fallback.
+"""
+
+import random
+import threading
+import zlib
+from array import array
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAVE_NUMPY = False
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Number of MinHash permutations per signature.
+NUM_PERM: int = 64
+# LSH bands; each band covers ``NUM_PERM // BANDS`` signature slots.
+BANDS: int = 16
+# Estimated Jaccard similarity at or above which two files are near-duplicates.
+SIMILARITY_THRESHOLD: float = 0.8
+# Consecutive non-blank lines per shingle.
+SHINGLE_LINES: int = 2
+
+_MASK_64 = (1 << 64) - 1
+_SHINGLE_MULT = 0x9E3779B1
+# Multiply-shift permutations ``((a * x + b) mod 2**64) >> 32`` with odd *a*.
+# The seed is fixed so signatures are stable across processes.
+_perm_rng = random.Random(0x5EED)
+_PERM_A: tuple[int, ...] = tuple(_perm_rng.getrandbits(64) | 1 for _ in range(NUM_PERM))
+_PERM_B: tuple[int, ...] = tuple(_perm_rng.getrandbits(64) for _ in range(NUM_PERM))
+if HAVE_NUMPY:
+    _NP_PERM_A = np.array(_PERM_A, dtype=np.uint64)[:, None]
+    _NP_PERM_B = np.array(_PERM_B, dtype=np.uint64)[:, None]
+
+
+# ---------------------------------------------------------------------------
+# MinHash
+# ---------------------------------------------------------------------------
+
+
+def _line_hashes(lines: Iterable[str]) -> list[int]:
+    """CRC-32 of every non-blank line, with surrounding whitespace stripped."""
+    crc32 = zlib.crc32
+    return [crc32(stripped.encode()) for stripped in map(str.strip, lines) if stripped]
+
+
+def minhash(lines: Sequence[str]) -> "array[int] | None":
+    """Return the MinHash signature of *lines*.
+
+    Args:
+        lines: Source lines of one file.
+
+    Returns:
+        ``NUM_PERM`` 32-bit minima (stored as unsigned 64-bit values), or
+        ``None`` if the file has no non-blank lines.
+    """
+    hashes = _line_hashes(lines)
+    if not hashes:
+        return None
+    width = min(SHINGLE_LINES, len(hashes))
+
+    if HAVE_NUMPY:
+        h = np.frombuffer(array("I", hashes), dtype=np.uint32).astype(np.uint64)
+        count = len(h) - width + 1
+        shingles: Any = h[:count]
+        for offset in range(1, width):
+            shingles = (shingles * _SHINGLE_MULT + h[offset: count + offset]) & 0xFFFFFFFF
+        with np.errstate(over="ignore"):
+            sig = ((_NP_PERM_A * shingles[None, :] + _NP_PERM_B) >> np.uint64(32)).min(axis=1)
+        return array("Q", sig.tobytes())
+
+    shingle_list = []
+    for start in range(len(hashes) - width + 1):
+        value = hashes[start]
+        for offset in range(1, width):
+            value = (value * _SHINGLE_MULT + hashes[start + offset]) & 0xFFFFFFFF
+        shingle_list.append(value)
+    return array("Q", [
+        min(((a * x + b) & _MASK_64) >> 32 for x in shingle_list)
+        for a, b in zip(_PERM_A, _PERM_B, strict=True)
+    ])
+
+
+def similarity(first: "array[int]", second: "array[int]") -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(first, second, strict=True) if x == y) / NUM_PERM
+
+
+# ---------------------------------------------------------------------------
+# LSH index
+# ---------------------------------------------------------------------------
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index of file signatures.
+
+    Thread-safe, so the scanner can add files while games are created.
+
+    Args:
+        threshold: Estimated Jaccard similarity at or above which two files
+            are near-duplicates.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._signatures: dict[str, array[int]] = {}
+        self._bands: list[dict[bytes, set[str]]] = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._signatures
+
+    def add(self, path: str, lines: Sequence[str]) -> None:
+        """Compute the signature of *lines* and index it under *path*.
+
+        Re-adding a path replaces its previous signature.
+        """
+        signature = minhash(lines)
+        if signature is None:
+            self.remove(path)
+        else:
+            self.add_signature(path, signature)
+
+    def add_signature(self, path: str, signature: "array[int]") -> None:
+        """Index a precomputed *signature* under *path*."""
+        with self._lock:
+            self._discard(path)
+            self._signatures[path] = signature
+            for band, key in zip(self._bands, _band_keys(signature), strict=True):
+                band.setdefault(key, set()).add(path)
+
+    def remove(self, path: str) -> None:
+        """Drop *path* from the index, if present."""
+        with self._lock:
+            self._discard(path)
+
+    def clear(self) -> None:
+        """Drop every signature."""
+        with self._lock:
+            self._signatures.clear()
+            for band in self._bands:
+                band.clear()
+
+    def signature(self, path: str) -> "array[int] | None":
+        """Return the signature indexed for *path*, if any."""
+        return self._signatures.get(path)
+
+    def near(self, path: str) -> set[str]:
+        """Return the indexed near-duplicates of *path* (excluding itself)."""
+        with self._lock:
+            signature = self._signatures.get(path)
+            if signature is None:
+                return set()
+            candidates: set[str] = set()
+            for band, key in zip(self._bands, _band_keys(signature), strict=True):
+                candidates |= band.get(key, set())
+            candidates.discard(path)
+            return {
+                other for other in candidates
+                if similarity(signature, self._signatures[other]) >= self.threshold
+            }
+
+    def is_near_any(self, path: str, others: Iterable[str]) -> bool:
+        """Return True if *path* is a near-duplicate of any of *others*."""
+        signature = self._signatures.get(path)
+        if signature is None:
+            return False
+        for other in others:
+            other_sig = self._signatures.get(other)
+            if other_sig is not None and similarity(signature, other_sig) >= self.threshold:
+                return True
+        return False
+
+    def distinct(self, candidates: Iterable[str], count: int) -> list[str]:
+        """Pick up to *count* of *candidates*, in order, skipping near-duplicates.
+
+        A candidate is skipped if it is a near-duplicate of one already
+        picked.
+
+        Args:
+            candidates: Paths in preference order.
+            count: Number of paths wanted.
+
+        Returns:
+            The picked paths; fewer than *count* if the candidates run out.
+        """
+        picked: list[str] = []
+        for path in candidates:
+            if len(picked) >= count:
+                break
+            if not self.is_near_any(path, picked):
+                picked.append(path)
+        return picked
+
+    def clusters(self) -> list[list[str]]:
+        """Return the groups of two or more mutually connected near-duplicates.
+
+        Groups are the connected components of the near-duplicate relation.
+        Each group is sorted, and the groups are ordered by descending size.
+        """
+        parent: dict[str, str] = {}
+
+        def find(path: str) -> str:
+            root = path
+            while parent[root] != root:
+                root = parent[root]
+            while path != root:
+                parent[path], path = root, parent[path]
+            return root
+
+        for path in list(self._signatures):
+            for other in self.near(path):
+                parent.setdefault(path, path)
+                parent.setdefault(other, other)
+                parent[find(path)] = find(other)
+        groups: dict[str, list[str]] = {}
+        for path in parent:
+            groups.setdefault(find(path), []).append(path)
+        return sorted(
+            (sorted(group) for group in groups.values() if len(group) > 1),
+            key=lambda group: (-len(group), group[0]),
+        )
+
+    def _discard(self, path: str) -> None:
+        old = self._signatures.pop(path, None)
+        if old is None:
+            return
+        for band, key in zip(self._bands, _band_keys(old), strict=True):
+            members = band.get(key)
+            if members is not None:
+                members.discard(path)
+                if not members:
+                    del band[key]
+
+
+def _band_keys(signature: "array[int]") -> list[bytes]:
+    """Split *signature* into ``BANDS`` hashable band keys."""
+    rows = NUM_PERM // BANDS
+    raw = signature.tobytes()
+    width = rows * signature.itemsize
+    return [raw[idx * width: (idx + 1) * width] for idx in range(BANDS)]
@@ -0,0 +1,326 @@
+"""Background round pre-generation for CodeGuessr.
+
+A ``RoundPool`` keeps a bounded queue of ready-made rounds (target chosen,
+highlight picked, source lines cached) for one filter configuration.  A
+``RoundPoolManager`` owns one pool per active configuration and runs a single
+daemon producer thread that tops pools back up after games draw from them,
+so creating a game never has to wait on disk I/O.
+"""
+
+import logging
+import random
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from codeguessr.classify import DEFAULT_LIMITS, ClassifyLimits
+from codeguessr.game import HighlightIndex, PreparedRound
+from codeguessr.jsonenc import Fragment
+from codeguessr.metrics import POOL_ROUNDS
+from codeguessr.neardup import NearDuplicateIndex
+from codeguessr.sampling import MAX_REJECTIONS_PER_DRAW, TargetSampler
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+POOL_CAPACITY: int = 32
+MAX_POOLS: int = 8
+
+
+# ---------------------------------------------------------------------------
+# Pools
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class PoolKey:
+    """Filter configuration that identifies a round pool.
+
+    Attributes:
+        min_lines: Minimum number of lines required in each file.
+        include_pattern: Optional regex that paths must match.
+        ignore_pattern: Optional regex that excludes matching paths.
+        min_line_chars: Minimum non-whitespace characters in the highlight.
+        weighting: Name of the target weighting strategy.
+        limits: Classification thresholds for binary/generated/minified files.
+    """
+
+    min_lines: int
+    include_pattern: str | None
+    ignore_pattern: str | None
+    min_line_chars: int
+    weighting: str = "uniform"
+    limits: ClassifyLimits = DEFAULT_LIMITS
+
+
+class RoundPool:
+    """Bounded queue of prepared rounds drawn from a fixed file list.
+
+    Targets are dealt from a shuffled bag of *files*, so consecutive rounds
+    in the queue are distinct until the bag is exhausted and reshuffled.
+    When a *sampler* is given, targets are drawn from it instead.  With a
+    *near_dups* index, ``take`` avoids handing out near-duplicate targets in
+    the same game.
+
+    Args:
+        root_dir: Absolute path to the directory that was scanned.
+        files: Eligible relative file paths for this configuration.
+        min_line_chars: Minimum non-whitespace characters in the highlight.
+        capacity: Maximum number of prepared rounds kept in the queue.
+        highlights: Optional per-file highlight indexes from the scan.
+        sampler: Optional weighted sampler over *files*.
+        near_dups: Optional near-duplicate index over *files*.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        files: list[str],
+        min_line_chars: int = 1,
+        capacity: int = POOL_CAPACITY,
+        highlights: Mapping[str, HighlightIndex] | None = None,
+        sampler: TargetSampler | None = None,
+        near_dups: NearDuplicateIndex | None = None,
+    ) -> None:
+        self.root_dir = root_dir
+        self.files = files
+        self.min_line_chars = min_line_chars
+        self.capacity = capacity
+        self.highlights: Mapping[str, HighlightIndex] = highlights or {}
+        self.sampler = sampler
+        self.near_dups = near_dups
+        self._ready: deque[PreparedRound] = deque()
+        self._bag: list[str] = []
+        self._lock = threading.Lock()
+        self._files_fragment: Fragment | None = None
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def files_fragment(self) -> Fragment:
+        """Return *files* as JSON, encoded on first use and shared by every game."""
+        fragment = self._files_fragment
+        if fragment is None:
+            fragment = self._files_fragment = Fragment.of(self.files)
+        return fragment
+
+    def _next_target(self) -> str:
+        """Deal the next target from the shuffled bag, refilling it when empty."""
+        if self.sampler is not None:
+            return self.sampler.draw()
+        with self._lock:
+            if not self._bag:
+                self._bag = list(self.files)
+                random.shuffle(self._bag)
+            return self._bag.pop()
+
+    def _prepare(self, target: str) -> PreparedRound:
+        return PreparedRound.load(
+            self.root_dir, target,
+            min_line_chars=self.min_line_chars, highlight=self.highlights.get(target),
+        )
+
+    def fill(self) -> int:
+        """Prepare rounds until the queue reaches *capacity*.
+
+        Files that can no longer be read are skipped, and a pool without
+        files stays empty.
+
+        Returns:
+            Number of rounds added to the queue.
+        """
+        if not self.files and self.sampler is None:
+            return 0
+        added = 0
+        for _ in range(self.capacity - len(self._ready)):
+            target = self._next_target()
+            try:
+                prepared = self._prepare(target)
+            except OSError:
+                continue
+            with self._lock:
+                if len(self._ready) >= self.capacity:
+                    break
+                self._ready.append(prepared)
+            added += 1
+        return added
+
+    def take(self, count: int) -> list[PreparedRound]:
+        """Draw *count* prepared rounds for a new game.
+
+        Targets are distinct whenever the pool has at least *count* files,
+        and near-duplicates of earlier targets are avoided where possible.
+        Any shortfall in the queue is prepared synchronously.
+
+        Args:
+            count: Number of rounds required.
+
+        Returns:
+            List of *count* prepared rounds, in play order.
+
+        Raises:
+            OSError: If a synchronously prepared target cannot be read.
+        """
+        unique = len(self.files) >= count
+        chosen: list[PreparedRound] = []
+        skipped: list[PreparedRound] = []
+        seen: set[str] = set()
+        with self._lock:
+            while self._ready and len(chosen) < count:
+                prepared = self._ready.popleft()
+                if unique and self._conflicts(prepared.target_file, seen):
+                    skipped.append(prepared)
+                    continue
+                chosen.append(prepared)
+                seen.add(prepared.target_file)
+            self._ready.extendleft(reversed(skipped))
+        if chosen:
+            POOL_ROUNDS.inc("ready", amount=len(chosen))
+
+        inline = count - len(chosen)
+        while len(chosen) < count:
+            if unique:
+                target = self._draw_unique(seen)
+            elif self.sampler is not None:
+                target = self.sampler.draw()
+            else:
+                target = random.choice(self.files)
+            chosen.append(self._prepare(target))
+            seen.add(target)
+        if inline > 0:
+            POOL_ROUNDS.inc("inline", amount=inline)
+        return chosen
+
+    def _draw_unique(self, seen: set[str]) -> str:
+        """Draw a target that is not in *seen* and, where possible, not near one.
+
+        Draws are rejected against the exclusions a bounded number of times,
+        so a round costs O(1) in expectation however many files the pool has;
+        only when the tries run out (most files excluded) is the pool scanned.
+        """
+        excluded = self._exclusions(seen)
+        if self.sampler is not None:
+            if sum(path in self.sampler for path in excluded) >= len(self.sampler):
+                excluded = seen
+            return self.sampler.sample(1, exclude=excluded)[0]
+        for _ in range(MAX_REJECTIONS_PER_DRAW):
+            target = random.choice(self.files)
+            if target not in excluded:
+                return target
+        remaining = [f for f in self.files if f not in excluded]
+        return random.choice(remaining or [f for f in self.files if f not in seen])
+
+    def _exclusions(self, seen: set[str]) -> set[str]:
+        """Return *seen* plus their near-duplicates."""
+        if self.near_dups is None:
+            return seen
+        excluded = set(seen)
+        for target in seen:
+            excluded |= self.near_dups.near(target)
+        return excluded
+
+    def _conflicts(self, target: str, seen: set[str]) -> bool:
+        """Return True if *target* repeats or nearly duplicates a chosen target."""
+        if target in seen:
+            return True
+        return self.near_dups is not None and self.near_dups.is_near_any(target, seen)
+
+
+# ---------------------------------------------------------------------------
+# Producer
+# ---------------------------------------------------------------------------
+
+
+class RoundPoolManager:
+    """Registry of round pools with a background producer thread.
+
+    At most *max_pools* configurations are kept; the least recently used
+    pool is dropped when a new one is added beyond that limit.
+
+    Args:
+        max_pools: Maximum number of filter configurations kept warm.
+    """
+
+    def __init__(self, max_pools: int = MAX_POOLS) -> None:
+        self.max_pools = max_pools
+        self._pools: OrderedDict[PoolKey, RoundPool] = OrderedDict()
+        self._pending: deque[RoundPool] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def get(self, key: PoolKey) -> RoundPool | None:
+        """Return the pool for *key*, marking it as recently used."""
+        with self._cond:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+            return pool
+
+    def add(self, key: PoolKey, pool: RoundPool) -> RoundPool:
+        """Register *pool* under *key* and schedule it to be filled.
+
+        Args:
+            key: Filter configuration served by the pool.
+            pool: The pool to register.
+
+        Returns:
+            The registered pool.
+        """
+        with self._cond:
+            self._pools[key] = pool
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_pools:
+                self._pools.popitem(last=False)
+        self.request_refill(pool)
+        return pool
+
+    def clear(self) -> None:
+        """Drop every registered pool."""
+        with self._cond:
+            self._pools.clear()
+            self._pending.clear()
+
+    def request_refill(self, pool: RoundPool) -> None:
+        """Queue *pool* for the producer thread to top up."""
+        with self._cond:
+            if pool not in self._pending:
+                self._pending.append(pool)
+                self._cond.notify()
+
+    def start(self) -> None:
+        """Start the producer thread if it is not already running."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="codeguessr-round-pool", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Signal the producer thread to exit and wait for it."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                pool = self._pending.popleft()
+            try:
+                pool.fill()
+            except Exception:
+                # Keep the producer alive; the pool is queued again by its next game.
+                logger.exception("Filling round pool for %s failed", pool.root_dir)
@@ -0,0 +1,330 @@
+"""Sampled ``cProfile`` profiles of HTTP requests.
+
+Rare slow requests are hard to reproduce, so the server can profile a
+random fraction of live requests instead.  ``ProfilingMiddleware`` runs the
+sampled requests under ``cProfile`` and stores each profile in a
+``ProfileRing``: a directory holding at most ``capacity`` ``.prof`` files,
+the oldest removed first.  The files load with ``pstats``, ``snakeviz`` or
+any other ``cProfile`` viewer.
+
+Profiling is off until ``RequestSampler.configure`` gives it a fraction and
+a ring; while off, the middleware costs one attribute check per request.
+
+Endpoints are coroutines running on the event loop thread, so a profile
+covers the sampled request's own work plus whatever other coroutines ran
+while it was awaiting.  Blocking work an endpoint hands to a worker thread
+is profiled too when it goes through ``profiled``
+(``await asyncio.to_thread(profiled, func, *args)``): the call is profiled
+in its thread and merged into the request's profile.  Only one request is
+profiled at a time; a request sampled while another is being profiled runs
+unprofiled.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Profiles kept on disk by default.
+PROFILE_RING_SIZE: int = 50
+# Requests under this path prefix (the profile endpoints) are never sampled.
+ADMIN_PREFIX: str = "/api/admin/"
+
+# ``{id}-{endpoint}-{status}-{microseconds}.prof``
+_PROFILE_NAME = re.compile(r"^(\d+)-(\w+)-(\d+)-(\d+)\.prof$")
+
+# Profiles of the worker-thread calls made by the request being profiled;
+# ``None`` outside a profiled request.
+_thread_profiles: contextvars.ContextVar[list[cProfile.Profile] | None] = (
+    contextvars.ContextVar("codeguessr_thread_profiles", default=None)
+)
+
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
+
+
+# ---------------------------------------------------------------------------
+# Profile ring
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ProfileEntry:
+    """One stored request profile.
+
+    Attributes:
+        id: Sequence number, increasing with every profile stored.
+        endpoint: Name of the endpoint function that served the request.
+        status: HTTP status code of the response.
+        seconds: Wall-clock duration of the request.
+        path: Request path (empty for profiles found on disk at startup).
+        created: Time the profile was stored (seconds since the epoch).
+        file: Location of the ``.prof`` file.
+    """
+
+    id: int
+    endpoint: str
+    status: int
+    seconds: float
+    path: str
+    created: float
+    file: Path
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the entry as a JSON-friendly dict."""
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "ms": round(self.seconds * 1000, 3),
+            "path": self.path,
+            "created": self.created,
+            "bytes": self.file.stat().st_size if self.file.exists() else 0,
+        }
+
+
+class ProfileRing:
+    """Directory of at most *capacity* request profiles.
+
+    Profiles already in *directory* (from an earlier run) are adopted, so
+    the bound holds across restarts.
+
+    Args:
+        directory: Where the ``.prof`` files are written; created if needed.
+        capacity: Most profiles kept; storing another removes the oldest.
+
+    Raises:
+        ValueError: If *capacity* is less than 1.
+    """
+
+    def __init__(
+        self, directory: str | os.PathLike[str], capacity: int = PROFILE_RING_SIZE
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self._entries: deque[ProfileEntry] = deque()
+        self._lock = threading.Lock()
+        found = []
+        for file in self.directory.glob("*.prof"):
+            match = _PROFILE_NAME.match(file.name)
+            if match is None:
+                continue
+            found.append(ProfileEntry(
+                int(match[1]), match[2], int(match[3]), int(match[4]) / 1e6, "",
+                file.stat().st_mtime, file,
+            ))
+        for entry in sorted(found, key=lambda entry: entry.id):
+            self._append(entry)
+        self._next_id = self._entries[-1].id + 1 if self._entries else 1
+
+    def _append(self, entry: ProfileEntry) -> None:
+        self._entries.append(entry)
+        while len(self._entries) > self.capacity:
+            self._entries.popleft().file.unlink(missing_ok=True)
+
+    def add(
+        self,
+        profile: cProfile.Profile,
+        endpoint: str,
+        status: int,
+        seconds: float,
+        path: str = "",
+        threads: Sequence[cProfile.Profile] = (),
+    ) -> ProfileEntry:
+        """Write *profile* to the ring, removing the oldest profile if it is full.
+
+        Blocking (the profile is written to disk), so the middleware calls
+        it from a worker thread.
+
+        Args:
+            profile: Profile of the request on the event loop thread.
+            endpoint: Name of the endpoint function that served the request.
+            status: HTTP status code of the response.
+            seconds: Wall-clock duration of the request.
+            path: Request path.
+            threads: Profiles of the request's worker-thread calls, merged
+                into *profile*.
+
+        Returns:
+            The stored entry.
+        """
+        with self._lock:
+            profile_id = self._next_id
+            self._next_id += 1
+        file = self.directory / f"{profile_id}-{endpoint}-{status}-{round(seconds * 1e6)}.prof"
+        if threads:
+            merged = pstats.Stats(profile)
+            merged.add(*threads)
+            merged.dump_stats(file)
+        else:
+            profile.dump_stats(file)
+        entry = ProfileEntry(profile_id, endpoint, status, seconds, path, time.time(), file)
+        with self._lock:
+            self._append(entry)
+        return entry
+
+    def entries(self) -> list[ProfileEntry]:
+        """Return the stored profiles, newest first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def get(self, profile_id: int) -> ProfileEntry | None:
+        """Return the stored profile with *profile_id*, or ``None`` if it is gone."""
+        with self._lock:
+            return next((entry for entry in self._entries if entry.id == profile_id), None)
+
+
+def format_profile(entry: ProfileEntry, sort: str = "cumulative", limit: int = 40) -> str:
+    """Return the ``pstats`` report of *entry*'s top *limit* functions by *sort*.
+
+    Raises:
+        KeyError: If *sort* is not a ``pstats`` sort key.
+    """
+    if sort not in pstats.Stats.sort_arg_dict_default:
+        raise KeyError(sort)
+    out = io.StringIO()
+    stats = pstats.Stats(str(entry.file), stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def profiled(func: Callable[_P, _T], /, *args: _P.args, **kwargs: _P.kwargs) -> _T:
+    """Call *func*, profiling the call if the request that made it is being profiled.
+
+    Meant to be passed to ``asyncio.to_thread`` ahead of *func*: the worker
+    thread inherits the request's context, so the call's profile is merged
+    into the request's.  Outside a profiled request this is a plain call.
+    """
+    profiles = _thread_profiles.get()
+    if profiles is None:
+        return func(*args, **kwargs)
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ profiles through sys.monitoring, which allows one
+        # profiler at a time; the request's profiler already sees this thread.
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        profiles.append(profile)
+
+
+# ---------------------------------------------------------------------------
+# Request sampling
+# ---------------------------------------------------------------------------
+
+
+class RequestSampler:
+    """Decides which requests are profiled and where their profiles go.
+
+    Args:
+        fraction: Fraction of requests to profile, from 0 (off) to 1.
+        ring: Destination of the profiles; required when *fraction* > 0.
+        rng: Returns uniform floats in [0, 1); ``random.random`` by default.
+    """
+
+    def __init__(
+        self,
+        fraction: float = 0.0,
+        ring: ProfileRing | None = None,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.fraction = 0.0
+        self.ring: ProfileRing | None = None
+        self.rng = rng
+        # Held while a request is profiled; cProfile profiles one thing at a time.
+        self._busy = threading.Lock()
+        self.configure(fraction, ring)
+
+    def configure(self, fraction: float, ring: ProfileRing | None) -> None:
+        """Set the sampled fraction and profile ring; a fraction of 0 turns sampling off.
+
+        Raises:
+            ValueError: If *fraction* is outside [0, 1] or positive without a ring.
+        """
+        if not 0.0 <= fraction <= 1.0:
+            raise ValueError(f"Profile fraction must be between 0 and 1, got {fraction}")
+        if fraction and ring is None:
+            raise ValueError("A profile ring is required to sample requests")
+        self.ring = ring
+        self.fraction = fraction
+
+    def should_sample(self, path: str) -> bool:
+        """Return True if a request for *path* should be profiled."""
+        return not path.startswith(ADMIN_PREFIX) and self.rng() < self.fraction
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles the requests its sampler selects.
+
+    Args:
+        app: The wrapped application.
+        sampler: Sampling configuration, shared with whoever configures it.
+    """
+
+    def __init__(self, app: ASGIApp, sampler: RequestSampler) -> None:
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        sampler = self.sampler
+        if (
+            not sampler.fraction
+            or scope["type"] != "http"
+            or not sampler.should_sample(scope["path"])
+            or not sampler._busy.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def _send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profile = cProfile.Profile()
+        threads: list[cProfile.Profile] = []
+        token = _thread_profiles.set(threads)
+        start = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                await self.app(scope, receive, _send)
+            finally:
+                profile.disable()
+                _thread_profiles.reset(token)
+            seconds = time.perf_counter() - start
+            ring = sampler.ring
+            if ring is not None:
+                # The router records the matched endpoint in the scope.
+                name = getattr(scope.get("endpoint"), "__name__", "unmatched")
+                await asyncio.to_thread(
+                    ring.add, profile, name, status, seconds, scope["path"], threads
+                )
+        finally:
+            sampler._busy.release()
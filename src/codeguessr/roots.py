@@ -0,0 +1,379 @@
+"""Per-root scan state for a server that hosts several repositories.
+
+Each configured root gets a ``RootIndex`` — its scan progress, file table,
+highlight and near-duplicate indexes, difficulty statistics and round pools —
+built lazily the first time a game asks for it.  ``RootRegistry`` keeps the
+loaded indexes in LRU order and unloads the coldest ones when their
+estimated memory use exceeds a budget.  File contents are not part of a
+root's footprint: they live in the shared, content-addressed
+``ContentStore``, which has its own byte budget.
+"""
+
+import logging
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable, Mapping, MutableMapping
+from pathlib import Path
+from typing import Any
+
+from codeguessr.artifact import SharedHighlights, iter_map_index
+from codeguessr.classify import DEFAULT_LIMITS, ClassifyLimits
+from codeguessr.content import default_store
+from codeguessr.game import MIN_LINES, FilterPlan, HighlightIndex, ScanProgress, ScanStats
+from codeguessr.neardup import NUM_PERM, NearDuplicateIndex
+from codeguessr.pool import PoolKey, RoundPool, RoundPoolManager
+from codeguessr.sampling import DifficultyTracker
+from codeguessr.sources import close_source
+from codeguessr.table import FileTable, iter_scan_table, load_unread
+from codeguessr.tracing import Tracer
+from codeguessr.treesample import iter_sample_directory
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Default memory budget for all loaded root indexes together.
+ROOT_MEMORY_BUDGET: int = 512 * 1024 * 1024
+
+# Rough per-file cost assumed while a root's scan is still running.
+_BYTES_PER_FILE_ESTIMATE: int = 2048
+# Fixed per-object overheads used by ``RootIndex.memory_bytes``.
+_HIGHLIGHT_OVERHEAD: int = 400
+_SIGNATURE_BYTES: int = NUM_PERM * 8 + 200
+
+
+# ---------------------------------------------------------------------------
+# Root configuration
+# ---------------------------------------------------------------------------
+
+
+def parse_roots(spec: str) -> dict[str, str]:
+    """Parse a ``CODEGUESSR_DIR`` value into root names and directories.
+
+    The value holds one or more entries separated by ``os.pathsep``.  Each
+    entry is a directory, optionally prefixed with ``NAME=``.  Unnamed roots
+    are named after their last path component, with ``-2``, ``-3``, …
+    appended to repeated names.
+
+    Args:
+        spec: The environment value.
+
+    Returns:
+        Root names mapped to directories, in the order given.
+
+    Raises:
+        ValueError: If a name is given twice.
+    """
+    roots: dict[str, str] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(os.pathsep))):
+        name, sep, path = entry.partition("=")
+        if sep and name and os.sep not in name:
+            if name in roots:
+                raise ValueError(f"Duplicate root name {name!r}")
+        else:
+            path = entry
+            base = Path(path).name or path
+            name, suffix = base, 2
+            while name in roots:
+                name, suffix = f"{base}-{suffix}", suffix + 1
+        roots[name] = path
+    return roots
+
+
+# ---------------------------------------------------------------------------
+# Root index
+# ---------------------------------------------------------------------------
+
+
+class RootIndex:
+    """Lazily built scan state and caches for one root directory.
+
+    Args:
+        name: Name clients use to select the root.
+        root_dir: Directory to scan.
+        sample_size: When positive, sample this many files instead of
+            scanning the whole tree.
+        limits: Default classification thresholds for the root.
+        on_loaded: Called with the index once its scan completes.
+        index_path: Prebuilt scan artifact (see ``codeguessr.artifact``)
+            to load instead of scanning; it takes precedence over
+            *sample_size*.
+        trace_path: Write a Chrome trace of the full scan to this file once
+            it completes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        root_dir: str,
+        sample_size: int = 0,
+        limits: ClassifyLimits = DEFAULT_LIMITS,
+        on_loaded: Callable[["RootIndex"], None] | None = None,
+        index_path: str | None = None,
+        trace_path: str | None = None,
+    ) -> None:
+        self.name = name
+        self.root_dir = root_dir
+        self.sample_size = sample_size
+        self.limits = limits
+        self.index_path = index_path
+        self.trace_path = trace_path
+        self.files: list[str] = []
+        self.highlights: MutableMapping[str, HighlightIndex] = {}
+        self.table = FileTable()
+        self.near_dups = NearDuplicateIndex()
+        self.difficulty = DifficultyTracker()
+        self.pools = RoundPoolManager()
+        self.scan = ScanProgress()
+        # Counts the walk of the scan, by filter stage (see ``FilterPlan``).
+        self.plan = FilterPlan(limits=limits)
+        # Phase timings and counters of a full scan (sampling and artifact
+        # loads leave them empty).
+        self.stats = ScanStats(trace=Tracer() if trace_path else None)
+        self._on_loaded = on_loaded
+        self._memory: int | None = None
+        # Serializes selections, which fill unread rows and the table's
+        # regex mask cache, across request threads.
+        self._table_lock = threading.Lock()
+
+    def default_pool_key(self) -> PoolKey:
+        """Return the pool key of a game created with default settings."""
+        return PoolKey(
+            min_lines=MIN_LINES, include_pattern=None, ignore_pattern=None, min_line_chars=1,
+            limits=self.limits,
+        )
+
+    def select(self, plan: FilterPlan) -> list[str]:
+        """Return the files of the completed scan that pass *plan*.
+
+        Unread rows that *plan*'s limits admit are read and indexed first,
+        so files skipped by the scan's default limits are only loaded by the
+        requests that ask for them.
+        """
+        with self._table_lock:
+            if load_unread(
+                self.root_dir, self.table, plan.limits, self.highlights, self.near_dups
+            ):
+                self._memory = None
+            return self.table.apply(plan)
+
+    def start(self) -> None:
+        """Start the pool producer and the background scan of the root."""
+        self.pools.start()
+        progress = self.scan
+
+        def _on_complete(files: list[str]) -> None:
+            self.files = files
+            self.pools.add(self.default_pool_key(), RoundPool(
+                self.root_dir, files, highlights=self.highlights, near_dups=self.near_dups
+            ))
+            self._memory = None
+            logger.debug("scan of %s: %s", self.name, self.stats.as_dict())
+            if self.stats.trace is not None and self.trace_path:
+                self.stats.trace.write(self.trace_path)
+            if self._on_loaded is not None:
+                self._on_loaded(self)
+
+        scan_kwargs: dict[str, Any] = {
+            "on_complete": _on_complete,
+            "highlights": self.highlights,
+            "near_dups": self.near_dups,
+        }
+        if self.index_path is not None:
+            # Mapped rather than copied, so processes serving the same
+            # artifact share its table columns and highlight indexes.
+            self.highlights = SharedHighlights(self.table)
+            scan_kwargs.update(
+                scanner=iter_map_index,
+                table=self.table,
+                index_path=self.index_path,
+                highlights=self.highlights,
+                limits=self.limits,
+            )
+        elif self.sample_size > 0:
+            scan_kwargs.update(
+                scanner=iter_sample_directory,
+                sample_size=self.sample_size,
+                plan=self.plan,
+            )
+        else:
+            scan_kwargs.update(
+                scanner=iter_scan_table, table=self.table, limits=self.limits, plan=self.plan,
+                stats=self.stats,
+            )
+        threading.Thread(
+            target=progress.run,
+            args=(self.root_dir,),
+            kwargs=scan_kwargs,
+            name=f"codeguessr-scan-{self.name}",
+            daemon=True,
+        ).start()
+
+    def close(self) -> None:
+        """Cancel the scan, stop the pool producer and close the root's source.
+
+        The root's per-path entries in the ``ContentStore`` are dropped too.
+        """
+        self.scan.cancel()
+        self.pools.stop()
+        self.pools.clear()
+        close_source(self.root_dir)
+        default_store().forget(self.root_dir)
+
+    def memory_bytes(self) -> int:
+        """Estimate the memory held by this root's indexes and table.
+
+        The estimate is computed once the scan completes; while it runs, a
+        fixed per-file cost is assumed.
+        """
+        if not self.scan.done.is_set():
+            return len(self.scan.found) * _BYTES_PER_FILE_ESTIMATE
+        if self._memory is None:
+            self._memory = self._measure()
+        return self._memory
+
+    def _measure(self) -> int:
+        table = self.table
+        total = sum(sys.getsizeof(path) for path in table.paths)
+        total += _array_bytes(
+            table.ext_codes, table.sizes, table.line_counts, table.nonempty_counts,
+            table.depths, table.mtimes, table.flags, table.max_line_lengths,
+            table.avg_line_lengths,
+        )
+        highlights = self.highlights
+        if isinstance(highlights, SharedHighlights):
+            # Mapped indexes live in the shared page cache, not in this process.
+            highlights = highlights.private()
+        for index in list(highlights.values()):
+            total += _HIGHLIGHT_OVERHEAD + _array_bytes(
+                index.middle, index.lengths, index.bucket_starts, index.outer
+            )
+        total += len(self.near_dups) * _SIGNATURE_BYTES
+        total += sys.getsizeof(self.files) + sys.getsizeof(self.scan.found)
+        return total
+
+
+def _array_bytes(*arrays: "array[Any]") -> int:
+    # Columns mapped from an artifact are memoryviews and cost no private memory.
+    return sum(arr.itemsize * len(arr) for arr in arrays if isinstance(arr, array))
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+class RootRegistry:
+    """Configured roots with an LRU of loaded ``RootIndex`` objects.
+
+    Args:
+        roots: Root names mapped to directories; the first is the default.
+        max_bytes: Memory budget for all loaded indexes together.  The most
+            recently used root is never unloaded, even if it alone exceeds
+            the budget.
+        sample_size: Passed to every ``RootIndex``.
+        limits: Default classification thresholds for every root.
+        indexes: Prebuilt scan artifacts by root name, loaded instead of
+            scanning those roots.
+        traces: Files by root name that receive a Chrome trace of that
+            root's scan.
+    """
+
+    def __init__(
+        self,
+        roots: Mapping[str, str],
+        max_bytes: int = ROOT_MEMORY_BUDGET,
+        sample_size: int = 0,
+        limits: ClassifyLimits = DEFAULT_LIMITS,
+        indexes: Mapping[str, str] | None = None,
+        traces: Mapping[str, str] | None = None,
+    ) -> None:
+        self.roots = dict(roots)
+        self.indexes = dict(indexes or {})
+        self.traces = dict(traces or {})
+        self.max_bytes = max_bytes
+        self.sample_size = sample_size
+        self.limits = limits
+        self._loaded: OrderedDict[str, RootIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def default(self) -> str:
+        """Name of the root used when a request does not select one."""
+        return next(iter(self.roots), "")
+
+    def get(self, name: str | None = None) -> RootIndex:
+        """Return the index for root *name*, loading it if necessary.
+
+        Args:
+            name: Root name; the default root when ``None``.
+
+        Returns:
+            The loaded (possibly still scanning) index.
+
+        Raises:
+            KeyError: If *name* is not a configured root.
+        """
+        name = name or self.default
+        root_dir = self.roots[name]
+        with self._lock:
+            index = self._loaded.get(name)
+            if index is not None:
+                self._loaded.move_to_end(name)
+                return index
+            index = RootIndex(
+                name, root_dir,
+                sample_size=self.sample_size, limits=self.limits, on_loaded=self._enforce_budget,
+                index_path=self.indexes.get(name), trace_path=self.traces.get(name),
+            )
+            self._loaded[name] = index
+        index.start()
+        self._enforce_budget(index)
+        return index
+
+    def find(self, root_dir: str) -> RootIndex | None:
+        """Return the loaded index serving *root_dir*, without loading it."""
+        with self._lock:
+            for index in self._loaded.values():
+                if index.root_dir == root_dir:
+                    return index
+        return None
+
+    def loaded(self) -> list[RootIndex]:
+        """Return the loaded indexes, least recently used first."""
+        with self._lock:
+            return list(self._loaded.values())
+
+    def memory_bytes(self) -> int:
+        """Estimated memory held by all loaded indexes."""
+        return sum(index.memory_bytes() for index in self.loaded())
+
+    def close(self) -> None:
+        """Unload every root."""
+        with self._lock:
+            indexes = list(self._loaded.values())
+            self._loaded.clear()
+        for index in indexes:
+            index.close()
+
+    def _enforce_budget(self, keep: RootIndex) -> None:
+        """Unload least recently used roots until the budget is met."""
+        evicted: list[RootIndex] = []
+        with self._lock:
+            total = sum(index.memory_bytes() for index in self._loaded.values())
+            for name in list(self._loaded):
+                if total <= self.max_bytes:
+                    break
+                index = self._loaded[name]
+                if index is keep or name == next(reversed(self._loaded)):
+                    continue
+                del self._loaded[name]
+                total -= index.memory_bytes()
+                evicted.append(index)
+        for index in evicted:
+            index.close()
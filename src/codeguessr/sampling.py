@@ -0,0 +1,374 @@
+"""Weighted target sampling for CodeGuessr.
+
+Provides a blocked alias table that draws a weighted index in O(1) and can
+be reweighted one entry at a time, a ``TargetSampler`` that maps it onto file
+paths and supports without-replacement draws for a round set, and the
+built-in weighting strategies selectable from the API.
+"""
+
+import heapq
+import math
+import random
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+
+from codeguessr import sources
+from codeguessr.table import FileTable
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Entries per alias block; an update rebuilds one block plus the top table.
+BLOCK_SIZE: int = 1024
+
+# Rejected draws tolerated per requested target before falling back to an
+# exact O(n) weighted sample without replacement.
+MAX_REJECTIONS_PER_DRAW: int = 8
+
+WEIGHTINGS: tuple[str, ...] = ("uniform", "size", "directory", "recency", "difficulty")
+
+# Recency weighting halves a file's weight for every this many seconds of age.
+RECENCY_HALF_LIFE: float = 30 * 24 * 3600.0
+# Smallest weight recency assigns, so old files are rare rather than absent.
+RECENCY_FLOOR: float = 1e-3
+
+WeightFn = Callable[[str], float]
+
+
+# ---------------------------------------------------------------------------
+# Alias tables
+# ---------------------------------------------------------------------------
+
+
+class _AliasTable:
+    """Vose alias table over a fixed list of non-negative weights."""
+
+    __slots__ = ("alias", "prob", "total")
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        count = len(weights)
+        self.total = math.fsum(weights)
+        self.prob = array("d", [1.0] * count)
+        self.alias = array("I", range(count))
+        if count == 0 or self.total <= 0:
+            return
+
+        scaled = [w * count / self.total for w in weights]
+        small = [idx for idx, val in enumerate(scaled) if val < 1.0]
+        large = [idx for idx, val in enumerate(scaled) if val >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            self.prob[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Leftovers are 1.0 up to rounding error.
+        for idx in small + large:
+            self.prob[idx] = 1.0
+
+    def draw(self, rng: random.Random) -> int:
+        slot = int(rng.random() * len(self.prob))
+        return slot if rng.random() < self.prob[slot] else self.alias[slot]
+
+
+class AliasSampler:
+    """Weighted index sampler with O(1) draws and O(block) updates.
+
+    Weights are split into blocks of *block_size*.  Each block has its own
+    alias table and a top-level table picks a block by its total weight, so
+    changing or zeroing a single weight only rebuilds one block and the
+    (much smaller) top table.  Not thread-safe on its own;
+    ``TargetSampler`` serializes access to it.
+
+    Args:
+        weights: Initial non-negative weight per index.
+        block_size: Number of entries per alias block.
+    """
+
+    def __init__(self, weights: Iterable[float] = (), block_size: int = BLOCK_SIZE) -> None:
+        self.block_size = block_size
+        self._weights = array("d", (max(0.0, w) for w in weights))
+        self._blocks = [
+            _AliasTable(self._weights[start:start + block_size])
+            for start in range(0, len(self._weights), block_size)
+        ]
+        self._rebuild_top()
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    @property
+    def total(self) -> float:
+        """Sum of all weights."""
+        return self._top.total
+
+    def weight(self, idx: int) -> float:
+        """Return the weight currently assigned to *idx*."""
+        return self._weights[idx]
+
+    def _rebuild_top(self) -> None:
+        self._top = _AliasTable([block.total for block in self._blocks])
+
+    def _rebuild_block(self, block_idx: int) -> None:
+        start = block_idx * self.block_size
+        self._blocks[block_idx] = _AliasTable(self._weights[start:start + self.block_size])
+        self._rebuild_top()
+
+    def set_weight(self, idx: int, weight: float) -> None:
+        """Change the weight of an existing index."""
+        self._weights[idx] = max(0.0, weight)
+        self._rebuild_block(idx // self.block_size)
+
+    def draw(self, rng: random.Random) -> int:
+        """Return an index with probability proportional to its weight.
+
+        Raises:
+            ValueError: If every weight is zero.
+        """
+        if self.total <= 0:
+            raise ValueError("cannot draw from an alias table with zero total weight")
+        block_idx = self._top.draw(rng)
+        return block_idx * self.block_size + self._blocks[block_idx].draw(rng)
+
+
+# ---------------------------------------------------------------------------
+# Target sampler
+# ---------------------------------------------------------------------------
+
+
+class TargetSampler:
+    """Weighted sampler over a fixed list of file paths.
+
+    Thread-safe: weight updates (from request threads, see
+    ``DifficultyTracker``) and draws (from the pool producer) are
+    serialized, so a draw never sees a half-rebuilt alias block.
+
+    Args:
+        files: Initial eligible relative file paths.
+        weight: Weight function applied to each path; uniform if omitted.
+        rng: Random source; a fresh generator is created if omitted.
+        block_size: Number of entries per alias block.
+    """
+
+    def __init__(
+        self,
+        files: Iterable[str],
+        weight: WeightFn | None = None,
+        rng: random.Random | None = None,
+        block_size: int = BLOCK_SIZE,
+    ) -> None:
+        self.weight_fn: WeightFn = weight or (lambda _path: 1.0)
+        self.rng = rng or random.Random()
+        self._paths: list[str] = list(files)
+        self._index: dict[str, int] = {path: idx for idx, path in enumerate(self._paths)}
+        # Reentrant, since ``sample`` calls ``draw``.
+        self._lock = threading.RLock()
+        self._alias = AliasSampler(
+            (self.weight_fn(path) for path in self._paths), block_size=block_size
+        )
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._index
+
+    def set_weight(self, path: str, weight: float) -> None:
+        """Override the weight of an eligible *path*."""
+        with self._lock:
+            idx = self._index.get(path)
+            if idx is not None:
+                self._alias.set_weight(idx, weight)
+
+    def draw(self) -> str:
+        """Return one weighted random path.
+
+        Falls back to a uniform choice when every weight is zero.
+
+        Raises:
+            IndexError: If the sampler has no eligible paths.
+        """
+        with self._lock:
+            if self._alias.total > 0:
+                return self._paths[self._alias.draw(self.rng)]
+            return self.rng.choice(self._paths)
+
+    def sample(self, count: int, exclude: Iterable[str] = ()) -> list[str]:
+        """Draw *count* paths, distinct whenever enough paths are eligible.
+
+        Distinct draws use rejection against the alias table, which is
+        O(count) in expectation; if rejections pile up (a few paths hold most
+        of the weight) the remainder is drawn exactly in O(n).
+
+        Args:
+            count: Number of paths required.
+            exclude: Paths that must not be returned when drawing distinct
+                paths (for example targets already chosen for the game).
+
+        Returns:
+            List of *count* paths.
+        """
+        with self._lock:
+            chosen: list[str] = []
+            seen = {path for path in exclude if path in self._index}
+            if count > len(self._index) - len(seen):
+                return [self.draw() for _ in range(count)]
+
+            budget = count * MAX_REJECTIONS_PER_DRAW
+            while len(chosen) < count and budget > 0 and self._alias.total > 0:
+                path = self.draw()
+                if path in seen:
+                    budget -= 1
+                    continue
+                chosen.append(path)
+                seen.add(path)
+
+            if len(chosen) < count:
+                chosen.extend(self._exact_sample(count - len(chosen), seen))
+            return chosen
+
+    def _exact_sample(self, count: int, seen: set[str]) -> list[str]:
+        """Weighted sample without replacement via Efraimidis-Spirakis keys."""
+        rng = self.rng
+
+        def _key(path: str) -> float:
+            weight = self._alias.weight(self._index[path])
+            return rng.random() ** (1.0 / weight) if weight > 0 else -rng.random()
+
+        remaining = (path for path in self._index if path not in seen)
+        return heapq.nlargest(count, remaining, key=_key)
+
+
+# ---------------------------------------------------------------------------
+# Weighting strategies
+# ---------------------------------------------------------------------------
+
+
+class DifficultyTracker:
+    """Running per-file difficulty, fed by completed rounds.
+
+    A file's weight is ``1 + mean wrong guesses`` (with one neutral prior
+    round), so files players struggle with come up more often.  Samplers
+    registered with ``subscribe`` are updated as results arrive.
+    """
+
+    def __init__(self) -> None:
+        self._rounds: Counter[str] = Counter()
+        self._misses: Counter[str] = Counter()
+        self._samplers: weakref.WeakSet[TargetSampler] = weakref.WeakSet()
+
+    def weight(self, path: str) -> float:
+        """Return the difficulty weight of *path*."""
+        return 1.0 + self._misses[path] / (self._rounds[path] + 1)
+
+    def subscribe(self, sampler: TargetSampler) -> None:
+        """Keep *sampler*'s weights in sync with future results."""
+        self._samplers.add(sampler)
+
+    def record(self, path: str, wrong_guesses: int) -> None:
+        """Record a completed round on *path* with *wrong_guesses* misses."""
+        self._rounds[path] += 1
+        self._misses[path] += wrong_guesses
+        weight = self.weight(path)
+        for sampler in list(self._samplers):
+            sampler.set_weight(path, weight)
+
+
+def _column_value(table: FileTable | None, column: str, path: str) -> float | None:
+    """Return *path*'s entry in *column* of the path-sorted *table*, or ``None``."""
+    if table is None:
+        return None
+    paths = table.paths
+    row = bisect_left(paths, path)
+    if row < len(paths) and paths[row] == path:
+        return float(getattr(table, column)[row])
+    return None
+
+
+def _size_weight(root_dir: str, table: FileTable | None) -> WeightFn:
+    def _weight(path: str) -> float:
+        size = _column_value(table, "sizes", path)
+        if size is None:
+            try:
+                size = sources.stat(Path(root_dir) / path).st_size
+            except OSError:
+                return 0.0
+        return math.log2(size + 2)
+    return _weight
+
+
+def _directory_weight(files: Sequence[str]) -> WeightFn:
+    per_dir = Counter(path.rpartition("/")[0] for path in files)
+
+    def _weight(path: str) -> float:
+        return 1.0 / max(1, per_dir[path.rpartition("/")[0]])
+    return _weight
+
+
+def _recency_weight(root_dir: str, table: FileTable | None) -> WeightFn:
+    now = time.time()
+
+    def _weight(path: str) -> float:
+        mtime = _column_value(table, "mtimes", path)
+        if mtime is None:
+            try:
+                mtime = sources.stat(Path(root_dir) / path).st_mtime
+            except OSError:
+                return 0.0
+        age = max(0.0, now - mtime)
+        return max(RECENCY_FLOOR, math.pow(0.5, age / RECENCY_HALF_LIFE))
+    return _weight
+
+
+def make_sampler(
+    weighting: str,
+    root_dir: str,
+    files: Sequence[str],
+    difficulty: DifficultyTracker | None = None,
+    table: FileTable | None = None,
+) -> TargetSampler | None:
+    """Build a ``TargetSampler`` for one of the ``WEIGHTINGS`` strategies.
+
+    - ``uniform``: every file equally likely (no sampler is needed).
+    - ``size``: weight grows with the logarithm of the file size.
+    - ``directory``: every directory equally likely, whatever its file count.
+    - ``recency``: weight halves every ``RECENCY_HALF_LIFE`` seconds of age.
+    - ``difficulty``: files with more past wrong guesses are favoured.
+
+    Args:
+        weighting: Name of the strategy.
+        root_dir: Absolute path to the directory that was scanned.
+        files: Eligible relative file paths.
+        difficulty: Tracker backing the ``difficulty`` strategy.
+        table: Completed, path-sorted scan table that *files* were
+            selected from; ``size`` and ``recency`` read its columns
+            instead of calling ``stat`` on every file.
+
+    Returns:
+        A sampler, or ``None`` for ``uniform``.
+
+    Raises:
+        ValueError: If *weighting* is not a known strategy.
+    """
+    if weighting == "uniform":
+        return None
+    if weighting == "size":
+        return TargetSampler(files, _size_weight(root_dir, table))
+    if weighting == "directory":
+        return TargetSampler(files, _directory_weight(files))
+    if weighting == "recency":
+        return TargetSampler(files, _recency_weight(root_dir, table))
+    if weighting == "difficulty":
+        tracker = difficulty or DifficultyTracker()
+        sampler = TargetSampler(files, tracker.weight)
+        tracker.subscribe(sampler)
+        return sampler
+    raise ValueError(f"Unknown weighting {weighting!r}; expected one of {WEIGHTINGS}")
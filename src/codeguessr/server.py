@@ -1,36 +1,296 @@
 """FastAPI application for CodeGuessr.
 
-Exposes two API endpoints:
+Exposes four API endpoints:
   - ``POST /api/game/new``: create a new game session.
   - ``POST /api/game/{game_id}/guess``: submit a file-path guess.
+  - ``GET /api/duplicates``: list clusters of near-duplicate files.
+  - ``GET /api/roots``: list the configured code roots.
+
+``GET /metrics`` serves request, scan, session and cache metrics in the
+Prometheus text format (see ``codeguessr.metrics``).  When request profiling
+is enabled (``CODEGUESSR_PROFILE``), ``GET /api/admin/profiles`` lists the
+sampled profiles and ``GET /api/admin/profiles/{id}`` serves one (see
+``codeguessr.profiling``).  Profiles reveal source paths, so the admin
+endpoints only answer loopback clients, or clients that send the
+``CODEGUESSR_ADMIN_TOKEN`` as a bearer token.
+
+``CODEGUESSR_DIR`` may name several roots (see ``codeguessr.roots``); games
+select one with the ``root`` setting and default to the first.
+
+The API responses are described by the ``*Response`` models for the
+OpenAPI schema, but built as dicts and encoded directly by
+``codeguessr.jsonenc`` rather than validated and re-encoded by FastAPI.
+Responses are compressed for clients that accept it (see
+``codeguessr.compression``).
 
 All other routes are handled by a catch-all that serves the Angular SPA.
 """
 
+import asyncio
+import hmac
+import ipaddress
+import logging
 import os
 import re
-from collections.abc import AsyncIterator
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
 from contextlib import asynccontextmanager
+from dataclasses import replace
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response
 from pydantic import BaseModel
-
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from codeguessr.artifact import read_index_meta
+from codeguessr.classify import (
+    DEFAULT_LIMITS,
+    MAX_AVG_LINE_LENGTH,
+    MAX_FILE_BYTES,
+    MAX_LINE_LENGTH,
+    ClassifyLimits,
+)
+from codeguessr.compression import CompressedJSONResponse, CompressionMiddleware
+from codeguessr.content import ContentStore, default_store
 from codeguessr.game import (
     MAX_GUESSES_PER_ROUND,
     MIN_LINES,
     NUM_ROUNDS,
+    FilterPlan,
     GameSession,
+    PreparedRound,
     scan_directory,
 )
+from codeguessr.jsonenc import Fragment
+from codeguessr.metrics import POOL_ROUNDS, REGISTRY
+from codeguessr.pool import PoolKey, RoundPool
+from codeguessr.profiling import (
+    PROFILE_RING_SIZE,
+    ProfileRing,
+    ProfilingMiddleware,
+    RequestSampler,
+    format_profile,
+    profiled,
+)
+from codeguessr.roots import ROOT_MEMORY_BUDGET, RootIndex, RootRegistry, parse_roots
+from codeguessr.sampling import make_sampler
+from codeguessr.sessions import SessionDirectory
+from codeguessr.treesample import sample_directory
 
 STATIC_DIR = Path(__file__).parent / "static" / "browser"
 
-_sessions: dict[str, GameSession] = {}
-_files: list[str] = []
-_root_dir: str = ""
+logger = logging.getLogger(__name__)
+
+# Startup completes once this many files are found (or the scan finishes);
+# the rest of the tree is scanned in the background.
+EARLY_START_FILES: int = 200
+# Most game sessions kept; the least recently played ones are evicted.
+MAX_SESSIONS: int = 10_000
+
+_sessions: OrderedDict[str, GameSession] = OrderedDict()
+# Sessions shared with other worker processes (``CODEGUESSR_SESSION_DIR``);
+# when set, it holds the authoritative state of every game.
+_shared_sessions: SessionDirectory | None = None
+# Scan state of every configured root, loaded on demand (``CODEGUESSR_DIR``).
+# When ``CODEGUESSR_SAMPLE`` is positive, roots are sampled down to that many
+# files instead of being scanned completely.
+_roots = RootRegistry({})
+# Request profiling, off unless ``CODEGUESSR_PROFILE`` is a positive fraction.
+_profiler = RequestSampler()
+# Bearer token that opens the admin endpoints to remote clients
+# (``CODEGUESSR_ADMIN_TOKEN``); without one, only loopback clients are served.
+_admin_token: str = ""
+# Server-wide defaults for file classification (``CODEGUESSR_MAX_*`` and
+# ``CODEGUESSR_ALLOW_GENERATED``); requests may override each threshold.
+_limits: ClassifyLimits = DEFAULT_LIMITS
+
+
+def _limits_from_env() -> ClassifyLimits:
+    """Build the default ``ClassifyLimits`` from the environment set by the CLI."""
+    env = os.environ
+    return ClassifyLimits(
+        max_line_length=int(env.get("CODEGUESSR_MAX_LINE_LENGTH") or MAX_LINE_LENGTH),
+        max_avg_line_length=int(
+            env.get("CODEGUESSR_MAX_AVG_LINE_LENGTH") or MAX_AVG_LINE_LENGTH
+        ),
+        max_file_bytes=int(env.get("CODEGUESSR_MAX_FILE_KB") or MAX_FILE_BYTES // 1024) * 1024,
+        allow_generated=env.get("CODEGUESSR_ALLOW_GENERATED", "") in ("1", "true"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+_REQUEST_SECONDS = REGISTRY.histogram(
+    "codeguessr_http_request_duration_seconds",
+    "Time to serve a request, by endpoint.",
+    ("endpoint",),
+)
+_REQUESTS = REGISTRY.counter(
+    "codeguessr_http_requests_total", "Requests served, by endpoint and status.",
+    ("endpoint", "status"),
+)
+_RESPONSE_BYTES = REGISTRY.counter(
+    "codeguessr_http_response_bytes_total", "Response body bytes sent, by endpoint.",
+    ("endpoint",),
+)
+_CONTENT_REQUESTS = REGISTRY.counter(
+    "codeguessr_http_content_reads_total",
+    "File contents needed while serving requests, by endpoint and result "
+    "(hit = served from the content cache, read = read from disk).",
+    ("endpoint", "result"),
+)
+_SESSIONS_EVICTED = REGISTRY.counter(
+    "codeguessr_sessions_evicted_total", "Game sessions evicted to stay within MAX_SESSIONS."
+)
+
+
+def _ratio(hits: float, misses: float) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+def _per_root(value: Callable[[RootIndex], float]) -> Callable[[], list[tuple[tuple[str], float]]]:
+    """Return a metric callback reporting *value* for every loaded root."""
+    return lambda: [((index.name,), value(index)) for index in _roots.loaded()]
+
+
+def _scan_dirs() -> list[tuple[tuple[str, str], float]]:
+    samples: list[tuple[tuple[str, str], float]] = []
+    for index in _roots.loaded():
+        stats = index.stats
+        samples += [
+            ((index.name, "visited"), stats.dirs_visited),
+            ((index.name, "pruned"), stats.dirs_pruned),
+            ((index.name, "gitignored"), stats.dirs_gitignored),
+        ]
+    return samples
+
+
+def _scan_phases() -> list[tuple[tuple[str, str], float]]:
+    return [
+        ((index.name, phase), seconds)
+        for index in _roots.loaded()
+        for phase, seconds in list(index.stats.phases.items())
+    ]
+
+
+def _rejections() -> list[tuple[tuple[str, str], float]]:
+    return [
+        ((index.name, stage.name), stage.rejected)
+        for index in _roots.loaded()
+        for stage in list(index.plan.stages.values())
+    ]
+
+
+def _content_requests() -> list[tuple[tuple[str], float]]:
+    stats = default_store().stats
+    return [(("hit",), stats.hits), (("read",), stats.reads)]
+
+
+def _pool_hit_ratio() -> list[tuple[tuple[()], float]]:
+    return [((), _ratio(POOL_ROUNDS.value("ready"), POOL_ROUNDS.value("inline")))]
+
+
+REGISTRY.callback(
+    "codeguessr_scan_duration_seconds", "Duration of a root's scan (so far, while running).",
+    _per_root(lambda index: index.scan.duration), ("root",),
+)
+REGISTRY.callback(
+    "codeguessr_scan_complete", "1 once a root's scan has finished.",
+    _per_root(lambda index: index.scan.done.is_set()), ("root",),
+)
+REGISTRY.callback(
+    "codeguessr_scan_phase_seconds", "Time a root's scan spent per phase (see ScanStats).",
+    _scan_phases, ("root", "phase"),
+)
+REGISTRY.callback(
+    "codeguessr_scan_dirs", "Directories seen while walking a root, by outcome.",
+    _scan_dirs, ("root", "outcome"),
+)
+REGISTRY.callback(
+    "codeguessr_scan_files_walked", "Files seen while walking a root.",
+    _per_root(lambda index: index.stats.files_walked), ("root",),
+)
+REGISTRY.callback(
+    "codeguessr_scan_bytes_read", "Bytes of the files a root's scan read completely.",
+    _per_root(lambda index: index.stats.bytes_read), ("root",),
+)
+REGISTRY.callback(
+    "codeguessr_scan_files_rejected", "Walked files rejected, by root and filter stage.",
+    _rejections, ("root", "reason"),
+)
+REGISTRY.callback(
+    "codeguessr_scan_files_accepted", "Playable files found in a root.",
+    _per_root(lambda index: len(index.scan.found)), ("root",),
+)
+REGISTRY.callback(
+    "codeguessr_sessions_active", "Game sessions held in memory.",
+    lambda: [((), len(_sessions))],
+)
+REGISTRY.callback(
+    "codeguessr_content_cache_requests_total",
+    "File content requests to the content cache, by result.",
+    _content_requests, ("result",), kind="counter",
+)
+REGISTRY.callback(
+    "codeguessr_content_cache_hit_ratio", "Fraction of content requests served from the cache.",
+    lambda: [((), _ratio(default_store().stats.hits, default_store().stats.reads))],
+)
+REGISTRY.callback(
+    "codeguessr_content_cache_bytes", "Raw size of the file bodies in the content cache.",
+    lambda: [((), default_store().cached_bytes)],
+)
+REGISTRY.callback(
+    "codeguessr_round_pool_hit_ratio",
+    "Fraction of rounds handed out that were already prepared.",
+    _pool_hit_ratio,
+)
+
+
+class _RequestMetrics:
+    """ASGI middleware recording each request's latency, status, size and content reads.
+
+    Samples are labelled with the name of the endpoint function that served
+    the request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def _send(message: Message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        with ContentStore.measure() as content:
+            try:
+                await self.app(scope, receive, _send)
+            finally:
+                # The router records the matched endpoint in the scope.
+                name = getattr(scope.get("endpoint"), "__name__", "unmatched")
+                _REQUEST_SECONDS.observe(time.perf_counter() - start, name)
+                _REQUESTS.inc(name, str(status))
+                _RESPONSE_BYTES.inc(name, amount=sent)
+                if content.hits:
+                    _CONTENT_REQUESTS.inc(name, "hit", amount=content.hits)
+                if content.reads:
+                    _CONTENT_REQUESTS.inc(name, "read", amount=content.reads)
 
 
 # ---------------------------------------------------------------------------
@@ -40,19 +300,181 @@ _root_dir: str = ""
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    """Scan the code directory on startup and expose the file list globally."""
-    global _files, _root_dir
-    root = os.environ.get("CODEGUESSR_DIR", "")
-    if not root:
+    """Start scanning the default code root and tear every root down on exit.
+
+    Roots are scanned by their ``RootIndex`` (see ``codeguessr.roots``):
+    with ``CODEGUESSR_SAMPLE`` set, only a bounded random sample of the
+    tree is collected; otherwise every candidate file is recorded in a
+    ``FileTable``, so later filter changes are answered without walking the
+    tree.  Other roots are loaded by the first game that selects them, and
+    the least recently used ones are unloaded once the indexes exceed
+    ``CODEGUESSR_ROOT_BUDGET_MB``.  With ``CODEGUESSR_INDEX`` set, the
+    default root is loaded from that prebuilt artifact without walking the
+    tree, and ``CODEGUESSR_DIR`` defaults to the root recorded in it.  With
+    ``CODEGUESSR_SCAN_TRACE`` set, a Chrome trace of the default root's
+    full scan is written to that file when the scan completes.
+
+    With ``CODEGUESSR_SESSION_DIR`` set (``serve --workers``), game
+    sessions are also kept in that directory, so any worker process can
+    serve any game.
+
+    ``CODEGUESSR_PROFILE`` (a fraction between 0 and 1) turns on request
+    profiling; the profiles are kept in ``CODEGUESSR_PROFILE_DIR`` (a new
+    temporary directory by default), at most ``CODEGUESSR_PROFILE_KEEP`` of
+    them.  ``CODEGUESSR_ADMIN_TOKEN`` lets remote clients read them.
+
+    The scan runs in a background thread; startup only waits until
+    ``EARLY_START_FILES`` files have been found in the default root, and
+    games created before the scan completes draw their targets from its
+    reservoir sample.
+    """
+    global _roots, _limits, _shared_sessions, _admin_token
+    spec = os.environ.get("CODEGUESSR_DIR", "")
+    index_path = os.environ.get("CODEGUESSR_INDEX", "")
+    if not spec and index_path:
+        spec = read_index_meta(index_path)["root"]
+    if not spec:
         raise RuntimeError("CODEGUESSR_DIR environment variable is not set")
-    _root_dir = root
-    _files = scan_directory(root)
-    if not _files:
-        raise RuntimeError(f"No qualifying code files found in {root!r}")
-    yield
+    roots = parse_roots(spec)
+    budget_mb = os.environ.get("CODEGUESSR_ROOT_BUDGET_MB", "")
+    trace_path = os.environ.get("CODEGUESSR_SCAN_TRACE", "")
+    _limits = _limits_from_env()
+    _configure_profiling()
+    _admin_token = os.environ.get("CODEGUESSR_ADMIN_TOKEN", "")
+    session_dir = os.environ.get("CODEGUESSR_SESSION_DIR", "")
+    _shared_sessions = SessionDirectory(session_dir, MAX_SESSIONS) if session_dir else None
+    default_store().clear()
+    _roots.close()
+    _roots = RootRegistry(
+        roots,
+        max_bytes=int(budget_mb) * 1024 * 1024 if budget_mb else ROOT_MEMORY_BUDGET,
+        sample_size=int(os.environ.get("CODEGUESSR_SAMPLE", "0") or 0),
+        limits=_limits,
+        indexes={next(iter(roots)): index_path} if index_path else None,
+        traces={next(iter(roots)): trace_path} if trace_path else None,
+    )
+    index = _roots.get()
+    await asyncio.to_thread(index.scan.wait_for, EARLY_START_FILES)
+    if not index.scan.found:
+        _roots.close()
+        raise RuntimeError(
+            f"No qualifying code files found in {index.root_dir!r}"
+        ) from index.scan.error
+    try:
+        yield
+    finally:
+        _roots.close()
+
+
+def _configure_profiling() -> None:
+    """Configure ``_profiler`` from the environment set by the CLI."""
+    env = os.environ
+    fraction = float(env.get("CODEGUESSR_PROFILE", "") or 0)
+    ring = None
+    if fraction:
+        directory = env.get("CODEGUESSR_PROFILE_DIR", "") or tempfile.mkdtemp(
+            prefix="codeguessr-profiles-"
+        )
+        keep = int(env.get("CODEGUESSR_PROFILE_KEEP", "") or PROFILE_RING_SIZE)
+        ring = ProfileRing(directory, keep)
+        logger.info("Profiling %.1f%% of requests into %s", fraction * 100, directory)
+    _profiler.configure(fraction, ring)
 
 
 app = FastAPI(lifespan=lifespan)
+# Innermost, so profiles include compression and metrics count the bytes sent.
+app.add_middleware(CompressionMiddleware)
+# Added before the metrics so the profiled span excludes their bookkeeping.
+app.add_middleware(ProfilingMiddleware, sampler=_profiler)
+app.add_middleware(_RequestMetrics)
+
+
+# ---------------------------------------------------------------------------
+# Response models (documentation only; responses are encoded by jsonenc)
+# ---------------------------------------------------------------------------
+
+
+class RoundPayload(BaseModel):
+    """Display state of the round in play."""
+
+    round_num: int
+    code_display: str
+    highlight_line: int
+    potential_score: int
+    guesses_remaining: int
+    wrong_guesses: list[str]
+    language: str
+
+
+class NewGameResponse(RoundPayload):
+    """First round of a new game plus the game's settings."""
+
+    game_id: str
+    files: list[str]
+    total_rounds: int
+    max_guesses: int
+    root: str
+
+
+class CompletedRound(BaseModel):
+    """Outcome of the round a guess just ended."""
+
+    round_num: int
+    target_file: str
+    round_points: int
+    wrong_guesses: list[str]
+    correct: bool
+
+
+class RoundSummary(BaseModel):
+    """Outcome of one round, listed when the game ends."""
+
+    round_num: int
+    target_file: str
+    correct: bool
+    points: int
+    wrong_guesses: list[str]
+
+
+class GuessResponse(BaseModel):
+    """Result of a guess: the round's new display state, or the game summary."""
+
+    correct: bool
+    round_over: bool
+    game_over: bool
+    total_score: int
+    completed_round: CompletedRound | None = None
+    rounds: list[RoundSummary] | None = None
+    round_num: int | None = None
+    code_display: str | None = None
+    highlight_line: int | None = None
+    potential_score: int | None = None
+    guesses_remaining: int | None = None
+    wrong_guesses: list[str] | None = None
+    language: str | None = None
+
+
+class DuplicatesResponse(BaseModel):
+    """Near-duplicate clusters of a root."""
+
+    clusters: list[list[str]]
+    complete: bool
+
+
+class RootInfo(BaseModel):
+    """State of one configured root."""
+
+    name: str
+    loaded: bool
+    files: int
+    complete: bool
+
+
+class RootsResponse(BaseModel):
+    """The configured roots and the default one."""
+
+    default: str
+    roots: list[RootInfo]
 
 
 # ---------------------------------------------------------------------------
@@ -69,10 +491,18 @@ class NewGameRequest(BaseModel):
     min_lines: int = MIN_LINES
     include_pattern: str = ""
     ignore_pattern: str = ""
-
-
-@app.post("/api/game/new")
-async def new_game(body: NewGameRequest | None = None) -> dict[str, Any]:
+    weighting: Literal["uniform", "size", "directory", "recency", "difficulty"] = "uniform"
+    # Name of the code root to play; ``None`` selects the default root.
+    root: str | None = None
+    # File classification thresholds; ``None`` uses the server defaults.
+    max_line_length: int | None = None
+    max_avg_line_length: int | None = None
+    max_file_kb: int | None = None
+    allow_generated: bool | None = None
+
+
+@app.post("/api/game/new", response_model=NewGameResponse)
+async def new_game(body: NewGameRequest | None = None) -> Response:
     """Create a new game session with the given settings.
 
     Args:
@@ -80,52 +510,167 @@ async def new_game(body: NewGameRequest | None = None) -> dict[str, Any]:
 
     Returns:
         Initial round payload plus session metadata (``game_id``, ``files``,
-        ``total_rounds``, ``max_guesses``).
+        ``total_rounds``, ``max_guesses``); see ``NewGameResponse``.
 
     Raises:
-        HTTPException: 422 if a regex pattern is invalid or no files match.
+        HTTPException: 404 if ``root`` is not a configured root; 422 if a
+            regex pattern is invalid or no files match.
     """
     if body is None:
         body = NewGameRequest()
+    try:
+        index = _roots.get(body.root)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown root: {body.root}") from None
+    if not index.scan.found and not index.scan.done.is_set():
+        # A cold root: wait for its scan like startup does for the default one.
+        await asyncio.to_thread(index.scan.wait_for, EARLY_START_FILES)
     include_pat = body.include_pattern.strip() or None
     ignore_pat = body.ignore_pattern.strip() or None
 
+    compiled: dict[str, re.Pattern[str] | None] = {}
     for label, pat in (("include_pattern", include_pat), ("ignore_pattern", ignore_pat)):
+        compiled[label] = None
         if pat:
             try:
-                re.compile(pat)
+                compiled[label] = re.compile(pat)
             except re.error as exc:
                 raise HTTPException(
                     status_code=422, detail=f"Invalid {label}: {exc}"
                 ) from exc
+    overrides: dict[str, Any] = {
+        "max_line_length": body.max_line_length,
+        "max_avg_line_length": body.max_avg_line_length,
+        "max_file_bytes": body.max_file_kb * 1024 if body.max_file_kb is not None else None,
+        "allow_generated": body.allow_generated,
+    }
+    limits = replace(index.limits, **{k: v for k, v in overrides.items() if v is not None})
+    plan = FilterPlan(
+        min_lines=body.min_lines,
+        include_pattern=compiled["include_pattern"],
+        ignore_pattern=compiled["ignore_pattern"],
+        limits=limits,
+        timed=logger.isEnabledFor(logging.DEBUG),
+    )
 
-    files = scan_directory(
-        _root_dir,
+    key = PoolKey(
         min_lines=body.min_lines,
         include_pattern=include_pat,
         ignore_pattern=ignore_pat,
-    )
-    if not files:
-        raise HTTPException(
-            status_code=422,
-            detail="No qualifying files found with the current filter settings.",
-        )
-
-    session = GameSession.create(
-        _root_dir,
-        files,
-        num_rounds=body.num_rounds,
-        max_guesses=body.max_guesses,
         min_line_chars=body.min_line_chars,
+        weighting=body.weighting,
+        limits=limits,
     )
-    _sessions[session.game_id] = session
+    with default_store().measure() as content:
+        # Scans, filtering and inline round loads read files: keep them off the event loop.
+        session, files = await asyncio.to_thread(
+            profiled, _create_session, index, key, body, plan
+        )
+    logger.debug("content access for new game: %s", content.as_dict())
+    _remember(session)
+    if _shared_sessions is not None:
+        evicted = await asyncio.to_thread(profiled, _shared_sessions.save, session)
+        _SESSIONS_EVICTED.inc(amount=evicted)
 
     payload = session.current_round_payload()
     payload["game_id"] = session.game_id
-    payload["files"] = session.files
+    payload["files"] = files
     payload["total_rounds"] = len(session.rounds)
     payload["max_guesses"] = body.max_guesses
-    return payload
+    payload["root"] = index.name
+    return CompressedJSONResponse(payload)
+
+
+def _remember(session: GameSession) -> None:
+    """Keep *session* in this process, evicting the least recently played beyond the limit."""
+    _sessions[session.game_id] = session
+    _sessions.move_to_end(session.game_id)
+    while len(_sessions) > MAX_SESSIONS:
+        _sessions.popitem(last=False)
+        # Shared sessions are only dropped from this process's cache.
+        if _shared_sessions is None:
+            _SESSIONS_EVICTED.inc()
+
+
+def _create_session(
+    index: RootIndex, key: PoolKey, body: NewGameRequest, plan: FilterPlan
+) -> tuple[GameSession, list[str] | Fragment]:
+    """Create a session for a new game; blocking, so run it in a worker thread.
+
+    Returns:
+        The session and the file list to send with it.
+
+    Raises:
+        HTTPException: 422 if no files match the filter settings.
+    """
+    if key == index.default_pool_key() and not index.scan.done.is_set():
+        # The root's scan is still running: play from what it has found so far.
+        session = GameSession.from_prepared(
+            index.root_dir,
+            index.scan.snapshot(),
+            [
+                PreparedRound.load(
+                    index.root_dir, target,
+                    min_line_chars=body.min_line_chars,
+                    highlight=index.highlights.get(target),
+                )
+                for target in index.scan.sample(body.num_rounds)
+            ],
+            max_guesses=body.max_guesses,
+        )
+        return session, session.files
+    session, pool = _session_from_pool(index, key, body, plan)
+    return session, pool.files_fragment()
+
+
+def _session_from_pool(
+    index: RootIndex, key: PoolKey, body: NewGameRequest, plan: FilterPlan
+) -> tuple[GameSession, RoundPool]:
+    """Create a session from *index*'s round pool for *key*, filtering with *plan* if it is new.
+
+    Returns:
+        The session and the pool it was dealt from.
+
+    Raises:
+        HTTPException: 422 if no files match the filter settings.
+    """
+    root_dir = index.root_dir
+    pool = index.pools.get(key)
+    if pool is None:
+        # Set when the files come from the completed scan's table, whose
+        # columns then serve the sampler's weights.
+        table = None
+        if index.sample_size > 0:
+            files = sample_directory(
+                root_dir, sample_size=index.sample_size, highlights=index.highlights, plan=plan
+            )
+        elif index.scan.done.is_set() and index.scan.error is None:
+            files = index.select(plan)
+            table = index.table
+        else:
+            files = scan_directory(root_dir, highlights=index.highlights, plan=plan)
+        logger.debug("filter plan for %s: %s", key, plan.report())
+        if not files:
+            raise HTTPException(
+                status_code=422,
+                detail="No qualifying files found with the current filter settings.",
+            )
+        pool = index.pools.add(key, RoundPool(
+            root_dir, files,
+            min_line_chars=body.min_line_chars,
+            highlights=index.highlights,
+            sampler=make_sampler(body.weighting, root_dir, files, index.difficulty, table),
+            near_dups=index.near_dups,
+        ))
+
+    session = GameSession.from_prepared(
+        root_dir,
+        pool.files,
+        pool.take(body.num_rounds),
+        max_guesses=body.max_guesses,
+    )
+    index.pools.request_refill(pool)
+    return session, pool
 
 
 class GuessRequest(BaseModel):
@@ -134,8 +679,8 @@ class GuessRequest(BaseModel):
     file_path: str
 
 
-@app.post("/api/game/{game_id}/guess")
-async def submit_guess(game_id: str, body: GuessRequest) -> dict[str, Any]:
+@app.post("/api/game/{game_id}/guess", response_model=GuessResponse)
+async def submit_guess(game_id: str, body: GuessRequest) -> Response:
     """Submit a guess for the current round of a game session.
 
     Args:
@@ -148,10 +693,195 @@ async def submit_guess(game_id: str, body: GuessRequest) -> dict[str, Any]:
     Raises:
         HTTPException: 404 if *game_id* does not refer to a known session.
     """
-    session = _sessions.get(game_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Game not found")
-    return session.submit_guess(body.file_path)
+    if _shared_sessions is not None:
+        # The checkout holds a file lock another worker may have: keep it off the event loop.
+        session, result = await asyncio.to_thread(
+            profiled,
+            _guess_shared, _shared_sessions, game_id, _sessions.get(game_id), body.file_path,
+        )
+        _remember(session)
+    else:
+        local = _sessions.get(game_id)
+        if not local:
+            raise HTTPException(status_code=404, detail="Game not found")
+        session = local
+        _sessions.move_to_end(game_id)
+        result = session.submit_guess(body.file_path)
+    completed = result.get("completed_round")
+    index = _roots.find(session.root_dir)
+    if completed is not None and index is not None:
+        index.difficulty.record(completed["target_file"], len(completed["wrong_guesses"]))
+    return CompressedJSONResponse(result)
+
+
+def _guess_shared(
+    shared_sessions: SessionDirectory,
+    game_id: str,
+    cached: GameSession | None,
+    file_path: str,
+) -> tuple[GameSession, dict[str, Any]]:
+    """Apply a guess to a shared session; blocking, so run it in a worker thread.
+
+    Args:
+        shared_sessions: The directory the session is stored in.
+        game_id: UUID of the target session.
+        cached: This process's copy of the session, if it has one.
+        file_path: The guessed file path.
+
+    Returns:
+        The updated session and the result of the guess.
+
+    Raises:
+        HTTPException: 404 if *game_id* does not refer to a known session.
+    """
+    with shared_sessions.checkout(game_id) as shared:
+        if shared is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        if cached is not None:
+            # Another worker may have moved the game on; keep only the lines.
+            shared.files = cached.files
+            shared.line_cache = cached.line_cache
+        return shared, shared.submit_guess(file_path)
+
+
+@app.get("/api/duplicates", response_model=DuplicatesResponse)
+async def list_duplicates(root: str | None = None) -> Response:
+    """List clusters of near-duplicate files found by a root's scan.
+
+    Args:
+        root: Name of the root; the default root when omitted.
+
+    Returns:
+        ``clusters`` (lists of relative paths, largest first) and
+        ``complete`` (False while the root's scan is still running).
+
+    Raises:
+        HTTPException: 404 if *root* is not a configured root.
+    """
+    try:
+        index = _roots.get(root)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown root: {root}") from None
+    clusters = await asyncio.to_thread(profiled, index.near_dups.clusters)
+    return CompressedJSONResponse({"clusters": clusters, "complete": index.scan.done.is_set()})
+
+
+@app.get("/api/roots", response_model=RootsResponse)
+async def list_roots() -> Response:
+    """List the configured code roots.
+
+    Returns:
+        ``default`` (the root used when a game names none) and ``roots``:
+        one entry per root with its ``name``, whether its index is
+        ``loaded``, the number of ``files`` found so far and whether its
+        scan is ``complete``.
+    """
+    loaded = {index.name: index for index in _roots.loaded()}
+    roots = []
+    for name in _roots.roots:
+        index = loaded.get(name)
+        roots.append({
+            "name": name,
+            "loaded": index is not None,
+            "files": len(index.scan.found) if index is not None else 0,
+            "complete": index is not None and index.scan.done.is_set(),
+        })
+    return CompressedJSONResponse({"default": _roots.default, "roots": roots})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def export_metrics() -> Response:
+    """Serve every metric in the Prometheus text exposition format."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _require_admin(request: Request) -> None:
+    """Refuse *request* unless it carries the admin token or, without one, comes from loopback.
+
+    Raises:
+        HTTPException: 401 if a token is configured and not presented; 403
+            if no token is configured and the client is not local.
+    """
+    if _admin_token:
+        presented = request.headers.get("authorization", "")
+        if not hmac.compare_digest(presented.encode(), f"Bearer {_admin_token}".encode()):
+            raise HTTPException(
+                status_code=401, detail="Admin token required.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return
+    host = request.client.host if request.client is not None else ""
+    try:
+        local = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        local = False
+    if not local:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints only answer local clients; set CODEGUESSR_ADMIN_TOKEN.",
+        )
+
+
+def _profile_ring() -> ProfileRing:
+    ring = _profiler.ring
+    if not _profiler.fraction or ring is None:
+        raise HTTPException(
+            status_code=404, detail="Request profiling is off; set CODEGUESSR_PROFILE."
+        )
+    return ring
+
+
+@app.get("/api/admin/profiles", include_in_schema=False)
+async def list_profiles(request: Request) -> dict[str, Any]:
+    """List the stored request profiles, newest first.
+
+    Raises:
+        HTTPException: 401 or 403 if the client is not an admin (see
+            ``_require_admin``); 404 if request profiling is off.
+    """
+    _require_admin(request)
+    ring = _profile_ring()
+    return {
+        "fraction": _profiler.fraction,
+        "capacity": ring.capacity,
+        "profiles": [entry.as_dict() for entry in ring.entries()],
+    }
+
+
+@app.get("/api/admin/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(
+    request: Request,
+    profile_id: int,
+    format: Literal["prof", "text"] = "prof",
+    sort: str = "cumulative",
+) -> Response:
+    """Serve one stored profile.
+
+    Args:
+        request: The incoming request, checked by ``_require_admin``.
+        profile_id: Profile id, as listed by ``GET /api/admin/profiles``.
+        format: ``prof`` for the binary ``pstats`` file, ``text`` for a
+            report of the top functions ordered by *sort*.
+        sort: ``pstats`` sort key for the text report.
+
+    Raises:
+        HTTPException: 401 or 403 if the client is not an admin (see
+            ``_require_admin``); 404 if profiling is off or the profile was
+            rotated out of the ring, 400 for an unknown *sort*.
+    """
+    _require_admin(request)
+    entry = _profile_ring().get(profile_id)
+    if entry is None or not entry.file.exists():
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    if format == "prof":
+        return FileResponse(
+            entry.file, media_type="application/octet-stream", filename=entry.file.name
+        )
+    try:
+        report = await asyncio.to_thread(format_profile, entry, sort)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key {sort!r}") from None
+    return PlainTextResponse(report)
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,109 @@
+"""Running the CodeGuessr app under uvicorn.
+
+``ReadyServer`` is a ``uvicorn.Server`` that reports when it is ready to
+serve a game: once the app's lifespan startup has completed (the default
+root has found its first ``EARLY_START_FILES``) and the listening sockets
+are bound.  The CLI opens the browser from that signal instead of guessing
+how long startup takes.
+
+``serve_workers`` runs several server processes on one listening socket
+under uvicorn's process supervisor.  The workers read their configuration
+from the ``CODEGUESSR_*`` environment they inherit; readiness is detected by
+polling the API, since the workers start in fresh interpreters.
+"""
+
+import inspect
+import logging
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable
+from typing import Any
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Import string of the ASGI app, so uvicorn loads it in the serving process.
+APP: str = "codeguessr.server:app"
+# Seconds between two readiness checks of a multi-process server.
+READY_POLL_INTERVAL: float = 0.1
+
+
+class ReadyServer(uvicorn.Server):
+    """uvicorn server that calls *on_ready* once it accepts connections.
+
+    Args:
+        config: uvicorn configuration.
+        on_ready: Called without arguments, on the event loop, after startup;
+            it must not block.
+    """
+
+    def __init__(self, config: uvicorn.Config, on_ready: Callable[[], None] | None = None) -> None:
+        super().__init__(config)
+        self.on_ready = on_ready
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets)
+        # ``started`` stays False if startup failed and the server is exiting.
+        if self.started and self.on_ready is not None:
+            try:
+                self.on_ready()
+            except Exception:
+                logger.exception("Ready callback failed")
+
+
+def serve_app(host: str, port: int, on_ready: Callable[[], None] | None = None) -> None:
+    """Serve the app on *host*:*port* until interrupted, calling *on_ready* once ready."""
+    ReadyServer(uvicorn.Config(APP, host=host, port=port), on_ready).run()
+
+
+def _wait_until_serving(url: str, on_ready: Callable[[], None]) -> None:
+    """Poll *url* until it answers successfully, then call *on_ready*."""
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=READY_POLL_INTERVAL * 10) as response:
+                if response.status == 200:
+                    break
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(READY_POLL_INTERVAL)
+    try:
+        on_ready()
+    except Exception:
+        logger.exception("Ready callback failed")
+
+
+def serve_workers(
+    host: str, port: int, workers: int, on_ready: Callable[[], None] | None = None
+) -> None:
+    """Serve the app from *workers* processes sharing *host*:*port* until interrupted.
+
+    Args:
+        host: Interface to listen on.
+        port: Port to listen on.
+        workers: Number of server processes; crashed workers are replaced.
+        on_ready: Called without arguments, from a helper thread, once the
+            first worker answers requests.
+    """
+    config = uvicorn.Config(APP, host=host, port=port, workers=workers)
+    sock = config.bind_socket()
+    if on_ready is not None:
+        probe_host = "127.0.0.1" if host in ("0.0.0.0", "") else host
+        threading.Thread(
+            target=_wait_until_serving,
+            args=(f"http://{probe_host}:{port}/api/roots", on_ready),
+            name="codeguessr-ready",
+            daemon=True,
+        ).start()
+    supervisor_kwargs: dict[str, Any] = {"sockets": [sock]}
+    if "target" in inspect.signature(Multiprocess).parameters:
+        # Older uvicorn releases take the worker entry point explicitly.
+        supervisor_kwargs["target"] = uvicorn.Server(config).run
+    try:
+        Multiprocess(config, **supervisor_kwargs).run()
+    finally:
+        sock.close()
@@ -0,0 +1,146 @@
+"""Game sessions shared between worker processes.
+
+With ``serve --workers``, consecutive requests of one game may reach
+different processes, so each process's in-memory sessions are backed by a
+``SessionDirectory``: one small JSON file per game holding its progress
+(``GameSession.to_state``).  A guess locks the game's file, reads the
+latest state, applies the guess and writes the state back, so concurrent
+guesses from any worker are applied one at a time.
+
+Locking uses ``fcntl.flock`` and is therefore POSIX-only.
+"""
+
+import json
+import os
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TextIO
+
+from codeguessr.game import GameSession
+
+try:
+    import fcntl
+
+    HAVE_FCNTL = True
+except ImportError:  # pragma: no cover - Windows
+    HAVE_FCNTL = False
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Saves between two checks of the directory against its session limit.
+PRUNE_INTERVAL: int = 256
+
+
+# ---------------------------------------------------------------------------
+# Session directory
+# ---------------------------------------------------------------------------
+
+
+class SessionDirectory:
+    """Directory of game session states, safe to share between processes.
+
+    Args:
+        directory: Where the session files live; created if needed.
+        max_sessions: Most sessions kept; the least recently played are
+            removed first.
+
+    Raises:
+        RuntimeError: If file locking is not available on this platform.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], max_sessions: int) -> None:
+        if not HAVE_FCNTL:
+            raise RuntimeError("Shared sessions need fcntl file locks (POSIX only)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max_sessions
+        self._saves = 0
+
+    def _path(self, game_id: str) -> Path | None:
+        # Game IDs come from URLs; only canonical UUIDs name a file.
+        try:
+            canonical = str(uuid.UUID(game_id))
+        except ValueError:
+            return None
+        return self.directory / f"{canonical}.json" if canonical == game_id else None
+
+    def save(self, session: GameSession) -> int:
+        """Store *session*, replacing any earlier state of the same game.
+
+        Returns:
+            Number of sessions removed to stay within ``max_sessions``.
+
+        Raises:
+            ValueError: If the session's ID is not a canonical UUID.
+        """
+        path = self._path(session.game_id)
+        if path is None:
+            raise ValueError(f"Invalid game ID {session.game_id!r}")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+", encoding="utf-8") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            self._write(fh, session)
+        self._saves += 1
+        if self._saves % PRUNE_INTERVAL == 0:
+            return self.prune()
+        return 0
+
+    @contextmanager
+    def checkout(self, game_id: str) -> Iterator[GameSession | None]:
+        """Lock the game *game_id* and yield its latest state.
+
+        The session is written back when the block exits normally, and the
+        lock is held until then, so other processes see every change.
+
+        Yields:
+            The session, or ``None`` if the game is unknown.
+        """
+        path = self._path(game_id)
+        try:
+            fd = os.open(path, os.O_RDWR) if path is not None else -1
+        except FileNotFoundError:
+            fd = -1
+        if fd < 0:
+            yield None
+            return
+        with os.fdopen(fd, "r+", encoding="utf-8") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            data = fh.read()
+            session = GameSession.from_state(json.loads(data)) if data else None
+            yield session
+            if session is not None:
+                self._write(fh, session)
+
+    @staticmethod
+    def _write(fh: TextIO, session: GameSession) -> None:
+        fh.seek(0)
+        fh.truncate()
+        fh.write(json.dumps(session.to_state()))
+        fh.flush()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+    def prune(self) -> int:
+        """Remove the least recently saved sessions beyond ``max_sessions``.
+
+        Returns:
+            Number of sessions removed.
+        """
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue  # removed by another worker
+        excess = len(entries) - self.max_sessions
+        if excess <= 0:
+            return 0
+        entries.sort()
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+        return excess
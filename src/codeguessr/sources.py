@@ -0,0 +1,603 @@
+"""Code roots that are not plain directories.
+
+A root may be a git revision instead of a checkout: ``REPO@REF`` names the
+commit *REF* resolves to in the repository (bare or not) at *REPO*, and a
+bare repository without ``@REF`` stands for its ``HEAD``.  A root may also
+be a ``.tar``, ``.tar.gz`` (or ``.tgz``, ``.tar.bz2``, ``.tar.xz``) or
+``.zip`` archive of a codebase.  Such roots are opened as a ``Source`` and
+mounted under their root string, so the paths the game builds with
+``os.path.join(root, rel)`` keep working: ``stat``, ``read_bytes`` and
+``walk`` route paths below a mounted root to its source and everything else
+to the filesystem.
+
+``GitSource`` enumerates files from the commit's tree with one ``git
+ls-tree`` call and streams blob contents through a single persistent ``git
+cat-file --batch`` process, one pipe round-trip per blob.
+
+``TarSource`` and ``ZipSource`` enumerate members from the archive index
+and read them on demand without extracting anything to disk.
+"""
+
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import shutil
+import struct
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import IO, Any, Generic, TypeVar
+
+# ---------------------------------------------------------------------------
+# Source interface
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class SourceStat:
+    """The ``os.stat_result`` fields the game uses, for files in a ``Source``.
+
+    Attributes:
+        st_size: File size in bytes.
+        st_mtime: Modification time (seconds since the epoch).
+        st_mtime_ns: Modification time in nanoseconds.
+    """
+
+    st_size: int
+    st_mtime: float
+    st_mtime_ns: int
+
+
+class Source(ABC):
+    """A read-only file tree addressed by forward-slash relative paths.
+
+    Args:
+        root: Root string the source is mounted under.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        # Directory → (subdirectory names, file names); "" is the root.
+        self._dirs: dict[str, tuple[list[str], list[str]]] = {"": ([], [])}
+
+    def listdir(self, rel: str) -> tuple[list[str], list[str]]:
+        """Return the names of the subdirectories and files in directory *rel*.
+
+        Args:
+            rel: Directory path; ``""`` for the root.
+
+        Raises:
+            FileNotFoundError: If *rel* is not a directory of the source.
+        """
+        try:
+            dirs, files = self._dirs[rel]
+        except KeyError:
+            raise FileNotFoundError(rel) from None
+        return list(dirs), list(files)
+
+    @abstractmethod
+    def stat(self, rel: str) -> SourceStat:
+        """Return the size and modification time of file *rel*.
+
+        Raises:
+            FileNotFoundError: If *rel* is not a file of the source.
+        """
+
+    @abstractmethod
+    def read(self, rel: str, limit: int | None = None) -> bytes:
+        """Return the contents of file *rel*, or its first *limit* bytes.
+
+        Raises:
+            OSError: If *rel* is not a file of the source or cannot be read.
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release processes and handles; later reads may reopen them."""
+
+    def _add_file(self, rel: str) -> None:
+        """Record file *rel* in its directory listing, creating its ancestors."""
+        parent, _, name = rel.rpartition("/")
+        if parent not in self._dirs:
+            self._add_dir(parent)
+        self._dirs[parent][1].append(name)
+
+    def _add_dir(self, rel: str) -> None:
+        self._dirs[rel] = ([], [])
+        parent, _, name = rel.rpartition("/")
+        if parent not in self._dirs:
+            self._add_dir(parent)
+        self._dirs[parent][0].append(name)
+
+
+# ---------------------------------------------------------------------------
+# Git revisions
+# ---------------------------------------------------------------------------
+
+
+class GitSource(Source):
+    """The tree of one git commit, read from the object database.
+
+    The ref is resolved once, so the source is an immutable snapshot even if
+    the ref moves.  Every file reports the commit time as its modification
+    time.  Symlinks and submodules are skipped.
+
+    Args:
+        root: Root string the source is mounted under.
+        git_dir: The repository's git directory.
+        ref: Branch, tag or commit to read.
+
+    Raises:
+        OSError: If *ref* does not name a commit in *git_dir* or git cannot
+            be run.
+    """
+
+    def __init__(self, root: str, git_dir: str, ref: str = "HEAD") -> None:
+        super().__init__(root)
+        self.git_dir = git_dir
+        self.ref = ref
+        self.commit = self._git("rev-parse", "--verify", "--end-of-options", f"{ref}^{{commit}}")
+        mtime = int(self._git("show", "-s", "--format=%ct", self.commit))
+        self._stat_time = (float(mtime), mtime * 1_000_000_000)
+        self._blobs: dict[str, tuple[bytes, int]] = {}
+        self._load_tree()
+        self._batch: subprocess.Popen[bytes] | None = None
+        self._last: tuple[bytes, bytes] | None = None
+        self._lock = threading.Lock()
+
+    def _git_output(self, *args: str) -> bytes:
+        try:
+            return subprocess.run(
+                ["git", f"--git-dir={self.git_dir}", *args],
+                capture_output=True, check=True,
+            ).stdout
+        except subprocess.CalledProcessError as exc:
+            raise OSError(exc.stderr.decode(errors="replace").strip()) from exc
+
+    def _git(self, *args: str) -> str:
+        return self._git_output(*args).decode().strip()
+
+    def _load_tree(self) -> None:
+        """Index every blob of the commit's tree by path, with its directories."""
+        listing = self._git_output("ls-tree", "-r", "-l", "-z", self.commit)
+        for record in listing.split(b"\0"):
+            if not record:
+                continue
+            meta, _, raw_path = record.partition(b"\t")
+            mode, kind, oid, size = meta.split()
+            if kind != b"blob" or mode == b"120000":
+                continue
+            rel = raw_path.decode("utf-8", errors="surrogateescape")
+            self._blobs[rel] = (oid, int(size))
+            self._add_file(rel)
+
+    def stat(self, rel: str) -> SourceStat:
+        """See ``Source.stat``."""
+        try:
+            _, size = self._blobs[rel]
+        except KeyError:
+            raise FileNotFoundError(rel) from None
+        return SourceStat(size, *self._stat_time)
+
+    def read(self, rel: str, limit: int | None = None) -> bytes:
+        """Stream blob *rel* from the ``git cat-file --batch`` process.
+
+        The most recent blob is kept, so sniffing a file's head and then
+        reading it costs one round-trip.
+        """
+        try:
+            oid, _ = self._blobs[rel]
+        except KeyError:
+            raise FileNotFoundError(rel) from None
+        with self._lock:
+            if self._last is not None and self._last[0] == oid:
+                data = self._last[1]
+            else:
+                data = self._cat(oid)
+                self._last = (oid, data)
+        return data if limit is None else data[:limit]
+
+    def _cat(self, oid: bytes) -> bytes:
+        """Fetch one blob; the caller holds the lock."""
+        if self._batch is None or self._batch.poll() is not None:
+            self._batch = subprocess.Popen(
+                ["git", f"--git-dir={self.git_dir}", "cat-file", "--batch"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        stdin, stdout = self._batch.stdin, self._batch.stdout
+        assert stdin is not None and stdout is not None
+        try:
+            stdin.write(oid + b"\n")
+            stdin.flush()
+            header = stdout.readline().split()
+            if len(header) != 3:
+                raise OSError(f"git cat-file failed for {oid.decode()}")
+            size = int(header[2])
+            data = stdout.read(size)
+            stdout.read(1)
+        except (BrokenPipeError, ValueError) as exc:
+            self._batch = None
+            raise OSError(f"git cat-file failed for {oid.decode()}") from exc
+        if len(data) != size:
+            self._batch = None
+            raise OSError(f"git cat-file returned a short read for {oid.decode()}")
+        return data
+
+    def close(self) -> None:
+        """Stop the ``git cat-file`` process."""
+        with self._lock:
+            batch, self._batch = self._batch, None
+            self._last = None
+        if batch is not None:
+            assert batch.stdin is not None
+            batch.stdin.close()
+            batch.wait(timeout=5)
+            if batch.stdout is not None:
+                batch.stdout.close()
+
+
+# ---------------------------------------------------------------------------
+# Archives
+# ---------------------------------------------------------------------------
+
+# Suffixes of the archive formats that can be used as roots, and the module
+# that decompresses each compressed tarball format.
+TAR_SUFFIXES: dict[str, Callable[[str], Any] | None] = {
+    ".tar": None,
+    ".tar.gz": gzip.open,
+    ".tgz": gzip.open,
+    ".tar.bz2": bz2.open,
+    ".tar.xz": lzma.open,
+}
+ZIP_SUFFIXES: tuple[str, ...] = (".zip",)
+
+# Bytes copied at a time when decompressing a compressed tarball.
+_COPY_CHUNK: int = 1024 * 1024
+# Zip local file header: signature, then the file name and extra field lengths.
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+L = TypeVar("L")
+
+
+def _common_prefix(names: list[str]) -> str:
+    """Return ``"top/"`` if every name lies under one top-level directory."""
+    tops = {name.partition("/")[0] for name in names}
+    if len(tops) == 1 and all("/" in name for name in names):
+        return f"{tops.pop()}/"
+    return ""
+
+
+class _ArchiveSource(Source, Generic[L]):
+    """Members of an archive file, keyed by relative path.
+
+    A single top-level directory shared by every member (as produced by
+    ``git archive --prefix`` or most release tarballs) is stripped from the
+    relative paths.
+
+    Args:
+        root: Root string the source is mounted under.
+        path: The archive file.
+    """
+
+    def __init__(self, root: str, path: str) -> None:
+        super().__init__(root)
+        self.path = path
+        # Relative path → (member locator, size, mtime).
+        self._members: dict[str, tuple[L, int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, members: dict[str, tuple[L, int, float]]) -> None:
+        """Record *members*, keyed by their names in the archive."""
+        prefix = _common_prefix(list(members))
+        for name, member in members.items():
+            rel = name[len(prefix):]
+            self._members[rel] = member
+            self._add_file(rel)
+
+    def _member(self, rel: str) -> tuple[L, int, float]:
+        try:
+            return self._members[rel]
+        except KeyError:
+            raise FileNotFoundError(rel) from None
+
+    def stat(self, rel: str) -> SourceStat:
+        """See ``Source.stat``."""
+        _, size, mtime = self._member(rel)
+        return SourceStat(size, mtime, int(mtime * 1_000_000_000))
+
+
+class TarSource(_ArchiveSource[int]):
+    """Members of a tarball, read through a memory map.
+
+    An uncompressed tarball is mapped directly, so reading a member is a
+    slice of the map.  A compressed one cannot be read at random, so it is
+    decompressed once into an anonymous temporary file that is mapped
+    instead; nothing is extracted.
+
+    Args:
+        root: Root string the source is mounted under.
+        path: The tarball.
+
+    Raises:
+        OSError: If the file is not a readable tarball.
+    """
+
+    def __init__(self, root: str, path: str) -> None:
+        super().__init__(root, path)
+        self._file: IO[bytes] | None = None
+        self._map: mmap.mmap | None = None
+        fileobj = self._open()[0]
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r:") as tar:
+                self._index({
+                    member.name.removeprefix("./"): (
+                        member.offset_data, member.size, float(member.mtime)
+                    )
+                    for member in tar.getmembers()
+                    if member.isfile()
+                })
+        except (tarfile.TarError, EOFError) as exc:
+            self.close()
+            raise OSError(f"{path}: {exc}") from exc
+
+    def _open(self) -> tuple[IO[bytes], mmap.mmap]:
+        """Open and map the tarball, decompressing it first if needed."""
+        with self._lock:
+            if self._file is None or self._map is None:
+                suffix = next(s for s in TAR_SUFFIXES if self.path.lower().endswith(s))
+                decompress = TAR_SUFFIXES[suffix]
+                if decompress is None:
+                    self._file = open(self.path, "rb")
+                else:
+                    self._file = tempfile.TemporaryFile()
+                    try:
+                        with decompress(self.path) as packed:
+                            shutil.copyfileobj(packed, self._file, _COPY_CHUNK)
+                    except (EOFError, lzma.LZMAError, ValueError) as exc:
+                        self._file.close()
+                        self._file = None
+                        raise OSError(f"{self.path}: {exc}") from exc
+                    self._file.seek(0)
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._file, self._map
+
+    def read(self, rel: str, limit: int | None = None) -> bytes:
+        """Return a member's bytes, sliced from the memory map."""
+        offset, size, _ = self._member(rel)
+        if limit is not None:
+            size = min(size, limit)
+        return self._open()[1][offset: offset + size]
+
+    def close(self) -> None:
+        """Unmap the tarball and drop any decompressed copy."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ZipSource(_ArchiveSource[zipfile.ZipInfo]):
+    """Members of a zip file.
+
+    Stored (uncompressed) members are sliced from a memory map of the file;
+    compressed members are inflated on demand, and only as far as *limit*
+    when a head is requested.
+
+    Args:
+        root: Root string the source is mounted under.
+        path: The zip file.
+
+    Raises:
+        OSError: If the file is not a readable zip file.
+    """
+
+    def __init__(self, root: str, path: str) -> None:
+        super().__init__(root, path)
+        self._zip: zipfile.ZipFile | None = None
+        self._map: mmap.mmap | None = None
+        self._index({
+            info.filename.removeprefix("./"): (
+                info, info.file_size, time.mktime((*info.date_time, 0, 0, -1))
+            )
+            for info in self._open()[0].infolist()
+            if not info.is_dir()
+        })
+
+    def _open(self) -> tuple[zipfile.ZipFile, mmap.mmap]:
+        with self._lock:
+            if self._zip is None or self._map is None:
+                try:
+                    self._zip = zipfile.ZipFile(self.path)
+                except zipfile.BadZipFile as exc:
+                    raise OSError(f"{self.path}: {exc}") from exc
+                with open(self.path, "rb") as fh:
+                    self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._zip, self._map
+
+    def read(self, rel: str, limit: int | None = None) -> bytes:
+        """Return a member's bytes, from the memory map when it is stored."""
+        info, size, _ = self._member(rel)
+        if limit is not None:
+            size = min(size, limit)
+        archive, mapped = self._open()
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            magic, name_len, extra_len = _ZIP_LOCAL_HEADER.unpack_from(mapped, info.header_offset)
+            if magic == b"PK\x03\x04":
+                start = info.header_offset + _ZIP_LOCAL_HEADER.size + name_len + extra_len
+                return mapped[start: start + size]
+        try:
+            with archive.open(info) as member:
+                return member.read(size)
+        except (zipfile.BadZipFile, RuntimeError) as exc:
+            raise OSError(f"{self.path}: {rel}: {exc}") from exc
+
+    def close(self) -> None:
+        """Close the zip file and its memory map."""
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+# ---------------------------------------------------------------------------
+# Opening roots
+# ---------------------------------------------------------------------------
+
+
+def _archive_type(root: str) -> type[TarSource | ZipSource] | None:
+    """Return the source class for an archive file *root*, if it is one."""
+    if not os.path.isfile(root):
+        return None
+    name = root.lower()
+    if name.endswith(tuple(TAR_SUFFIXES)):
+        return TarSource
+    if name.endswith(ZIP_SUFFIXES):
+        return ZipSource
+    return None
+
+
+def _git_dir(path: str) -> str | None:
+    """Return the git directory of the repository at *path*, if it is one."""
+    for candidate in (os.path.join(path, ".git"), path):
+        if os.path.isfile(os.path.join(candidate, "HEAD")) and os.path.isdir(
+            os.path.join(candidate, "objects")
+        ):
+            return candidate
+    return None
+
+
+def _git_revision(root: str) -> tuple[str, str] | None:
+    """Return the git directory and ref named by *root*, if it names a revision."""
+    if os.path.isdir(root):
+        return (root, "HEAD") if _git_dir(root) == root else None
+    repo, sep, ref = root.rpartition("@")
+    git_dir = _git_dir(repo) if sep and ref else None
+    return (git_dir, ref) if git_dir is not None else None
+
+
+def _open(root: str) -> Source | None:
+    """Open the source for *root*, or return ``None`` for a plain directory."""
+    archive = _archive_type(root)
+    if archive is not None:
+        return archive(root, root)
+    revision = _git_revision(root)
+    if revision is not None:
+        return GitSource(root, *revision)
+    return None
+
+
+def is_source(root: str | os.PathLike[str]) -> bool:
+    """Return True if *root* names a source rather than a plain directory."""
+    key = os.path.abspath(root)
+    return _archive_type(key) is not None or _git_revision(key) is not None
+
+
+# ---------------------------------------------------------------------------
+# Mounts
+# ---------------------------------------------------------------------------
+
+# Open sources by absolute root string; ``None`` marks plain directories.
+_mounts: dict[str, Source | None] = {}
+_mount_lock = threading.Lock()
+
+
+def open_source(root: str | os.PathLike[str]) -> Source | None:
+    """Return the mounted source for *root*, opening it on first use.
+
+    Args:
+        root: Root string as configured (``REPO@REF``, a bare repository or
+            a directory).
+
+    Returns:
+        The source, or ``None`` if *root* is a plain directory.
+
+    Raises:
+        OSError: If *root* names a git revision that cannot be opened.
+    """
+    key = os.path.abspath(root)
+    with _mount_lock:
+        if key in _mounts:
+            return _mounts[key]
+        source = _open(key)
+        _mounts[key] = source
+        return source
+
+
+def close_source(root: str | os.PathLike[str]) -> None:
+    """Close the source mounted for *root*, if any; it reopens on next use."""
+    source = _mounts.get(os.path.abspath(root))
+    if source is not None:
+        source.close()
+
+
+def _resolve(path: str) -> tuple[Source, str] | None:
+    """Return the mounted source containing *path* and the path within it."""
+    if not any(_mounts.values()):
+        return None
+    key = os.path.abspath(path)
+    for root, source in list(_mounts.items()):
+        if source is not None and key.startswith(root + os.sep):
+            return source, key[len(root) + 1:].replace(os.sep, "/")
+    return None
+
+
+def stat(path: str | os.PathLike[str]) -> os.stat_result | SourceStat:
+    """``os.stat`` that also answers for files below a mounted source.
+
+    Raises:
+        OSError: If the file does not exist.
+    """
+    key = os.fspath(path)
+    mounted = _resolve(key)
+    if mounted is not None:
+        return mounted[0].stat(mounted[1])
+    return os.stat(key)
+
+
+def read_bytes(path: str | os.PathLike[str], limit: int | None = None) -> bytes:
+    """Return the contents of *path*, or its first *limit* bytes.
+
+    Files below a mounted source are read from the source.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    key = os.fspath(path)
+    mounted = _resolve(key)
+    if mounted is not None:
+        return mounted[0].read(mounted[1], limit)
+    with open(key, "rb") as fh:
+        return fh.read() if limit is None else fh.read(limit)
+
+
+def walk(root: str | os.PathLike[str]) -> Iterator[tuple[str, list[str], list[str]]]:
+    """``os.walk`` over *root*, whether it is a directory or a mounted source.
+
+    As with ``os.walk``, callers may prune the yielded directory list in
+    place.  Paths are joined with ``os.path.join``.
+    """
+    source = open_source(root)
+    if source is None:
+        yield from os.walk(root)
+        return
+    base = os.fspath(root)
+    pending = [""]
+    while pending:
+        rel = pending.pop()
+        dirs, files = source.listdir(rel)
+        yield os.path.join(base, *rel.split("/")) if rel else base, dirs, files
+        pending.extend(f"{rel}/{name}" if rel else name for name in reversed(dirs))
@@ -0,0 +1,264 @@
+"""Startup profiling for ``codeguessr serve --profile-startup``.
+
+Cold starts (an autoscaled container coming up, say) spend their time in
+three places: importing the CLI and the app, the server's lifespan (which
+waits for the first ``EARLY_START_FILES`` of the scan), and the rest of the
+scan.  ``profile_startup`` measures each of them:
+
+- import times, from a fresh interpreter run with ``python -X importtime``
+  so modules already loaded in this process do not hide their cost;
+- a timeline from process start to the first successful game, by running
+  the server in this process on a free port;
+- the default root's ``ScanStats`` once its scan completes.
+
+The result is written as a text report and as "folded" stacks — one
+``frame;frame;frame microseconds`` line per stack — which ``flamegraph.pl``,
+speedscope and most other flame graph viewers read.
+"""
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Third-party modules whose import time is reported on its own.
+TRACKED_MODULES: tuple[str, ...] = ("fastapi", "uvicorn", "pathspec")
+# Imported by the ``-X importtime`` interpreter: everything ``serve`` loads.
+IMPORT_STATEMENT: str = "import codeguessr.cli, codeguessr.server"
+# Seconds to wait for the first HTTP responses.
+REQUEST_TIMEOUT: float = 30.0
+
+
+# ---------------------------------------------------------------------------
+# Import times
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    """One module import reported by ``python -X importtime``.
+
+    Attributes:
+        name: Module name.
+        self_us: Microseconds spent importing the module itself.
+        cumulative_us: Microseconds including the modules it imported.
+        depth: Nesting level; 0 for modules imported by the statement.
+    """
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(text: str) -> list[ImportTiming]:
+    """Parse the stderr of ``python -X importtime`` (lines in completion order)."""
+    timings = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        label = parts[2].rstrip()
+        name = label.lstrip()
+        # Each nesting level indents the name by two more spaces.
+        depth = (len(label) - len(name) - 1) // 2
+        timings.append(ImportTiming(name, int(parts[0]), int(parts[1]), max(depth, 0)))
+    return timings
+
+
+def measure_imports(
+    statement: str = IMPORT_STATEMENT, python: str = sys.executable
+) -> list[ImportTiming]:
+    """Run *statement* in a fresh interpreter and return its import times.
+
+    Raises:
+        RuntimeError: If the interpreter fails.
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Measuring imports failed:\n{result.stderr.strip()}")
+    return parse_importtime(result.stderr)
+
+
+def import_stacks(timings: list[ImportTiming], root: str = "import") -> list[tuple[str, int]]:
+    """Return ``(stack, self microseconds)`` pairs for every import in *timings*."""
+    stacks = []
+    path: list[str] = []
+    # importtime reports a module after the modules it imported, so walking
+    # the lines backwards visits every parent before its children.
+    for timing in reversed(timings):
+        path = [*path[:timing.depth], timing.name]
+        stacks.append((";".join([root, *path]), timing.self_us))
+    stacks.reverse()
+    return stacks
+
+
+def process_age() -> float | None:
+    """Return the seconds since this process started, or ``None`` if unknown.
+
+    Reads ``/proc``, so it is only available on Linux.
+    """
+    try:
+        with open("/proc/self/stat", encoding="ascii") as fh:
+            # Fields after the parenthesised command name; starttime is field 22.
+            fields = fh.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", encoding="ascii") as fh:
+            uptime = float(fh.read().split()[0])
+        return max(uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Startup profile
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class StartupProfile:
+    """Where one start of the server spent its time.
+
+    Attributes:
+        imports: Import times from a fresh interpreter.
+        timeline: Consecutive startup steps and their durations in seconds,
+            in order.
+        scan: The default root's ``ScanStats.as_dict()`` plus its
+            ``duration``; empty if the root was sampled or loaded from an
+            artifact.
+    """
+
+    imports: list[ImportTiming] = field(default_factory=list)
+    timeline: dict[str, float] = field(default_factory=dict)
+    scan: dict[str, Any] = field(default_factory=dict)
+
+    def module_times(self, modules: tuple[str, ...] = TRACKED_MODULES) -> dict[str, float]:
+        """Return the cumulative import seconds of each of *modules* that was imported."""
+        times = {}
+        for timing in self.imports:
+            if timing.name in modules and timing.name not in times:
+                times[timing.name] = timing.cumulative_us / 1e6
+        return times
+
+    def format(self) -> str:
+        """Return a human-readable report."""
+        lines = ["Imports (fresh interpreter, cumulative):"]
+        total = sum(timing.cumulative_us for timing in self.imports if timing.depth == 0)
+        lines.append(f"  {'all modules':<48} {total / 1000:>9.1f} ms")
+        for name, seconds in self.module_times().items():
+            lines.append(f"  {name:<48} {seconds * 1000:>9.1f} ms")
+        slowest = sorted(self.imports, key=lambda timing: timing.self_us, reverse=True)[:10]
+        lines.append("Slowest modules (self):")
+        lines += [f"  {timing.name:<48} {timing.self_us / 1000:>9.1f} ms" for timing in slowest]
+        lines.append("Timeline:")
+        for step, seconds in self.timeline.items():
+            lines.append(f"  {step:<48} {seconds * 1000:>9.1f} ms")
+        lines.append(f"  {'total':<48} {sum(self.timeline.values()) * 1000:>9.1f} ms")
+        if self.scan:
+            lines.append(
+                f"Scan of the default root ({self.scan['duration'] * 1000:.1f} ms, "
+                f"{self.scan['accepted']} files accepted of {self.scan['files_walked']} walked):"
+            )
+            for phase, seconds in self.scan["phases"].items():
+                lines.append(f"  {phase:<48} {seconds * 1000:>9.1f} ms")
+        return "\n".join(lines) + "\n"
+
+    def folded(self) -> str:
+        """Return the profile as folded stacks in microseconds.
+
+        ``startup`` holds the timeline, ``imports`` the import tree of the
+        fresh interpreter and ``scan`` the scan phases, which mostly run in
+        the background after startup.
+        """
+        stacks: list[tuple[str, int]] = []
+        for step, seconds in self.timeline.items():
+            stacks.append((f"startup;{step}", round(seconds * 1e6)))
+        stacks += import_stacks(self.imports, root="imports")
+        for phase, seconds in self.scan.get("phases", {}).items():
+            stacks.append((f"scan;{phase}", round(seconds * 1e6)))
+        return "".join(f"{stack.replace(' ', '_')} {value}\n" for stack, value in stacks if value)
+
+    def write(self, prefix: str | os.PathLike[str]) -> tuple[Path, Path]:
+        """Write ``PREFIX.txt`` (the report) and ``PREFIX.folded``.
+
+        Returns:
+            The report and folded-stacks paths.
+        """
+        report = Path(f"{prefix}.txt")
+        folded = Path(f"{prefix}.folded")
+        report.write_text(self.format(), encoding="utf-8")
+        folded.write_text(self.folded(), encoding="utf-8")
+        return report, folded
+
+
+def _request(url: str, body: dict[str, Any] | None = None) -> None:
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"} if data else {}
+    )
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+        response.read()
+
+
+def profile_startup(measure_import_tree: bool = True) -> StartupProfile:
+    """Start the server in this process and measure its startup.
+
+    The server is configured from the ``CODEGUESSR_*`` environment, as with
+    ``codeguessr serve``, and stopped once the default root's scan
+    completes.
+
+    Args:
+        measure_import_tree: Also run a fresh interpreter to time imports.
+
+    Raises:
+        RuntimeError: If the server fails to start.
+        OSError: If a request to it fails.
+    """
+    profile = StartupProfile()
+    age = process_age()
+    if age is not None:
+        profile.timeline["interpreter and CLI startup"] = age
+
+    start = time.perf_counter()
+    server = importlib.import_module("codeguessr.server")
+    from codeguessr.loadtest import serve_in_process
+
+    mark = time.perf_counter()
+    profile.timeline["import codeguessr.server"] = mark - start
+
+    with serve_in_process() as url:
+        now = time.perf_counter()
+        profile.timeline["server startup (lifespan)"] = now - mark
+        mark = now
+        _request(f"{url}/api/roots")
+        now = time.perf_counter()
+        profile.timeline["first response (GET /api/roots)"] = now - mark
+        mark = now
+        _request(f"{url}/api/game/new", {})
+        profile.timeline["first game (POST /api/game/new)"] = time.perf_counter() - mark
+
+        # The default root's scan keeps running after startup; wait for it.
+        index = server._roots.get()
+        index.scan.done.wait()
+        if index.stats.files_walked:
+            profile.scan = {**index.stats.as_dict(), "duration": index.scan.duration}
+
+    if measure_import_tree:
+        profile.imports = measure_imports()
+    return profile
@@ -0,0 +1,452 @@
+"""Columnar per-file metadata for CodeGuessr.
+
+A ``FileTable`` is produced by one full scan and holds every candidate file
+with its metadata in compact ``array`` columns indexed by path ID.  The game
+filters (``min_lines``, include/ignore patterns, extensions) are evaluated
+against the table as masks, so changing settings never walks the tree again.
+
+When NumPy is installed (``pip install codeguessr[fast]``) masks are computed
+on zero-copy views of the columns; otherwise a pure-Python path is used.
+"""
+
+import os
+import re
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from codeguessr import sources
+from codeguessr.classify import DEFAULT_LIMITS, ClassifyLimits, Sniff
+from codeguessr.content import default_store
+from codeguessr.game import (
+    INCLUDE_EXTENSIONS,
+    MIN_LINES,
+    FilterPlan,
+    FilterStage,
+    HighlightIndex,
+    ScanStats,
+    index_source,
+    iter_candidate_files,
+)
+from codeguessr.neardup import NearDuplicateIndex
+
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAVE_NUMPY = False
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Extension codes index into this tuple.
+EXTENSIONS: tuple[str, ...] = tuple(sorted(INCLUDE_EXTENSIONS))
+_EXT_CODE: dict[str, int] = {ext: code for code, ext in enumerate(EXTENSIONS)}
+
+# Number of distinct regex masks kept per table.
+REGEX_CACHE_SIZE: int = 64
+
+# Bits of the ``flags`` column.
+FLAG_GENERATED: int = 1
+# The row was recorded from its sniff alone; its line counts are not known
+# until ``load_unread`` reads the file.
+FLAG_UNREAD: int = 2
+
+# Names of the ``array`` columns of a ``FileTable``, in declaration order.
+COLUMNS: tuple[str, ...] = (
+    "ext_codes", "sizes", "line_counts", "nonempty_counts", "depths", "mtimes",
+    "flags", "max_line_lengths", "avg_line_lengths",
+)
+
+
+# ---------------------------------------------------------------------------
+# File table
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FileTable:
+    """Column store of candidate files, sorted by path.
+
+    A row's position is its path ID.  Only path-level eligibility rules have
+    been applied; content and user filters are applied by ``select``.
+
+    Attributes:
+        paths: Forward-slash relative path per row.
+        ext_codes: Extension code per row (index into ``EXTENSIONS``).
+        sizes: File size in bytes.
+        line_counts: Total number of lines.
+        nonempty_counts: Number of lines with non-whitespace content.
+        depths: Number of directories between the root and the file.
+        mtimes: Modification time (seconds since the epoch).
+        flags: ``FLAG_*`` bits from the file's ``Sniff`` and scan.
+        max_line_lengths: Longest line in the sniffed head, in bytes.
+        avg_line_lengths: Mean line length of the sniffed head, in bytes.
+    """
+
+    paths: list[str] = field(default_factory=list)
+    ext_codes: "array[int]" = field(default_factory=lambda: array("B"))
+    sizes: "array[int]" = field(default_factory=lambda: array("Q"))
+    line_counts: "array[int]" = field(default_factory=lambda: array("I"))
+    nonempty_counts: "array[int]" = field(default_factory=lambda: array("I"))
+    depths: "array[int]" = field(default_factory=lambda: array("H"))
+    mtimes: "array[float]" = field(default_factory=lambda: array("d"))
+    flags: "array[int]" = field(default_factory=lambda: array("B"))
+    max_line_lengths: "array[int]" = field(default_factory=lambda: array("I"))
+    avg_line_lengths: "array[int]" = field(default_factory=lambda: array("I"))
+    _regex_masks: OrderedDict[str, bytearray] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def append(
+        self,
+        path: str,
+        size: int,
+        lines: Sequence[str],
+        mtime: float,
+        sniff: Sniff | None = None,
+        unread: bool = False,
+    ) -> int:
+        """Add a row for *path* and return its path ID.
+
+        Without a *sniff* the row counts as an ordinary source file.  An
+        *unread* row is tagged ``FLAG_UNREAD`` and has empty *lines* until
+        ``fill`` is called.  Rows must be re-sorted with ``sort`` once
+        appending is finished.
+        """
+        flags = FLAG_GENERATED if sniff is not None and sniff.generated else 0
+        if unread:
+            flags |= FLAG_UNREAD
+        self.paths.append(path)
+        self.ext_codes.append(_EXT_CODE.get(os.path.splitext(path)[1].lower(), 0xFF))
+        self.sizes.append(size)
+        self.line_counts.append(len(lines))
+        self.nonempty_counts.append(sum(1 for line in lines if line.strip()))
+        self.depths.append(path.count("/"))
+        self.mtimes.append(mtime)
+        self.flags.append(flags)
+        self.max_line_lengths.append(sniff.max_line if sniff is not None else 0)
+        self.avg_line_lengths.append(sniff.avg_line if sniff is not None else 0)
+        self._regex_masks.clear()
+        return len(self.paths) - 1
+
+    def fill(self, idx: int, lines: Sequence[str]) -> None:
+        """Record the line counts of the unread row *idx* and clear its tag."""
+        self.line_counts[idx] = len(lines)
+        self.nonempty_counts[idx] = sum(1 for line in lines if line.strip())
+        self.flags[idx] &= ~FLAG_UNREAD
+
+    def unread_ids(self, limits: ClassifyLimits | None) -> list[int]:
+        """Return the IDs of unread rows that *limits* admit (every one for ``None``)."""
+        flags = self.flags
+        return [
+            idx for idx in range(len(self.paths))
+            if flags[idx] & FLAG_UNREAD and (limits is None or self._within(idx, limits))
+        ]
+
+    def sort(self) -> None:
+        """Reorder rows by path so selections come out sorted."""
+        order = sorted(range(len(self.paths)), key=self.paths.__getitem__)
+        self.paths = [self.paths[idx] for idx in order]
+        for name in COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[idx] for idx in order)))
+        self._regex_masks.clear()
+
+    def regex_mask(self, pattern: str) -> bytearray:
+        """Return a 0/1 mask of rows whose path matches *pattern*.
+
+        Each pattern is evaluated once per path and memoized.
+
+        Raises:
+            re.error: If *pattern* is not a valid regex.
+        """
+        mask = self._regex_masks.get(pattern)
+        if mask is not None:
+            self._regex_masks.move_to_end(pattern)
+            return mask
+        search = re.compile(pattern).search
+        mask = bytearray(1 if search(path) else 0 for path in self.paths)
+        self._regex_masks[pattern] = mask
+        while len(self._regex_masks) > REGEX_CACHE_SIZE:
+            self._regex_masks.popitem(last=False)
+        return mask
+
+    def select_ids(
+        self,
+        min_lines: int = MIN_LINES,
+        include_pattern: str | None = None,
+        ignore_pattern: str | None = None,
+        extensions: Sequence[str] | None = None,
+        limits: ClassifyLimits | None = DEFAULT_LIMITS,
+    ) -> list[int]:
+        """Return the path IDs that pass the given filters, in path order.
+
+        Args:
+            min_lines: Minimum number of lines required in each file.
+            include_pattern: Optional regex; only matching paths are kept.
+            ignore_pattern: Optional regex; matching paths are dropped.
+            extensions: Optional extensions (with dot) to keep.
+            limits: Classification thresholds for generated, minified and
+                oversized files; ``None`` keeps every row.
+
+        Returns:
+            Sorted list of matching path IDs.  Unread rows have no lines, so
+            they only match once ``load_unread`` has read them.
+        """
+        include = self.regex_mask(include_pattern) if include_pattern else None
+        ignore = self.regex_mask(ignore_pattern) if ignore_pattern else None
+        codes = (
+            {_EXT_CODE[ext] for ext in extensions if ext in _EXT_CODE}
+            if extensions is not None else None
+        )
+        if HAVE_NUMPY:
+            return _select_numpy(self, min_lines, include, ignore, codes, limits)
+
+        lines = self.line_counts
+        ext_codes = self.ext_codes
+        return [
+            idx for idx in range(len(self.paths))
+            if lines[idx] >= min_lines
+            and (include is None or include[idx])
+            and (ignore is None or not ignore[idx])
+            and (codes is None or ext_codes[idx] in codes)
+            and (limits is None or self._within(idx, limits))
+        ]
+
+    def _within(self, idx: int, limits: ClassifyLimits) -> bool:
+        """Return True if row *idx* passes *limits*."""
+        return (
+            (limits.allow_generated or not self.flags[idx] & FLAG_GENERATED)
+            and self.max_line_lengths[idx] <= limits.max_line_length
+            and self.avg_line_lengths[idx] <= limits.max_avg_line_length
+            and self.sizes[idx] <= limits.max_file_bytes
+        )
+
+    def select(
+        self,
+        min_lines: int = MIN_LINES,
+        include_pattern: str | None = None,
+        ignore_pattern: str | None = None,
+        extensions: Sequence[str] | None = None,
+        limits: ClassifyLimits | None = DEFAULT_LIMITS,
+    ) -> list[str]:
+        """Return the sorted relative paths that pass the given filters.
+
+        Equivalent to ``scan_directory`` with the same arguments, without
+        touching the filesystem.  See ``select_ids`` for the arguments.
+        """
+        paths = self.paths
+        return [
+            paths[idx]
+            for idx in self.select_ids(
+                min_lines, include_pattern, ignore_pattern, extensions, limits
+            )
+        ]
+
+    def apply(self, plan: FilterPlan) -> list[str]:
+        """Return the sorted relative paths that pass *plan*.
+
+        The whole selection is recorded on *plan* as one ``table`` stage.
+        """
+        start = time.perf_counter() if plan.timed else 0.0
+        paths = self.select(
+            plan.min_lines,
+            plan.include.pattern if plan.include is not None else None,
+            plan.ignore.pattern if plan.ignore is not None else None,
+            None if plan.extensions >= INCLUDE_EXTENSIONS else sorted(plan.extensions),
+            plan.limits,
+        )
+        elapsed = time.perf_counter() - start if plan.timed else 0.0
+        stage = plan.stages.setdefault("table", FilterStage("table"))
+        stage.checked += len(self.paths)
+        stage.rejected += len(self.paths) - len(paths)
+        stage.seconds += elapsed
+        return paths
+
+
+def _select_numpy(
+    table: FileTable,
+    min_lines: int,
+    include: bytearray | None,
+    ignore: bytearray | None,
+    codes: set[int] | None,
+    limits: ClassifyLimits | None,
+) -> list[int]:
+    """Vectorised ``FileTable.select_ids`` over zero-copy column views."""
+    if not table.paths:
+        return []
+    mask: Any = np.frombuffer(table.line_counts, dtype=np.uint32) >= min_lines
+    if include is not None:
+        mask &= np.frombuffer(include, dtype=np.bool_)
+    if ignore is not None:
+        mask &= ~np.frombuffer(ignore, dtype=np.bool_)
+    if codes is not None:
+        mask &= np.isin(np.frombuffer(table.ext_codes, dtype=np.uint8), list(codes))
+    if limits is not None:
+        if not limits.allow_generated:
+            flags = np.frombuffer(table.flags, dtype=np.uint8)
+            mask &= (flags & FLAG_GENERATED) == 0
+        mask &= np.frombuffer(table.max_line_lengths, dtype=np.uint32) <= limits.max_line_length
+        mask &= np.frombuffer(table.avg_line_lengths, dtype=np.uint32) <= limits.max_avg_line_length
+        mask &= np.frombuffer(table.sizes, dtype=np.uint64) <= limits.max_file_bytes
+    return list(np.flatnonzero(mask).tolist())
+
+
+# ---------------------------------------------------------------------------
+# Table scan
+# ---------------------------------------------------------------------------
+
+
+def iter_scan_table(
+    root: str | os.PathLike[str],
+    table: FileTable,
+    min_lines: int = MIN_LINES,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    limits: ClassifyLimits | None = DEFAULT_LIMITS,
+    near_dups: NearDuplicateIndex | None = None,
+    plan: FilterPlan | None = None,
+    stats: ScanStats | None = None,
+) -> Iterator[str]:
+    """Fill *table* with every candidate file under *root*.
+
+    Every readable, non-binary candidate gets a row, whatever its length or
+    classification, so later ``select`` calls can apply any ``min_lines``
+    and ``ClassifyLimits``.  Files are classified from their head before
+    they are read: binary files get no row, and files that *limits* reject
+    as generated, minified or oversized get an unread row (``FLAG_UNREAD``)
+    from their stat and sniff data alone.  They are neither read nor
+    indexed until ``load_unread`` is called for limits that admit them.
+    Paths that satisfy the default *min_lines* and *limits* are yielded as
+    they are found, which lets a ``ScanProgress`` serve early games while
+    the table is being built.  The table is sorted once the walk completes.
+
+    Args:
+        root: Root directory to scan recursively.
+        table: Table to append rows to.
+        min_lines: Threshold for the paths that are yielded.
+        highlights: Optional mapping that is populated with a
+            ``HighlightIndex`` for every row.
+        limits: Classification thresholds for the paths that are yielded
+            and read; ``None`` reads every file.
+        near_dups: Optional index that every read row is added to.
+        plan: Optional plan that counts the walk: its path stages filter
+            the candidates and the ``binary``, ``read``, ``min_lines`` and
+            ``classify`` outcomes are recorded on it.  Its own *min_lines*
+            and limits are not used.
+        stats: Optional statistics that receive the scan's counters, phase
+            timings and trace spans.  Rows are recorded for files below
+            *min_lines* too, but they count as ``min_lines_rejects``.
+
+    Yields:
+        Relative paths that pass *min_lines* and *limits*, in walk order.
+    """
+    store = default_store()
+    plan = plan or FilterPlan(min_lines=0, limits=None)
+    stats = stats if stats is not None else ScanStats()
+    clock = time.perf_counter
+    scan_start = clock()
+    for filepath, rel in iter_candidate_files(root, plan, stats):
+        start = clock()
+        try:
+            sniff = store.sniff(filepath)
+        except OSError:
+            plan.record("read", False)
+            continue
+        read_start = clock()
+        stats.phases["classify"] += read_start - start
+        if not plan.record("binary", not sniff.binary):
+            continue
+        if not plan.record("classify", limits is None or limits.accepts(sniff)):
+            try:
+                mtime = sources.stat(os.fspath(filepath)).st_mtime
+            except OSError:
+                plan.record("read", False)
+                continue
+            table.append(rel, sniff.size, (), mtime, sniff, unread=True)
+            continue
+        try:
+            source = store.read(filepath)
+        except OSError:
+            plan.record("read", False)
+            continue
+        read_end = clock()
+        plan.record("read", True)
+        stats.record_read(rel, source, read_start, read_end)
+        lines = source.lines
+        table.append(rel, source.size, lines, source.mtime, sniff)
+        index_source(rel, source, highlights, near_dups)
+        stats.record_index(rel, read_end, clock())
+        if not plan.record("min_lines", len(lines) >= min_lines):
+            stats.min_lines_rejects += 1
+        else:
+            stats.accepted += 1
+            yield rel
+    table.sort()
+    if stats.trace is not None:
+        stats.trace.complete("scan", scan_start, clock(), root=os.fspath(root))
+
+
+def load_unread(
+    root: str | os.PathLike[str],
+    table: FileTable,
+    limits: ClassifyLimits | None,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    near_dups: NearDuplicateIndex | None = None,
+) -> int:
+    """Read and index the unread rows of *table* that *limits* admit.
+
+    Call before selecting with limits looser than the ones the table was
+    scanned with.  Rows whose file can no longer be read stay unread.
+
+    Args:
+        root: Root directory the table was scanned from.
+        table: Table whose unread rows are filled in place.
+        limits: Classification thresholds of the coming selection.
+        highlights: Optional mapping that receives a ``HighlightIndex``
+            for every row read.
+        near_dups: Optional index that every row read is added to.
+
+    Returns:
+        The number of rows read.
+    """
+    store = default_store()
+    loaded = 0
+    for idx in table.unread_ids(limits):
+        rel = table.paths[idx]
+        try:
+            source = store.read(os.path.join(root, rel))
+        except OSError:
+            continue
+        table.fill(idx, source.lines)
+        index_source(rel, source, highlights, near_dups)
+        loaded += 1
+    return loaded
+
+
+def scan_table(
+    root: str | os.PathLike[str],
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+) -> FileTable:
+    """Return a sorted ``FileTable`` of every candidate file under *root*.
+
+    Args:
+        root: Root directory to scan recursively.
+        highlights: Optional mapping that is populated with a
+            ``HighlightIndex`` for every row.
+
+    Returns:
+        The populated table.
+    """
+    table = FileTable()
+    for _ in iter_scan_table(root, table, highlights=highlights):
+        pass
+    return table
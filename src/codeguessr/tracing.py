@@ -0,0 +1,114 @@
+"""Span traces in the Chrome trace event format.
+
+A ``Tracer`` collects timed spans — one per scanned directory and file, for
+example — and writes them as a JSON trace that ``chrome://tracing`` and
+Perfetto (https://ui.perfetto.dev) can open.  Spans are "complete" events
+(``"ph": "X"``) stamped with the process and thread that recorded them.
+Recording stops at ``max_events`` so a huge scan cannot exhaust memory; the
+number of dropped spans is written to the trace's ``otherData``.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Spans kept by default; later spans are counted but dropped.
+MAX_TRACE_EVENTS: int = 500_000
+
+
+# ---------------------------------------------------------------------------
+# Tracer
+# ---------------------------------------------------------------------------
+
+
+class Tracer:
+    """Thread-safe collector of spans.
+
+    Span times are ``time.perf_counter`` values; they are written relative
+    to the tracer's creation.
+
+    Args:
+        max_events: Maximum number of spans kept.
+    """
+
+    def __init__(self, max_events: int = MAX_TRACE_EVENTS) -> None:
+        self.max_events = max_events
+        self.events: list[dict[str, Any]] = []
+        self.dropped = 0
+        self._origin = time.perf_counter()
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def complete(
+        self, name: str, start: float, end: float, cat: str = "scan", **args: Any
+    ) -> None:
+        """Record a span from *start* to *end* (``perf_counter`` seconds).
+
+        Args:
+            name: Span name shown in the viewer.
+            start: Start time.
+            end: End time.
+            cat: Comma-separated categories, for filtering in the viewer.
+            **args: Details shown when the span is selected.
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            self.events.append(event)
+            if thread.ident is not None and thread.ident not in self._threads:
+                self._threads[thread.ident] = thread.name
+
+    @contextmanager
+    def span(self, name: str, cat: str = "scan", **args: Any) -> Iterator[dict[str, Any]]:
+        """Record the enclosed block as a span.
+
+        Yields:
+            The span's ``args``; entries added inside the block are recorded.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.complete(name, start, time.perf_counter(), cat, **args)
+
+    def to_json(self) -> dict[str, Any]:
+        """Return the trace as a Chrome trace event format document."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+            dropped = self.dropped
+        names = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return {
+            "traceEvents": names + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": dropped},
+        }
+
+    def write(self, path: str | os.PathLike[str]) -> None:
+        """Write the trace to *path* as JSON."""
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_json(), fh)
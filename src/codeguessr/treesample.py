@@ -0,0 +1,298 @@
+"""Sampling scanner for enormous source trees.
+
+Instead of walking every directory, ``iter_sample_directory`` estimates
+subtree sizes with random probes and then draws files by random descents
+weighted by those estimates.  Scan time and memory are bounded by the sample
+size rather than by the size of the tree.
+
+Bias bounds
+-----------
+Each descent moves into a child with probability proportional to its
+estimated number of candidate files (files count as 1).  If every subtree
+estimate on the way down is within a factor ``1 ± ε`` of the true count, a
+candidate file at depth *d* is drawn with probability within a factor
+``((1 + ε) / (1 - ε)) ** d`` of the uniform ``1 / N``.  Estimates come from
+Knuth's random-probe estimator: unbiased, but noisy on very unbalanced trees,
+so ``ε`` shrinks as ``probes`` grows.  Two further effects are not covered by
+the bound: drawn files are removed without re-estimating their ancestors, and
+estimates count candidates by name, so subtrees with many files that fail
+``min_lines`` are slightly under-represented among the accepted files.
+
+A probe that ends in an empty branch estimates its whole path as empty.
+Such zero estimates are not trusted: until a descent finds a subtree
+exhausted, it is weighted like an unprobed one, so no populated subtree is
+excluded from the sample for good.
+"""
+
+import os
+import random
+from collections.abc import Iterator, MutableMapping
+from pathlib import Path
+
+from codeguessr.content import default_store
+from codeguessr.game import (
+    MIN_LINES,
+    PRUNE_DIRS,
+    FilterPlan,
+    GitignoreMatcher,
+    HighlightIndex,
+    index_source,
+)
+from codeguessr.neardup import NearDuplicateIndex
+from codeguessr.sources import open_source
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+SAMPLE_SIZE: int = 2000
+# Knuth probes run before sampling to estimate subtree sizes.
+ESTIMATE_PROBES: int = 64
+# Descents allowed per requested file before giving up on a sparse tree.
+MAX_DESCENTS_PER_FILE: int = 20
+
+
+# ---------------------------------------------------------------------------
+# Lazily listed directory tree
+# ---------------------------------------------------------------------------
+
+
+class _Dir:
+    """Cached listing and size estimate of one directory."""
+
+    __slots__ = ("est_count", "est_sum", "exhausted", "files", "rel", "subdirs")
+
+    def __init__(self, rel: str, files: list[str], subdirs: list[str]) -> None:
+        self.rel = rel
+        self.files = files
+        self.subdirs = subdirs
+        self.est_sum = 0.0
+        self.est_count = 0
+        self.exhausted = False
+
+
+class _Tree:
+    """Directory nodes listed on first visit, with candidate filtering applied."""
+
+    def __init__(
+        self,
+        root: Path,
+        plan: FilterPlan,
+        rng: random.Random,
+    ) -> None:
+        self.root = root
+        self.plan = plan
+        self.rng = rng
+        self.gitignore = GitignoreMatcher(root)
+        self.source = open_source(root)
+        self.nodes: dict[str, _Dir] = {}
+        self._subtree_sum = 0.0
+        self._subtree_count = 0
+
+    def node(self, rel: str) -> _Dir:
+        cached = self.nodes.get(rel)
+        if cached is not None:
+            return cached
+        files: list[str] = []
+        subdirs: list[str] = []
+        dirnames, filenames = self._listdir(rel)
+        for name in dirnames:
+            child = f"{rel}/{name}" if rel else name
+            if name in PRUNE_DIRS or name.startswith("."):
+                continue
+            if not self.gitignore.is_ignored(child, is_dir=True):
+                subdirs.append(child)
+        for name in filenames:
+            child = f"{rel}/{name}" if rel else name
+            if self._is_candidate(child):
+                files.append(child)
+        node = _Dir(rel, files, subdirs)
+        self.nodes[rel] = node
+        return node
+
+    def _listdir(self, rel: str) -> tuple[list[str], list[str]]:
+        """Return the subdirectory and file names in *rel*, in listing order."""
+        if self.source is not None:
+            try:
+                return self.source.listdir(rel)
+            except OSError:
+                return [], []
+        dirnames: list[str] = []
+        filenames: list[str] = []
+        try:
+            entries = list(os.scandir(self.root / rel if rel else self.root))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            (dirnames if is_dir else filenames).append(entry.name)
+        return dirnames, filenames
+
+    def _is_candidate(self, rel: str) -> bool:
+        if not self.plan.matches_path(rel):
+            return False
+        return self.plan.run("gitignore", self._not_ignored, rel)
+
+    def _not_ignored(self, rel: str) -> bool:
+        return not self.gitignore.is_ignored(rel)
+
+    def estimate(self, rel: str) -> float:
+        """Estimated candidate files under *rel*, without listing it.
+
+        Only exhausted subtrees estimate to zero.  A subtree whose probes all
+        ended in empty branches gets the same prior as an unprobed one, so
+        that descents keep visiting it until it is found to be empty.
+        """
+        node = self.nodes.get(rel)
+        if node is not None and node.exhausted:
+            return 0.0
+        if node is not None and node.est_sum:
+            return node.est_sum / node.est_count
+        if self._subtree_sum:
+            return self._subtree_sum / self._subtree_count
+        return 1.0
+
+    def probe(self) -> None:
+        """Run one Knuth probe from the root and fold its estimates in."""
+        path = [self.node("")]
+        while path[-1].subdirs:
+            path.append(self.node(self.rng.choice(path[-1].subdirs)))
+        est = 0.0
+        for node in reversed(path):
+            est = len(node.files) + len(node.subdirs) * est
+            node.est_sum += est
+            node.est_count += 1
+            if node.rel:
+                self._subtree_sum += est
+                self._subtree_count += 1
+
+    def descend(self) -> str | None:
+        """Draw one candidate file by an estimate-weighted random descent.
+
+        Returns:
+            The drawn relative path (removed from further draws), or ``None``
+            if the descent hit an exhausted branch or the tree is empty.
+        """
+        node = self.node("")
+        while True:
+            weights = [1.0] * len(node.files) + [self.estimate(d) for d in node.subdirs]
+            if not any(weights):
+                node.exhausted = True
+                return None
+            pick = self.rng.choices(range(len(weights)), weights=weights)[0]
+            if pick < len(node.files):
+                return node.files.pop(pick)
+            node = self.node(node.subdirs[pick - len(node.files)])
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def iter_sample_directory(
+    root: str | os.PathLike[str],
+    sample_size: int = SAMPLE_SIZE,
+    min_lines: int = MIN_LINES,
+    include_pattern: str | None = None,
+    ignore_pattern: str | None = None,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    probes: int = ESTIMATE_PROBES,
+    rng: random.Random | None = None,
+    plan: FilterPlan | None = None,
+    near_dups: NearDuplicateIndex | None = None,
+) -> Iterator[str]:
+    """Yield up to *sample_size* qualifying files drawn roughly uniformly from *root*.
+
+    Eligibility rules match ``scan_directory``.  At most ``probes +
+    sample_size * MAX_DESCENTS_PER_FILE`` descents are made, so the run
+    time does not depend on the total size of the tree.  See the module
+    docstring for bias bounds.
+
+    Args:
+        root: Root directory to sample.
+        sample_size: Maximum number of files to return.
+        min_lines: Minimum number of lines required in each file.
+        include_pattern: Optional regex; only matching paths are included.
+        ignore_pattern: Optional regex; matching paths are excluded.
+        highlights: Optional mapping that is populated with a
+            ``HighlightIndex`` for every returned path.
+        probes: Number of Knuth probes used to estimate subtree sizes.
+        rng: Random source; a fresh generator is created if omitted.
+        plan: Prebuilt filters; when given, it replaces *min_lines*,
+            *include_pattern* and *ignore_pattern* and collects stage costs.
+        near_dups: Optional index that every returned path is added to.
+
+    Yields:
+        Distinct forward-slash relative file paths, in draw order.
+    """
+    root_path = Path(root)
+    if plan is None:
+        plan = FilterPlan(min_lines, include_pattern, ignore_pattern)
+    tree = _Tree(root_path, plan, rng or random.Random())
+    for _ in range(probes):
+        tree.probe()
+
+    accepted = 0
+    budget = sample_size * MAX_DESCENTS_PER_FILE
+    while accepted < sample_size and budget > 0:
+        budget -= 1
+        rel = tree.descend()
+        if rel is None:
+            if tree.node("").exhausted:
+                return
+            continue
+        if not plan.accepts_content(root_path / rel):
+            continue
+        try:
+            source = default_store().read(root_path / rel)
+        except OSError:
+            plan.record("read", False)
+            continue
+        plan.record("read", True)
+        if not plan.accepts_lines(len(source.lines)):
+            continue
+        index_source(rel, source, highlights, near_dups)
+        accepted += 1
+        yield rel
+
+
+def sample_directory(
+    root: str | os.PathLike[str],
+    sample_size: int = SAMPLE_SIZE,
+    min_lines: int = MIN_LINES,
+    include_pattern: str | None = None,
+    ignore_pattern: str | None = None,
+    highlights: MutableMapping[str, HighlightIndex] | None = None,
+    plan: FilterPlan | None = None,
+    near_dups: NearDuplicateIndex | None = None,
+) -> list[str]:
+    """Return a sorted sample of up to *sample_size* qualifying files under *root*.
+
+    Args:
+        root: Root directory to sample.
+        sample_size: Maximum number of files to return.
+        min_lines: Minimum number of lines required in each file.
+        include_pattern: Optional regex; only matching paths are included.
+        ignore_pattern: Optional regex; matching paths are excluded.
+        highlights: Optional mapping that is populated with a
+            ``HighlightIndex`` for every returned path.
+        plan: Prebuilt filters passed to ``iter_sample_directory``.
+        near_dups: Optional index that every returned path is added to.
+
+    Returns:
+        Sorted list of forward-slash relative file paths.
+    """
+    return sorted(iter_sample_directory(
+        root,
+        sample_size=sample_size,
+        min_lines=min_lines,
+        include_pattern=include_pattern,
+        ignore_pattern=ignore_pattern,
+        highlights=highlights,
+        plan=plan,
+        near_dups=near_dups,
+    ))
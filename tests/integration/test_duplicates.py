@@ -0,0 +1,26 @@
+"""Integration tests for GET /api/duplicates."""
+import shutil
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from codeguessr import server as _srv
+
+
+class TestDuplicates:
+    def test_lists_copied_files_as_a_cluster(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that a copied file is reported together with its original."""
+        (code_dir / "unique.py").write_text(
+            "\n".join(f"value_{i} = compute({i} * {i})" for i in range(30)), encoding="utf-8"
+        )
+        shutil.copy(code_dir / "unique.py", code_dir / "lib" / "unique_copy.py")
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        with TestClient(_srv.app) as client:
+            assert _srv._roots.get().scan.done.wait(5)
+            data: dict[str, Any] = client.get("/api/duplicates").json()
+        assert data["complete"] is True
+        assert ["lib/unique_copy.py", "unique.py"] in data["clusters"]
@@ -45,6 +45,8 @@ class TestFullGameFlow:
                 result = c.post(
                     f"/api/game/{game_id}/guess", json={"file_path": target(game_id)}
                 ).json()
+                assert set(result) <= set(_srv.GuessResponse.model_fields)
+                _srv.GuessResponse.model_validate(result)
                 if result["round_over"]:
                     completed += 1
             assert completed == num_rounds
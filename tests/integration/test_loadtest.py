@@ -0,0 +1,50 @@
+"""Integration tests for the load driver against a real in-process server."""
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from codeguessr.cli import main
+from codeguessr.loadtest import NEW_GAME, SUBMIT_GUESS, LoadTestConfig, run_loadtest
+
+
+class TestLoadTest:
+    def test_players_finish_their_games(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that every simulated player plays its games to the end without errors."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        config = LoadTestConfig(
+            players=3, games_per_player=2, think_time=0, settings={"num_rounds": 2}, seed=1
+        )
+        report = run_loadtest(config)
+        assert report.games == 6
+        assert report.errors == 0
+        assert report.endpoints[NEW_GAME].count == 6
+        # Each round takes between one and max_guesses guesses.
+        assert 12 <= report.endpoints[SUBMIT_GUESS].count <= 6 * 2 * 6
+        assert report.rss_before is not None and report.rss_after is not None
+
+    def test_unreachable_url_counts_errors(self) -> None:
+        """Verify that failed requests are counted instead of aborting the run."""
+        config = LoadTestConfig(players=2, games_per_player=1, think_time=0, timeout=2)
+        report = run_loadtest(config, url="http://127.0.0.1:9")
+        assert report.games == 0
+        assert report.error_rate == 1.0
+
+    def test_cli_writes_json_report(
+        self, code_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that ``codeguessr loadtest`` prints the report and writes it as JSON."""
+        monkeypatch.delenv("CODEGUESSR_DIR", raising=False)
+        out = tmp_path / "report.json"
+        result = CliRunner().invoke(main, [
+            "loadtest", str(code_dir), "--players", "2", "--games", "1",
+            "--think-time", "0", "--rounds", "1", "--json", str(out),
+        ])
+        assert result.exit_code == 0, result.output
+        assert "p95 ms" in result.output
+        summary = json.loads(out.read_text(encoding="utf-8"))
+        assert summary["games"] == 2
+        assert summary["endpoints"][NEW_GAME]["count"] == 2
@@ -0,0 +1,63 @@
+"""Integration tests for GET /metrics."""
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from codeguessr import server as _srv
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Return the value of the first sample line starting with *prefix*."""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"no sample {prefix!r} in metrics")
+
+
+class TestMetrics:
+    def test_reports_request_latency_and_bytes(self, api_client: TestClient) -> None:
+        """Verify that played requests show up in the latency histogram and byte counters."""
+        before = _srv._REQUEST_SECONDS.count("submit_guess")
+        game = api_client.post("/api/game/new").json()
+        api_client.post(f"/api/game/{game['game_id']}/guess", json={"file_path": "nope.py"})
+        res = api_client.get("/metrics")
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/plain")
+        text = res.text
+        assert "# TYPE codeguessr_http_request_duration_seconds histogram" in text
+        assert _sample(
+            text, 'codeguessr_http_request_duration_seconds_count{endpoint="submit_guess"}'
+        ) == before + 1
+        assert _sample(text, 'codeguessr_http_response_bytes_total{endpoint="new_game"}') > 0
+        assert _sample(text, "codeguessr_sessions_active") == 1
+
+    def test_reports_scan_counters(self, code_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that the scan's walked, rejected and accepted files are exported per root."""
+        (code_dir / "README.md").write_text("docs\n", encoding="utf-8")
+        monkeypatch.setenv("CODEGUESSR_DIR", f"code={code_dir}")
+        with TestClient(_srv.app) as client:
+            assert _srv._roots.get().scan.done.wait(5)
+            text = client.get("/metrics").text
+        assert _sample(text, 'codeguessr_scan_files_accepted{root="code"}') == 5
+        assert _sample(text, 'codeguessr_scan_files_walked{root="code"}') == 6
+        assert _sample(
+            text, 'codeguessr_scan_files_rejected{root="code",reason="extension"}'
+        ) == 1
+        assert _sample(text, 'codeguessr_scan_complete{root="code"}') == 1
+        assert _sample(text, 'codeguessr_scan_duration_seconds{root="code"}') > 0
+
+    def test_counts_evicted_sessions(
+        self, api_client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that sessions beyond MAX_SESSIONS are evicted oldest first and counted."""
+        monkeypatch.setattr(_srv, "MAX_SESSIONS", 2)
+        evicted = _srv._SESSIONS_EVICTED.value()
+        first = api_client.post("/api/game/new").json()["game_id"]
+        for _ in range(2):
+            api_client.post("/api/game/new")
+        assert first not in _srv._sessions
+        assert len(_srv._sessions) == 2
+        text = api_client.get("/metrics").text
+        assert _sample(text, "codeguessr_sessions_evicted_total") == evicted + 1
+        assert _sample(text, "codeguessr_sessions_active") == 2
@@ -1,10 +1,19 @@
 """Integration tests for POST /api/game/new."""
+import asyncio
+import os
+from collections import Counter
+from pathlib import Path
 from typing import Any
 
+import pytest
 from fastapi.testclient import TestClient
 
 from codeguessr import server as _srv
-from codeguessr.game import ATTEMPT_POINTS
+from codeguessr import sources
+from codeguessr.artifact import build_index
+from codeguessr.content import ContentStore
+from codeguessr.game import ATTEMPT_POINTS, ScanProgress
+from tests.helpers import make_file
 from tests.integration.helpers import OBSCURED_RE
 
 
@@ -27,6 +36,26 @@ class TestNewGame:
         ids = {api_client.post("/api/game/new").json()["game_id"] for _ in range(5)}
         assert len(ids) == 5
 
+    def test_session_is_created_off_the_event_loop(
+        self, api_client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that filtering and round loading run outside the event loop."""
+        assert _srv._roots.get().scan.done.wait(5)
+        on_loop: list[bool] = []
+        session_from_pool = _srv._session_from_pool
+
+        def record(*args: Any) -> Any:
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return session_from_pool(*args)
+
+        monkeypatch.setattr(_srv, "_session_from_pool", record)
+        assert api_client.post("/api/game/new", json={"min_lines": 12}).status_code == 200
+        assert on_loop == [False]
+
     def test_round_num_starts_at_1(self, api_client: TestClient) -> None:
         """Verify that the first round is numbered 1."""
         assert api_client.post("/api/game/new").json()["round_num"] == 1
@@ -110,3 +139,126 @@ class TestNewGame:
         """Verify that guesses_remaining equals max_guesses at the start of a round."""
         data: dict[str, Any] = api_client.post("/api/game/new", json={"max_guesses": 4}).json()
         assert data["guesses_remaining"] == data["max_guesses"]
+
+    def test_response_matches_model(self, api_client: TestClient) -> None:
+        """Verify that the response has exactly the fields of NewGameResponse."""
+        data: dict[str, Any] = api_client.post("/api/game/new").json()
+        assert set(data) == set(_srv.NewGameResponse.model_fields)
+        _srv.NewGameResponse.model_validate(data)
+
+    def test_file_list_encoded_once_per_pool(self, api_client: TestClient) -> None:
+        """Verify that games dealt from one pool reuse its encoded file list."""
+        first: dict[str, Any] = api_client.post("/api/game/new").json()
+        index = _srv._roots.get()
+        pool = index.pools.get(index.default_pool_key())
+        assert pool is not None
+        fragment = pool.files_fragment()
+        second: dict[str, Any] = api_client.post("/api/game/new").json()
+        assert pool.files_fragment() is fragment
+        assert first["files"] == second["files"] == pool.files
+
+    def test_response_compressed_when_accepted(self, api_client: TestClient) -> None:
+        """Verify that the new-game response is gzip-encoded only for clients accepting it."""
+        plain = api_client.post("/api/game/new", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        res = api_client.post("/api/game/new", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert int(res.headers["content-length"]) < len(plain.content)
+        assert res.json()["files"] == plain.json()["files"]
+
+    def test_game_created_while_scan_running(self, api_client: TestClient) -> None:
+        """Verify that a default game is served from the partial scan before it completes."""
+        partial = ScanProgress()
+        index = _srv._roots.get()
+        first = sorted(index.scan.found)[0]
+        partial.add(first)
+        index.scan = partial
+        data: dict[str, Any] = api_client.post("/api/game/new", json={"num_rounds": 2}).json()
+        assert data["files"] == [first]
+        assert _srv._sessions[data["game_id"]].current_round.target_file == first
+
+    def test_each_file_read_once(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that scanning, round preparation and payloads share one read per file."""
+        # The scan runs in its own thread, outside any ``measure`` block.
+        reads: Counter[str] = Counter()
+        count = ContentStore._count
+
+        def record(store: ContentStore, key: str, kind: str, size: int) -> None:
+            if kind != "hit":
+                reads[key] += 1
+            count(store, key, kind, size)
+
+        monkeypatch.setattr(ContentStore, "_count", record)
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        with TestClient(_srv.app) as client:
+            assert _srv._roots.get().scan.done.wait(5)
+            data: dict[str, Any] = client.post(
+                "/api/game/new", json={"include_pattern": r"\.py$"}
+            ).json()
+            client.post(f"/api/game/{data['game_id']}/guess", json={"file_path": "nope.py"})
+        assert reads
+        assert max(reads.values()) == 1
+
+    def test_classification_thresholds_in_request(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that generated files are excluded unless the request allows them."""
+        (code_dir / "gen.go").write_text(
+            "// Code generated by mockgen. DO NOT EDIT.\n" + "var x = 1\n" * 20,
+            encoding="utf-8",
+        )
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        with TestClient(_srv.app) as client:
+            assert _srv._roots.get().scan.done.wait(5)
+            default: dict[str, Any] = client.post(
+                "/api/game/new", json={"include_pattern": r"\.go$"}
+            ).json()
+            allowed: dict[str, Any] = client.post(
+                "/api/game/new", json={"include_pattern": r"\.go$", "allow_generated": True}
+            ).json()
+        assert "gen.go" not in default["files"]
+        assert "gen.go" in allowed["files"]
+
+    def test_game_in_selected_root(
+        self, code_dir: Path, tmp_path_factory: pytest.TempPathFactory,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Verify that a game can be played in a second root loaded on demand."""
+        other = tmp_path_factory.mktemp("other")
+        make_file(other / "pkg" / "only.rs")
+        monkeypatch.setenv("CODEGUESSR_DIR", os.pathsep.join([str(code_dir), f"extra={other}"]))
+        with TestClient(_srv.app) as client:
+            roots: dict[str, Any] = client.get("/api/roots").json()
+            assert [r["name"] for r in roots["roots"]] == [code_dir.name, "extra"]
+            assert roots["roots"][1]["loaded"] is False
+            data: dict[str, Any] = client.post("/api/game/new", json={"root": "extra"}).json()
+            missing = client.post("/api/game/new", json={"root": "nope"})
+        assert data["root"] == "extra"
+        assert data["files"] == ["pkg/only.rs"]
+        assert missing.status_code == 404
+
+    def test_served_from_prebuilt_index(
+        self, code_dir: Path, tmp_path_factory: pytest.TempPathFactory,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Verify that a server started from an artifact never walks the tree."""
+        index_path = tmp_path_factory.mktemp("index") / "code.idx"
+        build_index(code_dir, index_path)
+
+        def _no_walk(root: object) -> None:
+            raise AssertionError(f"walked {root}")
+
+        monkeypatch.setattr(sources, "walk", _no_walk)
+        monkeypatch.delenv("CODEGUESSR_DIR", raising=False)
+        monkeypatch.setenv("CODEGUESSR_INDEX", str(index_path))
+        with TestClient(_srv.app) as client:
+            index = _srv._roots.get()
+            assert index.scan.done.wait(5)
+            assert index.scan.error is None
+            data: dict[str, Any] = client.post(
+                "/api/game/new", json={"include_pattern": r"\.py$"}
+            ).json()
+        assert index.root_dir == str(code_dir)
+        assert data["files"] == ["main.py", "utils.py"]
@@ -0,0 +1,112 @@
+"""Integration tests for sampled request profiling and the admin profile endpoints."""
+import pstats
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from codeguessr import server as _srv
+
+# Admin endpoints answer loopback clients when no admin token is configured.
+LOCAL_CLIENT = ("127.0.0.1", 50000)
+
+
+@pytest.fixture()
+def profiled_client(
+    code_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Generator[TestClient, None, None]:
+    """Return a TestClient whose server profiles every request into a two-entry ring."""
+    monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+    monkeypatch.setenv("CODEGUESSR_PROFILE", "1")
+    monkeypatch.setenv("CODEGUESSR_PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("CODEGUESSR_PROFILE_KEEP", "2")
+    _srv._sessions.clear()
+    with TestClient(_srv.app, client=LOCAL_CLIENT) as client:
+        yield client
+
+
+class TestProfiling:
+    def test_sampled_requests_are_listed_newest_first(self, profiled_client: TestClient) -> None:
+        """Verify that the ring keeps the latest profiled requests and skips admin calls."""
+        game = profiled_client.post("/api/game/new").json()
+        profiled_client.post(f"/api/game/{game['game_id']}/guess", json={"file_path": "x.py"})
+        profiled_client.get("/api/roots")
+        res = profiled_client.get("/api/admin/profiles")
+        assert res.status_code == 200
+        body = res.json()
+        assert body["fraction"] == 1.0
+        assert [p["endpoint"] for p in body["profiles"]] == ["list_roots", "submit_guess"]
+        assert body["profiles"][1]["path"] == f"/api/game/{game['game_id']}/guess"
+        assert all(p["bytes"] > 0 and p["status"] == 200 for p in body["profiles"])
+
+    def test_profile_is_served_as_pstats_and_text(
+        self, profiled_client: TestClient, tmp_path: Path
+    ) -> None:
+        """Verify that a profile downloads as a pstats file or renders as a text report."""
+        profiled_client.post("/api/game/new")
+        (entry,) = profiled_client.get("/api/admin/profiles").json()["profiles"]
+        res = profiled_client.get(f"/api/admin/profiles/{entry['id']}")
+        assert res.status_code == 200
+        path = tmp_path / "download.prof"
+        path.write_bytes(res.content)
+        assert pstats.Stats(str(path)).total_calls > 0
+        text = profiled_client.get(f"/api/admin/profiles/{entry['id']}?format=text")
+        assert "new_game" in text.text
+        assert profiled_client.get(
+            f"/api/admin/profiles/{entry['id']}?format=text&sort=bogus"
+        ).status_code == 400
+        assert profiled_client.get("/api/admin/profiles/999").status_code == 404
+
+    def test_worker_thread_work_is_profiled(
+        self, profiled_client: TestClient, tmp_path: Path
+    ) -> None:
+        """Verify that a new game's profile includes the session creation in its worker thread."""
+        profiled_client.post("/api/game/new", json={"min_lines": 12})
+        (entry,) = profiled_client.get("/api/admin/profiles").json()["profiles"]
+        path = tmp_path / "new_game.prof"
+        path.write_bytes(profiled_client.get(f"/api/admin/profiles/{entry['id']}").content)
+        functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+        assert {"new_game", "_create_session", "_session_from_pool"} <= functions
+
+    def test_endpoints_are_hidden_when_profiling_is_off(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that the admin endpoints answer 404 unless profiling is enabled."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        with TestClient(_srv.app, client=LOCAL_CLIENT) as client:
+            client.post("/api/game/new")
+            assert client.get("/api/admin/profiles").status_code == 404
+            assert client.get("/api/admin/profiles/1").status_code == 404
+
+    def test_remote_clients_are_refused(self, profiled_client: TestClient) -> None:
+        """Verify that only loopback clients are served when no admin token is set."""
+        profiled_client.post("/api/game/new")
+        remote = TestClient(_srv.app, client=("192.0.2.10", 50000))
+        assert remote.get("/api/admin/profiles").status_code == 403
+        assert remote.get("/api/admin/profiles/1").status_code == 403
+        assert profiled_client.get("/api/admin/profiles").status_code == 200
+
+    def test_admin_token_is_required_when_configured(
+        self, code_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that a configured admin token is required, from loopback clients too."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        monkeypatch.setenv("CODEGUESSR_PROFILE", "1")
+        monkeypatch.setenv("CODEGUESSR_PROFILE_DIR", str(tmp_path / "profiles"))
+        monkeypatch.setenv("CODEGUESSR_ADMIN_TOKEN", "s3cret")
+        with TestClient(_srv.app, client=("192.0.2.10", 50000)) as client:
+            client.post("/api/game/new")
+            assert client.get("/api/admin/profiles").status_code == 401
+            wrong = {"Authorization": "Bearer nope"}
+            assert client.get("/api/admin/profiles", headers=wrong).status_code == 401
+            good = {"Authorization": "Bearer s3cret"}
+            res = client.get("/api/admin/profiles", headers=good)
+            assert res.status_code == 200
+            (entry,) = res.json()["profiles"]
+            assert client.get(f"/api/admin/profiles/{entry['id']}").status_code == 401
+            assert client.get(
+                f"/api/admin/profiles/{entry['id']}", headers=good
+            ).status_code == 200
+        with TestClient(_srv.app, client=LOCAL_CLIENT) as client:
+            assert client.get("/api/admin/profiles").status_code == 401
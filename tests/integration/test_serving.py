@@ -0,0 +1,132 @@
+"""Integration tests for ReadyServer's readiness signal and multi-process serving."""
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any
+
+import pytest
+import uvicorn
+
+from codeguessr import serving
+from codeguessr.serving import APP, ReadyServer
+
+
+class TestReadyServer:
+    def test_ready_callback_fires_once_the_game_can_load(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that on_ready runs after startup, when the API already answers."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        ready = threading.Event()
+        server = ReadyServer(uvicorn.Config(APP, log_level="warning"), on_ready=ready.set)
+        thread = threading.Thread(
+            target=lambda: asyncio.run(server.serve(sockets=[sock])), daemon=True
+        )
+        thread.start()
+        try:
+            assert ready.wait(10)
+            assert server.started
+            url = f"http://127.0.0.1:{port}/api/roots"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.status == 200
+        finally:
+            server.should_exit = True
+            thread.join(10)
+            sock.close()
+
+    def test_failed_startup_never_signals(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that a server whose lifespan fails does not report readiness."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(tmp_path))  # no code files
+        ready = threading.Event()
+        server = ReadyServer(uvicorn.Config(APP, log_level="critical"), on_ready=ready.set)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        try:
+            with pytest.raises(SystemExit):
+                asyncio.run(server.serve(sockets=[sock]))
+        finally:
+            sock.close()
+        assert not ready.is_set()
+
+
+def _post(url: str, body: dict[str, Any]) -> dict[str, Any]:
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())  # type: ignore[no-any-return]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="shared sessions need POSIX file locks")
+class TestServeWorkers:
+    def test_workers_share_games(self, code_dir: Path, tmp_path: Path) -> None:
+        """Verify that every guess of a game succeeds whichever worker receives it."""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = {
+            **os.environ,
+            "CODEGUESSR_DIR": str(code_dir),
+            "CODEGUESSR_SESSION_DIR": str(tmp_path / "sessions"),
+        }
+        script = (
+            "from codeguessr.serving import serve_workers; "
+            f"serve_workers('127.0.0.1', {port}, 2)"
+        )
+        process = subprocess.Popen(
+            [sys.executable, "-c", script],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    with urllib.request.urlopen(f"{url}/api/roots", timeout=1):
+                        break
+                except OSError:
+                    assert time.monotonic() < deadline, "workers did not start"
+                    time.sleep(0.1)
+            for _ in range(5):
+                game = _post(f"{url}/api/game/new", {"num_rounds": 1})
+                for attempt in range(3):
+                    result = _post(f"{url}/api/game/{game['game_id']}/guess",
+                                   {"file_path": f"wrong{attempt}.py"})
+                    assert len(result["wrong_guesses"]) == attempt + 1
+        finally:
+            process.send_signal(signal.SIGINT)
+            process.wait(30)
+
+    def test_older_supervisor_gets_a_target(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that a Multiprocess taking a target, as older uvicorn's does, receives one."""
+        calls: list[dict[str, Any]] = []
+
+        class OldMultiprocess:
+            def __init__(
+                self, config: uvicorn.Config, target: Any, sockets: list[socket.socket]
+            ) -> None:
+                calls.append({"target": target, "sockets": sockets})
+
+            def run(self) -> None:
+                pass
+
+        monkeypatch.setattr(serving, "Multiprocess", OldMultiprocess)
+        serving.serve_workers("127.0.0.1", 0, 2)
+        assert len(calls) == 1
+        assert callable(calls[0]["target"])
+        assert len(calls[0]["sockets"]) == 1
@@ -0,0 +1,54 @@
+"""Integration tests for profiling the server's startup."""
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from codeguessr.cli import main
+from codeguessr.startup import measure_imports, profile_startup
+
+# Variables ``codeguessr serve`` exports for the server.
+_SERVE_ENV = (
+    "CODEGUESSR_DIR", "CODEGUESSR_SAMPLE", "CODEGUESSR_MAX_LINE_LENGTH",
+    "CODEGUESSR_MAX_AVG_LINE_LENGTH", "CODEGUESSR_MAX_FILE_KB", "CODEGUESSR_ALLOW_GENERATED",
+    "CODEGUESSR_ROOT_BUDGET_MB", "CODEGUESSR_INDEX", "CODEGUESSR_SCAN_TRACE",
+    "CODEGUESSR_PROFILE", "CODEGUESSR_PROFILE_DIR", "CODEGUESSR_PROFILE_KEEP",
+)
+
+
+class TestProfileStartup:
+    def test_timeline_and_scan_are_measured(
+        self, code_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that every startup step is timed and the completed scan is reported."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        profile = profile_startup(measure_import_tree=False)
+        assert list(profile.timeline)[-3:] == [
+            "server startup (lifespan)",
+            "first response (GET /api/roots)",
+            "first game (POST /api/game/new)",
+        ]
+        assert all(seconds >= 0 for seconds in profile.timeline.values())
+        assert profile.scan["accepted"] == 5
+        assert profile.scan["duration"] > 0
+
+    def test_imports_are_measured_in_a_fresh_interpreter(self) -> None:
+        """Verify that a fresh interpreter reports pathspec even if this process loaded it."""
+        timings = measure_imports("import pathspec")
+        assert any(timing.name == "pathspec" and timing.depth == 0 for timing in timings)
+
+    def test_cli_writes_report_and_folded_stacks(
+        self, code_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that ``codeguessr --profile-startup DIR`` writes both outputs and exits."""
+        for name in _SERVE_ENV:
+            monkeypatch.delenv(name, raising=False)
+        prefix = tmp_path / "startup"
+        result = CliRunner().invoke(
+            main, ["--profile-startup", str(code_dir), "--startup-output", str(prefix)]
+        )
+        assert result.exit_code == 0, result.output
+        assert "fastapi" in (tmp_path / "startup.txt").read_text(encoding="utf-8")
+        folded = (tmp_path / "startup.folded").read_text(encoding="utf-8").splitlines()
+        assert any(line.startswith("imports;") for line in folded)
+        assert any(line.startswith("scan;") for line in folded)
@@ -1,4 +1,5 @@
 """Integration tests for POST /api/game/{game_id}/guess."""
+import asyncio
 from pathlib import Path
 from typing import Any
 
@@ -201,3 +202,55 @@ class TestSubmitGuess:
             rd: dict[str, Any] = result["rounds"][0]
             for key in ("round_num", "target_file", "correct", "points", "wrong_guesses"):
                 assert key in rd
+
+
+class TestSharedSessions:
+    def test_guess_served_from_session_directory(
+        self, code_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that a game unknown to this process is played from the shared directory."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        monkeypatch.setenv("CODEGUESSR_SESSION_DIR", str(tmp_path / "sessions"))
+        _srv._sessions.clear()
+        with TestClient(_srv.app) as c:
+            game: dict[str, Any] = c.post("/api/game/new", json={"num_rounds": 2}).json()
+            game_id: str = game["game_id"]
+            answer = target(game_id)
+            # As if the game had been created by another worker process.
+            _srv._sessions.clear()
+            result: dict[str, Any] = c.post(
+                f"/api/game/{game_id}/guess", json={"file_path": answer}
+            ).json()
+            assert result["correct"] is True
+            _srv._sessions.clear()
+            res = c.post(f"/api/game/{game_id}/guess", json={"file_path": "nope.py"})
+            assert res.status_code == 200
+            assert res.json()["round_num"] == 2
+            assert c.post("/api/game/00000000-0000-0000-0000-000000000000/guess",
+                          json={"file_path": "x.py"}).status_code == 404
+
+    def test_shared_guess_runs_off_the_event_loop(
+        self, code_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that the locked load, guess and save of a shared session run in a thread."""
+        monkeypatch.setenv("CODEGUESSR_DIR", str(code_dir))
+        monkeypatch.setenv("CODEGUESSR_SESSION_DIR", str(tmp_path / "sessions"))
+        on_loop: list[bool] = []
+        guess_shared = _srv._guess_shared
+
+        def record(*args: Any) -> Any:
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return guess_shared(*args)
+
+        monkeypatch.setattr(_srv, "_guess_shared", record)
+        with TestClient(_srv.app) as c:
+            game_id: str = c.post("/api/game/new").json()["game_id"]
+            res = c.post(f"/api/game/{game_id}/guess", json={"file_path": "nope.py"})
+            assert res.status_code == 200
+            assert c.post("/api/game/00000000-0000-0000-0000-000000000000/guess",
+                          json={"file_path": "x.py"}).status_code == 404
+        assert on_loop == [False, False]
@@ -0,0 +1,428 @@
+"""Benchmarks for the game engine.
+
+Times the hot paths of a game against synthetic repositories (see
+``tests.perf.synth``) of several sizes:
+
+- ``scan_directory`` with a cold content cache, building highlight and
+  near-duplicate indexes as the server does;
+- ``_pick_highlight`` per file;
+- ``RoundState.get_code_display`` at every reveal stage;
+- ``GameSession.create`` from the scan's indexes;
+- ``GameSession.submit_guess`` for a wrong and for a correct guess.
+
+Results can be saved as a JSON baseline and later checked against it; a
+metric regresses when its median is more than ``--threshold`` slower than
+the baseline's.  Baselines are machine-specific, so they are not committed:
+``--check`` records the first run on a machine as its baseline, and
+``--save`` replaces it::
+
+    python -m tests.perf.bench --scales 1000,10000,100000 --save tests/perf/baselines/engine.json
+    python -m tests.perf.bench --scales 1000,10000,100000 --check tests/perf/baselines/engine.json
+"""
+import argparse
+import hashlib
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from codeguessr.content import default_store
+from codeguessr.game import (
+    REVEAL_STAGES,
+    GameSession,
+    HighlightIndex,
+    RoundState,
+    _pick_highlight,
+    scan_directory,
+)
+from codeguessr.neardup import NearDuplicateIndex
+from tests.perf.synth import RepoSpec, SynthRepo, make_repo
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Version of the baseline file layout.
+BASELINE_FORMAT: int = 1
+DEFAULT_SCALES: tuple[int, ...] = (1000, 10_000)
+# Allowed slowdown of a metric's median before it counts as a regression.
+DEFAULT_THRESHOLD: float = 0.25
+# Slowdowns smaller than this (in milliseconds) are timer noise, not regressions.
+NOISE_FLOOR_MS: float = 0.005
+# Files whose lines feed the per-file micro benchmarks.
+_SAMPLE_FILES: int = 200
+# Sessions played per ``submit_guess`` run.
+_SESSIONS_PER_RUN: int = 20
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Timing:
+    """Summary of repeated timings of one operation.
+
+    Attributes:
+        runs: Number of timed runs.
+        median_ms: Median time per operation in milliseconds.
+        min_ms: Fastest time per operation in milliseconds.
+    """
+
+    runs: int
+    median_ms: float
+    min_ms: float
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the timing as a JSON-ready dict."""
+        return {"runs": self.runs, "median_ms": self.median_ms, "min_ms": self.min_ms}
+
+
+def time_runs(
+    run: Callable[[Any], object],
+    repeat: int,
+    setup: Callable[[], Any] = lambda: None,
+    per_run: int = 1,
+) -> Timing:
+    """Time *repeat* calls of ``run(setup())``, excluding the setup.
+
+    Args:
+        run: Operation to time; receives the value returned by *setup*.
+        repeat: Number of timed runs.
+        setup: Untimed preparation called before every run.
+        per_run: Operations performed by one run; timings are divided by it.
+
+    Returns:
+        Per-operation timing summary.
+    """
+    samples = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        samples.append((time.perf_counter() - start) * 1000 / per_run)
+    return Timing(runs=repeat, median_ms=statistics.median(samples), min_ms=min(samples))
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def bench_repo(repo: SynthRepo, repeat: int = 5, seed: int = 0) -> dict[str, Any]:
+    """Run every benchmark against one generated repository.
+
+    Args:
+        repo: Repository to benchmark.
+        repeat: Timed runs of each micro benchmark; the scan is repeated
+            fewer times on large trees.
+        seed: Seed for the random choices of the game code.
+
+    Returns:
+        ``{"files": ..., "found": ..., "metrics": {name: timing dict}}``.
+    """
+    random.seed(seed)
+    root = str(repo.root)
+    store = default_store()
+    metrics: dict[str, Timing] = {}
+
+    highlights: dict[str, HighlightIndex] = {}
+    near_dups = NearDuplicateIndex()
+    found: list[str] = []
+
+    def scan_setup() -> None:
+        store.clear()
+        highlights.clear()
+        near_dups.clear()
+
+    def scan(_: None) -> None:
+        found[:] = scan_directory(root, highlights=highlights, near_dups=near_dups)
+
+    scan_repeat = 3 if len(repo.files) <= 10_000 else 1
+    metrics["scan_directory"] = time_runs(scan, scan_repeat, scan_setup)
+
+    sample = random.sample(found, min(_SAMPLE_FILES, len(found)))
+    lines = [store.read_lines(repo.root / rel) for rel in sample]
+
+    metrics["pick_highlight"] = time_runs(
+        lambda _: [_pick_highlight(body) for body in lines], repeat, per_run=len(lines)
+    )
+
+    for stage_idx, stage in enumerate(REVEAL_STAGES):
+        rounds = [
+            RoundState(
+                target_file=rel,
+                highlight_line=_pick_highlight(body),
+                wrong_guesses=["wrong"] * stage_idx,
+            )
+            for rel, body in zip(sample, lines, strict=True)
+        ]
+        metrics[f"get_code_display[{stage}]"] = time_runs(
+            lambda _, rounds=rounds: [
+                rnd.get_code_display(body) for rnd, body in zip(rounds, lines, strict=True)
+            ],
+            repeat,
+            per_run=len(rounds),
+        )
+
+    metrics["GameSession.create"] = time_runs(
+        lambda _: [
+            GameSession.create(root, found, highlights=highlights, near_dups=near_dups)
+            for _ in range(_SESSIONS_PER_RUN)
+        ],
+        repeat,
+        per_run=_SESSIONS_PER_RUN,
+    )
+
+    def sessions() -> list[GameSession]:
+        played = [
+            GameSession.create(root, found, highlights=highlights, near_dups=near_dups)
+            for _ in range(_SESSIONS_PER_RUN)
+        ]
+        for session in played:
+            # Warm the target's lines, as the first round payload does.
+            session.current_round_payload()
+        return played
+
+    metrics["submit_guess[wrong]"] = time_runs(
+        lambda played: [session.submit_guess("not/a/target.py") for session in played],
+        repeat, sessions, per_run=_SESSIONS_PER_RUN,
+    )
+    metrics["submit_guess[correct]"] = time_runs(
+        lambda played: [
+            session.submit_guess(session.current_round.target_file) for session in played
+        ],
+        repeat, sessions, per_run=_SESSIONS_PER_RUN,
+    )
+
+    return {
+        "files": len(repo.files),
+        "found": len(found),
+        "metrics": {name: timing.as_dict() for name, timing in metrics.items()},
+    }
+
+
+def run_benchmarks(
+    scales: Sequence[int],
+    workdir: str | Path,
+    spec: RepoSpec | None = None,
+    repeat: int = 5,
+    log: Callable[[str], None] = lambda _: None,
+) -> dict[str, Any]:
+    """Generate a repository per scale under *workdir* and benchmark each.
+
+    Trees already generated in *workdir* from the same spec are reused.
+
+    Args:
+        scales: File counts to benchmark.
+        workdir: Directory that holds the generated trees.
+        spec: Shape of the trees (default ``RepoSpec()``); its ``files`` is
+            replaced by each scale.
+        repeat: Timed runs of each micro benchmark.
+        log: Receives progress messages.
+
+    Returns:
+        Baseline document with the results of every scale.
+    """
+    spec = spec or RepoSpec()
+    results: dict[str, Any] = {}
+    for files in scales:
+        scaled = replace(spec, files=files)
+        digest = hashlib.blake2b(scaled.key().encode(), digest_size=6).hexdigest()
+        log(f"generating {files} files ...")
+        repo = make_repo(Path(workdir) / f"repo-{files}-{digest}", scaled)
+        log(f"benchmarking {files} files ...")
+        results[str(files)] = bench_repo(repo, repeat=repeat, seed=spec.seed)
+    return {
+        "format": BASELINE_FORMAT,
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "spec": {**json.loads(spec.key()), "files": None},
+        "results": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Regression:
+    """A metric that got slower than its baseline allows.
+
+    Attributes:
+        scale: File count of the repository.
+        metric: Benchmark name.
+        baseline_ms: Baseline median.
+        current_ms: Current median.
+    """
+
+    scale: str
+    metric: str
+    baseline_ms: float
+    current_ms: float
+
+    @property
+    def ratio(self) -> float:
+        """Current median relative to the baseline."""
+        return self.current_ms / self.baseline_ms if self.baseline_ms else float("inf")
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    floor_ms: float = NOISE_FLOOR_MS,
+) -> list[Regression]:
+    """Return the metrics of *current* that regressed against *baseline*.
+
+    Only scales and metrics present in both documents are compared.
+
+    Args:
+        current: Result of ``run_benchmarks``.
+        baseline: Previously saved result.
+        threshold: Allowed relative slowdown of a median (0.25 = 25 %).
+        floor_ms: Absolute slowdown below which a change is ignored.
+
+    Returns:
+        The regressions, in scale and metric order.
+
+    Raises:
+        ValueError: If *baseline* has another layout version.
+    """
+    if baseline.get("format") != BASELINE_FORMAT:
+        raise ValueError(
+            f"baseline has format {baseline.get('format')}, expected {BASELINE_FORMAT}; "
+            "record it again"
+        )
+    regressions = []
+    for scale, result in current["results"].items():
+        base_metrics = baseline["results"].get(scale, {}).get("metrics", {})
+        for metric, timing in result["metrics"].items():
+            base = base_metrics.get(metric)
+            if base is None:
+                continue
+            slower = timing["median_ms"] - base["median_ms"]
+            if slower > base["median_ms"] * threshold and slower >= floor_ms:
+                regressions.append(
+                    Regression(scale, metric, base["median_ms"], timing["median_ms"])
+                )
+    return regressions
+
+
+def format_report(current: dict[str, Any], baseline: dict[str, Any] | None = None) -> str:
+    """Render *current* as a text table, with changes against *baseline*."""
+    rows = [f"{'files':>8}  {'metric':<28} {'median ms':>11} {'min ms':>11} {'change':>8}"]
+    for scale, result in current["results"].items():
+        base_metrics = (baseline or {}).get("results", {}).get(scale, {}).get("metrics", {})
+        for metric, timing in result["metrics"].items():
+            base = base_metrics.get(metric)
+            change = ""
+            if base and base["median_ms"]:
+                change = f"{(timing['median_ms'] / base['median_ms'] - 1) * 100:+.0f}%"
+            rows.append(
+                f"{scale:>8}  {metric:<28} {timing['median_ms']:>11.4f} "
+                f"{timing['min_ms']:>11.4f} {change:>8}"
+            )
+    return "\n".join(rows)
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the benchmarks from the command line.
+
+    Returns:
+        Exit status: 1 if ``--check`` found regressions, else 0.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.perf.bench", description="Benchmark the CodeGuessr game engine."
+    )
+    parser.add_argument(
+        "--scales", default=",".join(map(str, DEFAULT_SCALES)),
+        help="comma-separated file counts (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per micro benchmark")
+    for flag, help_text in (
+        ("depth", "maximum tree depth"),
+        ("fanout", "subdirectories per directory"),
+        ("min_lines", "fewest lines per file"),
+        ("max_lines", "most lines per file"),
+    ):
+        parser.add_argument(
+            f"--{flag.replace('_', '-')}", type=int, default=getattr(RepoSpec, flag), help=help_text
+        )
+    parser.add_argument(
+        "--gitignore-density", type=float, default=RepoSpec.gitignore_density,
+        help="fraction of directories with a .gitignore",
+    )
+    parser.add_argument(
+        "--workdir",
+        help="keep generated trees here and reuse them (default: a temporary directory)",
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--save", metavar="BASELINE", help="write the results as a new baseline")
+    parser.add_argument(
+        "--check", metavar="BASELINE",
+        help="fail if slower than this baseline; record it first if it does not exist",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="allowed slowdown for --check (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    spec = RepoSpec(
+        depth=args.depth, fanout=args.fanout, min_lines=args.min_lines,
+        max_lines=args.max_lines, gitignore_density=args.gitignore_density,
+    )
+    scales = [int(value) for value in args.scales.split(",") if value]
+
+    def log(message: str) -> None:
+        print(message, file=sys.stderr)
+
+    if args.workdir:
+        current = run_benchmarks(scales, args.workdir, spec, args.repeat, log)
+    else:
+        with tempfile.TemporaryDirectory(prefix="codeguessr-bench-") as workdir:
+            current = run_benchmarks(scales, workdir, spec, args.repeat, log)
+
+    baseline = None
+    save = args.save
+    if args.check and Path(args.check).exists():
+        baseline = json.loads(Path(args.check).read_text(encoding="utf-8"))
+    elif args.check:
+        log(f"no baseline at {args.check}; recording this run as the baseline")
+        save = save or args.check
+    print(format_report(current, baseline))
+    for path in filter(None, (args.output, save)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+
+    if baseline is None:
+        return 0
+    regressions = compare(current, baseline, args.threshold)
+    for reg in regressions:
+        print(
+            f"REGRESSION {reg.scale} files {reg.metric}: "
+            f"{reg.baseline_ms:.4f} ms -> {reg.current_ms:.4f} ms ({reg.ratio:.2f}x)"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Benchmarks of response compression: CPU cost against bytes saved.
+
+Compresses the payloads the server sends for a synthetic repository (see
+``tests.perf.synth``) with every available coding (see
+``codeguessr.compression``) at each of the levels the server uses:
+
+- ``file_list``: the ``files`` list of a new game;
+- ``code_display[stage]``: guess responses at every reveal stage, from
+  the fully obscured code to the whole file;
+- ``new_game``: a whole new-game response, compressed ``whole`` and with
+  the file list ``spliced`` in precompressed, as the server sends it.
+
+Each row reports the median time per body, the mean raw and compressed
+sizes, and the kilobytes saved per millisecond of CPU::
+
+    python -m tests.perf.compress_bench --files 10000
+"""
+import argparse
+import random
+import sys
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from codeguessr.compression import CODINGS, Coding, compress_parts, precompressed
+from codeguessr.content import default_store
+from codeguessr.game import REVEAL_STAGES, RoundState, _pick_highlight
+from codeguessr.jsonenc import Fragment, encode_parts, join_parts
+from tests.perf.bench import time_runs
+from tests.perf.synth import RepoSpec, make_repo
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+DEFAULT_FILES: int = 10_000
+# Files whose code displays are compressed per run.
+_SAMPLE_FILES: int = 50
+
+Body = list[bytes | Fragment]
+
+
+# ---------------------------------------------------------------------------
+# Payloads
+# ---------------------------------------------------------------------------
+
+
+def build_payloads(root: Path, files: list[str], seed: int = 0) -> dict[str, list[Body]]:
+    """Return the benchmarked response bodies, grouped by payload name.
+
+    Args:
+        root: Repository root the files are read from.
+        files: Relative paths of the repository's files.
+        seed: Seed for the choice of sample files.
+    """
+    rng = random.Random(seed)
+    sample = rng.sample(files, min(_SAMPLE_FILES, len(files)))
+    lines = [default_store().read_lines(root / rel) for rel in sample]
+    file_list = Fragment.of(files)
+    payloads: dict[str, list[Body]] = {"file_list": [[file_list.data]]}
+    for stage_idx, stage in enumerate(REVEAL_STAGES):
+        bodies = []
+        for rel, body in zip(sample, lines, strict=True):
+            rnd = RoundState(
+                target_file=rel,
+                highlight_line=_pick_highlight(body),
+                wrong_guesses=["wrong"] * stage_idx,
+            )
+            bodies.append(encode_parts({
+                "correct": False, "round_over": False, "game_over": False, "total_score": 0,
+                "code_display": rnd.get_code_display(body), "wrong_guesses": rnd.wrong_guesses,
+            }))
+        payloads[f"code_display[{stage}]"] = bodies
+    rnd = RoundState(target_file=sample[0], highlight_line=_pick_highlight(lines[0]))
+    payloads["new_game"] = [encode_parts({
+        "game_id": "00000000-0000-0000-0000-000000000000",
+        "code_display": rnd.get_code_display(lines[0]),
+        "files": file_list,
+    })]
+    return payloads
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def _row(
+    payload: str, coding: Coding, mode: str, bodies: list[Body], repeat: int, spliced: bool
+) -> dict[str, Any]:
+    raw = [join_parts(body) for body in bodies]
+    if spliced:
+        for body in bodies:
+            for part in body:
+                if isinstance(part, Fragment):
+                    precompressed(part, coding)  # done once per pool, not per response
+        timing = time_runs(
+            lambda _: [compress_parts(body, coding) for body in bodies], repeat,
+            per_run=len(bodies),
+        )
+        compressed = [compress_parts(body, coding) for body in bodies]
+    else:
+        level = int(mode.rsplit("-", 1)[1])
+        timing = time_runs(
+            lambda _: [coding.compress(data, level) for data in raw], repeat, per_run=len(raw)
+        )
+        compressed = [coding.compress(data, level) for data in raw]
+    raw_bytes = sum(map(len, raw)) / len(raw)
+    out_bytes = sum(map(len, compressed)) / len(compressed)
+    saved_kb = (raw_bytes - out_bytes) / 1024
+    return {
+        "payload": payload,
+        "mode": mode,
+        "median_ms": timing.median_ms,
+        "raw_bytes": round(raw_bytes),
+        "bytes": round(out_bytes),
+        "ratio": raw_bytes / out_bytes if out_bytes else 0.0,
+        "saved_kb_per_ms": saved_kb / timing.median_ms if timing.median_ms else 0.0,
+    }
+
+
+def bench_compression(payloads: dict[str, list[Body]], repeat: int = 5) -> list[dict[str, Any]]:
+    """Compress every payload with every coding and level.
+
+    Returns:
+        One row per payload and mode (``CODING-LEVEL``, or ``CODING-spliced``
+        for the new-game response with its precompressed file list).
+    """
+    rows = []
+    for payload, bodies in payloads.items():
+        for coding in CODINGS.values():
+            for level in sorted({coding.fast_level, coding.level, coding.static_level}):
+                rows.append(_row(payload, coding, f"{coding.name}-{level}", bodies, repeat, False))
+            if payload == "new_game" and coding.spliceable:
+                rows.append(_row(payload, coding, f"{coding.name}-spliced", bodies, repeat, True))
+    return rows
+
+
+def format_rows(rows: list[dict[str, Any]]) -> str:
+    """Render benchmark rows as a text table."""
+    lines = [
+        f"{'payload':<22} {'mode':<14} {'median ms':>10} {'raw B':>10} {'out B':>9} "
+        f"{'ratio':>7} {'KB saved/ms':>12}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['payload']:<22} {row['mode']:<14} {row['median_ms']:>10.4f} "
+            f"{row['raw_bytes']:>10} {row['bytes']:>9} {row['ratio']:>7.1f} "
+            f"{row['saved_kb_per_ms']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the compression benchmarks from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.perf.compress_bench",
+        description="Benchmark response compression: CPU time against bytes saved.",
+    )
+    parser.add_argument("--files", type=int, default=DEFAULT_FILES, help="files in the repository")
+    parser.add_argument("--max-lines", type=int, default=RepoSpec.max_lines,
+                        help="most lines per file")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per row")
+    parser.add_argument("--workdir", help="keep the generated tree here and reuse it")
+    args = parser.parse_args(argv)
+    spec = RepoSpec(files=args.files, max_lines=args.max_lines)
+
+    with tempfile.TemporaryDirectory(prefix="codeguessr-bench-") as tmp:
+        repo = make_repo(Path(args.workdir or tmp) / f"repo-{args.files}", spec)
+        payloads = build_payloads(repo.root, repo.files)
+        print(f"codings: {', '.join(CODINGS)}", file=sys.stderr)
+        print(format_rows(bench_compression(payloads, args.repeat)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Synthetic repository generator for the benchmark suite.
+
+``make_repo`` writes a deterministic tree of source files whose shape — file
+count, directory depth, file sizes and how many directories carry a
+``.gitignore`` — is set by a ``RepoSpec``.  Every ``.gitignore`` hides a
+``build/`` directory and a few ``*.gen.*`` files next to it, so the scanner
+has real ignore rules to evaluate and real files to skip.
+"""
+import json
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Extensions written by the generator, with the line template of each.
+_TEMPLATES: dict[str, str] = {
+    "py": "    {name} = compute_{word}({arg}, {num})  # {word}",
+    "ts": "  const {name}: number = compute{Word}({arg}, {num}); // {word}",
+    "go": "\t{name} := compute{Word}({arg}, {num}) // {word}",
+    "rs": "    let {name} = compute_{word}({arg}, {num}); // {word}",
+    "java": "        int {name} = compute{Word}({arg}, {num}); // {word}",
+    "js": "  let {name} = compute{Word}({arg}, {num}); // {word}",
+}
+_WORDS: tuple[str, ...] = (
+    "alpha", "bravo", "cache", "delta", "event", "frame", "graph", "index",
+    "joint", "kernel", "layer", "merge", "node", "order", "parse", "query",
+    "range", "state", "token", "value", "width", "yield", "zone", "buffer",
+)
+# Files with generated content hidden by each ``.gitignore``.
+_IGNORED_PER_GITIGNORE: int = 3
+# Marker written next to a generated tree, recording the spec it was built from.
+SPEC_FILE: str = ".synth-spec.json"
+
+
+# ---------------------------------------------------------------------------
+# Spec
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class RepoSpec:
+    """Shape of a synthetic repository.
+
+    Attributes:
+        files: Number of visible (not gitignored) source files.
+        depth: Maximum directory nesting below the root.
+        fanout: Subdirectories per directory.
+        min_lines: Fewest lines in a file.
+        max_lines: Most lines in a file.
+        gitignore_density: Fraction of directories that get a ``.gitignore``.
+        seed: Random seed; equal specs produce identical trees.
+    """
+
+    files: int = 1000
+    depth: int = 4
+    fanout: int = 4
+    min_lines: int = 20
+    max_lines: int = 200
+    gitignore_density: float = 0.1
+    seed: int = 0
+
+    def key(self) -> str:
+        """Return a stable string identifying the spec."""
+        return json.dumps(asdict(self), sort_keys=True)
+
+
+@dataclass
+class SynthRepo:
+    """A generated repository.
+
+    Attributes:
+        root: Root directory of the tree.
+        spec: Spec the tree was generated from.
+        files: Relative paths of the visible source files, sorted.
+        ignored: Number of files hidden by ``.gitignore`` rules.
+        gitignores: Number of ``.gitignore`` files written.
+    """
+
+    root: Path
+    spec: RepoSpec
+    files: list[str]
+    ignored: int
+    gitignores: int
+
+
+# ---------------------------------------------------------------------------
+# Generation
+# ---------------------------------------------------------------------------
+
+
+def _directories(spec: RepoSpec) -> list[str]:
+    """Return the relative directories of the tree, breadth first ("" is the root)."""
+    dirs = [""]
+    level = [""]
+    for _ in range(spec.depth):
+        level = [
+            f"{parent}/d{idx}" if parent else f"d{idx}"
+            for parent in level
+            for idx in range(spec.fanout)
+        ]
+        dirs.extend(level)
+        # Stop growing once every directory would hold fewer than two files.
+        if len(dirs) * 2 > spec.files:
+            break
+    return dirs
+
+
+def _source(rng: random.Random, ext: str, num_lines: int) -> str:
+    template = _TEMPLATES[ext]
+    lines = []
+    for idx in range(num_lines):
+        if idx % 12 == 11:
+            lines.append("")
+            continue
+        word = rng.choice(_WORDS)
+        lines.append(template.format(
+            name=f"{rng.choice(_WORDS)}_{idx}",
+            word=word,
+            Word=word.capitalize(),
+            arg=rng.choice(_WORDS),
+            num=rng.randrange(10_000),
+        ))
+    return "\n".join(lines) + "\n"
+
+
+def make_repo(root: str | Path, spec: RepoSpec) -> SynthRepo:
+    """Generate the tree described by *spec* under *root*.
+
+    A tree already generated from the same spec is reused as is.
+
+    Args:
+        root: Directory to write into; created if missing.
+        spec: Shape of the tree.
+
+    Returns:
+        The generated repository.
+    """
+    root = Path(root)
+    rng = random.Random(spec.seed)
+    dirs = _directories(spec)
+    exts = sorted(_TEMPLATES)
+    placed = [
+        (dirs[rng.randrange(len(dirs))], exts[idx % len(exts)]) for idx in range(spec.files)
+    ]
+    ignoring = sorted(rng.sample(dirs, min(len(dirs), round(len(dirs) * spec.gitignore_density))))
+    files = sorted(
+        f"{directory}/f{idx}.{ext}" if directory else f"f{idx}.{ext}"
+        for idx, (directory, ext) in enumerate(placed)
+    )
+    repo = SynthRepo(
+        root=root,
+        spec=spec,
+        files=files,
+        ignored=len(ignoring) * _IGNORED_PER_GITIGNORE * 2,
+        gitignores=len(ignoring),
+    )
+
+    marker = root / SPEC_FILE
+    if marker.is_file() and marker.read_text(encoding="utf-8") == spec.key():
+        return repo
+
+    root.mkdir(parents=True, exist_ok=True)
+    for directory in dirs:
+        (root / directory).mkdir(parents=True, exist_ok=True)
+    for rel in files:
+        ext = rel.rsplit(".", 1)[1]
+        num_lines = rng.randint(spec.min_lines, spec.max_lines)
+        (root / rel).write_text(_source(rng, ext, num_lines), encoding="utf-8")
+    for directory in ignoring:
+        base = root / directory
+        (base / ".gitignore").write_text("build/\n*.gen.*\n", encoding="utf-8")
+        (base / "build").mkdir(exist_ok=True)
+        for idx in range(_IGNORED_PER_GITIGNORE):
+            body = _source(rng, "py", spec.max_lines)
+            (base / f"out{idx}.gen.py").write_text(body, encoding="utf-8")
+            (base / "build" / f"bundle{idx}.js").write_text(body, encoding="utf-8")
+    marker.write_text(spec.key(), encoding="utf-8")
+    return repo
@@ -0,0 +1,110 @@
+"""Tests for the benchmark harness itself (generator, runner and baseline checks)."""
+import json
+from pathlib import Path
+
+from codeguessr.game import REVEAL_STAGES, scan_directory
+from tests.perf.bench import BASELINE_FORMAT, compare, main, run_benchmarks
+from tests.perf.compress_bench import bench_compression, build_payloads
+from tests.perf.synth import SPEC_FILE, RepoSpec, make_repo
+
+
+def _doc(median_ms: float, metric: str = "scan_directory") -> dict:
+    return {
+        "format": BASELINE_FORMAT,
+        "results": {"100": {"metrics": {metric: {"runs": 1, "median_ms": median_ms, "min_ms": 0}}}},
+    }
+
+
+class TestMakeRepo:
+    def test_scan_finds_exactly_the_visible_files(self, tmp_path: Path) -> None:
+        """Verify that scan_directory returns the generated files and skips gitignored ones."""
+        repo = make_repo(tmp_path, RepoSpec(files=120, gitignore_density=0.5))
+        assert repo.gitignores > 0
+        assert len(list(tmp_path.rglob("*.gen.py"))) > 0
+        assert scan_directory(tmp_path) == repo.files
+
+    def test_same_spec_is_deterministic_and_reused(self, tmp_path: Path) -> None:
+        """Verify that equal specs describe the same tree and an existing tree is not rewritten."""
+        spec = RepoSpec(files=40, seed=3)
+        first = make_repo(tmp_path, spec)
+        target = tmp_path / first.files[0]
+        target.write_text("changed\n", encoding="utf-8")
+        second = make_repo(tmp_path, spec)
+        assert second.files == first.files
+        assert target.read_text(encoding="utf-8") == "changed\n"
+        assert (tmp_path / SPEC_FILE).is_file()
+
+    def test_depth_is_bounded(self, tmp_path: Path) -> None:
+        """Verify that no file is nested deeper than the spec's depth."""
+        repo = make_repo(tmp_path, RepoSpec(files=200, depth=2, fanout=3))
+        assert max(rel.count("/") for rel in repo.files) <= 2
+
+
+class TestCompare:
+    def test_slowdown_over_threshold_is_a_regression(self) -> None:
+        """Verify that a median slower than the threshold allows is reported."""
+        regressions = compare(_doc(13.0), _doc(10.0), threshold=0.25)
+        assert [(reg.scale, reg.metric) for reg in regressions] == [("100", "scan_directory")]
+        assert regressions[0].ratio == 1.3
+
+    def test_slowdown_within_threshold_passes(self) -> None:
+        """Verify that a slowdown within the threshold is not reported."""
+        assert compare(_doc(12.0), _doc(10.0), threshold=0.25) == []
+
+    def test_slowdown_below_noise_floor_passes(self) -> None:
+        """Verify that tiny absolute slowdowns are ignored however large the ratio."""
+        assert compare(_doc(0.002), _doc(0.001), threshold=0.25, floor_ms=0.005) == []
+
+    def test_unknown_metrics_are_skipped(self) -> None:
+        """Verify that metrics missing from the baseline are not compared."""
+        assert compare(_doc(50.0, "new_metric"), _doc(10.0)) == []
+
+
+class TestRunBenchmarks:
+    def test_reports_every_metric(self, tmp_path: Path) -> None:
+        """Verify that a small run times every benchmarked operation and stage."""
+        doc = run_benchmarks([60], tmp_path, RepoSpec(max_lines=60), repeat=1)
+        result = doc["results"]["60"]
+        assert result["found"] == 60
+        assert set(result["metrics"]) == {
+            "scan_directory", "pick_highlight", "GameSession.create",
+            "submit_guess[wrong]", "submit_guess[correct]",
+            *(f"get_code_display[{stage}]" for stage in REVEAL_STAGES),
+        }
+        assert all(timing["median_ms"] >= 0 for timing in result["metrics"].values())
+
+    def test_check_mode_exits_nonzero_on_regression(self, tmp_path: Path) -> None:
+        """Verify that --check fails against a baseline that every metric is slower than."""
+        baseline = tmp_path / "baseline.json"
+        argv = ["--scales", "30", "--repeat", "1", "--max-lines", "40", "--workdir", str(tmp_path)]
+        assert main([*argv, "--save", str(baseline)]) == 0
+
+        doc = json.loads(baseline.read_text(encoding="utf-8"))
+        for timing in doc["results"]["30"]["metrics"].values():
+            timing["median_ms"] = 1e-9
+        baseline.write_text(json.dumps(doc), encoding="utf-8")
+        assert main([*argv, "--check", str(baseline)]) == 1
+
+    def test_check_records_a_missing_baseline(self, tmp_path: Path) -> None:
+        """Verify that --check against a missing baseline records this run and passes."""
+        baseline = tmp_path / "baselines" / "engine.json"
+        argv = ["--scales", "30", "--repeat", "1", "--max-lines", "40", "--workdir", str(tmp_path)]
+        assert main([*argv, "--check", str(baseline)]) == 0
+        doc = json.loads(baseline.read_text(encoding="utf-8"))
+        assert "30" in doc["results"]
+
+
+class TestCompressionBench:
+    def test_reports_every_payload_and_coding(self, tmp_path: Path) -> None:
+        """Verify that every payload is compressed by every coding, spliced for new games."""
+        repo = make_repo(tmp_path, RepoSpec(files=60, max_lines=60))
+        payloads = build_payloads(repo.root, repo.files)
+        rows = bench_compression(payloads, repeat=1)
+        assert {row["payload"] for row in rows} == {
+            "file_list", "new_game", *(f"code_display[{stage}]" for stage in REVEAL_STAGES),
+        }
+        assert any(row["mode"] == "gzip-spliced" for row in rows)
+        by_key = {(row["payload"], row["mode"]): row for row in rows}
+        # Obscured code compresses far better than the revealed file.
+        assert (by_key["code_display[-1]", "gzip-5"]["ratio"]
+                > by_key["code_display[None]", "gzip-5"]["ratio"])
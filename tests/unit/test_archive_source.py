@@ -0,0 +1,119 @@
+"""Unit tests for TarSource, ZipSource and scanning archives."""
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from codeguessr.content import ContentStore
+from codeguessr.game import GameSession, scan_directory
+from codeguessr.sources import TarSource, ZipSource, is_source, open_source
+from codeguessr.table import scan_table
+from codeguessr.treesample import sample_directory
+from tests.helpers import make_file
+
+
+@pytest.fixture()
+def tree(tmp_path: Path) -> Path:
+    """Return a small code tree under ``project-1.0/``."""
+    top = tmp_path / "project-1.0"
+    make_file(top / "main.py")
+    make_file(top / "src" / "app.ts")
+    make_file(top / "src" / "deep" / "lib.go", num_lines=40)
+    make_file(top / "short.py", num_lines=3)
+    make_file(top / "node_modules" / "dep.js")
+    (top / "logo.png").write_bytes(b"\x89PNG\0\0\0")
+    return top
+
+
+def _make_tar(tree: Path, path: Path, mode: str) -> Path:
+    """Archive *tree* (with its top-level directory) into *path*."""
+    with tarfile.open(path, mode) as tar:
+        tar.add(tree, arcname=tree.name)
+    return path
+
+
+def _make_zip(tree: Path, path: Path, compression: int) -> Path:
+    """Zip *tree* (with its top-level directory) into *path*."""
+    with zipfile.ZipFile(path, "w", compression=compression) as archive:
+        for file in sorted(tree.rglob("*")):
+            archive.write(file, f"{tree.name}/{file.relative_to(tree).as_posix()}")
+    return path
+
+
+@pytest.fixture(params=[
+    ("code.tar", "w"),
+    ("code.tar.gz", "w:gz"),
+    ("code.tar.xz", "w:xz"),
+    ("code.zip", zipfile.ZIP_STORED),
+    ("code.zip", zipfile.ZIP_DEFLATED),
+])
+def archive(request: pytest.FixtureRequest, tree: Path, tmp_path: Path) -> Path:
+    """Return *tree* archived in each supported format."""
+    name, mode = request.param
+    if name.endswith(".zip"):
+        return _make_zip(tree, tmp_path / name, mode)
+    return _make_tar(tree, tmp_path / name, mode)
+
+
+class TestArchiveSource:
+    def test_scan_matches_directory(self, archive: Path, tree: Path) -> None:
+        """Verify that scanning an archive equals scanning the extracted tree."""
+        assert is_source(archive)
+        assert scan_directory(archive) == scan_directory(tree)
+
+    def test_reads_members(self, archive: Path, tree: Path) -> None:
+        """Verify member contents, heads and sizes, with the top directory stripped."""
+        source = open_source(archive)
+        assert source is not None
+        expected = (tree / "src" / "deep" / "lib.go").read_bytes()
+        assert source.read("src/deep/lib.go") == expected
+        assert source.read("src/deep/lib.go", limit=10) == expected[:10]
+        assert source.stat("src/deep/lib.go").st_size == len(expected)
+        with pytest.raises(FileNotFoundError):
+            source.read("project-1.0/main.py")
+
+    def test_reopens_after_close(self, archive: Path) -> None:
+        """Verify that a closed source reopens on the next read."""
+        source = open_source(archive)
+        assert source is not None
+        first = source.read("main.py")
+        source.close()
+        assert source.read("main.py") == first
+
+    def test_table_sample_and_game(self, archive: Path) -> None:
+        """Verify that the table scanner, the sampler and games read archives."""
+        table = scan_table(archive)
+        assert table.paths == ["main.py", "short.py", "src/app.ts", "src/deep/lib.go"]
+        assert sorted(sample_directory(archive, sample_size=10)) == [
+            "main.py", "src/app.ts", "src/deep/lib.go"
+        ]
+        session = GameSession.create(str(archive), ["src/deep/lib.go"], num_rounds=1)
+        assert session.current_round_payload()["code_display"].count("\n") == 39
+
+    def test_content_store_reads_archive(self, archive: Path) -> None:
+        """Verify that the content store resolves paths inside an archive."""
+        open_source(archive)
+        store = ContentStore()
+        assert len(store.read(archive / "main.py").lines) == 25
+        assert store.sniff(archive / "main.py").binary is False
+
+
+class TestArchiveErrors:
+    def test_corrupt_archives_raise(self, tmp_path: Path) -> None:
+        """Verify that unreadable archives raise OSError when opened."""
+        for name, cls in (("bad.tar.gz", TarSource), ("bad.zip", ZipSource)):
+            path = tmp_path / name
+            path.write_bytes(b"not an archive at all" * 50)
+            with pytest.raises(OSError):
+                cls(str(path), str(path))
+
+    def test_archive_without_common_top_directory(self, tmp_path: Path) -> None:
+        """Verify that member paths are kept when there is no shared top directory."""
+        make_file(tmp_path / "flat" / "a.py")
+        make_file(tmp_path / "flat" / "pkg" / "b.py")
+        path = tmp_path / "flat.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.write(tmp_path / "flat" / "a.py", "a.py")
+            archive.write(tmp_path / "flat" / "pkg" / "b.py", "pkg/b.py")
+        assert scan_directory(path) == ["a.py", "pkg/b.py"]
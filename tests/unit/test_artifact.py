@@ -0,0 +1,148 @@
+"""Unit tests for prebuilt scan artifacts and the ``codeguessr index`` command."""
+import struct
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from codeguessr.artifact import (
+    INDEX_VERSION,
+    MappedIndex,
+    SharedHighlights,
+    build_index,
+    build_sample_index,
+    iter_map_index,
+    read_index_meta,
+)
+from codeguessr.cli import main
+from codeguessr.game import HighlightIndex, scan_directory
+from codeguessr.neardup import NearDuplicateIndex
+from codeguessr.table import COLUMNS, FileTable, scan_table
+from tests.helpers import make_file
+
+
+def _make_tree(root: Path) -> None:
+    """Populate *root* with a few files of different lengths."""
+    make_file(root / "main.py", num_lines=30)
+    make_file(root / "short.py", num_lines=4)
+    make_file(root / "src" / "app.ts", num_lines=70)
+    make_file(root / "src" / "big.go", num_lines=1200)
+    (root / "src" / "empty.rs").write_text("", encoding="utf-8")
+    (root / ".gitignore").write_text("ignored.py\n", encoding="utf-8")
+    make_file(root / "ignored.py")
+
+
+def _map_paths(root: Path, index_path: Path) -> list[str]:
+    """Return the paths the artifact scanner yields for *index_path*."""
+    table = FileTable()
+    return list(iter_map_index(root, table, index_path, SharedHighlights(table)))
+
+
+class TestArtifact:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        """Verify that a mapped artifact reproduces the scan it was built from."""
+        _make_tree(tmp_path / "code")
+        path = tmp_path / "code.idx"
+        built, size = build_index(tmp_path / "code", path)
+        assert size == path.stat().st_size
+
+        table = FileTable()
+        highlights = SharedHighlights(table)
+        near_dups = NearDuplicateIndex()
+        list(iter_map_index(tmp_path / "code", table, path, highlights, near_dups=near_dups))
+        meta = read_index_meta(path)
+        assert meta["rows"] == len(built)
+        assert meta["root"] == str(tmp_path / "code")
+        assert table.paths == built.paths
+        assert "ignored.py" not in table.paths
+        for name in COLUMNS:
+            assert list(getattr(table, name)) == list(getattr(built, name))
+        assert isinstance(table.line_counts, memoryview)
+
+        expected: dict[str, HighlightIndex] = {}
+        scan_table(tmp_path / "code", highlights=expected)
+        assert sorted(highlights) == sorted(expected)
+        assert "missing.py" not in highlights
+        for rel, index in expected.items():
+            loaded = highlights[rel]
+            assert loaded.line_count == index.line_count
+            assert list(loaded.middle) == list(index.middle)
+            assert list(loaded.lengths) == list(index.lengths)
+            assert list(loaded.bucket_starts) == list(index.bucket_starts)
+            assert list(loaded.outer) == list(index.outer)
+        assert near_dups.signature("main.py") is not None
+        assert near_dups.signature("src/empty.rs") is None
+
+    def test_loader_matches_scan(self, tmp_path: Path) -> None:
+        """Verify that the artifact scanner yields what a directory scan returns."""
+        _make_tree(tmp_path / "code")
+        build_index(tmp_path / "code", tmp_path / "code.idx")
+        loaded = _map_paths(tmp_path / "code", tmp_path / "code.idx")
+        assert loaded == scan_directory(tmp_path / "code")
+
+    def test_empty_tree(self, tmp_path: Path) -> None:
+        """Verify that an artifact of an empty tree maps as an empty table."""
+        (tmp_path / "code").mkdir()
+        build_index(tmp_path / "code", tmp_path / "code.idx")
+        table = FileTable()
+        MappedIndex(tmp_path / "code.idx").fill_table(table)
+        assert table.paths == []
+
+    def test_rejects_other_versions_and_files(self, tmp_path: Path) -> None:
+        """Verify that foreign files and other format versions raise ValueError."""
+        _make_tree(tmp_path / "code")
+        path = tmp_path / "code.idx"
+        build_index(tmp_path / "code", path)
+        data = bytearray(path.read_bytes())
+        struct.pack_into("<I", data, 8, INDEX_VERSION + 1)
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError, match="rebuild"):
+            read_index_meta(path)
+        path.write_bytes(b"\0" * 64)
+        with pytest.raises(ValueError, match="not a CodeGuessr index"):
+            MappedIndex(path)
+
+    def test_sample_index(self, tmp_path: Path) -> None:
+        """Verify that a sampled artifact holds exactly the sampled, eligible files."""
+        _make_tree(tmp_path / "code")
+        for i in range(20):
+            make_file(tmp_path / "code" / "pkg" / f"m{i}.py")
+        built, _ = build_sample_index(tmp_path / "code", tmp_path / "code.idx", sample_size=8)
+        assert len(built) == 8
+        assert set(built.paths) <= set(scan_directory(tmp_path / "code"))
+        assert _map_paths(tmp_path / "code", tmp_path / "code.idx") == built.paths
+
+
+class TestMappedIndex:
+    def test_assigned_highlights_take_precedence(self, tmp_path: Path) -> None:
+        """Verify that entries assigned after mapping shadow the artifact's."""
+        _make_tree(tmp_path / "code")
+        build_index(tmp_path / "code", tmp_path / "code.idx")
+        table = FileTable()
+        highlights = SharedHighlights(table)
+        list(iter_map_index(tmp_path / "code", table, tmp_path / "code.idx", highlights))
+        replacement = HighlightIndex.build(["x = 1"] * 40)
+        highlights["main.py"] = replacement
+        highlights["new.py"] = replacement
+        assert highlights["main.py"] is replacement
+        assert "new.py" in highlights
+        assert highlights.private() == {"main.py": replacement, "new.py": replacement}
+        del highlights["new.py"]
+        assert "new.py" not in highlights
+
+
+class TestIndexCommand:
+    def test_index_command_writes_artifact(self, tmp_path: Path) -> None:
+        """Verify that ``codeguessr index`` writes a loadable artifact."""
+        _make_tree(tmp_path / "code")
+        out = tmp_path / "out.idx"
+        result = CliRunner().invoke(main, ["index", str(tmp_path / "code"), "-o", str(out)])
+        assert result.exit_code == 0, result.output
+        assert "Indexed 5 files" in result.output
+        assert read_index_meta(out)["rows"] == 5
+
+    def test_directory_without_subcommand_runs_serve(self, tmp_path: Path) -> None:
+        """Verify that ``codeguessr DIR`` is still parsed as ``serve DIR``."""
+        result = CliRunner().invoke(main, [str(tmp_path / "missing")])
+        assert result.exit_code == 2
+        assert "is not a directory" in result.output
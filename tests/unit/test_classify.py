@@ -0,0 +1,118 @@
+"""Unit tests for file pre-classification."""
+from pathlib import Path
+
+import pytest
+
+from codeguessr.classify import (
+    BINARY,
+    GENERATED,
+    MINIFIED,
+    OVERSIZED,
+    SNIFF_BYTES,
+    SOURCE,
+    ClassifyLimits,
+    Sniff,
+)
+from codeguessr.content import ContentStore, default_store
+from codeguessr.game import HighlightIndex, scan_directory
+from codeguessr.table import FLAG_UNREAD, load_unread, scan_table
+from tests.helpers import make_file
+
+
+def _make_tree(root: Path) -> None:
+    """Populate *root* with one file of every classification.
+
+    Args:
+        root: Directory in which to create the files.
+    """
+    make_file(root / "main.py", num_lines=30)
+    (root / "blob.c").write_bytes(b"int x;\n" * 20 + b"\0\1\2" * 100)
+    (root / "gen.go").write_text(
+        "// Code generated by protoc-gen-go. DO NOT EDIT.\n" + "var x = 1\n" * 20,
+        encoding="utf-8",
+    )
+    (root / "bundle.js").write_text("var a=1;" * 500 + "\n" + "x\n" * 20, encoding="utf-8")
+
+
+class TestSniff:
+    @pytest.mark.parametrize(
+        ("head", "expected"),
+        [
+            (b"def f():\n    return 1\n", SOURCE),
+            (b"abc\0def\n", BINARY),
+            (b"\x01\x02\x03\x04abc", BINARY),
+            (b"# @generated by tool\nx = 1\n", GENERATED),
+            (b"/* This file was automatically generated */\n", GENERATED),
+            (b"#!/usr/bin/env python\n\n# Generated by protoc.  DO NOT EDIT!\n", GENERATED),
+            (b"/*\n * Copyright 2020\n *\n * @generated\n */\npackage x\n", GENERATED),
+            (b'"""Loads the auto-generated client stubs."""\nimport x\n', SOURCE),
+            (b"import re\n\n# Lines saying 'do not edit' are kept.\nx = 1\n", SOURCE),
+            (b'MARKER = "// Code generated by tool. DO NOT EDIT."\n', SOURCE),
+            (b"x" * 2000 + b"\n", MINIFIED),
+            (b"y" * 300 + b"\n" + b"z" * 300, MINIFIED),
+        ],
+    )
+    def test_classify_head(self, head: bytes, expected: str) -> None:
+        """Verify the verdict for representative file heads."""
+        assert ClassifyLimits().classify(Sniff.from_head(head, len(head))) == expected
+
+    def test_oversized(self) -> None:
+        """Verify that files above max_file_bytes are rejected as oversized."""
+        sniff = Sniff.from_head(b"x = 1\n", 10_000)
+        assert ClassifyLimits(max_file_bytes=1000).classify(sniff) == OVERSIZED
+
+    def test_allow_generated(self) -> None:
+        """Verify that allow_generated keeps files with a generated marker."""
+        sniff = Sniff.from_head(b"// DO NOT EDIT\nx := 1\n", 20)
+        assert ClassifyLimits(allow_generated=True).accepts(sniff)
+
+    def test_store_reads_only_the_head(self, tmp_path: Path) -> None:
+        """Verify that sniffing a large file reads at most SNIFF_BYTES."""
+        path = tmp_path / "big.js"
+        path.write_bytes(b"x" * (SNIFF_BYTES * 4))
+        store = ContentStore()
+        assert store.sniff(path).size == SNIFF_BYTES * 4
+        assert store.stats.bytes_sniffed == SNIFF_BYTES
+        assert store.stats.bytes_read == 0
+
+
+class TestScanClassification:
+    def test_scan_rejects_non_source_files(self, tmp_path: Path) -> None:
+        """Verify that binary, generated and minified files are skipped by default."""
+        _make_tree(tmp_path)
+        assert scan_directory(tmp_path) == ["main.py"]
+
+    def test_table_honours_per_request_limits(self, tmp_path: Path) -> None:
+        """Verify that relaxed limits on the table match a scan with the same limits."""
+        _make_tree(tmp_path)
+        table = scan_table(tmp_path)
+        limits = ClassifyLimits(max_line_length=10_000, max_avg_line_length=10_000,
+                                allow_generated=True)
+        assert "blob.c" not in table.paths
+        assert load_unread(tmp_path, table, limits) == 2
+        assert table.select(limits=limits) == ["bundle.js", "gen.go", "main.py"]
+        assert table.select() == ["main.py"]
+
+    def test_rejected_files_are_tagged_without_reading(self, tmp_path: Path) -> None:
+        """Verify that files the default limits reject get unread rows and no full read."""
+        _make_tree(tmp_path)
+        default_store().clear()
+        highlights: dict[str, HighlightIndex] = {}
+        with ContentStore.measure() as content:
+            table = scan_table(tmp_path, highlights=highlights)
+        read = {Path(path).name for path in content.per_path}
+        assert read == {"main.py"}
+        assert set(highlights) == {"main.py"}
+        unread = {table.paths[idx] for idx in range(len(table)) if table.flags[idx] & FLAG_UNREAD}
+        assert unread == {"bundle.js", "gen.go"}
+        assert table.select(limits=ClassifyLimits(allow_generated=True)) == ["main.py"]
+
+    def test_unread_rows_load_only_when_admitted(self, tmp_path: Path) -> None:
+        """Verify that load_unread reads only the rows the given limits admit."""
+        _make_tree(tmp_path)
+        table = scan_table(tmp_path)
+        highlights: dict[str, HighlightIndex] = {}
+        assert load_unread(tmp_path, table, ClassifyLimits(allow_generated=True), highlights) == 1
+        assert set(highlights) == {"gen.go"}
+        assert table.select(limits=ClassifyLimits(allow_generated=True)) == ["gen.go", "main.py"]
+        assert load_unread(tmp_path, table, ClassifyLimits(allow_generated=True)) == 0
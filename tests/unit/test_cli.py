@@ -0,0 +1,30 @@
+"""Unit tests for the CLI module's import cost and option defaults."""
+from codeguessr import cli
+from codeguessr.profiling import PROFILE_RING_SIZE
+from codeguessr.roots import ROOT_MEMORY_BUDGET
+from codeguessr.startup import measure_imports
+
+# Most milliseconds ``import codeguessr.cli`` may take in a fresh interpreter
+# (about 40 ms when this was written, dominated by click).
+CLI_IMPORT_BUDGET_MS: float = 200.0
+# Modules that only the commands themselves may import.
+DEFERRED_MODULES: frozenset[str] = frozenset({
+    "uvicorn", "fastapi", "starlette", "pydantic", "httpx", "numpy", "pathspec",
+    "codeguessr.game", "codeguessr.server", "codeguessr.roots", "codeguessr.artifact",
+    "codeguessr.loadtest", "codeguessr.sources",
+})
+
+
+class TestCliImport:
+    def test_import_stays_within_budget(self) -> None:
+        """Verify that importing the CLI defers the server stack and stays fast."""
+        timings = measure_imports("import codeguessr.cli")
+        loaded = {timing.name for timing in timings}
+        assert not loaded & DEFERRED_MODULES
+        (cli_import,) = [timing for timing in timings if timing.name == "codeguessr.cli"]
+        assert cli_import.cumulative_us / 1000 < CLI_IMPORT_BUDGET_MS
+
+    def test_displayed_defaults_match_the_server(self) -> None:
+        """Verify that defaults repeated in the CLI equal the constants the server uses."""
+        assert cli.ROOT_BUDGET_MB_DEFAULT * 1024 * 1024 == ROOT_MEMORY_BUDGET
+        assert cli.PROFILE_KEEP_DEFAULT == PROFILE_RING_SIZE
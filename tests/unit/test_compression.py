@@ -0,0 +1,162 @@
+"""Unit tests for negotiated response compression (codings, splicing, middleware)."""
+import gzip
+import json
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from codeguessr.compression import (
+    CODINGS,
+    MIN_COMPRESS_BYTES,
+    CompressedJSONResponse,
+    CompressionMiddleware,
+    compress_parts,
+    negotiate,
+    precompressed,
+)
+from codeguessr.jsonenc import Fragment, encode_parts, join_parts
+
+GZIP = CODINGS["gzip"]
+OBSCURED = "\n".join("█" * (20 + i % 40) for i in range(400))
+
+
+def _payload() -> dict[str, object]:
+    files = [f"src/pkg{i % 7}/module_{i}.py" for i in range(2000)]
+    return {"game_id": "g", "code_display": OBSCURED, "files": Fragment.of(files), "n": 1}
+
+
+class TestNegotiate:
+    def test_gzip_is_always_available(self) -> None:
+        """Verify that a gzip-only client gets gzip."""
+        coding = negotiate("gzip, deflate")
+        assert coding is not None and coding.name == "gzip"
+
+    def test_quality_values(self) -> None:
+        """Verify that q=0 refuses a coding and unknown or refused codings yield None."""
+        assert negotiate("gzip;q=0") is None
+        assert negotiate("identity") is None
+        assert negotiate("") is None
+        coding = negotiate("*;q=0.5")
+        assert coding is not None and coding.name == next(iter(CODINGS))
+
+    def test_preference_order_breaks_ties(self) -> None:
+        """Verify that equal quality values go to the most preferred coding."""
+        coding = negotiate(", ".join(reversed(CODINGS)))
+        assert coding is not None and coding.name == next(iter(CODINGS))
+
+    def test_spliceable_codings_preferred_for_fragments(self) -> None:
+        """Verify that bodies with fragments prefer a coding that can splice them."""
+        coding = negotiate("br, gzip", prefer_spliceable=True)
+        assert coding is not None and coding.spliceable
+
+
+class TestSplicing:
+    def test_gzip_splice_round_trip(self) -> None:
+        """Verify that a spliced gzip body decompresses to the encoded payload."""
+        parts = encode_parts(_payload())
+        body = compress_parts(parts, GZIP)
+        assert gzip.decompress(body) == join_parts(parts)
+        assert json.loads(gzip.decompress(body))["n"] == 1
+
+    def test_fragment_compressed_once(self) -> None:
+        """Verify that a fragment's compressed form is cached and reused."""
+        payload = _payload()
+        fragment = payload["files"]
+        assert isinstance(fragment, Fragment)
+        compress_parts(encode_parts(payload), GZIP)
+        cached = fragment.variants["gzip"]
+        payload["game_id"] = "other"
+        body = compress_parts(encode_parts(payload), GZIP)
+        assert precompressed(fragment, GZIP) is cached
+        assert cached in body
+
+    def test_several_fragments_and_empty_parts(self) -> None:
+        """Verify splicing with adjacent fragments and empty byte strings."""
+        parts: list[bytes | Fragment] = [
+            b"", Fragment(b"[1,2]"), Fragment(b'"x"' * 500), b"", b"tail",
+        ]
+        assert gzip.decompress(compress_parts(parts, GZIP)) == join_parts(parts)
+
+    @pytest.mark.parametrize("name", ["zstd", "br"])
+    def test_optional_codings_round_trip(self, name: str) -> None:
+        """Verify the optional codings when their packages are installed."""
+        if name not in CODINGS:
+            pytest.skip(f"{name} support is not installed")
+        parts = encode_parts(_payload())
+        body = compress_parts(parts, CODINGS[name])
+        if name == "zstd":
+            zstandard = pytest.importorskip("zstandard")
+            reader = zstandard.ZstdDecompressor().stream_reader(body, read_across_frames=True)
+            assert reader.read() == join_parts(parts)
+        else:
+            brotli = pytest.importorskip("brotli")
+            assert brotli.decompress(body) == join_parts(parts)
+
+
+async def _json(request: Request) -> Response:
+    size = int(request.query_params.get("size", "0"))
+    return CompressedJSONResponse({"code_display": "█" * size})
+
+
+async def _text(request: Request) -> Response:
+    media_type = request.query_params.get("type", "text/plain")
+    return PlainTextResponse(OBSCURED, media_type=media_type)
+
+
+async def _stream(request: Request) -> Response:
+    async def chunks() -> AsyncIterator[bytes]:
+        for _ in range(20):
+            yield OBSCURED.encode()
+
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+def _client() -> TestClient:
+    app = Starlette(routes=[
+        Route("/json", _json), Route("/text", _text), Route("/stream", _stream),
+    ])
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+class TestResponses:
+    def test_large_json_is_compressed(self) -> None:
+        """Verify that a JSON response over the threshold is sent gzip-encoded."""
+        res = _client().get("/json?size=5000", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert "accept-encoding" in res.headers["vary"].lower()
+        assert int(res.headers["content-length"]) < 5000
+        assert res.json() == {"code_display": "█" * 5000}
+
+    def test_small_json_is_not_compressed(self) -> None:
+        """Verify that a body under the threshold is sent as it is."""
+        res = _client().get("/json?size=10", headers={"Accept-Encoding": "gzip"})
+        assert len(res.content) < MIN_COMPRESS_BYTES
+        assert "content-encoding" not in res.headers
+
+    def test_client_without_accept_encoding(self) -> None:
+        """Verify that nothing is compressed for a client that accepts no coding."""
+        res = _client().get("/text", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in res.headers
+        assert res.text == OBSCURED
+
+    def test_middleware_compresses_text_and_streams(self) -> None:
+        """Verify that plain and streamed text responses are compressed by the middleware."""
+        client = _client()
+        res = client.get("/text", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.text == OBSCURED
+        res = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert "content-length" not in res.headers
+        assert res.text == OBSCURED * 20
+
+    def test_incompressible_types_pass_through(self) -> None:
+        """Verify that content types outside the compressible list are not compressed."""
+        res = _client().get("/text?type=image/png", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in res.headers
@@ -0,0 +1,156 @@
+"""Unit tests for ContentStore."""
+import os
+from pathlib import Path
+
+import pytest
+
+from codeguessr.content import ContentStore, default_store
+from codeguessr.game import HighlightIndex, scan_directory
+from tests.helpers import make_file
+
+
+class TestContentStore:
+    def test_second_read_is_a_cache_hit(self, tmp_path: Path) -> None:
+        """Verify that an unchanged file is read from disk only once."""
+        path = make_file(tmp_path / "a.py", num_lines=3)
+        store = ContentStore()
+        first = store.read_lines(path)
+        assert store.read_lines(path) is first
+        assert store.stats.reads == 1
+        assert store.stats.hits == 1
+        assert store.stats.bytes_read == path.stat().st_size
+        assert store.stats.bytes_cached == path.stat().st_size
+
+    def test_modified_file_is_reread(self, tmp_path: Path) -> None:
+        """Verify that a change in mtime or size invalidates the cached lines."""
+        path = make_file(tmp_path / "a.py", num_lines=3)
+        store = ContentStore()
+        with store.measure() as content:
+            store.read_lines(path)
+            make_file(path, num_lines=5)
+            st = path.stat()
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            assert len(store.read_lines(path)) == 5
+        assert content.per_path[str(path)] == 2
+
+    def test_eviction_respects_byte_budget(self, tmp_path: Path) -> None:
+        """Verify that least recently used files are evicted to stay within the budget."""
+        paths = [tmp_path / f"f{i}.py" for i in range(3)]
+        for i, path in enumerate(paths):
+            path.write_text(f"x = {i}\n" * 10, encoding="utf-8")
+        size = paths[0].stat().st_size
+        store = ContentStore(max_bytes=2 * size)
+        with store.measure() as content:
+            for path in paths:
+                store.read(path)
+            assert store.cached_bytes == 2 * size
+            store.read(paths[0])
+        assert content.per_path[str(paths[0])] == 2
+
+    def test_path_entries_are_bounded(self, tmp_path: Path) -> None:
+        """Verify that stamps and sniffs beyond max_paths are forgotten, oldest first."""
+        paths = [make_file(tmp_path / f"f{i}.py", num_lines=3 + i) for i in range(3)]
+        store = ContentStore(max_paths=2)
+        with store.measure() as content:
+            for path in paths:
+                store.read(path)
+                store.sniff(path)
+            sniffed = store.stats.bytes_sniffed
+            store.read(paths[2])
+            store.sniff(paths[2])
+            assert content.per_path[str(paths[2])] == 1
+            assert store.stats.bytes_sniffed == sniffed
+            store.read(paths[0])
+            store.sniff(paths[0])
+        assert content.per_path[str(paths[0])] == 2
+        assert store.stats.bytes_sniffed > sniffed
+
+    def test_forget_drops_one_root(self, tmp_path: Path) -> None:
+        """Verify that forget drops the path entries under one root only."""
+        kept = make_file(tmp_path / "kept" / "a.py", num_lines=3)
+        dropped = make_file(tmp_path / "dropped" / "a.py", num_lines=4)
+        store = ContentStore()
+        with store.measure() as content:
+            for path in (kept, dropped):
+                store.read(path)
+            store.forget(tmp_path / "dropped")
+            store.read(kept)
+            store.read(dropped)
+        assert content.per_path == {str(kept): 1, str(dropped): 2}
+
+    def test_invalid_utf8_is_decoded_lossily(self, tmp_path: Path) -> None:
+        """Verify that undecodable bytes are dropped, flagged and counted."""
+        path = tmp_path / "a.py"
+        path.write_bytes(b"caf\xe9 = 1\n")
+        store = ContentStore()
+        source = store.read(path)
+        assert source.lossy
+        assert source.lines == ["caf = 1"]
+        assert store.stats.decode_errors == 1
+        assert not store.read(make_file(tmp_path / "b.py", num_lines=2)).lossy
+
+    def test_global_stats_keep_no_paths(self, tmp_path: Path) -> None:
+        """Verify that only measured stats record reads per path."""
+        path = make_file(tmp_path / "a.py", num_lines=3)
+        store = ContentStore()
+        store.read(path)
+        with store.measure() as content:
+            store.read(make_file(tmp_path / "b.py", num_lines=4))
+        assert store.stats.reads == 2
+        assert store.stats.per_path == {}
+        assert content.per_path == {str(tmp_path / "b.py"): 1}
+
+    def test_measure_collects_nested_requests(self, tmp_path: Path) -> None:
+        """Verify that reads are attributed to every active measure block."""
+        path = make_file(tmp_path / "a.py", num_lines=3)
+        store = ContentStore()
+        with store.measure() as outer:
+            store.read(path)
+            with store.measure() as inner:
+                store.read(path)
+        assert outer.as_dict()["reads"] == 1
+        assert outer.hits == 1
+        assert inner.reads == 0
+        assert inner.hits == 1
+
+    def test_missing_file_raises(self, tmp_path: Path) -> None:
+        """Verify that reading a missing file raises OSError."""
+        with pytest.raises(OSError):
+            ContentStore().read(tmp_path / "missing.py")
+
+    def test_identical_bodies_share_one_decode(self, tmp_path: Path) -> None:
+        """Verify that files with the same content share lines and derived values."""
+        first = make_file(tmp_path / "a" / "x.py", num_lines=5)
+        second = make_file(tmp_path / "b" / "y.py", num_lines=5)
+        store = ContentStore()
+        one, two = store.read(first), store.read(second)
+        assert one.digest == two.digest
+        assert one.lines is two.lines
+        assert store.stats.reads == 2
+        assert store.stats.shared == 1
+        assert store.stats.bytes_decoded == first.stat().st_size
+        assert store.cached_bytes == first.stat().st_size
+
+        calls: list[int] = []
+
+        def build(lines: list[str]) -> int:
+            calls.append(1)
+            return len(lines)
+
+        assert store.derive(one, "count", build) == 5
+        assert store.derive(two, "count", build) == 5
+        assert len(calls) == 1
+
+    def test_second_checkout_is_not_decoded_again(self, tmp_path: Path) -> None:
+        """Verify that scanning a copy of a tree reuses bodies and highlight indexes."""
+        for root in ("main", "branch"):
+            make_file(tmp_path / root / "a.py", num_lines=20)
+            make_file(tmp_path / root / "pkg" / "b.py", num_lines=30)
+        main: dict[str, HighlightIndex] = {}
+        branch: dict[str, HighlightIndex] = {}
+        scan_directory(tmp_path / "main", highlights=main)
+        with default_store().measure() as stats:
+            scan_directory(tmp_path / "branch", highlights=branch)
+        assert stats.bytes_decoded == 0
+        assert stats.shared == 2
+        assert all(branch[rel] is main[rel] for rel in main)
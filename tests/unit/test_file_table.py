@@ -0,0 +1,127 @@
+"""Unit tests for FileTable and the table scan."""
+from pathlib import Path
+
+import pytest
+
+from codeguessr import table as _table
+from codeguessr.game import FilterPlan, HighlightIndex, scan_directory
+from codeguessr.table import EXTENSIONS, FileTable, iter_scan_table, scan_table
+from tests.helpers import make_file
+
+
+@pytest.fixture(params=["numpy", "python"])
+def select_backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Run a test against both the NumPy and the pure-Python filter paths.
+
+    Args:
+        request: pytest request carrying the backend name.
+        monkeypatch: pytest monkeypatch fixture used to disable NumPy.
+
+    Returns:
+        The backend name.
+    """
+    if request.param == "numpy":
+        if not _table.HAVE_NUMPY:
+            pytest.skip("numpy not installed")
+    else:
+        monkeypatch.setattr(_table, "HAVE_NUMPY", False)
+    return str(request.param)
+
+
+def _make_tree(root: Path) -> None:
+    """Populate *root* with files of varying lengths and extensions.
+
+    Args:
+        root: Directory in which to create the files.
+    """
+    make_file(root / "main.py", num_lines=30)
+    make_file(root / "short.py", num_lines=5)
+    make_file(root / "src" / "app.ts", num_lines=12)
+    make_file(root / "src" / "app_test.ts", num_lines=40)
+    make_file(root / "lib" / "deep" / "util.go", num_lines=25)
+    make_file(root / "node_modules" / "dep.js")
+    (root / "notes.md").write_text("x\n" * 30, encoding="utf-8")
+
+
+class TestFileTable:
+    @pytest.mark.parametrize(
+        ("min_lines", "include", "ignore"),
+        [
+            (10, None, None),
+            (1, None, None),
+            (26, None, None),
+            (10, r"^src/", None),
+            (10, None, r"_test\."),
+            (1, r"\.ts$", r"test"),
+        ],
+    )
+    def test_select_matches_scan_directory(
+        self,
+        tmp_path: Path,
+        select_backend: str,
+        min_lines: int,
+        include: str | None,
+        ignore: str | None,
+    ) -> None:
+        """Verify that selecting from the table equals a fresh filtered scan."""
+        _make_tree(tmp_path)
+        table = scan_table(tmp_path)
+        expected = scan_directory(
+            tmp_path, min_lines=min_lines, include_pattern=include, ignore_pattern=ignore
+        )
+        assert table.select(min_lines, include, ignore) == expected
+
+    def test_extension_filter(self, tmp_path: Path, select_backend: str) -> None:
+        """Verify that the extension filter keeps only the requested extensions."""
+        _make_tree(tmp_path)
+        assert scan_table(tmp_path).select(min_lines=1, extensions=[".go"]) == [
+            "lib/deep/util.go"
+        ]
+
+    def test_columns_are_populated(self, tmp_path: Path) -> None:
+        """Verify the per-row metadata recorded by the scan."""
+        make_file(tmp_path / "lib" / "deep" / "util.go", num_lines=25)
+        table = scan_table(tmp_path)
+        assert table.paths == ["lib/deep/util.go"]
+        assert EXTENSIONS[table.ext_codes[0]] == ".go"
+        assert table.line_counts[0] == 25
+        assert table.nonempty_counts[0] == 25
+        assert table.depths[0] == 2
+        assert table.sizes[0] == (tmp_path / "lib" / "deep" / "util.go").stat().st_size
+        assert table.mtimes[0] > 0
+
+    def test_regex_mask_is_memoized(self, tmp_path: Path) -> None:
+        """Verify that a pattern is evaluated once and then served from the cache."""
+        _make_tree(tmp_path)
+        table = scan_table(tmp_path)
+        assert table.regex_mask(r"src") is table.regex_mask(r"src")
+
+    def test_append_invalidates_masks(self) -> None:
+        """Verify that adding rows drops stale regex masks."""
+        table = FileTable()
+        table.append("a.py", 10, ["x"], 0.0)
+        before = table.regex_mask("b")
+        table.append("b.py", 10, ["x"], 0.0)
+        assert table.regex_mask("b") is not before
+        assert list(table.regex_mask("b")) == [0, 1]
+
+    def test_scan_records_highlights_for_every_row(self, tmp_path: Path) -> None:
+        """Verify that the table scan builds a highlight index per row."""
+        _make_tree(tmp_path)
+        highlights: dict[str, HighlightIndex] = {}
+        table = scan_table(tmp_path, highlights=highlights)
+        assert set(highlights) == set(table.paths)
+
+    def test_scan_counts_stages_on_plan(self, tmp_path: Path) -> None:
+        """Verify that the table scan records why walked files were rejected."""
+        _make_tree(tmp_path)
+        (tmp_path / "blob.py").write_bytes(b"\0\1\2" * 100)
+        plan = FilterPlan(min_lines=0, limits=None)
+        table = FileTable()
+        found = list(iter_scan_table(tmp_path, table, plan=plan))
+        report = plan.report()
+        assert report["extension"]["rejected"] >= 1
+        assert report["binary"]["rejected"] == 1
+        assert report["read"]["checked"] == len(table)
+        assert report["min_lines"]["rejected"] >= 1
+        assert "short.py" in table.paths and "short.py" not in found
@@ -0,0 +1,87 @@
+"""Unit tests for FilterPlan and its use by the scanners."""
+import re
+from pathlib import Path
+
+import pytest
+
+from codeguessr.game import FilterPlan, scan_directory
+from codeguessr.table import scan_table
+from tests.helpers import make_file
+
+
+def _make_tree(root: Path) -> None:
+    """Populate *root* with files that exercise every filter stage.
+
+    Args:
+        root: Directory in which to create the files.
+    """
+    make_file(root / "main.py", num_lines=30)
+    make_file(root / "short.py", num_lines=5)
+    make_file(root / "src" / "app.ts", num_lines=12)
+    make_file(root / "src" / "app_test.ts", num_lines=40)
+    make_file(root / "bundle.min.js", num_lines=20)
+    make_file(root / "gen" / "out.py", num_lines=20)
+    (root / ".gitignore").write_text("gen/out.py\n", encoding="utf-8")
+    (root / "notes.md").write_text("x\n" * 30, encoding="utf-8")
+
+
+class TestFilterPlan:
+    def test_path_stages_run_cheapest_first(self) -> None:
+        """Verify that a path rejected by its extension never reaches the regexes."""
+        plan = FilterPlan(include_pattern=r"src", ignore_pattern=r"test")
+        assert not plan.matches_path("src/readme.md")
+        report = plan.report()
+        assert report["extension"]["rejected"] == 1
+        assert "include" not in report
+        assert "ignore" not in report
+
+    def test_accepts_compiled_patterns(self) -> None:
+        """Verify that precompiled patterns are used as given."""
+        include = re.compile(r"^src/")
+        plan = FilterPlan(include_pattern=include)
+        assert plan.include is include
+        assert plan.matches_path("src/app.ts")
+        assert not plan.matches_path("lib/app.ts")
+
+    def test_invalid_pattern_raises(self) -> None:
+        """Verify that an invalid regex is rejected when the plan is built."""
+        with pytest.raises(re.error):
+            FilterPlan(ignore_pattern="[")
+
+    def test_minified_check_is_case_insensitive(self) -> None:
+        """Verify that ``*.MIN.JS`` bundles are rejected."""
+        assert not FilterPlan().matches_path("dist/App.MIN.JS")
+
+    def test_scan_reports_every_stage(self, tmp_path: Path) -> None:
+        """Verify the per-stage counters collected by a directory scan."""
+        _make_tree(tmp_path)
+        plan = FilterPlan(min_lines=10, ignore_pattern=r"_test\.", timed=True)
+        files = scan_directory(tmp_path, plan=plan)
+        assert files == ["main.py", "src/app.ts"]
+
+        report = plan.report()
+        assert list(report) == [
+            "extension", "minified", "ignore", "gitignore", "classify", "read", "min_lines"
+        ]
+        assert report["minified"]["rejected"] == 1
+        assert report["ignore"]["rejected"] == 1
+        assert report["gitignore"]["rejected"] == 1
+        assert report["min_lines"]["rejected"] == 1
+        assert all(stage["seconds"] >= 0 for stage in report.values())
+
+    def test_plan_matches_keyword_filters(self, tmp_path: Path) -> None:
+        """Verify that a plan filters exactly like the equivalent keyword arguments."""
+        _make_tree(tmp_path)
+        expected = scan_directory(tmp_path, min_lines=1, include_pattern=r"\.ts$")
+        plan = FilterPlan(min_lines=1, include_pattern=r"\.ts$")
+        assert scan_directory(tmp_path, plan=plan) == expected
+
+    def test_table_apply_matches_scan(self, tmp_path: Path) -> None:
+        """Verify that applying a plan to a table equals scanning with it."""
+        _make_tree(tmp_path)
+        table = scan_table(tmp_path)
+        plan = FilterPlan(min_lines=10, include_pattern=r"\.(py|ts)$", extensions=[".ts"])
+        assert table.apply(plan) == scan_directory(tmp_path, plan=FilterPlan(
+            min_lines=10, include_pattern=r"\.(py|ts)$", extensions=[".ts"]
+        ))
+        assert plan.report()["table"]["checked"] == len(table)
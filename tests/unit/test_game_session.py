@@ -1,5 +1,6 @@
 """Unit tests for GameSession (creation, properties, payload, submit_guess)."""
 import itertools
+import json
 from pathlib import Path
 
 from codeguessr.game import (
@@ -278,3 +279,19 @@ class TestGameSessionSubmitGuess:
         session.submit_guess(session.current_round.target_file)
         result = session.submit_guess("anything.py")
         assert result["game_over"] is True
+
+
+class TestGameSessionState:
+    def test_state_round_trip(self, tmp_path: Path) -> None:
+        """Verify that a session restored from its state plays on identically."""
+        session = _make_session(tmp_path, num_rounds=2)
+        session.submit_guess(_wrong_file(session))
+        state = json.loads(json.dumps(session.to_state()))
+        restored = GameSession.from_state(state)
+        assert restored.game_id == session.game_id
+        assert restored.rounds == session.rounds
+        assert restored.current_round_idx == session.current_round_idx
+        assert restored.line_cache == {}
+
+        target = session.current_round.target_file
+        assert restored.submit_guess(target) == session.submit_guess(target)
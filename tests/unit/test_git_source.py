@@ -0,0 +1,139 @@
+"""Unit tests for GitSource and scanning git revisions."""
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from codeguessr.content import ContentStore
+from codeguessr.game import GameSession, scan_directory
+from codeguessr.sources import GitSource, close_source, is_source, open_source, walk
+from codeguessr.table import scan_table
+from codeguessr.treesample import sample_directory
+from tests.helpers import make_file
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def _git(cwd: Path, *args: str) -> None:
+    """Run git in *cwd* with a fixed identity."""
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture()
+def bare_repo(tmp_path: Path) -> Path:
+    """Return a bare repository whose ``main`` holds a small code tree.
+
+    A second commit on ``main`` is tagged ``v2``; ``v1`` lacks ``extra.py``.
+    """
+    work = tmp_path / "work"
+    make_file(work / "main.py")
+    make_file(work / "src" / "app.ts")
+    make_file(work / "src" / "deep" / "lib.go")
+    make_file(work / "short.py", num_lines=3)
+    make_file(work / "node_modules" / "dep.js")
+    (work / "logo.png").write_bytes(b"\x89PNG\0\0\0")
+    _git(work, "init", "-q", "-b", "main")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "one")
+    _git(work, "tag", "v1")
+    make_file(work / "extra.py")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "two")
+    _git(work, "tag", "v2")
+    bare = tmp_path / "repo.git"
+    _git(tmp_path, "clone", "-q", "--bare", str(work), str(bare))
+    return bare
+
+
+class TestGitSource:
+    def test_lists_tree(self, bare_repo: Path) -> None:
+        """Verify that directories and files come from the commit's tree."""
+        source = GitSource(f"{bare_repo}@v1", str(bare_repo), "v1")
+        try:
+            dirs, files = source.listdir("")
+            assert sorted(dirs) == ["node_modules", "src"]
+            assert "extra.py" not in files
+            assert source.listdir("src") == (["deep"], ["app.ts"])
+            with pytest.raises(FileNotFoundError):
+                source.listdir("missing")
+        finally:
+            source.close()
+
+    def test_reads_blobs_through_one_process(self, bare_repo: Path) -> None:
+        """Verify that every blob is streamed by the same ``cat-file`` process."""
+        source = GitSource(str(bare_repo), str(bare_repo))
+        try:
+            first = source.read("main.py")
+            batch = source._batch
+            assert batch is not None
+            assert source.read("src/app.ts", limit=10) == b"def func_0"
+            assert source.read("main.py") == first
+            assert source._batch is batch
+            assert first.startswith(b"def func_0(x, y)")
+            assert source.stat("main.py").st_size == len(first)
+        finally:
+            source.close()
+
+    def test_unknown_ref_raises(self, bare_repo: Path) -> None:
+        """Verify that a ref that does not resolve is an OSError."""
+        with pytest.raises(OSError):
+            GitSource(f"{bare_repo}@nope", str(bare_repo), "nope")
+
+    def test_walk_prunes_like_os_walk(self, bare_repo: Path) -> None:
+        """Verify that pruning the yielded directory list skips subtrees."""
+        root = f"{bare_repo}@main"
+        seen = []
+        for dirpath, dirnames, _ in walk(root):
+            dirnames[:] = [name for name in dirnames if name != "deep"]
+            seen.append(dirpath)
+        assert str(Path(root) / "src" / "deep") not in seen
+        assert str(Path(root) / "src") in seen
+
+
+class TestScanRevision:
+    def test_is_source(self, bare_repo: Path, tmp_path: Path) -> None:
+        """Verify which root strings name git revisions, in bare or working repositories."""
+        assert is_source(bare_repo)
+        assert is_source(f"{bare_repo}@v1")
+        assert not is_source(tmp_path)
+        assert is_source(tmp_path / "work@main")
+        assert not is_source(tmp_path / "missing@main")
+        assert open_source(tmp_path) is None
+
+    def test_scan_matches_checkout(self, bare_repo: Path, tmp_path: Path) -> None:
+        """Verify that scanning a revision equals scanning its checkout."""
+        assert scan_directory(f"{bare_repo}@v2") == scan_directory(tmp_path / "work")
+        assert "extra.py" not in scan_directory(f"{bare_repo}@v1")
+        close_source(f"{bare_repo}@v2")
+
+    def test_table_and_sample(self, bare_repo: Path) -> None:
+        """Verify that the table scanner and the sampler read revisions too."""
+        root = f"{bare_repo}@main"
+        table = scan_table(root)
+        assert "logo.png" not in table.paths
+        assert table.paths == ["extra.py", "main.py", "short.py", "src/app.ts", "src/deep/lib.go"]
+        assert sorted(sample_directory(root, sample_size=10)) == [
+            "extra.py", "main.py", "src/app.ts", "src/deep/lib.go"
+        ]
+
+    def test_game_reads_revision(self, bare_repo: Path) -> None:
+        """Verify that game rounds load their source from the object database."""
+        root = f"{bare_repo}@v1"
+        files = scan_directory(root)
+        session = GameSession.create(root, files, num_rounds=2)
+        payload = session.current_round_payload()
+        assert payload["code_display"].count("\n") == 24
+
+    def test_content_store_reads_revision(self, bare_repo: Path) -> None:
+        """Verify that the content store resolves paths below a revision root."""
+        root = f"{bare_repo}@main"
+        assert open_source(root) is not None
+        store = ContentStore()
+        source = store.read(Path(root) / "main.py")
+        assert len(source.lines) == 25
+        assert store.read(Path(root) / "main.py").digest == source.digest
+        assert store.stats.reads == 1
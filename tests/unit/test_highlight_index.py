@@ -0,0 +1,77 @@
+"""Unit tests for HighlightIndex."""
+import random
+from pathlib import Path
+
+from codeguessr.game import GameSession, HighlightIndex, scan_directory
+from tests.helpers import make_file
+
+
+def _candidates(lines: list[str], min_chars: int) -> set[int]:
+    """Return the candidate set that _pick_highlight would draw from.
+
+    Args:
+        lines: All lines of the source file.
+        min_chars: Minimum non-whitespace characters required.
+
+    Returns:
+        Set of 0-based line indices eligible for the highlight.
+    """
+    count = len(lines)
+    low, high = int(count * 0.1), int(count * 0.9)
+    if low >= high:
+        low, high = 0, count - 1
+    found = {i for i in range(low, high + 1) if len(lines[i].strip()) >= min_chars}
+    if not found:
+        found = {i for i in range(count) if lines[i].strip()}
+    return found or set(range(count))
+
+
+class TestHighlightIndex:
+    def test_picks_match_pick_highlight_candidates(self) -> None:
+        """Verify that every pick comes from the same candidate set as _pick_highlight."""
+        rng = random.Random(7)
+        for _ in range(30):
+            lines = [
+                " " * rng.randint(0, 4) + "x" * rng.choice([0, 1, 3, 9, 40, 300])
+                for _ in range(rng.randint(1, 80))
+            ]
+            index = HighlightIndex.build(lines)
+            for min_chars in (0, 1, 2, 3, 5, 8, 33, 64, 299, 301):
+                expected = _candidates(lines, min_chars)
+                picks = {index.pick(min_chars) for _ in range(40)}
+                assert picks <= expected
+
+    def test_respects_min_chars(self) -> None:
+        """Verify that only the line meeting min_chars is chosen."""
+        lines = ["x" for _ in range(50)]
+        lines[30] = "a longer line here!"
+        index = HighlightIndex.build(lines)
+        assert {index.pick(10) for _ in range(20)} == {30}
+
+    def test_falls_back_to_any_nonempty_line(self) -> None:
+        """Verify fallback to a non-empty line outside the middle 80 percent."""
+        lines = ["" for _ in range(30)]
+        lines[1] = "a"
+        assert HighlightIndex.build(lines).pick(5) == 1
+
+    def test_empty_lines_only_falls_back_to_any_line(self) -> None:
+        """Verify that a file of blank lines still yields a valid index."""
+        index = HighlightIndex.build(["", "  ", ""])
+        assert 0 <= index.pick(3) < 3
+
+    def test_scan_records_index_per_file(self, tmp_path: Path) -> None:
+        """Verify that scan_directory populates a highlight index for each result."""
+        make_file(tmp_path / "a.py")
+        make_file(tmp_path / "b.py")
+        highlights: dict[str, HighlightIndex] = {}
+        files = scan_directory(tmp_path, highlights=highlights)
+        assert set(highlights) == set(files)
+
+    def test_create_does_not_read_files(self, tmp_path: Path) -> None:
+        """Verify that GameSession.create uses the index without touching the disk."""
+        make_file(tmp_path / "a.py", num_lines=40)
+        highlights: dict[str, HighlightIndex] = {}
+        files = scan_directory(tmp_path, highlights=highlights)
+        (tmp_path / "a.py").unlink()
+        session = GameSession.create(str(tmp_path), files, num_rounds=1, highlights=highlights)
+        assert 4 <= session.current_round.highlight_line <= 36
@@ -0,0 +1,33 @@
+"""Unit tests for the JSON response encoder (dumps, Fragment, encode)."""
+import json
+
+from codeguessr.jsonenc import Fragment, JSONBytesResponse, _json_dumps, dumps, encode
+
+
+class TestEncode:
+    def test_matches_standard_library(self) -> None:
+        """Verify that the selected encoder and the fallback produce equal JSON."""
+        payload = {"code_display": "██ x = 1\n" * 50, "files": ["a.py", "é.py"], "n": 3}
+        assert json.loads(dumps(payload)) == payload
+        assert json.loads(_json_dumps(payload)) == payload
+        assert b"\\u" not in _json_dumps(payload)
+
+    def test_fragments_are_spliced_in(self) -> None:
+        """Verify that Fragment values appear in the output as encoded."""
+        files = ["src/a.py", "src/b.py"]
+        fragment = Fragment.of(files)
+        data = encode({"game_id": "g", "files": fragment, "round_num": 1})
+        assert json.loads(data) == {"game_id": "g", "files": files, "round_num": 1}
+        assert fragment.data in data
+
+    def test_only_fragments(self) -> None:
+        """Verify that a payload made only of fragments is valid JSON."""
+        data = encode({"a": Fragment(b"[1]"), "b": Fragment(b"{}")})
+        assert json.loads(data) == {"a": [1], "b": {}}
+
+    def test_response_sends_bytes_unchanged(self) -> None:
+        """Verify that bytes content is sent as is with a JSON media type."""
+        response = JSONBytesResponse(b'{"ok":true}')
+        assert response.body == b'{"ok":true}'
+        assert response.headers["content-type"] == "application/json"
+        assert json.loads(JSONBytesResponse({"files": Fragment(b"[]")}).body) == {"files": []}
@@ -0,0 +1,65 @@
+"""Unit tests for the load-test report and RSS helper."""
+import os
+
+import pytest
+
+from codeguessr.loadtest import (
+    NEW_GAME,
+    SUBMIT_GUESS,
+    EndpointStats,
+    LoadTestConfig,
+    LoadTestReport,
+    read_rss,
+)
+
+
+class TestEndpointStats:
+    def test_percentiles_use_nearest_rank(self) -> None:
+        """Verify that percentiles pick the nearest-rank latency."""
+        stats = EndpointStats(latencies=[i / 1000 for i in range(1, 101)])
+        assert stats.percentile(50) == 0.050
+        assert stats.percentile(95) == 0.095
+        assert stats.percentile(99) == 0.099
+        assert stats.percentile(100) == 0.100
+
+    def test_empty_has_no_percentiles(self) -> None:
+        """Verify that an endpoint without successful requests reports no latency."""
+        stats = EndpointStats(errors=2)
+        assert stats.count == 2
+        assert stats.percentile(50) is None
+        assert stats.as_dict()["p99_ms"] is None
+
+
+class TestLoadTestReport:
+    def test_totals(self) -> None:
+        """Verify that throughput and error rate cover every endpoint."""
+        report = LoadTestReport(LoadTestConfig(players=2), elapsed=2.0)
+        report.endpoints[NEW_GAME] = EndpointStats(latencies=[0.01, 0.02])
+        report.endpoints[SUBMIT_GUESS] = EndpointStats(latencies=[0.001] * 5, errors=1)
+        assert report.requests == 8
+        assert report.throughput == 4.0
+        assert report.error_rate == 1 / 8
+        summary = report.as_dict()
+        assert summary["endpoints"][NEW_GAME]["p50_ms"] == 10.0
+        assert summary["rss_growth"] is None
+
+    def test_format_includes_rss_growth(self) -> None:
+        """Verify that the text report shows the memory growth when known."""
+        report = LoadTestReport(
+            LoadTestConfig(), elapsed=1.0, rss_before=10 * 1024 * 1024, rss_after=15 * 1024 * 1024
+        )
+        text = report.format()
+        assert "+5.0 MiB" in text
+        assert NEW_GAME in text and SUBMIT_GUESS in text
+
+
+class TestReadRss:
+    @pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+    def test_current_process(self) -> None:
+        """Verify that the RSS of this process is positive."""
+        assert (read_rss() or 0) > 0
+        assert read_rss(os.getpid()) == pytest.approx(read_rss(), rel=0.5)
+
+    def test_missing_process(self) -> None:
+        """Verify that an unknown process has no RSS."""
+        assert read_rss(2**22 + 12345) is None
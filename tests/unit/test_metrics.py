@@ -0,0 +1,55 @@
+"""Unit tests for the Prometheus metrics registry."""
+import pytest
+
+from codeguessr.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    def test_counter_renders_labelled_samples(self) -> None:
+        """Verify that counters render one sample per label combination."""
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests_total", "Requests.", ("endpoint",))
+        requests.inc("new_game")
+        requests.inc("new_game", amount=2)
+        requests.inc("submit_guess")
+        text = registry.render()
+        assert "# TYPE app_requests_total counter" in text
+        assert 'app_requests_total{endpoint="new_game"} 3' in text
+        assert 'app_requests_total{endpoint="submit_guess"} 1' in text
+        assert requests.value("new_game") == 3
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        """Verify that histogram buckets count every observation at or below their bound."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("app_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, "x")
+        lines = registry.render().splitlines()
+        assert 'app_seconds_bucket{endpoint="x",le="0.1"} 2' in lines
+        assert 'app_seconds_bucket{endpoint="x",le="1"} 3' in lines
+        assert 'app_seconds_bucket{endpoint="x",le="+Inf"} 4' in lines
+        assert 'app_seconds_count{endpoint="x"} 4' in lines
+        assert 'app_seconds_sum{endpoint="x"} 3.65' in lines
+        assert latency.count("x") == 4
+
+    def test_callback_is_read_at_render_time(self) -> None:
+        """Verify that callback metrics report the value current when rendered."""
+        registry = MetricsRegistry()
+        state = {"active": 1}
+        registry.callback("app_active", "Active.", lambda: [((), state["active"])])
+        assert "app_active 1\n" in registry.render()
+        state["active"] = 7
+        assert "app_active 7\n" in registry.render()
+
+    def test_label_values_are_escaped(self) -> None:
+        """Verify that quotes and backslashes in label values are escaped."""
+        registry = MetricsRegistry()
+        registry.counter("app_total", "Total.", ("root",)).inc('a"b\\c')
+        assert 'app_total{root="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_duplicate_names_are_rejected(self) -> None:
+        """Verify that a metric name can only be registered once."""
+        registry = MetricsRegistry()
+        registry.counter("app_total", "Total.")
+        with pytest.raises(ValueError, match="already registered"):
+            registry.histogram("app_total", "Again.")
@@ -0,0 +1,130 @@
+"""Unit tests for MinHash signatures and the near-duplicate index."""
+from pathlib import Path
+
+import pytest
+
+from codeguessr import neardup as _neardup
+from codeguessr.game import GameSession, scan_directory
+from codeguessr.neardup import NearDuplicateIndex, minhash, similarity
+from codeguessr.pool import RoundPool
+
+
+def _source(seed: int, num_lines: int = 40) -> list[str]:
+    """Return distinct source lines for file number *seed*.
+
+    Args:
+        seed: Distinguishes the generated file from others.
+        num_lines: Number of lines to generate.
+
+    Returns:
+        The generated lines.
+    """
+    return [f"def fn_{seed}_{i}(arg): return arg * {seed * 1000 + i}" for i in range(num_lines)]
+
+
+def _write(path: Path, lines: list[str]) -> None:
+    """Write *lines* to *path*, creating parent directories.
+
+    Args:
+        path: Destination file.
+        lines: Lines to write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+class TestMinHash:
+    def test_identical_files_have_equal_signatures(self) -> None:
+        """Verify that indentation changes do not affect the signature."""
+        lines = _source(1)
+        assert minhash(lines) == minhash(["    " + line for line in lines])
+
+    def test_similarity_tracks_overlap(self) -> None:
+        """Verify that a small edit stays similar and unrelated files do not."""
+        base = _source(1)
+        edited = list(base)
+        edited[10] = "changed = True"
+        first, second, other = minhash(base), minhash(edited), minhash(_source(2))
+        assert first is not None and second is not None and other is not None
+        assert similarity(first, second) >= 0.8
+        assert similarity(first, other) < 0.2
+
+    def test_blank_file_has_no_signature(self) -> None:
+        """Verify that files without non-blank lines are not signed."""
+        assert minhash(["", "   "]) is None
+
+    def test_pure_python_matches_numpy(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that the fallback computes the same signature as NumPy."""
+        if not _neardup.HAVE_NUMPY:
+            pytest.skip("numpy not installed")
+        lines = _source(3)
+        expected = minhash(lines)
+        monkeypatch.setattr(_neardup, "HAVE_NUMPY", False)
+        assert minhash(lines) == expected
+
+
+class TestNearDuplicateIndex:
+    def test_near_and_clusters(self) -> None:
+        """Verify that templated copies are found and grouped into one cluster."""
+        index = NearDuplicateIndex()
+        base = _source(1)
+        for name in ("a.py", "b.py", "c.py"):
+            index.add(name, [*base, f"# {name}"])
+        index.add("other.py", _source(2))
+        assert index.near("a.py") == {"b.py", "c.py"}
+        assert index.clusters() == [["a.py", "b.py", "c.py"]]
+
+    def test_readd_replaces_signature(self) -> None:
+        """Verify that re-adding a path with new content updates its buckets."""
+        index = NearDuplicateIndex()
+        index.add("a.py", _source(1))
+        index.add("b.py", _source(1))
+        index.add("b.py", _source(2))
+        assert index.near("a.py") == set()
+        assert len(index) == 2
+
+    def test_distinct_skips_near_duplicates(self) -> None:
+        """Verify that distinct keeps only the first of a near-duplicate pair."""
+        index = NearDuplicateIndex()
+        index.add("a.py", _source(1))
+        index.add("b.py", _source(1))
+        index.add("c.py", _source(2))
+        assert index.distinct(["a.py", "b.py", "c.py"], 2) == ["a.py", "c.py"]
+
+
+class TestTargetSpreading:
+    def _tree(self, root: Path) -> tuple[list[str], NearDuplicateIndex]:
+        """Create two clusters of copies plus unique files and index them.
+
+        Args:
+            root: Directory in which to create the files.
+
+        Returns:
+            The scanned file list and its near-duplicate index.
+        """
+        for i in range(4):
+            _write(root / f"copy_a{i}.py", _source(1))
+            _write(root / f"copy_b{i}.py", _source(2))
+        for i in range(3):
+            _write(root / f"unique{i}.py", _source(10 + i))
+        index = NearDuplicateIndex()
+        return scan_directory(root, near_dups=index), index
+
+    def test_session_avoids_near_duplicate_targets(self, tmp_path: Path) -> None:
+        """Verify that a game never contains two targets from the same cluster."""
+        files, index = self._tree(tmp_path)
+        for _ in range(20):
+            session = GameSession.create(str(tmp_path), files, num_rounds=5, near_dups=index)
+            targets = [rnd.target_file for rnd in session.rounds]
+            assert sum(t.startswith("copy_a") for t in targets) == 1
+            assert sum(t.startswith("copy_b") for t in targets) == 1
+
+    def test_pool_take_avoids_near_duplicate_targets(self, tmp_path: Path) -> None:
+        """Verify that pooled rounds for one game skip near-duplicates."""
+        files, index = self._tree(tmp_path)
+        pool = RoundPool(str(tmp_path), files, near_dups=index)
+        for _ in range(10):
+            pool.fill()
+            targets = [prepared.target_file for prepared in pool.take(4)]
+            assert sum(t.startswith("copy_a") for t in targets) <= 1
+            assert sum(t.startswith("copy_b") for t in targets) <= 1
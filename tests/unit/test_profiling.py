@@ -0,0 +1,72 @@
+"""Unit tests for ProfileRing and RequestSampler."""
+import cProfile
+import pstats
+from pathlib import Path
+
+import pytest
+
+from codeguessr.profiling import ProfileRing, RequestSampler, format_profile
+
+
+def _profile() -> cProfile.Profile:
+    """Return a profile of a small, recognisable function call."""
+    def busy_function() -> int:
+        return sum(range(1000))
+
+    profile = cProfile.Profile()
+    profile.runcall(busy_function)
+    return profile
+
+
+class TestProfileRing:
+    def test_oldest_profiles_are_removed(self, tmp_path: Path) -> None:
+        """Verify that the ring keeps at most capacity files, dropping the oldest."""
+        ring = ProfileRing(tmp_path, capacity=2)
+        entries = [ring.add(_profile(), "new_game", 200, 0.01 * i) for i in range(3)]
+        assert [entry.id for entry in ring.entries()] == [3, 2]
+        assert not entries[0].file.exists()
+        assert sorted(tmp_path.glob("*.prof")) == sorted(entry.file for entry in entries[1:])
+        assert ring.get(1) is None
+
+    def test_existing_profiles_are_adopted(self, tmp_path: Path) -> None:
+        """Verify that a new ring over the same directory resumes ids and honours the bound."""
+        first = ProfileRing(tmp_path, capacity=3)
+        for _ in range(3):
+            first.add(_profile(), "submit_guess", 404, 0.5)
+        second = ProfileRing(tmp_path, capacity=2)
+        assert [entry.id for entry in second.entries()] == [3, 2]
+        assert second.entries()[0].endpoint == "submit_guess"
+        assert second.entries()[0].status == 404
+        assert second.entries()[0].seconds == 0.5
+        assert second.add(_profile(), "new_game", 200, 0.1).id == 4
+        assert len(list(tmp_path.glob("*.prof"))) == 2
+
+    def test_profiles_load_with_pstats(self, tmp_path: Path) -> None:
+        """Verify that stored files are pstats files and format_profile reports them."""
+        entry = ProfileRing(tmp_path).add(_profile(), "new_game", 200, 0.1)
+        assert pstats.Stats(str(entry.file)).total_calls > 0
+        assert "busy_function" in format_profile(entry, sort="tottime")
+        with pytest.raises(KeyError):
+            format_profile(entry, sort="bogus")
+
+
+class TestRequestSampler:
+    def test_fraction_selects_requests(self, tmp_path: Path) -> None:
+        """Verify that requests are sampled when the random draw is below the fraction."""
+        draws = iter([0.05, 0.5])
+        sampler = RequestSampler(0.1, ProfileRing(tmp_path), rng=lambda: next(draws))
+        assert sampler.should_sample("/api/game/new")
+        assert not sampler.should_sample("/api/game/new")
+
+    def test_admin_requests_are_never_sampled(self, tmp_path: Path) -> None:
+        """Verify that the profile endpoints themselves are not profiled."""
+        sampler = RequestSampler(1.0, ProfileRing(tmp_path))
+        assert not sampler.should_sample("/api/admin/profiles")
+
+    def test_invalid_configuration_raises(self) -> None:
+        """Verify that out-of-range fractions and a missing ring are rejected."""
+        with pytest.raises(ValueError):
+            RequestSampler(1.5)
+        with pytest.raises(ValueError):
+            RequestSampler(0.5)
+        assert RequestSampler().fraction == 0.0
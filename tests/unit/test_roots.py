@@ -0,0 +1,118 @@
+"""Unit tests for parse_roots and RootRegistry."""
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from codeguessr.roots import RootRegistry, parse_roots
+from tests.helpers import make_file
+
+
+def _make_roots(base: Path, count: int) -> dict[str, str]:
+    """Create *count* small code roots under *base* and return them by name.
+
+    Args:
+        base: Directory in which to create the roots.
+        count: Number of roots.
+
+    Returns:
+        Root names (``r0``, ``r1``, …) mapped to directories.
+    """
+    roots = {}
+    for idx in range(count):
+        root = base / f"r{idx}"
+        for name in ("a.py", "b.py", "c.py"):
+            make_file(root / name, num_lines=20 + idx)
+        roots[f"r{idx}"] = str(root)
+    return roots
+
+
+class TestParseRoots:
+    def test_single_directory(self) -> None:
+        """Verify that a plain directory is named after its last component."""
+        assert parse_roots("/srv/code/project") == {"project": "/srv/code/project"}
+
+    def test_named_and_repeated_roots(self) -> None:
+        """Verify explicit names and suffixes for repeated basenames."""
+        spec = os.pathsep.join(["/a/app", "/b/app", "web=/c/site"])
+        assert parse_roots(spec) == {"app": "/a/app", "app-2": "/b/app", "web": "/c/site"}
+
+    def test_duplicate_name_raises(self) -> None:
+        """Verify that naming two roots the same is an error."""
+        with pytest.raises(ValueError, match="Duplicate"):
+            parse_roots(os.pathsep.join(["x=/a", "x=/b"]))
+
+
+class TestRootRegistry:
+    def test_roots_are_loaded_lazily(self, tmp_path: Path) -> None:
+        """Verify that only requested roots are scanned."""
+        registry = RootRegistry(_make_roots(tmp_path, 2))
+        try:
+            assert registry.loaded() == []
+            index = registry.get()
+            assert index.name == "r0"
+            assert index.scan.done.wait(5)
+            assert index.files == ["a.py", "b.py", "c.py"]
+            assert [idx.name for idx in registry.loaded()] == ["r0"]
+            assert registry.get("r0") is index
+        finally:
+            registry.close()
+
+    def test_scan_trace_is_written_on_completion(self, tmp_path: Path) -> None:
+        """Verify that a root with a trace file gets its stats and trace after the scan."""
+        trace = tmp_path / "trace.json"
+        registry = RootRegistry(_make_roots(tmp_path, 1), traces={"r0": str(trace)})
+        try:
+            index = registry.get()
+            assert index.scan.done.wait(5)
+            assert index.stats.accepted == 3
+            for _ in range(50):
+                if trace.exists():
+                    break
+                time.sleep(0.05)
+            events = json.loads(trace.read_text(encoding="utf-8"))["traceEvents"]
+            assert any(event["name"] == "scan" for event in events)
+        finally:
+            registry.close()
+
+    def test_unknown_root_raises(self, tmp_path: Path) -> None:
+        """Verify that an unconfigured root name raises KeyError."""
+        registry = RootRegistry(_make_roots(tmp_path, 1))
+        with pytest.raises(KeyError):
+            registry.get("missing")
+
+    def test_least_recently_used_root_is_evicted(self, tmp_path: Path) -> None:
+        """Verify that loading a root over budget unloads the coldest one."""
+        roots = _make_roots(tmp_path, 3)
+        registry = RootRegistry(roots, max_bytes=1)
+        try:
+            for name in roots:
+                assert registry.get(name).scan.done.wait(5)
+            assert [idx.name for idx in registry.loaded()] == ["r2"]
+        finally:
+            registry.close()
+
+    def test_budget_keeps_recent_roots(self, tmp_path: Path) -> None:
+        """Verify that roots within the budget stay loaded in LRU order."""
+        roots = _make_roots(tmp_path, 3)
+        registry = RootRegistry(roots)
+        try:
+            for name in ("r0", "r1", "r2", "r0"):
+                assert registry.get(name).scan.done.wait(5)
+            assert [idx.name for idx in registry.loaded()] == ["r1", "r2", "r0"]
+            assert registry.memory_bytes() > 0
+        finally:
+            registry.close()
+
+    def test_find_by_directory(self, tmp_path: Path) -> None:
+        """Verify that a loaded index can be found from its directory."""
+        roots = _make_roots(tmp_path, 2)
+        registry = RootRegistry(roots)
+        try:
+            index = registry.get("r1")
+            assert registry.find(roots["r1"]) is index
+            assert registry.find(roots["r0"]) is None
+        finally:
+            registry.close()
@@ -0,0 +1,170 @@
+"""Unit tests for RoundPool and RoundPoolManager."""
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from codeguessr.game import GameSession, PreparedRound, scan_directory
+from codeguessr.pool import PoolKey, RoundPool, RoundPoolManager
+from tests.helpers import make_file
+
+
+def _make_pool(tmp_path: Path, num_files: int = 5, capacity: int = 8) -> RoundPool:
+    """Create a RoundPool backed by temporary Python files.
+
+    Args:
+        tmp_path: Temporary directory in which to create source files.
+        num_files: Number of dummy source files to create.
+        capacity: Maximum number of prepared rounds in the pool.
+
+    Returns:
+        An empty RoundPool over the scanned files.
+    """
+    for i in range(num_files):
+        make_file(tmp_path / f"f{i}.py")
+    return RoundPool(str(tmp_path), scan_directory(tmp_path), capacity=capacity)
+
+
+class TestPreparedRound:
+    def test_load_caches_lines(self, tmp_path: Path) -> None:
+        """Verify that PreparedRound.load keeps the target file's lines."""
+        make_file(tmp_path / "a.py", num_lines=30)
+        prepared = PreparedRound.load(str(tmp_path), "a.py")
+        assert len(prepared.lines) == 30
+        assert 0 <= prepared.highlight_line < 30
+
+    def test_session_from_prepared_uses_cached_lines(self, tmp_path: Path) -> None:
+        """Verify that payloads are built from cached lines even if the file disappears."""
+        make_file(tmp_path / "a.py")
+        prepared = PreparedRound.load(str(tmp_path), "a.py")
+        (tmp_path / "a.py").unlink()
+        session = GameSession.from_prepared(str(tmp_path), ["a.py"], [prepared])
+        assert session.current_round_payload()["code_display"]
+
+
+class TestRoundPool:
+    def test_fill_reaches_capacity(self, tmp_path: Path) -> None:
+        """Verify that fill prepares rounds up to the pool capacity."""
+        pool = _make_pool(tmp_path, capacity=6)
+        assert pool.fill() == 6
+        assert len(pool) == 6
+        assert pool.fill() == 0
+
+    def test_fill_without_files_adds_nothing(self, tmp_path: Path) -> None:
+        """Verify that filling a pool over an empty file list is a no-op."""
+        pool = RoundPool(str(tmp_path), [])
+        assert pool.fill() == 0
+        assert len(pool) == 0
+
+    def test_take_returns_distinct_targets(self, tmp_path: Path) -> None:
+        """Verify that drawn rounds have distinct targets when enough files exist."""
+        pool = _make_pool(tmp_path, num_files=5, capacity=12)
+        pool.fill()
+        for _ in range(5):
+            targets = [r.target_file for r in pool.take(4)]
+            assert len(set(targets)) == 4
+            pool.fill()
+
+    def test_take_consumes_queue(self, tmp_path: Path) -> None:
+        """Verify that taking rounds removes them from the queue."""
+        pool = _make_pool(tmp_path, capacity=8)
+        pool.fill()
+        pool.take(3)
+        assert len(pool) == 5
+
+    def test_take_from_empty_pool_prepares_synchronously(self, tmp_path: Path) -> None:
+        """Verify that an empty pool still yields the requested number of rounds."""
+        pool = _make_pool(tmp_path)
+        rounds = pool.take(3)
+        assert len(rounds) == 3
+        assert len({r.target_file for r in rounds}) == 3
+
+    def test_take_inline_does_not_scan_files(self, tmp_path: Path) -> None:
+        """Verify that rounds prepared inline are drawn without scanning the file list."""
+
+        class Unscannable(list[str]):
+            def __iter__(self) -> Iterator[str]:
+                raise AssertionError("file list scanned")
+
+        for i in range(50):
+            make_file(tmp_path / f"f{i}.py")
+        pool = RoundPool(str(tmp_path), Unscannable(scan_directory(tmp_path)))
+        rounds = pool.take(5)
+        assert len({r.target_file for r in rounds}) == 5
+
+    def test_take_more_rounds_than_files(self, tmp_path: Path) -> None:
+        """Verify that repeated targets are allowed when files are scarce."""
+        pool = _make_pool(tmp_path, num_files=1)
+        pool.fill()
+        assert len(pool.take(5)) == 5
+
+    def test_fill_skips_unreadable_files(self, tmp_path: Path) -> None:
+        """Verify that files deleted after the scan are skipped by the producer."""
+        pool = _make_pool(tmp_path, num_files=2, capacity=4)
+        (tmp_path / "f0.py").unlink()
+        pool.fill()
+        assert len(pool) > 0
+        assert all(r.target_file == "f1.py" for r in pool._ready)
+
+
+class TestRoundPoolManager:
+    def _key(self, min_lines: int = 10) -> PoolKey:
+        return PoolKey(min_lines=min_lines, include_pattern=None, ignore_pattern=None,
+                       min_line_chars=1)
+
+    def test_producer_fills_added_pool(self, tmp_path: Path) -> None:
+        """Verify that the background thread fills a newly registered pool."""
+        manager = RoundPoolManager()
+        manager.start()
+        try:
+            pool = manager.add(self._key(), _make_pool(tmp_path, capacity=4))
+            for _ in range(100):
+                if len(pool) == 4:
+                    break
+                time.sleep(0.01)
+            assert len(pool) == 4
+        finally:
+            manager.stop()
+
+    def test_producer_survives_failing_fill(
+        self, tmp_path: Path, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Verify that an exception in one pool's fill is logged and later pools still fill."""
+        broken = _make_pool(tmp_path, capacity=4)
+
+        def fail() -> int:
+            raise ValueError("broken pool")
+
+        broken.fill = fail  # type: ignore[method-assign]
+        manager = RoundPoolManager()
+        manager.start()
+        try:
+            manager.add(self._key(1), broken)
+            pool = manager.add(self._key(2), _make_pool(tmp_path, capacity=4))
+            for _ in range(100):
+                if len(pool) == 4:
+                    break
+                time.sleep(0.01)
+            assert len(pool) == 4
+        finally:
+            manager.stop()
+        assert "broken pool" in caplog.text
+
+    def test_get_returns_registered_pool(self, tmp_path: Path) -> None:
+        """Verify that get finds a pool by its filter configuration."""
+        manager = RoundPoolManager()
+        pool = manager.add(self._key(), _make_pool(tmp_path))
+        assert manager.get(self._key()) is pool
+        assert manager.get(self._key(min_lines=20)) is None
+
+    def test_least_recently_used_pool_evicted(self, tmp_path: Path) -> None:
+        """Verify that the oldest pool is dropped once max_pools is exceeded."""
+        manager = RoundPoolManager(max_pools=2)
+        pool = _make_pool(tmp_path)
+        manager.add(self._key(1), pool)
+        manager.add(self._key(2), pool)
+        manager.get(self._key(1))
+        manager.add(self._key(3), pool)
+        assert manager.get(self._key(2)) is None
+        assert manager.get(self._key(1)) is pool
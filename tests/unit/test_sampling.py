@@ -0,0 +1,164 @@
+"""Unit tests for the weighted target sampler."""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from codeguessr import sources
+from codeguessr.game import GameSession, scan_directory
+from codeguessr.sampling import (
+    RECENCY_HALF_LIFE,
+    AliasSampler,
+    DifficultyTracker,
+    TargetSampler,
+    make_sampler,
+)
+from codeguessr.table import FileTable
+from tests.helpers import make_file
+
+
+class TestAliasSampler:
+    def test_draw_frequencies_follow_weights(self) -> None:
+        """Verify that draw frequencies are proportional to the weights."""
+        sampler = AliasSampler([1.0, 3.0, 0.0, 6.0], block_size=2)
+        rng = random.Random(1)
+        counts = Counter(sampler.draw(rng) for _ in range(20000))
+        assert counts[2] == 0
+        assert counts[3] / 20000 == pytest.approx(0.6, abs=0.02)
+        assert counts[1] / 20000 == pytest.approx(0.3, abs=0.02)
+
+    def test_set_weight_updates_distribution(self) -> None:
+        """Verify that changing one weight is reflected in later draws."""
+        sampler = AliasSampler([1.0] * 10, block_size=4)
+        sampler.set_weight(7, 0.0)
+        rng = random.Random(2)
+        assert 7 not in {sampler.draw(rng) for _ in range(2000)}
+        assert sampler.total == pytest.approx(9.0)
+
+    def test_zero_total_raises(self) -> None:
+        """Verify that drawing from an all-zero table raises ValueError."""
+        with pytest.raises(ValueError):
+            AliasSampler([0.0, 0.0]).draw(random.Random())
+
+
+class TestTargetSampler:
+    def test_sample_distinct_targets(self) -> None:
+        """Verify that a round set never repeats a file when enough files exist."""
+        files = [f"f{i}.py" for i in range(6)]
+        sampler = TargetSampler(files, rng=random.Random(4))
+        for _ in range(50):
+            picked = sampler.sample(6)
+            assert sorted(picked) == files
+
+    def test_sample_skewed_weights_still_distinct(self) -> None:
+        """Verify the exact fallback when one file holds almost all of the weight."""
+        files = ["heavy.py", "a.py", "b.py"]
+        sampler = TargetSampler(
+            files, lambda p: 1e9 if p == "heavy.py" else 1e-9, rng=random.Random(5)
+        )
+        assert sorted(sampler.sample(3)) == sorted(files)
+
+    def test_sample_with_replacement_when_scarce(self) -> None:
+        """Verify that more rounds than files are drawn with replacement."""
+        sampler = TargetSampler(["only.py"])
+        assert sampler.sample(3) == ["only.py"] * 3
+
+    def test_sample_respects_exclude(self) -> None:
+        """Verify that excluded paths are never returned by a distinct sample."""
+        sampler = TargetSampler(["a.py", "b.py", "c.py"])
+        for _ in range(20):
+            assert sampler.sample(1, exclude={"a.py", "b.py"}) == ["c.py"]
+
+    def test_draws_during_weight_updates(self) -> None:
+        """Verify that draws racing with weight updates never return a zero-weight path."""
+        # Blocks of two: a path that always weighs zero next to a live one.
+        files = [name for i in range(64) for name in (f"dead{i}.py", f"live{i}.py")]
+        sampler = TargetSampler(files, block_size=2)
+        for i in range(64):
+            sampler.set_weight(f"dead{i}.py", 0.0)
+        stop = threading.Event()
+
+        def toggle() -> None:
+            # Zeroing a live path leaves its whole block at zero weight.
+            rng = random.Random(0)
+            while not stop.is_set():
+                path = f"live{rng.randrange(32, 64)}.py"
+                sampler.set_weight(path, 0.0)
+                sampler.set_weight(path, 1.0)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # switch threads as often as possible
+        updater = threading.Thread(target=toggle)
+        updater.start()
+        try:
+            drawn = {sampler.draw() for _ in range(50_000)}
+        finally:
+            stop.set()
+            updater.join()
+            sys.setswitchinterval(interval)
+        assert not any(path.startswith("dead") for path in drawn)
+
+
+class TestWeightings:
+    def test_directory_weighting_balances_directories(self, tmp_path: Path) -> None:
+        """Verify that a lone file is drawn as often as a crowded directory."""
+        files = ["solo/a.py"] + [f"crowd/f{i}.py" for i in range(9)]
+        sampler = make_sampler("directory", str(tmp_path), files)
+        assert sampler is not None
+        sampler.rng = random.Random(6)
+        counts = Counter(sampler.draw() for _ in range(10000))
+        assert counts["solo/a.py"] / 10000 == pytest.approx(0.5, abs=0.03)
+
+    def test_size_and_recency_weights_read_the_table(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Verify that table-backed size and recency weights never stat the files."""
+        table = FileTable()
+        now = time.time()
+        table.append("new.py", 1 << 20, ["x"], now)
+        table.append("old.py", 10, ["x"], now - 10 * RECENCY_HALF_LIFE)
+        table.sort()
+
+        def no_stat(path: str | os.PathLike[str]) -> os.stat_result:
+            raise AssertionError(f"stat called for {path}")
+
+        monkeypatch.setattr(sources, "stat", no_stat)
+        for weighting in ("size", "recency"):
+            sampler = make_sampler(weighting, str(tmp_path), table.paths, table=table)
+            assert sampler is not None
+            sampler.rng = random.Random(8)
+            counts = Counter(sampler.draw() for _ in range(2000))
+            assert counts["new.py"] > 1.5 * counts["old.py"]
+
+    def test_uniform_weighting_needs_no_sampler(self, tmp_path: Path) -> None:
+        """Verify that the uniform strategy returns None."""
+        assert make_sampler("uniform", str(tmp_path), ["a.py"]) is None
+
+    def test_unknown_weighting_raises(self, tmp_path: Path) -> None:
+        """Verify that an unknown strategy name raises ValueError."""
+        with pytest.raises(ValueError):
+            make_sampler("bogus", str(tmp_path), ["a.py"])
+
+    def test_difficulty_tracker_updates_subscribed_sampler(self, tmp_path: Path) -> None:
+        """Verify that recorded results change the weights of subscribed samplers."""
+        tracker = DifficultyTracker()
+        sampler = make_sampler("difficulty", str(tmp_path), ["a.py", "b.py"], tracker)
+        assert sampler is not None
+        tracker.record("a.py", wrong_guesses=9)
+        sampler.rng = random.Random(7)
+        counts = Counter(sampler.draw() for _ in range(6000))
+        assert counts["a.py"] > 3 * counts["b.py"]
+
+    def test_create_uses_sampler(self, tmp_path: Path) -> None:
+        """Verify that GameSession.create draws its targets from the given sampler."""
+        for i in range(4):
+            make_file(tmp_path / f"f{i}.py")
+        files = scan_directory(tmp_path)
+        sampler = TargetSampler(files, lambda p: 1.0 if p == "f2.py" else 0.0)
+        session = GameSession.create(str(tmp_path), files, num_rounds=1, sampler=sampler)
+        assert session.current_round.target_file == "f2.py"
@@ -0,0 +1,69 @@
+"""Unit tests for iter_scan_directory and ScanProgress."""
+from pathlib import Path
+
+from codeguessr.game import ScanProgress, iter_scan_directory, scan_directory
+from tests.helpers import make_file
+
+
+class TestIterScanDirectory:
+    def test_yields_same_files_as_scan_directory(self, tmp_path: Path) -> None:
+        """Verify that the generator finds exactly the files scan_directory returns."""
+        for i in range(5):
+            make_file(tmp_path / f"pkg{i % 2}" / f"f{i}.py")
+        make_file(tmp_path / "short.py", num_lines=2)
+        assert sorted(iter_scan_directory(tmp_path)) == scan_directory(tmp_path)
+
+    def test_is_lazy(self, tmp_path: Path) -> None:
+        """Verify that the first result is available before the walk completes."""
+        make_file(tmp_path / "a.py")
+        make_file(tmp_path / "b.py")
+        gen = iter_scan_directory(tmp_path)
+        first = next(gen)
+        assert first in {"a.py", "b.py"}
+        gen.close()
+
+
+class TestScanProgress:
+    def test_reservoir_is_bounded(self) -> None:
+        """Verify that the reservoir never grows past its size."""
+        progress = ScanProgress(reservoir_size=4)
+        for i in range(100):
+            progress.add(f"f{i}.py")
+        assert len(progress.reservoir) == 4
+        assert len(progress.found) == 100
+        assert set(progress.reservoir) <= set(progress.found)
+
+    def test_sample_distinct_when_possible(self) -> None:
+        """Verify that reservoir samples do not repeat targets when enough exist."""
+        progress = ScanProgress(reservoir_size=8)
+        for i in range(20):
+            progress.add(f"f{i}.py")
+        assert len(set(progress.sample(5))) == 5
+
+    def test_run_calls_on_complete_with_sorted_files(self, tmp_path: Path) -> None:
+        """Verify that a finished scan reports the sorted full file list."""
+        for name in ("z.py", "a.py", "m.py"):
+            make_file(tmp_path / name)
+        progress = ScanProgress()
+        completed: list[list[str]] = []
+        progress.run(tmp_path, on_complete=completed.append)
+        assert completed == [["a.py", "m.py", "z.py"]]
+        assert progress.done.is_set()
+
+    def test_wait_for_returns_when_scan_ends_short(self, tmp_path: Path) -> None:
+        """Verify that wait_for stops waiting once the scan is done."""
+        make_file(tmp_path / "a.py")
+        progress = ScanProgress()
+        progress.run(tmp_path)
+        assert progress.wait_for(10, timeout=1) is False
+        assert progress.wait_for(1, timeout=1) is True
+
+    def test_duration_is_fixed_once_done(self, tmp_path: Path) -> None:
+        """Verify that a finished scan reports how long it ran."""
+        make_file(tmp_path / "a.py")
+        progress = ScanProgress()
+        assert progress.duration == 0.0
+        progress.run(tmp_path)
+        duration = progress.duration
+        assert duration > 0
+        assert progress.duration == duration
@@ -0,0 +1,75 @@
+"""Unit tests for ScanStats as filled by scan_directory and iter_scan_table."""
+import json
+from pathlib import Path
+
+from codeguessr.game import SCAN_PHASES, ScanStats, scan_directory
+from codeguessr.table import FileTable, iter_scan_table
+from codeguessr.tracing import Tracer
+from tests.helpers import make_file
+
+
+def _make_tree(root: Path) -> None:
+    """Create a tree that exercises every ScanStats counter."""
+    make_file(root / "a.py")
+    make_file(root / "pkg" / "b.py")
+    make_file(root / "short.py", num_lines=2)
+    make_file(root / "node_modules" / "dep.py")
+    make_file(root / "out" / "gen.py")
+    make_file(root / "skip.py")
+    (root / ".gitignore").write_text("out/\nskip.py\n", encoding="utf-8")
+    (root / "latin1.py").write_bytes(b"# caf\xe9\n" + b"x = 1\n" * 30)
+
+
+class TestScanStats:
+    def test_scan_directory_counts_each_outcome(self, tmp_path: Path) -> None:
+        """Verify that walking, pruning, gitignore, read and min_lines counters are filled."""
+        _make_tree(tmp_path)
+        stats = ScanStats()
+        files = scan_directory(tmp_path, stats=stats)
+        assert sorted(files) == ["a.py", "latin1.py", "pkg/b.py"]
+        assert stats.dirs_visited == 2
+        assert stats.dirs_pruned == 1
+        assert stats.dirs_gitignored == 1
+        assert stats.files_gitignored == 1
+        assert stats.min_lines_rejects == 1
+        assert stats.decode_errors == 1
+        assert stats.accepted == 3
+        assert stats.files_read == 4
+        assert stats.bytes_read == sum(
+            (tmp_path / rel).stat().st_size for rel in (*files, "short.py")
+        )
+
+    def test_phases_are_timed(self, tmp_path: Path) -> None:
+        """Verify that every phase is reported and the walk and read phases take time."""
+        _make_tree(tmp_path)
+        stats = ScanStats()
+        scan_directory(tmp_path, stats=stats)
+        assert tuple(stats.phases) == SCAN_PHASES
+        assert stats.phases["walk"] > 0
+        assert stats.phases["read"] > 0
+        assert json.loads(json.dumps(stats.as_dict()))["accepted"] == 3
+
+    def test_table_scan_fills_the_same_counters(self, tmp_path: Path) -> None:
+        """Verify that iter_scan_table counts like scan_directory."""
+        _make_tree(tmp_path)
+        expected = ScanStats()
+        scan_directory(tmp_path, stats=expected)
+        stats = ScanStats()
+        list(iter_scan_table(tmp_path, FileTable(), stats=stats))
+        assert stats.dirs_visited == expected.dirs_visited
+        assert stats.dirs_pruned == expected.dirs_pruned
+        assert stats.files_walked == expected.files_walked
+        assert stats.files_gitignored == expected.files_gitignored
+        assert stats.decode_errors == expected.decode_errors
+        assert stats.accepted == expected.accepted
+
+    def test_trace_has_a_span_per_directory_and_file(self, tmp_path: Path) -> None:
+        """Verify that a traced scan records list, read and scan spans."""
+        _make_tree(tmp_path)
+        stats = ScanStats(trace=Tracer())
+        scan_directory(tmp_path, stats=stats)
+        assert stats.trace is not None
+        names = [event["name"] for event in stats.trace.events]
+        assert names.count("list") == stats.dirs_visited
+        assert names.count("read") == stats.files_read
+        assert names[-1] == "scan"
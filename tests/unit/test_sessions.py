@@ -0,0 +1,73 @@
+"""Unit tests for SessionDirectory (game sessions shared between processes)."""
+import os
+from pathlib import Path
+
+import pytest
+
+from codeguessr.game import GameSession, scan_directory
+from codeguessr.sessions import SessionDirectory
+from tests.helpers import make_file
+
+
+def _make_session(tmp_path: Path) -> GameSession:
+    """Create a two-round GameSession over a few temporary Python files."""
+    for i in range(4):
+        make_file(tmp_path / "code" / f"f{i}.py")
+    root = tmp_path / "code"
+    return GameSession.create(str(root), scan_directory(root), num_rounds=2)
+
+
+class TestSessionDirectory:
+    def test_checkout_returns_saved_session(self, tmp_path: Path) -> None:
+        """Verify that a saved session is checked out with the same progress."""
+        sessions = SessionDirectory(tmp_path / "sessions", max_sessions=10)
+        session = _make_session(tmp_path)
+        sessions.save(session)
+        with sessions.checkout(session.game_id) as shared:
+            assert shared is not None
+            assert shared.rounds == session.rounds
+            assert shared.current_round_idx == 0
+
+    def test_changes_are_written_back(self, tmp_path: Path) -> None:
+        """Verify that a guess made on a checked-out session is persisted."""
+        sessions = SessionDirectory(tmp_path / "sessions", max_sessions=10)
+        session = _make_session(tmp_path)
+        sessions.save(session)
+        with sessions.checkout(session.game_id) as shared:
+            assert shared is not None
+            shared.submit_guess(shared.current_round.target_file)
+        with sessions.checkout(session.game_id) as shared:
+            assert shared is not None
+            assert shared.current_round_idx == 1
+            assert shared.rounds[0].correct
+
+    def test_unknown_and_invalid_ids(self, tmp_path: Path) -> None:
+        """Verify that unknown and non-UUID game IDs check out as None."""
+        sessions = SessionDirectory(tmp_path / "sessions", max_sessions=10)
+        for game_id in ("00000000-0000-0000-0000-000000000000", "../../etc/passwd", "x"):
+            with sessions.checkout(game_id) as shared:
+                assert shared is None
+
+    def test_save_rejects_invalid_id(self, tmp_path: Path) -> None:
+        """Verify that a session whose ID is not a UUID is not written."""
+        sessions = SessionDirectory(tmp_path / "sessions", max_sessions=10)
+        session = _make_session(tmp_path)
+        session.game_id = "../escape"
+        with pytest.raises(ValueError):
+            sessions.save(session)
+        assert len(sessions) == 0
+
+    def test_prune_removes_least_recently_saved(self, tmp_path: Path) -> None:
+        """Verify that pruning keeps the most recently saved sessions."""
+        sessions = SessionDirectory(tmp_path / "sessions", max_sessions=2)
+        saved = []
+        for age in (30, 20, 10):
+            session = _make_session(tmp_path)
+            sessions.save(session)
+            path = tmp_path / "sessions" / f"{session.game_id}.json"
+            os.utime(path, (path.stat().st_atime - age, path.stat().st_mtime - age))
+            saved.append(session.game_id)
+        assert sessions.prune() == 1
+        assert len(sessions) == 2
+        with sessions.checkout(saved[0]) as oldest:
+            assert oldest is None
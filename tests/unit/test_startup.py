@@ -0,0 +1,76 @@
+"""Unit tests for the startup profile's import parsing and output formats."""
+from codeguessr.startup import (
+    ImportTiming,
+    StartupProfile,
+    import_stacks,
+    parse_importtime,
+    process_age,
+)
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | site
+import time:        50 |         50 |     pathspec.util
+import time:       150 |        200 |   pathspec
+import time:       900 |       1100 | codeguessr.game
+"""
+
+
+class TestImportTimes:
+    def test_parse_reads_times_and_nesting(self) -> None:
+        """Verify that each reported import is parsed with its depth and the header skipped."""
+        timings = parse_importtime(IMPORTTIME)
+        assert [(t.name, t.depth) for t in timings] == [
+            ("_io", 1), ("site", 0), ("pathspec.util", 2), ("pathspec", 1), ("codeguessr.game", 0),
+        ]
+        assert timings[3] == ImportTiming("pathspec", 150, 200, 1)
+
+    def test_stacks_nest_children_under_their_importer(self) -> None:
+        """Verify that folded import stacks follow the importtime nesting."""
+        assert import_stacks(parse_importtime(IMPORTTIME)) == [
+            ("import;site;_io", 120),
+            ("import;site", 300),
+            ("import;codeguessr.game;pathspec;pathspec.util", 50),
+            ("import;codeguessr.game;pathspec", 150),
+            ("import;codeguessr.game", 900),
+        ]
+
+    def test_process_age_is_positive_when_known(self) -> None:
+        """Verify that the process age is either unavailable or a plausible duration."""
+        age = process_age()
+        assert age is None or 0 <= age < 24 * 3600
+
+
+class TestStartupProfile:
+    def _profile(self) -> StartupProfile:
+        return StartupProfile(
+            imports=parse_importtime(IMPORTTIME),
+            timeline={"import codeguessr.server": 0.25, "server startup (lifespan)": 0.05},
+            scan={
+                "duration": 0.5, "accepted": 10, "files_walked": 12,
+                "phases": {"walk": 0.1, "read": 0.3, "index": 0.0},
+            },
+        )
+
+    def test_module_times_report_tracked_modules(self) -> None:
+        """Verify that tracked modules are reported with their cumulative time."""
+        assert self._profile().module_times() == {"pathspec": 0.0002}
+
+    def test_report_lists_every_section(self) -> None:
+        """Verify that the text report covers imports, the timeline and scan phases."""
+        report = self._profile().format()
+        assert "pathspec" in report
+        assert "server startup (lifespan)" in report
+        assert "300.0 ms" in report
+        assert "10 files accepted of 12 walked" in report
+
+    def test_folded_stacks_are_in_microseconds(self) -> None:
+        """Verify that folded lines are space-free stacks with integer microseconds."""
+        lines = self._profile().folded().splitlines()
+        assert "startup;import_codeguessr.server 250000" in lines
+        assert "scan;read 300000" in lines
+        assert "imports;codeguessr.game;pathspec 150" in lines
+        # Zero-width frames are left out.
+        assert not any(line.startswith("scan;index") for line in lines)
+        assert all(len(line.split(" ")) == 2 for line in lines)
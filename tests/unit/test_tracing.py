@@ -0,0 +1,46 @@
+"""Unit tests for Tracer."""
+import json
+import time
+from pathlib import Path
+
+from codeguessr.tracing import Tracer
+
+
+class TestTracer:
+    def test_spans_are_complete_events_in_microseconds(self) -> None:
+        """Verify that a span is written as an "X" event relative to the tracer's start."""
+        tracer = Tracer()
+        start = time.perf_counter()
+        tracer.complete("read", start, start + 0.002, path="a.py")
+        (event,) = tracer.events
+        assert event["ph"] == "X"
+        assert event["ts"] >= 0
+        assert abs(event["dur"] - 2000) < 1e-6
+        assert event["args"] == {"path": "a.py"}
+
+    def test_span_context_manager_records_added_args(self) -> None:
+        """Verify that args set inside a span block are recorded."""
+        tracer = Tracer()
+        with tracer.span("list", path="pkg") as args:
+            args["entries"] = 3
+        assert tracer.events[0]["args"] == {"path": "pkg", "entries": 3}
+
+    def test_events_beyond_the_limit_are_dropped(self) -> None:
+        """Verify that recording stops at max_events and the drops are reported."""
+        tracer = Tracer(max_events=2)
+        for _ in range(5):
+            tracer.complete("x", 0.0, 0.0)
+        assert len(tracer.events) == 2
+        assert tracer.to_json()["otherData"] == {"dropped_events": 3}
+
+    def test_write_produces_a_loadable_trace(self, tmp_path: Path) -> None:
+        """Verify that the written file is JSON with named threads and the spans."""
+        tracer = Tracer()
+        with tracer.span("scan"):
+            pass
+        path = tmp_path / "trace.json"
+        tracer.write(path)
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        phases = [event["ph"] for event in doc["traceEvents"]]
+        assert phases == ["M", "X"]
+        assert doc["traceEvents"][0]["args"]["name"]
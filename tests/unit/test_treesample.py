@@ -0,0 +1,80 @@
+"""Unit tests for the sampling scanner."""
+import random
+from collections import Counter
+from pathlib import Path
+
+from codeguessr.game import HighlightIndex, scan_directory
+from codeguessr.treesample import iter_sample_directory, sample_directory
+from tests.helpers import make_file
+
+
+def _make_tree(root: Path) -> None:
+    """Populate *root* with an unbalanced tree of 40 eligible files.
+
+    Args:
+        root: Directory in which to create the files.
+    """
+    for i in range(30):
+        make_file(root / "big" / f"sub{i % 3}" / f"f{i}.py")
+    for i in range(8):
+        make_file(root / "mid" / f"m{i}.py")
+    make_file(root / "lone" / "deep" / "x" / "solo.py")
+    make_file(root / "top.py")
+
+
+class TestSampleDirectory:
+    def test_sample_is_bounded(self, tmp_path: Path) -> None:
+        """Verify that no more than sample_size files are returned."""
+        _make_tree(tmp_path)
+        assert len(sample_directory(tmp_path, sample_size=10)) == 10
+
+    def test_sample_is_subset_of_full_scan(self, tmp_path: Path) -> None:
+        """Verify that sampled files all pass the normal eligibility rules."""
+        _make_tree(tmp_path)
+        make_file(tmp_path / "short.py", num_lines=2)
+        make_file(tmp_path / "node_modules" / "dep.py")
+        full = set(scan_directory(tmp_path))
+        assert set(sample_directory(tmp_path, sample_size=25)) <= full
+
+    def test_large_sample_returns_every_file(self, tmp_path: Path) -> None:
+        """Verify that asking for more files than exist returns the whole tree."""
+        _make_tree(tmp_path)
+        assert sample_directory(tmp_path, sample_size=1000) == scan_directory(tmp_path)
+
+    def test_filters_apply(self, tmp_path: Path) -> None:
+        """Verify that include_pattern and highlights work in sampling mode."""
+        _make_tree(tmp_path)
+        highlights: dict[str, HighlightIndex] = {}
+        result = sample_directory(
+            tmp_path, sample_size=5, include_pattern=r"^mid/", highlights=highlights
+        )
+        assert result and all(p.startswith("mid/") for p in result)
+        assert set(highlights) == set(result)
+
+    def test_draws_are_roughly_uniform_across_subtrees(self, tmp_path: Path) -> None:
+        """Verify that the crowded subtree dominates single-file draws as it should."""
+        _make_tree(tmp_path)
+        counts: Counter[str] = Counter()
+        for seed in range(300):
+            gen = iter_sample_directory(tmp_path, sample_size=1, rng=random.Random(seed))
+            counts[next(gen).split("/")[0]] += 1
+        # 30 of 40 files live under big/; uniform sampling puts ~75% there.
+        assert 0.55 < counts["big"] / 300 < 0.95
+
+    def test_empty_tree(self, tmp_path: Path) -> None:
+        """Verify that sampling an empty directory returns nothing."""
+        assert sample_directory(tmp_path, sample_size=5) == []
+
+    def test_empty_probes_do_not_exclude_subtrees(self, tmp_path: Path) -> None:
+        """Verify that subtrees whose probes all hit empty branches are still sampled."""
+        for i in range(100):
+            (tmp_path / f"d{i:02}" / "empty").mkdir(parents=True)
+            for j in range(5):
+                make_file(tmp_path / f"d{i:02}" / "code" / f"f{j}.py")
+        for seed in range(10):
+            result = list(iter_sample_directory(
+                tmp_path, sample_size=400, rng=random.Random(seed)
+            ))
+            assert len(result) == 400
+            # Trusting zero estimates left 14-25 top directories unsampled.
+            assert len({rel.split("/")[0] for rel in result}) >= 92